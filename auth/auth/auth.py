@@ -13,7 +13,7 @@ from gear import (
     setup_aiohttp_session,
     rest_authenticated_users_only, web_authenticated_developers_only,
     web_maybe_authenticated_user, web_authenticated_users_only, create_session,
-    check_csrf_token, transaction, Database, AccessLogger
+    check_csrf_token, transaction, Database, AccessLogger, invalidate_session, invalidate_user
 )
 from web_common import (
     setup_aiohttp_jinja2, setup_common_static_routes, set_message,
@@ -154,6 +154,7 @@ async def logout(request, userdata):
     db = request.app['db']
     session_id = userdata['session_id']
     await db.just_execute('DELETE FROM sessions WHERE session_id = %s;', session_id)
+    invalidate_session(session_id)
 
     session = await aiohttp_session.get_session(request)
     if 'session_id' in session:
@@ -233,6 +234,7 @@ WHERE id = %s AND username = %s;
         assert n_rows == 0
         set_message(session, f'Delete failed, no such user {id} {username}.', 'error')
     else:
+        invalidate_user(username)
         set_message(session, f'Deleted user {id} {username}.', 'info')
 
     return web.HTTPFound(deploy_config.external_url('auth', '/users'))
@@ -302,6 +304,7 @@ async def rest_logout(request, userdata):
     session_id = userdata['session_id']
     db = request.app['db']
     await db.just_execute('DELETE FROM sessions WHERE session_id = %s;', session_id)
+    invalidate_session(session_id)
 
     return web.Response(status=200)
 
@@ -9,12 +9,13 @@ from hailtop.utils import (
     time_msecs, sleep_and_backoff, is_transient_error,
     time_msecs_str, humanize_timedelta_msecs)
 from hailtop.tls import ssl_client_session
+from gear import transaction
 
-from .globals import complete_states, tasks, STATUS_FORMAT_VERSION
+from .globals import complete_states, tasks, STATUS_FORMAT_VERSION, \
+    BULK_CREATE_JOBS_INSTANCE_VERSION
 from .batch_configuration import KUBERNETES_TIMEOUT_IN_SECONDS, \
     KUBERNETES_SERVER_URL
 from .batch_format_version import BatchFormatVersion
-from .spec_writer import SpecWriter
 from .utils import cost_str
 
 log = logging.getLogger('batch')
@@ -80,6 +81,8 @@ def batch_record_to_dict(record):
 
 
 async def notify_batch_job_complete(db, batch_id):
+    '''Make the batch's callback if it is complete.  Returns whether the
+    batch is complete.'''
     record = await db.select_and_fetchone(
         '''
 SELECT batches.*, SUM(`usage` * rate) AS cost
@@ -88,15 +91,16 @@ LEFT JOIN aggregated_batch_resources
   ON batches.id = aggregated_batch_resources.batch_id
 LEFT JOIN resources
   ON aggregated_batch_resources.resource = resources.resource
-WHERE id = %s AND NOT deleted AND callback IS NOT NULL AND
-   batches.`state` = 'complete'
+WHERE id = %s AND NOT deleted AND batches.`state` = 'complete'
 GROUP BY batches.id;
 ''',
         (batch_id,))
 
     if not record:
-        return
+        return False
     callback = record['callback']
+    if callback is None:
+        return True
 
     log.info(f'making callback for batch {batch_id}: {callback}')
 
@@ -112,6 +116,7 @@ GROUP BY batches.id;
             log.info(f'callback for batch {batch_id} successful')
     except Exception:
         log.exception(f'callback for batch {batch_id} failed, will not retry.')
+    return True
 
 
 async def add_attempt_resources(db, batch_id, job_id, attempt_id, resources):
@@ -154,6 +159,7 @@ async def mark_job_complete(app, batch_id, job_id, attempt_id, instance_name, ne
         log.exception(f'error while marking job {id} complete on instance {instance_name}')
         raise
 
+    app['ready_job_queue'].job_completed(batch_id, job_id)
     scheduler_state_changed.set()
     cancel_ready_state_changed.set()
 
@@ -163,6 +169,7 @@ async def mark_job_complete(app, batch_id, job_id, attempt_id, instance_name, ne
             if rv['delta_cores_mcpu'] != 0 and instance.state == 'active':
                 # may also create scheduling opportunities, set above
                 instance.adjust_free_cores_in_memory(rv['delta_cores_mcpu'])
+            instance.release_resources_in_memory(id)
         else:
             log.warning(f'mark_complete for job {id} from unknown {instance}')
 
@@ -180,7 +187,104 @@ async def mark_job_complete(app, batch_id, job_id, attempt_id, instance_name, ne
 
     log.info(f'job {id} changed state: {rv["old_state"]} => {new_state}')
 
-    await notify_batch_job_complete(db, batch_id)
+    if await notify_batch_job_complete(db, batch_id):
+        app['batch_context_cache'].invalidate(batch_id)
+
+
+async def mark_jobs_complete(app, instance_name, completions):
+    '''Like `mark_job_complete` for each of `completions`, dicts of
+    its arguments, but in one transaction with the attempt resources
+    of all the jobs inserted together.
+
+    If the transaction fails, each job is marked complete separately, so
+    that one bad completion does not fail the others.  Returns the ids of
+    the jobs that could not be marked complete.'''
+    scheduler_state_changed = app['scheduler_state_changed']
+    cancel_ready_state_changed = app['cancel_ready_state_changed']
+    db = app['db']
+    inst_pool = app['inst_pool']
+
+    # lock rows in a consistent order
+    completions = sorted(completions, key=lambda c: (c['batch_id'], c['job_id']))
+
+    log.info(f'marking {len(completions)} jobs complete on instance {instance_name}')
+
+    now = time_msecs()
+
+    @transaction(db)
+    async def mark_complete(tx):
+        rvs = []
+        for c in completions:
+            rvs.append(await tx.execute_and_fetchone(
+                '''
+CALL mark_job_complete_in_transaction(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+''',
+                (c['batch_id'], c['job_id'], c['attempt_id'], instance_name, c['new_state'],
+                 json.dumps(c['status']) if c['status'] is not None else None,
+                 c['start_time'], c['end_time'], c['reason'], now)))
+
+        resource_args = [(c['batch_id'], c['job_id'], c['attempt_id'], resource['name'], resource['quantity'])
+                         for c in completions if c['attempt_id']
+                         for resource in c['resources'] or []]
+        if resource_args:
+            await tx.execute_many('''
+INSERT INTO `attempt_resources` (batch_id, job_id, attempt_id, resource, quantity)
+VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE quantity = quantity;
+''',
+                                  resource_args)
+        return rvs
+
+    try:
+        # transient errors are retried by the transaction
+        rvs = await mark_complete()  # pylint: disable=no-value-for-parameter
+    except Exception:
+        log.exception(f'error while marking {len(completions)} jobs complete on instance {instance_name}, '
+                      f'marking each job complete separately')
+        failed = []
+        for c in completions:
+            try:
+                await mark_job_complete(
+                    app, c['batch_id'], c['job_id'], c['attempt_id'], instance_name, c['new_state'],
+                    c['status'], c['start_time'], c['end_time'], c['reason'], c['resources'])
+            except Exception:
+                failed.append((c['batch_id'], c['job_id']))
+        return failed
+
+    scheduler_state_changed.set()
+    cancel_ready_state_changed.set()
+
+    instance = inst_pool.name_instance.get(instance_name)
+    if not instance:
+        log.warning(f'mark_complete for {len(completions)} jobs from unknown instance {instance_name}')
+
+    completed_batch_ids = set()
+    for c, rv in zip(completions, rvs):
+        id = (c['batch_id'], c['job_id'])
+        app['ready_job_queue'].job_completed(*id)
+
+        if instance:
+            if rv['delta_cores_mcpu'] != 0 and instance.state == 'active':
+                instance.adjust_free_cores_in_memory(rv['delta_cores_mcpu'])
+            instance.release_resources_in_memory(id)
+
+        if rv['rc'] != 0:
+            log.info(f'mark_job_complete returned {rv} for job {id}')
+            continue
+
+        old_state = rv['old_state']
+        if old_state in complete_states:
+            log.info(f'old_state {old_state} complete for job {id}, doing nothing')
+            continue
+
+        log.info(f'job {id} changed state: {old_state} => {c["new_state"]}')
+        completed_batch_ids.add(c['batch_id'])
+
+    for batch_id in sorted(completed_batch_ids):
+        if await notify_batch_job_complete(db, batch_id):
+            app['batch_context_cache'].invalidate(batch_id)
+
+    return []
 
 
 async def mark_job_started(app, batch_id, job_id, attempt_id, instance, start_time, resources):
@@ -235,6 +339,46 @@ def job_record_to_dict(record, name):
     return result
 
 
+JOB_FIELDS = ('batch_id', 'job_id', 'name', 'state', 'exit_code', 'duration', 'msec_mcpu', 'cost')
+
+
+def job_record_to_fields_dict(record, fields):
+    '''Like job_record_to_dict, but only `fields`, which the record
+    was selected for.  batch_id and job_id are always included.'''
+    format_version = BatchFormatVersion(record['format_version'])
+
+    result = {
+        'batch_id': record['batch_id'],
+        'job_id': record['job_id']
+    }
+
+    if 'name' in fields:
+        result['name'] = record['name']
+    if 'state' in fields:
+        result['state'] = record['state']
+
+    if 'exit_code' in fields or 'duration' in fields:
+        db_status = record['status']
+        if db_status:
+            db_status = json.loads(db_status)
+            exit_code, duration = format_version.get_status_exit_code_duration(db_status)
+        else:
+            exit_code = None
+            duration = None
+        if 'exit_code' in fields:
+            result['exit_code'] = exit_code
+        if 'duration' in fields:
+            result['duration'] = duration
+
+    if 'msec_mcpu' in fields:
+        result['msec_mcpu'] = record['msec_mcpu']
+    if 'cost' in fields:
+        cost = format_version.cost(record['msec_mcpu'], record['cost'])
+        result['cost'] = cost_str(cost)
+
+    return result
+
+
 async def unschedule_job(app, record):
     cancel_ready_state_changed = app['cancel_ready_state_changed']
     scheduler_state_changed = app['scheduler_state_changed']
@@ -271,6 +415,8 @@ async def unschedule_job(app, record):
         log.warning(f'unschedule job {id}, attempt {attempt_id}: unknown instance {instance_name}')
         return
 
+    instance.release_resources_in_memory(id)
+
     if rv['delta_cores_mcpu'] and instance.state == 'active':
         instance.adjust_free_cores_in_memory(rv['delta_cores_mcpu'])
         scheduler_state_changed.set()
@@ -283,11 +429,10 @@ async def unschedule_job(app, record):
         if instance.state in ('inactive', 'deleted'):
             break
         try:
-            async with aiohttp.ClientSession(
-                    raise_for_status=True, timeout=aiohttp.ClientTimeout(total=60)) as session:
-                await session.delete(url)
-                await instance.mark_healthy()
-                break
+            async with instance.client_session().delete(url):
+                pass
+            await instance.mark_healthy()
+            break
         except Exception as e:
             if (isinstance(e, aiohttp.ClientResponseError)
                     and e.status == 404):  # pylint: disable=no-member
@@ -304,9 +449,57 @@ async def unschedule_job(app, record):
     log.info(f'unschedule job {id}, attempt {attempt_id}: called delete job')
 
 
+async def _read_secret_data(k8s_cache, name, namespace):
+    secret = await k8s_cache.read_secret(name, namespace, KUBERNETES_TIMEOUT_IN_SECONDS)
+    return secret.data
+
+
+async def _kube_config_secret(k8s_cache, namespace, name):
+    sa = await k8s_cache.read_service_account(
+        name, namespace, KUBERNETES_TIMEOUT_IN_SECONDS)
+    assert len(sa.secrets) == 1
+
+    token_secret_name = sa.secrets[0].name
+
+    secret = await k8s_cache.read_secret(
+        token_secret_name, namespace, KUBERNETES_TIMEOUT_IN_SECONDS)
+
+    token = base64.b64decode(secret.data['token']).decode()
+    cert = secret.data['ca.crt']
+
+    kube_config = f'''
+apiVersion: v1
+clusters:
+- cluster:
+    certificate-authority: /.kube/ca.crt
+    server: {KUBERNETES_SERVER_URL}
+  name: default-cluster
+contexts:
+- context:
+    cluster: default-cluster
+    user: {namespace}-{name}
+    namespace: {namespace}
+  name: default-context
+current-context: default-context
+kind: Config
+preferences: {{}}
+users:
+- name: {namespace}-{name}
+  user:
+    token: {token}
+'''
+
+    return {
+        'name': 'kube-config',
+        'mount_path': '/.kube',
+        'data': {'config': base64.b64encode(kube_config.encode()).decode(),
+                 'ca.crt': cert}
+    }
+
+
 async def job_config(app, record, attempt_id):
     k8s_cache = app['k8s_cache']
-    db = app['db']
+    batch_context_cache = app['batch_context_cache']
 
     format_version = BatchFormatVersion(record['format_version'])
     batch_id = record['batch_id']
@@ -324,21 +517,22 @@ async def job_config(app, record, attempt_id):
 
     job_spec['attempt_id'] = attempt_id
 
-    userdata = json.loads(record['userdata'])
+    context = batch_context_cache.context(batch_id, record['userdata'])
+    userdata = context.userdata
 
     secrets = job_spec.get('secrets', [])
-    k8s_secrets = await asyncio.gather(*[
-        k8s_cache.read_secret(
-            secret['name'], secret['namespace'],
-            KUBERNETES_TIMEOUT_IN_SECONDS)
+    secret_datas = await asyncio.gather(*[
+        batch_context_cache.resolve(
+            context, ('secret', secret['name'], secret['namespace']),
+            _read_secret_data, k8s_cache, secret['name'], secret['namespace'])
         for secret in secrets
     ])
 
     gsa_key = None
-    for secret, k8s_secret in zip(secrets, k8s_secrets):
+    for secret, secret_data in zip(secrets, secret_datas):
         if secret['name'] == userdata['gsa_key_secret_name']:
-            gsa_key = k8s_secret.data
-        secret['data'] = k8s_secret.data
+            gsa_key = secret_data
+        secret['data'] = secret_data
 
     assert gsa_key
 
@@ -347,46 +541,10 @@ async def job_config(app, record, attempt_id):
         namespace = service_account['namespace']
         name = service_account['name']
 
-        sa = await k8s_cache.read_service_account(
-            name, namespace, KUBERNETES_TIMEOUT_IN_SECONDS)
-        assert len(sa.secrets) == 1
-
-        token_secret_name = sa.secrets[0].name
-
-        secret = await k8s_cache.read_secret(
-            token_secret_name, namespace, KUBERNETES_TIMEOUT_IN_SECONDS)
-
-        token = base64.b64decode(secret.data['token']).decode()
-        cert = secret.data['ca.crt']
-
-        kube_config = f'''
-apiVersion: v1
-clusters:
-- cluster:
-    certificate-authority: /.kube/ca.crt
-    server: {KUBERNETES_SERVER_URL}
-  name: default-cluster
-contexts:
-- context:
-    cluster: default-cluster
-    user: {namespace}-{name}
-    namespace: {namespace}
-  name: default-context
-current-context: default-context
-kind: Config
-preferences: {{}}
-users:
-- name: {namespace}-{name}
-  user:
-    token: {token}
-'''
-
-        job_spec['secrets'].append({
-            'name': 'kube-config',
-            'mount_path': '/.kube',
-            'data': {'config': base64.b64encode(kube_config.encode()).decode(),
-                     'ca.crt': cert}
-        })
+        kube_config_secret = await batch_context_cache.resolve(
+            context, ('service_account', namespace, name),
+            _kube_config_secret, k8s_cache, namespace, name)
+        job_spec['secrets'].append(dict(kube_config_secret))
 
         env = job_spec.get('env')
         if not env:
@@ -396,7 +554,7 @@ users:
                     'value': '/.kube/config'})
 
     if format_version.has_full_spec_in_gcs():
-        token, start_job_id = await SpecWriter.get_token_start_id(db, batch_id, job_id)
+        token, start_job_id = await batch_context_cache.token_start_id(context, job_id)
     else:
         token = None
         start_job_id = None
@@ -413,36 +571,31 @@ users:
     }
 
 
-async def schedule_job(app, record, instance):
-    assert instance.state == 'active'
-
+async def _job_config_or_error(app, record, instance):
     log_store = app['log_store']
-    db = app['db']
 
     batch_id = record['batch_id']
     job_id = record['job_id']
     attempt_id = record['attempt_id']
     format_version = BatchFormatVersion(record['format_version'])
 
-    id = (batch_id, job_id)
-
     try:
-        try:
-            body = await job_config(app, record, attempt_id)
-        except Exception:
-            log.exception('while making job config')
-            status = {
-                'version': STATUS_FORMAT_VERSION,
-                'worker': None,
-                'batch_id': batch_id,
-                'job_id': job_id,
-                'attempt_id': attempt_id,
-                'user': record['user'],
-                'state': 'error',
-                'error': traceback.format_exc(),
-                'container_statuses': {k: {} for k in tasks}
-            }
+        return await job_config(app, record, attempt_id)
+    except Exception:
+        log.exception('while making job config')
+        status = {
+            'version': STATUS_FORMAT_VERSION,
+            'worker': None,
+            'batch_id': batch_id,
+            'job_id': job_id,
+            'attempt_id': attempt_id,
+            'user': record['user'],
+            'state': 'error',
+            'error': traceback.format_exc(),
+            'container_statuses': {k: {} for k in tasks}
+        }
 
+        try:
             if format_version.has_full_status_in_gcs():
                 await log_store.write_status_file(batch_id, job_id, attempt_id, json.dumps(status))
 
@@ -451,46 +604,198 @@ async def schedule_job(app, record, instance):
 
             await mark_job_complete(app, batch_id, job_id, attempt_id, instance.name,
                                     'Error', db_status, None, None, 'error', resources)
-            raise
+        except Exception:
+            log.exception(f'error while marking job {(batch_id, job_id)} errored on {instance}')
+        return None
 
-        log.info(f'schedule job {id} on {instance}: made job config')
 
-        try:
-            async with aiohttp.ClientSession(
-                    raise_for_status=True, timeout=aiohttp.ClientTimeout(total=2)) as session:
-                url = (f'http://{instance.ip_address}:5000'
-                       f'/api/v1alpha/batches/jobs/create')
-                await session.post(url, json=body)
-                await instance.mark_healthy()
-        except aiohttp.ClientResponseError as e:
-            await instance.mark_healthy()
-            if e.status == 403:
-                log.info(f'attempt already exists for job {id} on {instance}, aborting')
-            raise e
-        except Exception:
-            await instance.incr_failed_request_count()
-            raise
+async def _create_jobs_on_worker(instance, bodies):
+    '''Create jobs on the worker.  Returns a result per body whose
+    status is created, exists or error.'''
+    session = instance.client_session()
+    base_url = f'http://{instance.ip_address}:5000/api/v1alpha/batches/jobs/create'
+    try:
+        if instance.version >= BULK_CREATE_JOBS_INSTANCE_VERSION:
+            async with session.post(f'{base_url}/bulk', json={'jobs': bodies},
+                                    timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                results = (await resp.json())['results']
+        else:
+            results = []
+            for body in bodies:
+                try:
+                    async with session.post(base_url, json=body,
+                                            timeout=aiohttp.ClientTimeout(total=2)):
+                        results.append({'status': 'created'})
+                except aiohttp.ClientResponseError as e:
+                    if e.status != 403:
+                        raise
+                    results.append({'status': 'exists'})
+        await instance.mark_healthy()
+    except aiohttp.ClientResponseError:
+        await instance.mark_healthy()
+        raise
+    except Exception:
+        await instance.incr_failed_request_count()
+        raise
+    assert len(results) == len(bodies)
+    return results
+
+
+async def _schedule_jobs_in_db(db, records, instance_name):
+    '''Set-based `schedule_job`: record the attempts and mark the jobs
+    Running in one transaction.  Returns (batch_id, job_id) => rv as
+    `CALL schedule_job` would.'''
+    ids = [(record['batch_id'], record['job_id']) for record in records]
+    attempt_ids = {(record['batch_id'], record['job_id']): record['attempt_id'] for record in records}
+    record_cores_mcpu = {(record['batch_id'], record['job_id']): record['cores_mcpu'] for record in records}
+    id_placeholders = ', '.join(['(%s, %s)'] * len(ids))
+    id_args = [x for id in ids for x in id]
+
+    @transaction(db)
+    async def schedule(tx):
+        jobs = {(job['batch_id'], job['job_id']): job async for job in tx.execute_and_fetchall(
+            f'''
+SELECT jobs.batch_id, jobs.job_id, state, cores_mcpu, attempt_id,
+  (jobs.cancelled OR batches.cancelled) AND NOT always_run AS cancel
+FROM jobs
+INNER JOIN batches ON batches.id = jobs.batch_id
+WHERE batches.closed AND (jobs.batch_id, jobs.job_id) IN ({id_placeholders})
+FOR UPDATE;
+''',
+            id_args)}
+
+        existing_attempts = {(attempt['batch_id'], attempt['job_id'])
+                             async for attempt in tx.execute_and_fetchall(
+                                 f'''
+SELECT batch_id, job_id FROM attempts
+WHERE (batch_id, job_id, attempt_id) IN ({', '.join(['(%s, %s, %s)'] * len(ids))})
+FOR UPDATE;
+''',
+                                 [x for id in ids for x in (*id, attempt_ids[id])])}
 
-        log.info(f'schedule job {id} on {instance}: called create job')
+        new_attempts = [id for id in ids if id in jobs and id not in existing_attempts]
+        if new_attempts:
+            await tx.execute_many(
+                '''
+INSERT INTO attempts (batch_id, job_id, attempt_id, instance_name) VALUES (%s, %s, %s, %s);
+''',
+                [(*id, attempt_ids[id], instance_name) for id in new_attempts])
 
-        rv = await db.execute_and_fetchone(
-            '''
-CALL schedule_job(%s, %s, %s, %s);
+        instance = await tx.execute_and_fetchone(
+            'SELECT state FROM instances WHERE name = %s FOR UPDATE;', (instance_name,))
+        instance_state = instance['state'] if instance else None
+
+        if new_attempts and instance_state == 'active':
+            await tx.just_execute(
+                'UPDATE instances SET free_cores_mcpu = free_cores_mcpu - %s WHERE name = %s;',
+                (sum(jobs[id]['cores_mcpu'] for id in new_attempts), instance_name))
+            charged = set(new_attempts)
+        else:
+            charged = set()
+
+        rvs = {}
+        to_run = []
+        for id in ids:
+            job = jobs.get(id)
+            # the in-memory free cores were charged when the job was
+            # placed; give them back unless the database was charged
+            delta_cores_mcpu = 0 if id in charged else record_cores_mcpu[id]
+            if job and job['state'] == 'Ready' and not job['cancel'] and instance_state == 'active':
+                to_run.append(id)
+                rvs[id] = {'rc': 0, 'delta_cores_mcpu': delta_cores_mcpu}
+            else:
+                rvs[id] = {
+                    'rc': 1,
+                    'cur_job_state': job['state'] if job else None,
+                    'cur_job_cancel': job['cancel'] if job else None,
+                    'cur_instance_state': instance_state,
+                    'cur_attempt_id': job['attempt_id'] if job else None,
+                    'delta_cores_mcpu': delta_cores_mcpu,
+                    'message': 'job not Ready or cancelled or instance not active, but attempt already exists'
+                }
+
+        if to_run:
+            await tx.execute_update(
+                f'''
+UPDATE jobs
+INNER JOIN ({' UNION ALL '.join(['SELECT %s AS batch_id, %s AS job_id, %s AS attempt_id'] * len(to_run))}) AS t
+  ON jobs.batch_id = t.batch_id AND jobs.job_id = t.job_id
+SET jobs.state = 'Running', jobs.attempt_id = t.attempt_id;
 ''',
-            (batch_id, job_id, attempt_id, instance.name))
-    except Exception:
-        log.exception(f'error while scheduling job {id} on {instance}')
+                [x for id in to_run for x in (*id, attempt_ids[id])])
+
+        return rvs
+
+    return await schedule()  # pylint: disable=no-value-for-parameter
+
+
+async def schedule_jobs(app, records, instance):
+    '''Schedule `records` on `instance`: one request to the worker
+    creates all the jobs and one transaction records them.  Returns
+    whether each record was scheduled.'''
+    assert instance.state == 'active'
+
+    db = app['db']
+
+    def failed(record):
         if instance.state == 'active':
             instance.adjust_free_cores_in_memory(record['cores_mcpu'])
-        return
 
-    if rv['delta_cores_mcpu'] != 0 and instance.state == 'active':
-        instance.adjust_free_cores_in_memory(rv['delta_cores_mcpu'])
+    configs = await asyncio.gather(*[_job_config_or_error(app, record, instance) for record in records])
+    scheduled = [False] * len(records)
 
-    log.info(f'schedule job {id} on {instance}: updated database')
+    to_create = []
+    for i, (record, body) in enumerate(zip(records, configs)):
+        if body is None:
+            failed(record)
+        else:
+            to_create.append((i, record, body))
+    if not to_create:
+        return scheduled
 
-    if rv['rc'] != 0:
-        log.info(f'could not schedule job {id}, attempt {attempt_id} on {instance}, {rv}')
-        return
+    log.info(f'schedule {len(to_create)} jobs on {instance}: made job configs')
+
+    try:
+        results = await _create_jobs_on_worker(instance, [body for _, _, body in to_create])
+    except Exception:
+        log.exception(f'error while creating {len(to_create)} jobs on {instance}')
+        for _, record, _ in to_create:
+            failed(record)
+        return scheduled
+
+    created = []
+    for (i, record, _), result in zip(to_create, results):
+        id = (record['batch_id'], record['job_id'])
+        if result['status'] == 'created':
+            created.append((i, record))
+            continue
+        if result['status'] == 'exists':
+            log.info(f'attempt already exists for job {id} on {instance}, aborting')
+        else:
+            log.error(f'error while creating job {id} on {instance}: {result.get("error")}')
+        failed(record)
+    if not created:
+        return scheduled
+
+    log.info(f'schedule {len(created)} jobs on {instance}: called create jobs')
 
-    log.info(f'success scheduling job {id} on {instance}')
+    try:
+        rvs = await _schedule_jobs_in_db(db, [record for _, record in created], instance.name)
+    except Exception:
+        log.exception(f'error while scheduling {len(created)} jobs on {instance}')
+        for _, record in created:
+            failed(record)
+        return scheduled
+
+    for i, record in created:
+        id = (record['batch_id'], record['job_id'])
+        rv = rvs[id]
+        if rv['delta_cores_mcpu'] != 0 and instance.state == 'active':
+            instance.adjust_free_cores_in_memory(rv['delta_cores_mcpu'])
+        if rv['rc'] != 0:
+            log.info(f'could not schedule job {id}, attempt {record["attempt_id"]} on {instance}, {rv}')
+            continue
+        scheduled[i] = True
+
+    log.info(f'success scheduling {sum(scheduled)} of {len(records)} jobs on {instance}')
+    return scheduled
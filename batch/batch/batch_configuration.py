@@ -14,3 +14,8 @@ HAIL_SHOULD_PROFILE = os.environ.get('HAIL_SHOULD_PROFILE') is not None
 ENABLE_STANDING_WORKER = os.environ.get('ENABLE_STANDING_WORKER') is not None
 STANDING_WORKER_MAX_IDLE_TIME_MSECS = int(os.environ['STANDING_WORKER_MAX_IDLE_TIME_SECS']) * 1000
 WORKER_MAX_IDLE_TIME_MSECS = 30 * 1000
+PLACEMENT_POLICY = os.environ.get('HAIL_BATCH_PLACEMENT_POLICY', 'best-fit')
+AUTOSCALING_POLICY = os.environ.get('HAIL_BATCH_AUTOSCALING_POLICY', 'predictive')
+AUTOSCALER_MAX_CREATE_PER_TICK = int(os.environ.get('HAIL_BATCH_AUTOSCALER_MAX_CREATE_PER_TICK', 100))
+AUTOSCALER_MAX_CREATE_PER_MINUTE = int(os.environ.get('HAIL_BATCH_AUTOSCALER_MAX_CREATE_PER_MINUTE', 600))
+AUTOSCALER_IDLE_RETIRE_SECS = int(os.environ.get('HAIL_BATCH_AUTOSCALER_IDLE_RETIRE_SECS', 15))
@@ -1,4 +1,5 @@
 from hailtop.batch_client.aioclient import Job
+from hailtop.utils import parse_memory_in_bytes
 
 from .utils import cost_from_msec_mcpu
 
@@ -33,11 +34,21 @@ class BatchFormatVersion:
         if service_account:
             service_account = [service_account['namespace'], service_account['name']]
 
+        pvc_size = spec.get('pvc_size')
+        if pvc_size:
+            pvc_size = parse_memory_in_bytes(pvc_size)
+
+        memory = spec.get('resources', {}).get('memory')
+        if memory:
+            memory = parse_memory_in_bytes(memory)
+
         return [
             secrets,
             service_account,
             int(len(spec.get('input_files', [])) > 0),
-            int(len(spec.get('output_files', [])) > 0)
+            int(len(spec.get('output_files', [])) > 0),
+            pvc_size,
+            memory
         ]
 
     def get_spec_secrets(self, spec):
@@ -70,6 +81,29 @@ class BatchFormatVersion:
             return len(spec.get('output_files', [])) > 0
         return bool(spec[3])
 
+    def get_spec_pvc_size_bytes(self, spec):
+        if self.format_version == 1:
+            pvc_size = spec.get('pvc_size')
+            if pvc_size:
+                return parse_memory_in_bytes(pvc_size)
+            return None
+        # specs written before pvc_size was stored have 4 elements
+        if len(spec) > 4:
+            return spec[4]
+        return None
+
+    def get_spec_memory_bytes(self, spec):
+        if self.format_version == 1:
+            memory = spec.get('resources', {}).get('memory')
+            if memory:
+                return parse_memory_in_bytes(memory)
+            return None
+        # specs written before the memory request was stored have at most
+        # 5 elements
+        if len(spec) > 5:
+            return spec[5]
+        return None
+
     def db_status(self, status):
         if self.format_version == 1:
             return status
@@ -0,0 +1,79 @@
+import logging
+import asyncio
+
+log = logging.getLogger('completion_batcher')
+
+
+class ReportFailed(Exception):
+    pass
+
+
+class CompletionBatcher:
+    '''Coalesce job completion reports from the worker to the driver.
+
+    Reports made within `window_secs` of the first unsent report are
+    sent together by `post`, at most `max_batch_size` per request.
+    Each report waits for the request carrying it and raises its error,
+    so callers retry their own reports as they did when each was sent
+    alone.  `post` may return the indices of reports the driver could
+    not process; only those raise `ReportFailed`.
+    '''
+
+    def __init__(self, post, window_secs=0.1, max_batch_size=100):
+        self.post = post
+        self.window_secs = window_secs
+        self.max_batch_size = max_batch_size
+
+        # (status, future)
+        self.pending = []
+        self.flush_task = None
+
+        self.n_reports = 0
+        self.n_requests = 0
+
+    def stats(self):
+        return {
+            'n_pending': len(self.pending),
+            'n_reports': self.n_reports,
+            'n_requests': self.n_requests
+        }
+
+    async def _send(self, batch):
+        self.n_requests += 1
+        try:
+            failed = await self.post([status for status, _ in batch])
+        except Exception as e:  # pylint: disable=broad-except
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            failed = set(failed or [])
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    if i in failed:
+                        future.set_exception(ReportFailed('the driver failed to process the report'))
+                    else:
+                        future.set_result(None)
+
+    def _flush(self):
+        while self.pending:
+            batch = self.pending[:self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size:]
+            asyncio.ensure_future(self._send(batch))
+
+    async def _flush_after_window(self):
+        try:
+            await asyncio.sleep(self.window_secs)
+        finally:
+            self.flush_task = None
+            self._flush()
+
+    async def report(self, status):
+        self.n_reports += 1
+        future = asyncio.get_event_loop().create_future()
+        self.pending.append((status, future))
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self._flush_after_window())
+        await future
@@ -0,0 +1,219 @@
+import collections
+import logging
+
+log = logging.getLogger('autoscaler')
+
+
+class PoolState:
+    '''A snapshot of the instance pool taken each control loop tick.
+
+    `idle_instances` are the active, healthy instances running no jobs.
+    '''
+
+    def __init__(self, *, now_msecs, worker_cores_mcpu, ready_cores_mcpu, user_ready_cores_mcpu,
+                 free_cores_mcpu, live_free_cores_mcpu, n_pending, n_active, n_instances,
+                 pool_size, max_instances, idle_instances=(), min_live_instances=0):
+        self.now_msecs = now_msecs
+        self.worker_cores_mcpu = worker_cores_mcpu
+        self.ready_cores_mcpu = ready_cores_mcpu
+        self.user_ready_cores_mcpu = user_ready_cores_mcpu
+        self.free_cores_mcpu = free_cores_mcpu
+        self.live_free_cores_mcpu = live_free_cores_mcpu
+        self.n_pending = n_pending
+        self.n_active = n_active
+        self.n_instances = n_instances
+        self.pool_size = pool_size
+        self.max_instances = max_instances
+        self.idle_instances = idle_instances
+        self.min_live_instances = min_live_instances
+
+    @property
+    def n_live(self):
+        return self.n_pending + self.n_active
+
+    def max_new_instances(self):
+        return max(0, min(self.pool_size - self.n_live,
+                          self.max_instances - self.n_instances))
+
+
+class ScalingDecision:
+    def __init__(self, n_create=0, instances_to_retire=()):
+        self.n_create = n_create
+        self.instances_to_retire = list(instances_to_retire)
+
+    def __str__(self):
+        return f'create {self.n_create} retire {len(self.instances_to_retire)}'
+
+
+class AutoscalerConfig:
+    def __init__(self, *, interval_secs=15, max_create_per_tick=100, max_create_per_minute=600,
+                 boot_latency_secs=120, trend_window_secs=60, idle_retire_secs=15):
+        self.interval_secs = interval_secs
+        self.max_create_per_tick = max_create_per_tick
+        # 20 queries/s is our GCE long-run quota
+        self.max_create_per_minute = max_create_per_minute
+        # initial estimate, refined as instances activate
+        self.boot_latency_secs = boot_latency_secs
+        self.trend_window_secs = trend_window_secs
+        self.idle_retire_secs = idle_retire_secs
+
+
+class AutoscalingPolicy:
+    name = None
+
+    def __init__(self, config):
+        self.config = config
+
+    def observe_boot_latency(self, msecs):
+        pass
+
+    def decide(self, state):
+        raise NotImplementedError
+
+
+class ReactivePolicy(AutoscalingPolicy):
+    '''Create instances for the ready cores not covered by live free
+    cores, at most 10 per tick.  Idle instances exit on their own.'''
+
+    name = 'reactive'
+
+    def decide(self, state):
+        if state.ready_cores_mcpu <= 0 or state.free_cores_mcpu >= 500_000:
+            return ScalingDecision()
+        instances_needed = (
+            (state.ready_cores_mcpu - state.live_free_cores_mcpu + state.worker_cores_mcpu - 1)
+            // state.worker_cores_mcpu)
+        instances_needed = min(instances_needed,
+                               state.max_new_instances(),
+                               # 20 queries/s; our GCE long-run quota
+                               300,
+                               # n * 16 cores / 15s = excess_scheduling_rate/s = 10/s => n ~= 10
+                               10)
+        return ScalingDecision(n_create=max(0, instances_needed))
+
+
+def _slope(samples):
+    '''Least squares slope of (secs, value) samples, in value per second.'''
+    n = len(samples)
+    if n < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var
+
+
+class PredictivePolicy(AutoscalingPolicy):
+    '''Provision for the demand expected when new instances finish
+    booting.
+
+    Each user's ready cores are extrapolated along their recent trend
+    over the boot latency, so one user's draining queue does not mask
+    another's growing one.  Pending instances count as capacity, so
+    instances are not created twice for the same demand.  Creation is
+    rate limited per tick and per minute.  Idle instances are retired
+    once they have been idle for `idle_retire_secs` and the forecast
+    demand fits in the remaining capacity.
+    '''
+
+    name = 'predictive'
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.boot_latency_secs = config.boot_latency_secs
+        # (secs, {user: ready cores mcpu})
+        self.samples = collections.deque()
+        # msecs of recent instance creations
+        self.creations = collections.deque()
+        # instance name => msecs first seen idle
+        self.idle_since = {}
+
+    def observe_boot_latency(self, msecs):
+        self.boot_latency_secs = 0.8 * self.boot_latency_secs + 0.2 * (msecs / 1000)
+
+    def _record(self, state):
+        now_secs = state.now_msecs / 1000
+        self.samples.append((now_secs, dict(state.user_ready_cores_mcpu)))
+        while self.samples and self.samples[0][0] < now_secs - self.config.trend_window_secs:
+            self.samples.popleft()
+
+    def forecast(self, state):
+        '''Forecast ready cores mcpu once new instances have booted.'''
+        horizon_secs = self.boot_latency_secs + self.config.interval_secs
+        demand = 0
+        for user, ready_cores_mcpu in state.user_ready_cores_mcpu.items():
+            samples = [(t, user_ready.get(user, 0)) for t, user_ready in self.samples]
+            demand += max(0, ready_cores_mcpu + _slope(samples) * horizon_secs)
+        return int(demand)
+
+    def _n_create(self, state, demand_mcpu):
+        cutoff_msecs = state.now_msecs - 60 * 1000
+        while self.creations and self.creations[0] <= cutoff_msecs:
+            self.creations.popleft()
+
+        if demand_mcpu <= state.live_free_cores_mcpu:
+            return 0
+        instances_needed = (
+            (demand_mcpu - state.live_free_cores_mcpu + state.worker_cores_mcpu - 1)
+            // state.worker_cores_mcpu)
+        return max(0, min(instances_needed,
+                          state.max_new_instances(),
+                          self.config.max_create_per_tick,
+                          self.config.max_create_per_minute - len(self.creations)))
+
+    def _instances_to_retire(self, state, demand_mcpu):
+        idle_names = {instance.name for instance in state.idle_instances}
+        for name in list(self.idle_since):
+            if name not in idle_names:
+                del self.idle_since[name]
+        for instance in state.idle_instances:
+            self.idle_since.setdefault(instance.name, state.now_msecs)
+
+        excess_mcpu = state.live_free_cores_mcpu - demand_mcpu
+        n_live = state.n_live
+        to_retire = []
+        for instance in sorted(state.idle_instances, key=lambda instance: self.idle_since[instance.name]):
+            if n_live <= state.min_live_instances:
+                break
+            idle_msecs = state.now_msecs - self.idle_since[instance.name]
+            if idle_msecs < self.config.idle_retire_secs * 1000:
+                break
+            if instance.cores_mcpu > excess_mcpu:
+                continue
+            to_retire.append(instance)
+            excess_mcpu -= instance.cores_mcpu
+            n_live -= 1
+            del self.idle_since[instance.name]
+        return to_retire
+
+    def decide(self, state):
+        self._record(state)
+        forecast_mcpu = self.forecast(state)
+
+        # never provision for less than is ready now
+        demand_mcpu = max(state.ready_cores_mcpu, forecast_mcpu)
+        n_create = self._n_create(state, demand_mcpu)
+        self.creations.extend(state.now_msecs for _ in range(n_create))
+
+        if n_create > 0:
+            self.idle_since.clear()
+            return ScalingDecision(n_create=n_create)
+        return ScalingDecision(instances_to_retire=self._instances_to_retire(state, demand_mcpu))
+
+
+autoscaling_policies = {
+    policy.name: policy
+    for policy in (ReactivePolicy, PredictivePolicy)
+}
+
+
+def autoscaling_policy(name, config=None):
+    policy = autoscaling_policies.get(name)
+    if policy is None:
+        raise ValueError(f'unknown autoscaling policy {name}, '
+                         f'expected one of {", ".join(autoscaling_policies)}')
+    if config is None:
+        config = AutoscalerConfig()
+    return policy(config)
@@ -0,0 +1,283 @@
+'''Replay a load trace against the autoscaling policies.
+
+The trace is a file of JSON lines, one per group of identical jobs:
+
+  {"time": 0, "user": "a", "n": 50000, "cores": 1, "duration": 600}
+
+`time` and `duration` are in seconds.  The simulation boots instances
+after a fixed latency, places ready jobs first-fit in submission order
+and lets idle workers exit after the worker idle time, as the driver
+and workers do.  For each policy it reports the time the pool took to
+reach the capacity the ready jobs needed, the mean and longest job
+wait, and the core-hours paid for but not used by jobs.
+
+  python3 -m batch.driver.autoscaler_sim trace.jsonl
+  python3 -m batch.driver.autoscaler_sim --burst-cores 50000
+'''
+
+import argparse
+import collections
+import heapq
+import json
+
+from .autoscaler import AutoscalerConfig, PoolState, autoscaling_policies, autoscaling_policy
+
+
+class SimJob:
+    def __init__(self, submit_secs, user, cores_mcpu, duration_secs):
+        self.submit_secs = submit_secs
+        self.user = user
+        self.cores_mcpu = cores_mcpu
+        self.duration_secs = duration_secs
+
+
+class SimInstance:
+    def __init__(self, name, cores_mcpu, time_created):
+        self.name = name
+        self.cores_mcpu = cores_mcpu
+        self.free_cores_mcpu = cores_mcpu
+        self.time_created = time_created
+        self.state = 'pending'
+        self.n_jobs = 0
+        self.idle_since = None
+
+
+def read_trace(path):
+    jobs = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            for _ in range(record.get('n', 1)):
+                jobs.append(SimJob(record['time'], record.get('user', 'user'),
+                                   int(record.get('cores', 1) * 1000), record['duration']))
+    jobs.sort(key=lambda job: job.submit_secs)
+    return jobs
+
+
+def burst_trace(cores, duration_secs):
+    return [SimJob(0, 'user', 1000, duration_secs) for _ in range(cores)]
+
+
+class SimulationReport:
+    def __init__(self, policy_name):
+        self.policy_name = policy_name
+        self.time_to_capacity_secs = []
+        self.job_wait_secs = []
+        self.wasted_core_secs = 0
+        self.used_core_secs = 0
+        self.n_created = 0
+        self.n_retired = 0
+        self.peak_instances = 0
+        self.end_secs = 0
+
+    def summary(self):
+        waits = self.job_wait_secs
+        ttc = self.time_to_capacity_secs
+        return {
+            'policy': self.policy_name,
+            'time_to_capacity_secs': max(ttc) if ttc else 0,
+            'mean_time_to_capacity_secs': sum(ttc) / len(ttc) if ttc else 0,
+            'mean_job_wait_secs': sum(waits) / len(waits) if waits else 0,
+            'max_job_wait_secs': max(waits) if waits else 0,
+            'used_core_hours': self.used_core_secs / 3600,
+            'wasted_core_hours': self.wasted_core_secs / 3600,
+            'instances_created': self.n_created,
+            'instances_retired': self.n_retired,
+            'peak_instances': self.peak_instances,
+            'end_secs': self.end_secs
+        }
+
+
+class Simulator:
+    def __init__(self, policy, jobs, *, worker_cores=16, boot_latency_secs=120,
+                 interval_secs=15, step_secs=1, worker_idle_secs=30,
+                 pool_size=10_000, max_instances=10_000, max_secs=7 * 24 * 3600):
+        self.policy = policy
+        self.jobs = jobs
+        self.worker_cores_mcpu = worker_cores * 1000
+        self.boot_latency_secs = boot_latency_secs
+        self.interval_secs = interval_secs
+        self.step_secs = step_secs
+        self.worker_idle_secs = worker_idle_secs
+        self.pool_size = pool_size
+        self.max_instances = max_instances
+        self.max_secs = max_secs
+
+        self.report = SimulationReport(policy.name)
+        self.instances = {}
+        self.ready = collections.deque()
+        self.user_ready_cores_mcpu = collections.defaultdict(int)
+        # (end secs, seq, instance, job)
+        self.running = []
+        self.n_names = 0
+        self.live_free_cores_mcpu = 0
+        # ready cores mcpu plus running cores mcpu when the ready
+        # queue last became non-empty, and when
+        self.capacity_target = None
+
+    @property
+    def ready_cores_mcpu(self):
+        return sum(self.user_ready_cores_mcpu.values())
+
+    def create_instance(self, now):
+        self.n_names += 1
+        instance = SimInstance(f'sim-{self.n_names}', self.worker_cores_mcpu, now)
+        self.instances[instance.name] = instance
+        self.live_free_cores_mcpu += instance.cores_mcpu
+        self.report.n_created += 1
+
+    def remove_instance(self, instance):
+        assert instance.n_jobs == 0
+        del self.instances[instance.name]
+        self.live_free_cores_mcpu -= instance.free_cores_mcpu
+
+    def pool_state(self, now):
+        n_pending = sum(1 for instance in self.instances.values() if instance.state == 'pending')
+        active = [instance for instance in self.instances.values() if instance.state == 'active']
+        return PoolState(
+            now_msecs=int(now * 1000),
+            worker_cores_mcpu=self.worker_cores_mcpu,
+            ready_cores_mcpu=self.ready_cores_mcpu,
+            user_ready_cores_mcpu={user: cores for user, cores in self.user_ready_cores_mcpu.items() if cores},
+            free_cores_mcpu=sum(instance.free_cores_mcpu for instance in active),
+            live_free_cores_mcpu=self.live_free_cores_mcpu,
+            n_pending=n_pending,
+            n_active=len(active),
+            n_instances=len(self.instances),
+            pool_size=self.pool_size,
+            max_instances=self.max_instances,
+            idle_instances=[instance for instance in active if instance.n_jobs == 0])
+
+    def schedule(self, now):
+        if not self.ready:
+            return
+        for instance in self.instances.values():
+            if instance.state != 'active':
+                continue
+            while self.ready and self.ready[0].cores_mcpu <= instance.free_cores_mcpu:
+                job = self.ready.popleft()
+                self.user_ready_cores_mcpu[job.user] -= job.cores_mcpu
+                instance.free_cores_mcpu -= job.cores_mcpu
+                self.live_free_cores_mcpu -= job.cores_mcpu
+                instance.n_jobs += 1
+                instance.idle_since = None
+                self.report.job_wait_secs.append(now - job.submit_secs)
+                heapq.heappush(self.running, (now + job.duration_secs, id(job), instance, job))
+            if not self.ready:
+                return
+
+    def step(self, now, next_job):
+        # submit
+        while next_job < len(self.jobs) and self.jobs[next_job].submit_secs <= now:
+            job = self.jobs[next_job]
+            self.ready.append(job)
+            self.user_ready_cores_mcpu[job.user] += job.cores_mcpu
+            next_job += 1
+
+        # complete
+        while self.running and self.running[0][0] <= now:
+            _, _, instance, job = heapq.heappop(self.running)
+            instance.free_cores_mcpu += job.cores_mcpu
+            self.live_free_cores_mcpu += job.cores_mcpu
+            instance.n_jobs -= 1
+            self.report.used_core_secs += job.cores_mcpu / 1000 * job.duration_secs
+            if instance.n_jobs == 0:
+                instance.idle_since = now
+
+        for instance in list(self.instances.values()):
+            if instance.state == 'pending' and now - instance.time_created >= self.boot_latency_secs:
+                instance.state = 'active'
+                instance.idle_since = now
+                self.policy.observe_boot_latency((now - instance.time_created) * 1000)
+            elif (instance.state == 'active' and instance.n_jobs == 0
+                  and now - instance.idle_since >= self.worker_idle_secs):
+                self.remove_instance(instance)
+
+        if now % self.interval_secs == 0:
+            decision = self.policy.decide(self.pool_state(now))
+            for _ in range(decision.n_create):
+                self.create_instance(now)
+            for instance in decision.instances_to_retire:
+                if instance.name in self.instances and instance.n_jobs == 0:
+                    self.remove_instance(instance)
+                    self.report.n_retired += 1
+
+        self.schedule(now)
+
+        # time to capacity: from when the ready queue becomes
+        # non-empty until the pool has cores for everything that was
+        # running or ready then
+        if self.ready and self.capacity_target is None:
+            running_cores_mcpu = sum(job.cores_mcpu for _, _, _, job in self.running)
+            self.capacity_target = (now, self.ready_cores_mcpu + running_cores_mcpu)
+        if self.capacity_target is not None:
+            since, target_mcpu = self.capacity_target
+            active_cores_mcpu = sum(instance.cores_mcpu for instance in self.instances.values()
+                                    if instance.state == 'active')
+            if active_cores_mcpu >= target_mcpu or not self.ready:
+                self.report.time_to_capacity_secs.append(now - since)
+                self.capacity_target = None
+
+        self.report.wasted_core_secs += self.live_free_cores_mcpu / 1000 * self.step_secs
+        self.report.peak_instances = max(self.report.peak_instances, len(self.instances))
+        return next_job
+
+    def run(self):
+        now = 0
+        next_job = 0
+        while now <= self.max_secs:
+            next_job = self.step(now, next_job)
+            if next_job == len(self.jobs) and not self.ready and not self.running and not self.instances:
+                break
+            now += self.step_secs
+        self.report.end_secs = now
+        return self.report
+
+
+def simulate(policy_name, jobs, config=None, **kwargs):
+    policy = autoscaling_policy(policy_name, config)
+    return Simulator(policy, jobs, **kwargs).run().summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a load trace against the autoscaling policies.')
+    parser.add_argument('trace', nargs='?', help='JSON lines trace file')
+    parser.add_argument('--burst-cores', type=int, help='instead of a trace, submit this many 1-core jobs at once')
+    parser.add_argument('--burst-duration', type=int, default=600)
+    parser.add_argument('--policy', action='append', choices=list(autoscaling_policies),
+                        help='policies to simulate, default all')
+    parser.add_argument('--worker-cores', type=int, default=16)
+    parser.add_argument('--boot-latency', type=int, default=120)
+    parser.add_argument('--worker-idle', type=int, default=30)
+    parser.add_argument('--pool-size', type=int, default=10_000)
+    parser.add_argument('--max-instances', type=int, default=10_000)
+    parser.add_argument('--max-create-per-tick', type=int, default=100)
+    parser.add_argument('--max-create-per-minute', type=int, default=600)
+    args = parser.parse_args()
+
+    if args.trace:
+        jobs = read_trace(args.trace)
+    elif args.burst_cores:
+        jobs = burst_trace(args.burst_cores, args.burst_duration)
+    else:
+        parser.error('either a trace or --burst-cores is required')
+
+    config = AutoscalerConfig(
+        max_create_per_tick=args.max_create_per_tick,
+        max_create_per_minute=args.max_create_per_minute,
+        boot_latency_secs=args.boot_latency)
+    for policy_name in args.policy or autoscaling_policies:
+        summary = simulate(policy_name, jobs, config,
+                           worker_cores=args.worker_cores,
+                           boot_latency_secs=args.boot_latency,
+                           worker_idle_secs=args.worker_idle,
+                           pool_size=args.pool_size,
+                           max_instances=args.max_instances)
+        print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import logging
+import asyncio
+import bisect
+import collections
+import json
+import time
+
+log = logging.getLogger('batch_context_cache')
+
+
+class BatchContext:
+    def __init__(self, batch_id, userdata):
+        self.batch_id = batch_id
+        self.userdata = userdata
+
+        # sorted start job ids of the batch's bunches and their tokens
+        self.bunch_start_job_ids = []
+        self.bunch_tokens = []
+        self.bunches_loaded = False
+        self.bunches_load = None
+
+        # key => (value, time resolved)
+        self.resolved = {}
+        # key => task resolving it
+        self.resolving = {}
+
+    def token_start_id(self, job_id):
+        i = bisect.bisect_right(self.bunch_start_job_ids, job_id) - 1
+        if i < 0:
+            return None
+        return (self.bunch_tokens[i], self.bunch_start_job_ids[i])
+
+
+class BatchContextCache:
+    '''Per-batch state the driver needs to start a batch's jobs.
+
+    Holds each batch's parsed userdata, the start job ids and tokens of
+    its bunches, read once and searched with bisect, and the secrets
+    resolved for its jobs.  Bunches are read when the first job of a
+    batch is scheduled; batches are closed by then, so the bunches are
+    complete.  Resolved secrets are reused for `secret_ttl_secs`.
+    Batches are evicted in least-recently-used order beyond
+    `max_batches` and dropped when they complete or are deleted.
+    '''
+
+    def __init__(self, db, max_batches=1000, secret_ttl_secs=60):
+        self.db = db
+        self.max_batches = max_batches
+        self.secret_ttl_secs = secret_ttl_secs
+
+        # batch_id => BatchContext, least recently used first
+        self.batches = collections.OrderedDict()
+
+        self.n_bunch_queries = 0
+        self.n_resolves = 0
+
+    def context(self, batch_id, userdata):
+        '''`userdata` is the batch's JSON userdata, parsed once per batch.'''
+        context = self.batches.get(batch_id)
+        if context is not None:
+            self.batches.move_to_end(batch_id)
+            return context
+
+        context = BatchContext(batch_id, json.loads(userdata))
+        self.batches[batch_id] = context
+        while len(self.batches) > self.max_batches:
+            self.batches.popitem(last=False)
+        return context
+
+    def invalidate(self, batch_id):
+        self.batches.pop(batch_id, None)
+
+    async def drop_deleted_batches(self):
+        batch_ids = list(self.batches)
+        if not batch_ids:
+            return
+        async for record in self.db.select_and_fetchall(
+                f'''
+SELECT id FROM batches
+WHERE deleted AND id IN ({", ".join(["%s"] * len(batch_ids))});
+''',
+                batch_ids):
+            log.info(f'dropping deleted batch {record["id"]}')
+            self.invalidate(record['id'])
+
+    async def _load_bunches(self, context):
+        self.n_bunch_queries += 1
+        start_job_ids = []
+        tokens = []
+        async for record in self.db.select_and_fetchall(
+                '''
+SELECT start_job_id, token FROM batch_bunches
+WHERE batch_id = %s
+ORDER BY start_job_id;
+''',
+                (context.batch_id,)):
+            start_job_ids.append(record['start_job_id'])
+            tokens.append(record['token'])
+        context.bunch_start_job_ids = start_job_ids
+        context.bunch_tokens = tokens
+        context.bunches_loaded = True
+
+    async def token_start_id(self, context, job_id):
+        if not context.bunches_loaded:
+            if context.bunches_load is None:
+                context.bunches_load = asyncio.ensure_future(self._load_bunches(context))
+
+                def done(task):
+                    # retry failed loads on the next request
+                    if task.cancelled() or task.exception() is not None:
+                        context.bunches_load = None
+                context.bunches_load.add_done_callback(done)
+            await asyncio.shield(context.bunches_load)
+
+        token_start_id = context.token_start_id(job_id)
+        if token_start_id is None:
+            raise ValueError(f'no bunch for job {job_id} of batch {context.batch_id}')
+        return token_start_id
+
+    async def resolve(self, context, key, f, *args):
+        '''Return the value `f(*args)` resolved for `key` in the last
+        `secret_ttl_secs`, or resolve it.  Concurrent resolutions of a
+        key share one call.'''
+        value, time_resolved = context.resolved.get(key, (None, None))
+        if time_resolved is not None and time.time() < time_resolved + self.secret_ttl_secs:
+            return value
+
+        task = context.resolving.get(key)
+        if task is None:
+            self.n_resolves += 1
+
+            async def resolve():
+                value = await f(*args)
+                context.resolved[key] = (value, time.time())
+                return value
+
+            task = asyncio.ensure_future(resolve())
+            context.resolving[key] = task
+
+            def remove(_):
+                if context.resolving.get(key) is task:
+                    del context.resolving[key]
+            task.add_done_callback(remove)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            'n_batches': len(self.batches),
+            'n_bunch_queries': self.n_bunch_queries,
+            'n_resolves': self.n_resolves
+        }
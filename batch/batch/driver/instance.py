@@ -7,6 +7,7 @@ from hailtop.utils import time_msecs, time_msecs_str
 
 from ..database import check_call_procedure
 from ..globals import INSTANCE_VERSION
+from .placement import WORKER_STORAGE_BYTES
 
 log = logging.getLogger('instance')
 
@@ -57,10 +58,32 @@ VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         self.version = version
         self.zone = zone
 
+        # storage and memory are only tracked in memory, restored from
+        # the running jobs when the driver starts
+        # (batch_id, job_id) => (storage bytes, memory bytes)
+        self.job_resources = {}
+        self.free_storage_bytes = WORKER_STORAGE_BYTES
+        self.allocated_memory_bytes = 0
+
+        self._client_session = None
+
     @property
     def state(self):
         return self._state
 
+    def client_session(self):
+        '''Session for requests to the worker, kept open so requests
+        reuse its connections.  Closed when the instance is deactivated.'''
+        if self._client_session is None or self._client_session.closed:
+            self._client_session = aiohttp.ClientSession(
+                raise_for_status=True, timeout=aiohttp.ClientTimeout(total=60))
+        return self._client_session
+
+    async def close_client_session(self):
+        if self._client_session is not None:
+            await self._client_session.close()
+            self._client_session = None
+
     async def activate(self, ip_address, timestamp):
         assert self._state == 'pending'
 
@@ -73,6 +96,7 @@ VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         self._state = 'active'
         self.ip_address = ip_address
         self.instance_pool.adjust_for_add_instance(self)
+        self.instance_pool.autoscaling_policy.observe_boot_latency(timestamp - self.time_created)
 
         self.scheduler_state_changed.set()
 
@@ -96,8 +120,13 @@ VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         self.instance_pool.adjust_for_remove_instance(self)
         self._state = 'inactive'
         self._free_cores_mcpu = self.cores_mcpu
+        self.job_resources = {}
+        self.free_storage_bytes = WORKER_STORAGE_BYTES
+        self.allocated_memory_bytes = 0
         self.instance_pool.adjust_for_add_instance(self)
 
+        await self.close_client_session()
+
         # there might be jobs to reschedule
         self.scheduler_state_changed.set()
 
@@ -128,6 +157,19 @@ VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         self._free_cores_mcpu += delta_mcpu
         self.instance_pool.adjust_for_add_instance(self)
 
+    def allocate_resources_in_memory(self, id, storage_bytes, memory_bytes):
+        if id not in self.job_resources:
+            self.job_resources[id] = (storage_bytes, memory_bytes)
+            self.free_storage_bytes -= storage_bytes
+            self.allocated_memory_bytes += memory_bytes
+
+    def release_resources_in_memory(self, id):
+        resources = self.job_resources.pop(id, None)
+        if resources:
+            storage_bytes, memory_bytes = resources
+            self.free_storage_bytes += storage_bytes
+            self.allocated_memory_bytes -= memory_bytes
+
     @property
     def failed_request_count(self):
         return self._failed_request_count
@@ -135,14 +177,14 @@ VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
     async def check_is_active_and_healthy(self):
         if self._state == 'active' and self.ip_address:
             try:
-                async with aiohttp.ClientSession(
-                        raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5)) as session:
-                    async with session.get(f'http://{self.ip_address}:5000/healthcheck') as resp:
-                        actual_name = (await resp.json()).get('name')
-                        if actual_name and actual_name != self.name:
-                            return False
-                    await self.mark_healthy()
-                    return True
+                async with self.client_session().get(
+                        f'http://{self.ip_address}:5000/healthcheck',
+                        timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                    actual_name = (await resp.json()).get('name')
+                    if actual_name and actual_name != self.name:
+                        return False
+                await self.mark_healthy()
+                return True
             except Exception:
                 log.exception(f'while requesting {self} /healthcheck')
                 await self.incr_failed_request_count()
@@ -13,9 +13,12 @@ from hailtop.utils import time_msecs, secret_alnum_string
 
 from ..batch_configuration import DEFAULT_NAMESPACE, PROJECT, \
     WORKER_MAX_IDLE_TIME_MSECS, STANDING_WORKER_MAX_IDLE_TIME_MSECS, \
-    ENABLE_STANDING_WORKER
+    ENABLE_STANDING_WORKER, AUTOSCALING_POLICY, AUTOSCALER_MAX_CREATE_PER_TICK, \
+    AUTOSCALER_MAX_CREATE_PER_MINUTE, AUTOSCALER_IDLE_RETIRE_SECS
 
 from .instance import Instance
+from .placement import job_storage_and_memory_bytes
+from .autoscaler import AutoscalerConfig, PoolState, autoscaling_policy
 from ..worker_config import WorkerConfig
 
 log = logging.getLogger('instance_pool')
@@ -63,6 +66,14 @@ class InstancePool:
 
         self.name_instance = {}
 
+        self.autoscaling_policy = autoscaling_policy(
+            AUTOSCALING_POLICY,
+            AutoscalerConfig(
+                max_create_per_tick=AUTOSCALER_MAX_CREATE_PER_TICK,
+                max_create_per_minute=AUTOSCALER_MAX_CREATE_PER_MINUTE,
+                idle_retire_secs=AUTOSCALER_IDLE_RETIRE_SECS))
+        log.info(f'using autoscaling policy {AUTOSCALING_POLICY}')
+
     async def async_init(self):
         log.info('initializing instance pool')
 
@@ -82,10 +93,38 @@ SELECT worker_type, worker_cores, worker_disk_size_gb, standing_worker_cores, ma
             instance = Instance.from_record(self.app, record)
             self.add_instance(instance)
 
+        await self.load_running_job_resources()
+
         asyncio.ensure_future(self.event_loop())
         asyncio.ensure_future(self.control_loop())
         asyncio.ensure_future(self.instance_monitoring_loop())
 
+    async def load_running_job_resources(self):
+        '''Allocate the storage and memory of the jobs running on live
+        instances, which are only tracked in memory.'''
+        n_jobs = 0
+        async for record in self.db.select_and_fetchall(
+                '''
+SELECT jobs.batch_id, jobs.job_id, jobs.spec, jobs.cores_mcpu,
+  batches.format_version, attempts.instance_name
+FROM instances
+INNER JOIN attempts ON attempts.instance_name = instances.name
+INNER JOIN jobs
+  ON jobs.batch_id = attempts.batch_id AND jobs.job_id = attempts.job_id AND
+     jobs.attempt_id = attempts.attempt_id
+INNER JOIN batches ON batches.id = jobs.batch_id
+WHERE instances.removed = 0 AND instances.state IN ('pending', 'active') AND
+  jobs.state = 'Running';
+'''):
+            instance = self.name_instance.get(record['instance_name'])
+            if instance is None:
+                continue
+            storage_bytes, memory_bytes = job_storage_and_memory_bytes(record, self.worker_type)
+            instance.allocate_resources_in_memory(
+                (record['batch_id'], record['job_id']), storage_bytes, memory_bytes)
+            n_jobs += 1
+        log.info(f'allocated the resources of {n_jobs} running jobs')
+
     def config(self):
         return {
             'worker_type': self.worker_type,
@@ -514,43 +553,70 @@ AND timestamp >= "{mark}"
                 log.exception('in event loop')
             await asyncio.sleep(15)
 
+    async def retire_instance(self, instance):
+        # the scheduler may have placed jobs since the decision
+        if instance.state != 'active' or instance.free_cores_mcpu != instance.cores_mcpu:
+            return
+        # stop scheduling on the instance before deleting it
+        self.healthy_instances_by_free_cores.discard(instance)
+        log.info(f'retiring idle {instance}')
+        await self.call_delete_instance(instance, 'idle')
+
+    async def pool_state(self):
+        user_ready_cores_mcpu = {
+            record['user']: record['ready_cores_mcpu']
+            async for record in self.db.select_and_fetchall(
+                '''
+SELECT user, CAST(COALESCE(SUM(ready_cores_mcpu), 0) AS SIGNED) AS ready_cores_mcpu
+FROM user_resources
+GROUP BY user;
+''')
+        }
+        ready_cores_mcpu = sum(user_ready_cores_mcpu.values())
+
+        free_cores_mcpu = sum([
+            worker.free_cores_mcpu
+            for worker in self.healthy_instances_by_free_cores
+        ])
+        idle_instances = [
+            instance for instance in self.healthy_instances_by_free_cores
+            if instance.free_cores_mcpu == instance.cores_mcpu
+        ]
+
+        return PoolState(
+            now_msecs=time_msecs(),
+            worker_cores_mcpu=self.worker_cores * 1000,
+            ready_cores_mcpu=ready_cores_mcpu,
+            user_ready_cores_mcpu=user_ready_cores_mcpu,
+            free_cores_mcpu=free_cores_mcpu,
+            live_free_cores_mcpu=self.live_free_cores_mcpu,
+            n_pending=self.n_instances_by_state['pending'],
+            n_active=self.n_instances_by_state['active'],
+            n_instances=self.n_instances,
+            pool_size=self.pool_size,
+            max_instances=self.max_instances,
+            idle_instances=idle_instances,
+            min_live_instances=1 if ENABLE_STANDING_WORKER else 0)
+
     async def control_loop(self):
         log.info(f'starting control loop')
         while True:
             try:
-                ready_cores = await self.db.select_and_fetchone(
-                    '''
-SELECT CAST(COALESCE(SUM(ready_cores_mcpu), 0) AS SIGNED) AS ready_cores_mcpu
-FROM ready_cores;
-''')
-                ready_cores_mcpu = ready_cores['ready_cores_mcpu']
-
-                free_cores_mcpu = sum([
-                    worker.free_cores_mcpu
-                    for worker in self.healthy_instances_by_free_cores
-                ])
-                free_cores = free_cores_mcpu / 1000
+                state = await self.pool_state()
 
                 log.info(f'n_instances {self.n_instances} {self.n_instances_by_state}'
-                         f' free_cores {free_cores} live_free_cores {self.live_free_cores_mcpu / 1000}'
-                         f' ready_cores {ready_cores_mcpu / 1000}')
-
-                if ready_cores_mcpu > 0 and free_cores < 500:
-                    n_live_instances = self.n_instances_by_state['pending'] + self.n_instances_by_state['active']
-                    instances_needed = (
-                        (ready_cores_mcpu - self.live_free_cores_mcpu + (self.worker_cores * 1000) - 1)
-                        // (self.worker_cores * 1000))
-                    instances_needed = min(instances_needed,
-                                           self.pool_size - n_live_instances,
-                                           self.max_instances - self.n_instances,
-                                           # 20 queries/s; our GCE long-run quota
-                                           300,
-                                           # n * 16 cores / 15s = excess_scheduling_rate/s = 10/s => n ~= 10
-                                           10)
-                    if instances_needed > 0:
-                        log.info(f'creating {instances_needed} new instances')
-                        # parallelism will be bounded by thread pool
-                        await asyncio.gather(*[self.create_instance() for _ in range(instances_needed)])
+                         f' free_cores {state.free_cores_mcpu / 1000} live_free_cores {self.live_free_cores_mcpu / 1000}'
+                         f' ready_cores {state.ready_cores_mcpu / 1000}')
+
+                decision = self.autoscaling_policy.decide(state)
+                if decision.n_create > 0:
+                    log.info(f'creating {decision.n_create} new instances')
+                    # parallelism will be bounded by thread pool
+                    await asyncio.gather(*[self.create_instance() for _ in range(decision.n_create)])
+                if decision.instances_to_retire:
+                    log.info(f'retiring {len(decision.instances_to_retire)} idle instances')
+                    await asyncio.gather(*[self.retire_instance(instance)
+                                           for instance in decision.instances_to_retire])
 
                 n_live_instances = self.n_instances_by_state['pending'] + self.n_instances_by_state['active']
                 if ENABLE_STANDING_WORKER and n_live_instances == 0 and self.max_instances > 0:
@@ -8,7 +8,6 @@ import asyncio
 from aiohttp import web
 import aiohttp_session
 import kubernetes_asyncio as kube
-import google.oauth2.service_account
 from prometheus_async.aio.web import server_stats
 from gear import Database, setup_aiohttp_session, web_authenticated_developers_only, \
     check_csrf_token, transaction, AccessLogger
@@ -21,7 +20,7 @@ from web_common import setup_aiohttp_jinja2, setup_common_static_routes, render_
 import googlecloudprofiler
 import uvloop
 
-from ..batch import mark_job_complete, mark_job_started
+from ..batch import mark_job_complete, mark_jobs_complete, mark_job_started
 from ..log_store import LogStore
 from ..batch_configuration import REFRESH_INTERVAL_IN_SECONDS, \
     DEFAULT_NAMESPACE, BATCH_BUCKET_NAME, HAIL_SHA, HAIL_SHOULD_PROFILE, \
@@ -31,7 +30,9 @@ from ..utils import cost_from_msec_mcpu
 
 from .instance_pool import InstancePool
 from .scheduler import Scheduler
+from .ready_queue import ReadyJobQueue
 from .k8s_cache import K8sCache
+from .batch_context_cache import BatchContextCache
 
 uvloop.install()
 
@@ -159,6 +160,7 @@ SELECT state FROM batches WHERE user = %s AND id = %s;
     if not record:
         raise web.HTTPNotFound()
 
+    request.app['ready_job_queue'].batch_closed(batch_id)
     request.app['scheduler_state_changed'].set()
 
     return web.Response()
@@ -167,6 +169,7 @@ SELECT state FROM batches WHERE user = %s AND id = %s;
 @routes.post('/api/v1alpha/batches/cancel')
 @batch_only
 async def cancel_batch(request):
+    request.app['ready_job_queue'].batch_state_changed()
     request.app['cancel_running_state_changed'].set()
     request.app['cancel_ready_state_changed'].set()
     return web.Response()
@@ -175,6 +178,8 @@ async def cancel_batch(request):
 @routes.post('/api/v1alpha/batches/delete')
 @batch_only
 async def delete_batch(request):
+    await request.app['batch_context_cache'].drop_deleted_batches()
+    request.app['ready_job_queue'].batch_state_changed()
     request.app['cancel_running_state_changed'].set()
     request.app['cancel_ready_state_changed'].set()
     return web.Response()
@@ -216,14 +221,7 @@ async def deactivate_instance(request, instance):  # pylint: disable=unused-argu
     return await asyncio.shield(deactivate_instance_1(instance))
 
 
-async def job_complete_1(request, instance):
-    body = await request.json()
-    job_status = body['status']
-
-    batch_id = job_status['batch_id']
-    job_id = job_status['job_id']
-    attempt_id = job_status['attempt_id']
-
+def job_complete_args(job_status):
     state = job_status['state']
     if state == 'succeeded':
         new_state = 'Success'
@@ -233,14 +231,26 @@ async def job_complete_1(request, instance):
         assert state == 'failed', state
         new_state = 'Failed'
 
-    start_time = job_status['start_time']
-    end_time = job_status['end_time']
-    status = job_status['status']
-    resources = job_status.get('resources')
+    return {
+        'batch_id': job_status['batch_id'],
+        'job_id': job_status['job_id'],
+        'attempt_id': job_status['attempt_id'],
+        'new_state': new_state,
+        'status': job_status['status'],
+        'start_time': job_status['start_time'],
+        'end_time': job_status['end_time'],
+        'reason': 'completed',
+        'resources': job_status.get('resources')
+    }
 
-    await mark_job_complete(request.app, batch_id, job_id, attempt_id, instance.name,
-                            new_state, status, start_time, end_time, 'completed',
-                            resources)
+
+async def job_complete_1(request, instance):
+    body = await request.json()
+    args = job_complete_args(body['status'])
+
+    await mark_job_complete(request.app, args['batch_id'], args['job_id'], args['attempt_id'], instance.name,
+                            args['new_state'], args['status'], args['start_time'], args['end_time'],
+                            args['reason'], args['resources'])
 
     await instance.mark_healthy()
 
@@ -253,6 +263,23 @@ async def job_complete(request, instance):
     return await asyncio.shield(job_complete_1(request, instance))
 
 
+async def jobs_complete_1(request, instance):
+    body = await request.json()
+    completions = [job_complete_args(job_status) for job_status in body['statuses']]
+
+    failed = await mark_jobs_complete(request.app, instance.name, completions)
+
+    await instance.mark_healthy()
+
+    return web.json_response({'failed': failed})
+
+
+@routes.post('/api/v1alpha/instances/jobs_complete')
+@active_instances_only
+async def jobs_complete(request, instance):
+    return await asyncio.shield(jobs_complete_1(request, instance))
+
+
 async def job_started_1(request, instance):
     body = await request.json()
     job_status = body['status']
@@ -647,6 +674,8 @@ async def on_startup(app):
     await db.async_init(maxsize=50)
     app['db'] = db
 
+    app['batch_context_cache'] = BatchContextCache(db)
+
     row = await db.select_and_fetchone('''
 SELECT worker_type, worker_cores, worker_disk_size_gb,
   instance_id, internal_token FROM globals;
@@ -695,11 +724,11 @@ SELECT worker_type, worker_cores, worker_disk_size_gb,
     cancel_running_state_changed = asyncio.Event()
     app['cancel_running_state_changed'] = cancel_running_state_changed
 
-    credentials = google.oauth2.service_account.Credentials.from_service_account_file(
-        '/gsa-key/key.json')
-    log_store = LogStore(BATCH_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, instance_id, pool, credentials=credentials)
+    log_store = LogStore(BATCH_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, instance_id, credentials=aiogoogle_credentials)
     app['log_store'] = log_store
 
+    app['ready_job_queue'] = ReadyJobQueue(db)
+
     inst_pool = InstancePool(app, machine_name_prefix)
     app['inst_pool'] = inst_pool
     await inst_pool.async_init()
@@ -716,6 +745,7 @@ SELECT worker_type, worker_cores, worker_disk_size_gb,
 async def on_cleanup(app):
     blocking_pool = app['blocking_pool']
     blocking_pool.shutdown()
+    await app['log_store'].close()
     await app['db'].async_close()
 
 
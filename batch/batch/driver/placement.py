@@ -0,0 +1,149 @@
+import json
+import logging
+
+from ..batch_format_version import BatchFormatVersion
+from ..globals import WORKER_STORAGE_BYTES
+from ..utils import cores_mcpu_to_memory_bytes
+
+log = logging.getLogger('placement')
+
+
+def job_storage_and_memory_bytes(record, worker_type):
+    format_version = BatchFormatVersion(record['format_version'])
+    spec = json.loads(record['spec'])
+    storage_bytes = format_version.get_spec_pvc_size_bytes(spec)
+    if storage_bytes is None:
+        storage_bytes = 0
+    memory_bytes = format_version.get_spec_memory_bytes(spec)
+    if memory_bytes is None:
+        # the job may use the memory that comes with its cores
+        memory_bytes = cores_mcpu_to_memory_bytes(record['cores_mcpu'], worker_type)
+    return (storage_bytes, memory_bytes)
+
+
+class PlacementPolicy:
+    name = None
+
+    def __init__(self, worker_type):
+        self.worker_type = worker_type
+
+    def memory_bytes(self, instance):
+        return cores_mcpu_to_memory_bytes(instance.cores_mcpu, self.worker_type)
+
+    def free_memory_bytes(self, instance):
+        return self.memory_bytes(instance) - instance.allocated_memory_bytes
+
+    def is_eligible(self, instance, user, cores_mcpu, storage_bytes, memory_bytes):
+        if cores_mcpu > instance.free_cores_mcpu:
+            return False
+        if storage_bytes > instance.free_storage_bytes:
+            return False
+        if memory_bytes > self.free_memory_bytes(instance):
+            return False
+        return user != 'ci' or instance.zone.startswith('us-central1')
+
+    def candidates(self, instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+        '''Eligible instances in increasing order of free cores.'''
+        i = instances_by_free_cores.bisect_key_left(cores_mcpu)
+        while i < len(instances_by_free_cores):
+            instance = instances_by_free_cores[i]
+            assert cores_mcpu <= instance.free_cores_mcpu
+            if self.is_eligible(instance, user, cores_mcpu, storage_bytes, memory_bytes):
+                yield instance
+            i += 1
+
+    def get_instance(self, instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+        raise NotImplementedError
+
+
+class BestFitPolicy(PlacementPolicy):
+    '''Place on the instance with the fewest free cores that fits.'''
+
+    name = 'best-fit'
+
+    def get_instance(self, instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+        for instance in self.candidates(instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+            return instance
+        return None
+
+
+class WorstFitPolicy(PlacementPolicy):
+    '''Place on the instance with the most free cores.'''
+
+    name = 'worst-fit'
+
+    def get_instance(self, instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+        for instance in reversed(instances_by_free_cores):
+            if instance.free_cores_mcpu < cores_mcpu:
+                break
+            if self.is_eligible(instance, user, cores_mcpu, storage_bytes, memory_bytes):
+                return instance
+        return None
+
+
+class PackingScorePolicy(PlacementPolicy):
+    '''Place on the instance with the lowest packing score.
+
+    The score is the weighted sum of the fraction of cores, memory and
+    storage left free on the instance after placement, plus a penalty
+    for leaving a fragment of cores too small for a typical job.
+    Memory is allocated in proportion to cores (see
+    `adjust_cores_for_memory_request`), so memory is derived from the
+    instance's free cores.  Only the first `max_candidates` eligible
+    instances, in increasing order of free cores, are scored.
+    '''
+
+    name = 'packing-score'
+
+    def __init__(self, worker_type, cores_weight=1.0, memory_weight=1.0, storage_weight=1.0,
+                 min_useful_cores_mcpu=1000, fragment_penalty=1.0, max_candidates=64):
+        super().__init__(worker_type)
+        self.cores_weight = cores_weight
+        self.memory_weight = memory_weight
+        self.storage_weight = storage_weight
+        self.min_useful_cores_mcpu = min_useful_cores_mcpu
+        self.fragment_penalty = fragment_penalty
+        self.max_candidates = max_candidates
+
+    def score(self, instance, cores_mcpu, storage_bytes, memory_bytes):
+        free_cores_mcpu = instance.free_cores_mcpu - cores_mcpu
+        cores_left = free_cores_mcpu / instance.cores_mcpu
+
+        memory_left = (self.free_memory_bytes(instance) - memory_bytes) / self.memory_bytes(instance)
+
+        storage_left = (instance.free_storage_bytes - storage_bytes) / WORKER_STORAGE_BYTES
+
+        score = (self.cores_weight * cores_left
+                 + self.memory_weight * memory_left
+                 + self.storage_weight * storage_left)
+        if 0 < free_cores_mcpu < self.min_useful_cores_mcpu:
+            score += self.fragment_penalty
+        return score
+
+    def get_instance(self, instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+        best_instance = None
+        best_score = None
+        n = 0
+        for instance in self.candidates(instances_by_free_cores, user, cores_mcpu, storage_bytes, memory_bytes):
+            score = self.score(instance, cores_mcpu, storage_bytes, memory_bytes)
+            if best_score is None or score < best_score:
+                best_instance = instance
+                best_score = score
+            n += 1
+            if n >= self.max_candidates:
+                break
+        return best_instance
+
+
+placement_policies = {
+    policy.name: policy
+    for policy in (BestFitPolicy, WorstFitPolicy, PackingScorePolicy)
+}
+
+
+def placement_policy(name, worker_type):
+    policy = placement_policies.get(name)
+    if policy is None:
+        raise ValueError(f'unknown placement policy {name}, '
+                         f'expected one of {", ".join(placement_policies)}')
+    return policy(worker_type)
@@ -0,0 +1,220 @@
+import logging
+import collections
+import sortedcontainers
+
+from hailtop.utils import time_msecs
+
+log = logging.getLogger('ready_queue')
+
+
+class BatchReadyJobs:
+    def __init__(self, record):
+        self.id = record['id']
+        self.user = record['user']
+        self.userdata = record['userdata']
+        self.format_version = record['format_version']
+        self.cancelled = record['cancelled']
+
+        # job_id => record
+        self.jobs = sortedcontainers.SortedDict()
+        # stale means the database might have Ready jobs that are not in
+        # self.jobs, it is checked while fewer than the load limit are
+        # loaded
+        self.stale = True
+
+    def drop_cancelled_jobs(self):
+        for job_id in [job_id for job_id, record in self.jobs.items()
+                       if not record['always_run']]:
+            del self.jobs[job_id]
+
+
+class ReadyJobQueue:
+    '''In-memory, per-user queue of Ready jobs for the scheduler.
+
+    The queue is updated incrementally as the driver learns about job
+    state transitions (batch close, cancel, job complete) and is
+    reconciled against the database every `reconcile_interval_msecs`.
+    The database is only queried for a batch's Ready jobs when jobs
+    might have become Ready since they were last loaded and fewer than
+    `load_limit` of them are loaded.
+    '''
+
+    def __init__(self, db, load_limit=1000, reconcile_interval_msecs=60 * 1000):
+        self.db = db
+        self.load_limit = load_limit
+        self.reconcile_interval_msecs = reconcile_interval_msecs
+
+        # batch_id => BatchReadyJobs
+        self.batches = {}
+        # user => batch ids
+        self.user_batches = collections.defaultdict(sortedcontainers.SortedSet)
+
+        # jobs handed to the scheduler that are still Ready in the database
+        self.in_flight = set()
+
+        self.closed_batch_ids = set()
+        self.batches_changed = True
+        self.last_reconciled = None
+
+        self.n_queries = 0
+
+    @property
+    def n_ready_jobs(self):
+        return sum(len(batch.jobs) for batch in self.batches.values())
+
+    def batch_closed(self, batch_id):
+        self.closed_batch_ids.add(batch_id)
+
+    def batch_state_changed(self):
+        # cancel and delete notifications don't carry the batch id
+        self.batches_changed = True
+
+    def job_completed(self, batch_id, job_id):
+        self.in_flight.discard((batch_id, job_id))
+        batch = self.batches.get(batch_id)
+        if batch:
+            batch.jobs.pop(job_id, None)
+            # children might have become Ready
+            batch.stale = True
+
+    def take(self, record):
+        batch_id = record['batch_id']
+        job_id = record['job_id']
+        batch = self.batches.get(batch_id)
+        if batch:
+            batch.jobs.pop(job_id, None)
+        self.in_flight.add((batch_id, job_id))
+
+    def done_scheduling(self, batch_id, job_id, scheduled):
+        self.in_flight.discard((batch_id, job_id))
+        if not scheduled:
+            batch = self.batches.get(batch_id)
+            if batch:
+                # the job might still be Ready
+                batch.stale = True
+
+    def _add_batch(self, record):
+        batch = BatchReadyJobs(record)
+        self.batches[batch.id] = batch
+        self.user_batches[batch.user].add(batch.id)
+        return batch
+
+    def _remove_batch(self, batch_id):
+        batch = self.batches.pop(batch_id)
+        user_batch_ids = self.user_batches[batch.user]
+        user_batch_ids.discard(batch_id)
+        if not user_batch_ids:
+            del self.user_batches[batch.user]
+
+    async def _refresh_batches(self, mark_stale):
+        self.n_queries += 1
+        running_batch_ids = set()
+        async for record in self.db.select_and_fetchall(
+                '''
+SELECT id, cancelled, userdata, user, format_version
+FROM batches
+WHERE `state` = 'running';
+''',
+                timer_description='in ready queue: get running batches'):
+            batch_id = record['id']
+            running_batch_ids.add(batch_id)
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                self._add_batch(record)
+                continue
+            if record['cancelled'] and not batch.cancelled:
+                batch.cancelled = True
+                batch.drop_cancelled_jobs()
+            if mark_stale:
+                batch.stale = True
+
+        for batch_id in [batch_id for batch_id in self.batches
+                         if batch_id not in running_batch_ids]:
+            self._remove_batch(batch_id)
+
+        self.closed_batch_ids.clear()
+        self.batches_changed = False
+
+    async def _add_closed_batches(self):
+        batch_ids = list(self.closed_batch_ids)
+        self.closed_batch_ids.clear()
+
+        self.n_queries += 1
+        async for record in self.db.select_and_fetchall(
+                f'''
+SELECT id, cancelled, userdata, user, format_version
+FROM batches
+WHERE id IN ({", ".join(["%s"] * len(batch_ids))}) AND `state` = 'running';
+''',
+                batch_ids,
+                timer_description='in ready queue: get closed batches'):
+            if record['id'] not in self.batches:
+                self._add_batch(record)
+
+    async def update(self):
+        now = time_msecs()
+        if (self.last_reconciled is None
+                or now - self.last_reconciled > self.reconcile_interval_msecs):
+            await self._refresh_batches(mark_stale=True)
+            self.last_reconciled = now
+        elif self.batches_changed:
+            await self._refresh_batches(mark_stale=False)
+        elif self.closed_batch_ids:
+            await self._add_closed_batches()
+
+    async def _load_batch_jobs(self, batch):
+        if batch.cancelled:
+            sql = '''
+SELECT job_id, spec, cores_mcpu, always_run
+FROM jobs FORCE INDEX(jobs_batch_id_state_always_run_cancelled)
+WHERE batch_id = %s AND state = 'Ready' AND always_run = 1
+LIMIT %s;
+'''
+            args = (batch.id, self.load_limit)
+        else:
+            sql = '''
+(SELECT job_id, spec, cores_mcpu, always_run
+ FROM jobs FORCE INDEX(jobs_batch_id_state_always_run_cancelled)
+ WHERE batch_id = %s AND state = 'Ready' AND always_run = 1
+ LIMIT %s)
+UNION ALL
+(SELECT job_id, spec, cores_mcpu, always_run
+ FROM jobs FORCE INDEX(jobs_batch_id_state_always_run_cancelled)
+ WHERE batch_id = %s AND state = 'Ready' AND always_run = 0 AND cancelled = 0
+ LIMIT %s);
+'''
+            args = (batch.id, self.load_limit, batch.id, self.load_limit)
+
+        self.n_queries += 1
+        n_loaded = 0
+        async for record in self.db.select_and_fetchall(
+                sql, args,
+                timer_description=f'in ready queue: get batch {batch.id} ready jobs'):
+            n_loaded += 1
+            job_id = record['job_id']
+            if (batch.id, job_id) in self.in_flight:
+                continue
+            record['batch_id'] = batch.id
+            record['userdata'] = batch.userdata
+            record['user'] = batch.user
+            record['format_version'] = batch.format_version
+            batch.jobs[job_id] = record
+
+        # if we hit the limit, there might be more
+        batch.stale = n_loaded >= self.load_limit
+
+    async def user_ready_jobs(self, user):
+        '''Yield the user's Ready jobs in batch, job order.
+
+        Records are not removed from the queue until they are passed to
+        `take`.
+        '''
+        for batch_id in list(self.user_batches.get(user, [])):
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                continue
+            if batch.stale and len(batch.jobs) < self.load_limit:
+                await self._load_batch_jobs(batch)
+            for record in list(batch.jobs.values()):
+                if record['job_id'] in batch.jobs:
+                    yield record
@@ -6,10 +6,15 @@ from hailtop.utils import (
     AsyncWorkerPool, WaitableSharedPool, retry_long_running, run_if_changed,
     time_msecs, secret_alnum_string)
 
-from ..batch import schedule_job, unschedule_job, mark_job_complete
+from ..batch import schedule_jobs, unschedule_job, mark_job_complete
+from ..batch_configuration import PLACEMENT_POLICY
+
+from .placement import placement_policy, job_storage_and_memory_bytes
 
 log = logging.getLogger('driver')
 
+MAX_JOBS_PER_SCHEDULE_PASS = 3000
+
 
 class Box:
     def __init__(self, value):
@@ -24,6 +29,9 @@ class Scheduler:
         self.cancel_running_state_changed = app['cancel_running_state_changed']
         self.db = app['db']
         self.inst_pool = app['inst_pool']
+        self.ready_jobs = app['ready_job_queue']
+        self.placement_policy = placement_policy(PLACEMENT_POLICY, app['worker_type'])
+        log.info(f'using placement policy {PLACEMENT_POLICY}')
         self.async_worker_pool = AsyncWorkerPool(parallelism=100, queue_size=100)
 
     async def async_init(self):
@@ -303,60 +311,14 @@ LIMIT %s;
             should_wait = True
             return should_wait
         user_share = {
-            user: max(int(300 * resources['allocated_cores_mcpu'] / total + 0.5), 20)
+            user: max(int(MAX_JOBS_PER_SCHEDULE_PASS * resources['allocated_cores_mcpu'] / total + 0.5), 20)
             for user, resources in user_resources.items()
         }
 
-        async def user_runnable_jobs(user, remaining):
-            async for batch in self.db.select_and_fetchall(
-                    '''
-SELECT id, cancelled, userdata, user, format_version
-FROM batches
-WHERE user = %s AND `state` = 'running';
-''',
-                    (user,),
-                    timer_description=f'in schedule: get {user} running batches'):
-                async for record in self.db.select_and_fetchall(
-                        '''
-SELECT job_id, spec, cores_mcpu
-FROM jobs FORCE INDEX(jobs_batch_id_state_always_run_cancelled)
-WHERE batch_id = %s AND state = 'Ready' AND always_run = 1
-LIMIT %s;
-''',
-                        (batch['id'], remaining.value),
-                        timer_description=f'in schedule: get {user} batch {batch["id"]} runnable jobs (1)'):
-                    record['batch_id'] = batch['id']
-                    record['userdata'] = batch['userdata']
-                    record['user'] = batch['user']
-                    record['format_version'] = batch['format_version']
-                    yield record
-                if not batch['cancelled']:
-                    async for record in self.db.select_and_fetchall(
-                            '''
-SELECT job_id, spec, cores_mcpu
-FROM jobs FORCE INDEX(jobs_batch_id_state_always_run_cancelled)
-WHERE batch_id = %s AND state = 'Ready' AND always_run = 0 AND cancelled = 0
-LIMIT %s;
-''',
-                            (batch['id'], remaining.value),
-                            timer_description=f'in schedule: get {user} batch {batch["id"]} runnable jobs (2)'):
-                        record['batch_id'] = batch['id']
-                        record['userdata'] = batch['userdata']
-                        record['user'] = batch['user']
-                        record['format_version'] = batch['format_version']
-                        yield record
-
-        waitable_pool = WaitableSharedPool(self.async_worker_pool)
+        await self.ready_jobs.update()
 
-        def get_instance(user, cores_mcpu):
-            i = self.inst_pool.healthy_instances_by_free_cores.bisect_key_left(cores_mcpu)
-            while i < len(self.inst_pool.healthy_instances_by_free_cores):
-                instance = self.inst_pool.healthy_instances_by_free_cores[i]
-                assert cores_mcpu <= instance.free_cores_mcpu
-                if user != 'ci' or (user == 'ci' and instance.zone.startswith('us-central1')):
-                    return instance
-                i += 1
-            return None
+        # instance => records placed on it this pass
+        instance_records = {}
 
         should_wait = True
         for user, resources in user_resources.items():
@@ -368,38 +330,55 @@ LIMIT %s;
             share = user_share[user]
 
             remaining = Box(share)
-            async for record in user_runnable_jobs(user, remaining):
+            async for record in self.ready_jobs.user_ready_jobs(user):
                 batch_id = record['batch_id']
                 job_id = record['job_id']
                 id = (batch_id, job_id)
-                attempt_id = secret_alnum_string(6)
-                record['attempt_id'] = attempt_id
 
                 if scheduled_cores_mcpu + record['cores_mcpu'] > allocated_cores_mcpu:
                     break
 
-                instance = get_instance(user, record['cores_mcpu'])
+                storage_bytes, memory_bytes = job_storage_and_memory_bytes(
+                    record, self.placement_policy.worker_type)
+                instance = self.placement_policy.get_instance(
+                    self.inst_pool.healthy_instances_by_free_cores,
+                    user, record['cores_mcpu'], storage_bytes, memory_bytes)
                 if instance:
+                    self.ready_jobs.take(record)
+                    record['attempt_id'] = secret_alnum_string(6)
                     instance.adjust_free_cores_in_memory(-record['cores_mcpu'])
+                    instance.allocate_resources_in_memory(id, storage_bytes, memory_bytes)
                     scheduled_cores_mcpu += record['cores_mcpu']
                     n_scheduled += 1
                     should_wait = False
-
-                    async def schedule_with_error_handling(app, record, id, instance):
-                        try:
-                            await schedule_job(app, record, instance)
-                        except Exception:
-                            log.info(f'scheduling job {id} on {instance}', exc_info=True)
-                    await waitable_pool.call(
-                        schedule_with_error_handling, self.app, record, id, instance)
+                    instance_records.setdefault(instance, []).append(record)
 
                 remaining.value -= 1
                 if remaining.value <= 0:
                     break
 
+        async def schedule_with_error_handling(app, records, instance):
+            scheduled = [False] * len(records)
+            try:
+                scheduled = await schedule_jobs(app, records, instance)
+            except Exception:
+                log.info(f'scheduling {len(records)} jobs on {instance}', exc_info=True)
+            finally:
+                for record, record_scheduled in zip(records, scheduled):
+                    id = (record['batch_id'], record['job_id'])
+                    if not record_scheduled:
+                        instance.release_resources_in_memory(id)
+                    self.ready_jobs.done_scheduling(*id, record_scheduled)
+
+        # one request per instance carries all the jobs placed on it
+        waitable_pool = WaitableSharedPool(self.async_worker_pool)
+        for instance, records in instance_records.items():
+            await waitable_pool.call(
+                schedule_with_error_handling, self.app, records, instance)
         await waitable_pool.wait()
 
         end = time_msecs()
-        log.info(f'schedule: scheduled {n_scheduled} jobs in {end - start}ms')
+        log.info(f'schedule: scheduled {n_scheduled} jobs in {end - start}ms, '
+                 f'{self.ready_jobs.n_ready_jobs} ready jobs queued')
 
         return should_wait
@@ -12,12 +12,11 @@ import prometheus_client as pc
 import pymysql
 from prometheus_async.aio import time as prom_async_time
 from prometheus_async.aio.web import server_stats
-import google.oauth2.service_account
-import google.api_core.exceptions
 from hailtop.utils import time_msecs, time_msecs_str, humanize_timedelta_msecs, \
     request_retry_transient_errors, run_if_changed, retry_long_running, \
-    LoggingTimer
+    LoggingTimer, parse_cpu_in_mcpu, parse_memory_in_bytes
 from hailtop.config import get_deploy_config
+from hailtop import aiogoogle
 from hailtop.tls import get_server_ssl_context, ssl_client_session
 from gear import Database, setup_aiohttp_session, \
     rest_authenticated_users_only, web_authenticated_users_only, \
@@ -28,18 +27,20 @@ from web_common import setup_aiohttp_jinja2, setup_common_static_routes, render_
 
 # import uvloop
 
-from ..utils import parse_cpu_in_mcpu, parse_memory_in_bytes, adjust_cores_for_memory_request, \
+from ..utils import adjust_cores_for_memory_request, log_range, \
     worker_memory_per_core_gb, cost_from_msec_mcpu, adjust_cores_for_packability, coalesce
-from ..batch import batch_record_to_dict, job_record_to_dict
+from ..batch import batch_record_to_dict, job_record_to_dict, job_record_to_fields_dict, JOB_FIELDS
 from ..log_store import LogStore
 from ..database import CallError, check_call_procedure
 from ..batch_configuration import BATCH_PODS_NAMESPACE, BATCH_BUCKET_NAME, DEFAULT_NAMESPACE, \
     WORKER_LOGS_BUCKET_NAME
-from ..globals import HTTP_CLIENT_MAX_SIZE, BATCH_FORMAT_VERSION
+from ..globals import HTTP_CLIENT_MAX_SIZE, BATCH_FORMAT_VERSION, LOG_RANGE_MAX_BYTES, complete_states, \
+    BULK_JOBS_DEFAULT_LIMIT, BULK_JOBS_MAX_LIMIT, WORKER_STORAGE_BYTES
 from ..spec_writer import SpecWriter
 from ..batch_format_version import BatchFormatVersion
 
 from .validate import ValidationError, validate_batch, validate_jobs
+from .watcher import BatchWatcher
 
 # uvloop.install()
 
@@ -47,6 +48,7 @@ log = logging.getLogger('batch.front_end')
 
 REQUEST_TIME = pc.Summary('batch_request_latency_seconds', 'Batch request latency in seconds', ['endpoint', 'verb'])
 REQUEST_TIME_GET_JOBS = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs', verb="GET")
+REQUEST_TIME_GET_JOBS_BULK = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/bulk', verb="GET")
 REQUEST_TIME_GET_JOB = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/job_id', verb="GET")
 REQUEST_TIME_GET_JOB_LOG = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/job_id/log', verb="GET")
 REQUEST_TIME_GET_ATTEMPTS = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/job_id/attempts', verb="GET")
@@ -54,6 +56,8 @@ REQUEST_TIME_GET_BATCHES = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches',
 REQUEST_TIME_POST_CREATE_JOBS = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/create', verb="POST")
 REQUEST_TIME_POST_CREATE_BATCH = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/create', verb='POST')
 REQUEST_TIME_POST_GET_BATCH = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id', verb='GET')
+REQUEST_TIME_GET_BATCH_WAIT = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/wait', verb='GET')
+REQUEST_TIME_GET_JOB_WAIT = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/jobs/job_id/wait', verb='GET')
 REQUEST_TIME_PATCH_CANCEL_BATCH = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/cancel', verb="PATCH")
 REQUEST_TIME_PATCH_CLOSE_BATCH = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id/close', verb="PATCH")
 REQUEST_TIME_DELETE_BATCH = REQUEST_TIME.labels(endpoint='/api/v1alpha/batches/batch_id', verb="DELETE")
@@ -75,13 +79,17 @@ deploy_config = get_deploy_config()
 BATCH_JOB_DEFAULT_CPU = os.environ.get('HAIL_BATCH_JOB_DEFAULT_CPU', '1')
 BATCH_JOB_DEFAULT_MEMORY = os.environ.get('HAIL_BATCH_JOB_DEFAULT_MEMORY', '3.75G')
 
+# clients use a 60s total timeout
+DEFAULT_LONG_POLL_TIMEOUT_SECS = 30
+MAX_LONG_POLL_TIMEOUT_SECS = 50
+
 
 @routes.get('/healthcheck')
 async def get_healthcheck(request):  # pylint: disable=W0613
     return web.Response()
 
 
-async def _query_batch_jobs(request, batch_id):
+def _job_query_conditions(q):
     state_query_values = {
         'pending': ['Pending'],
         'ready': ['Ready'],
@@ -95,21 +103,9 @@ async def _query_batch_jobs(request, batch_id):
         'done': ['Cancelled', 'Error', 'Failed', 'Success']
     }
 
-    db = request.app['db']
+    where_conditions = []
+    where_args = []
 
-    # batch has already been validated
-    where_conditions = [
-        '(jobs.batch_id = %s)'
-    ]
-    where_args = [batch_id]
-
-    last_job_id = request.query.get('last_job_id')
-    if last_job_id is not None:
-        last_job_id = int(last_job_id)
-        where_conditions.append('(jobs.job_id > %s)')
-        where_args.append(last_job_id)
-
-    q = request.query.get('q', '')
     terms = q.split()
     for t in terms:
         if t[0] == '!':
@@ -144,9 +140,7 @@ async def _query_batch_jobs(request, batch_id):
             condition = f'({condition})'
             args = values
         else:
-            session = await aiohttp_session.get_session(request)
-            set_message(session, f'Invalid search term: {t}.', 'error')
-            return ([], None)
+            raise ValueError(f'Invalid search term: {t}.')
 
         if negate:
             condition = f'(NOT {condition})'
@@ -154,6 +148,34 @@ async def _query_batch_jobs(request, batch_id):
         where_conditions.append(condition)
         where_args.extend(args)
 
+    return (where_conditions, where_args)
+
+
+async def _query_batch_jobs(request, batch_id):
+    db = request.app['db']
+
+    # batch has already been validated
+    where_conditions = [
+        '(jobs.batch_id = %s)'
+    ]
+    where_args = [batch_id]
+
+    last_job_id = request.query.get('last_job_id')
+    if last_job_id is not None:
+        last_job_id = int(last_job_id)
+        where_conditions.append('(jobs.job_id > %s)')
+        where_args.append(last_job_id)
+
+    q = request.query.get('q', '')
+    try:
+        conditions, args = _job_query_conditions(q)
+    except ValueError as e:
+        session = await aiohttp_session.get_session(request)
+        set_message(session, str(e), 'error')
+        return ([], None)
+    where_conditions.extend(conditions)
+    where_args.extend(args)
+
     sql = f'''
 SELECT jobs.*, batches.format_version, job_attributes.value AS name, SUM(`usage` * rate) AS cost
 FROM jobs
@@ -211,6 +233,112 @@ WHERE user = %s AND id = %s AND NOT deleted;
     return web.json_response(resp)
 
 
+def _bulk_jobs_sql(fields, where_conditions, limit):
+    columns = ['jobs.batch_id', 'jobs.job_id', 'batches.format_version']
+    joins = ['INNER JOIN batches ON jobs.batch_id = batches.id']
+    group_by = ''
+    if 'state' in fields:
+        columns.append('jobs.state')
+    if 'exit_code' in fields or 'duration' in fields:
+        columns.append('jobs.status')
+    if 'msec_mcpu' in fields or 'cost' in fields:
+        columns.append('jobs.msec_mcpu')
+    if 'name' in fields:
+        columns.append('job_attributes.value AS name')
+        joins.append('''
+LEFT JOIN job_attributes
+  ON jobs.batch_id = job_attributes.batch_id AND
+     jobs.job_id = job_attributes.job_id AND
+     job_attributes.`key` = 'name'
+''')
+    if 'cost' in fields:
+        columns.append('SUM(`usage` * rate) AS cost')
+        joins.append('''
+LEFT JOIN aggregated_job_resources
+  ON jobs.batch_id = aggregated_job_resources.batch_id AND
+     jobs.job_id = aggregated_job_resources.job_id
+LEFT JOIN resources
+  ON aggregated_job_resources.resource = resources.resource
+''')
+        group_by = 'GROUP BY jobs.batch_id, jobs.job_id'
+
+    return f'''
+SELECT {', '.join(columns)}
+FROM jobs
+{' '.join(joins)}
+WHERE {' AND '.join(where_conditions)}
+{group_by}
+ORDER BY jobs.batch_id, jobs.job_id ASC
+LIMIT {limit};
+'''
+
+
+@routes.get('/api/v1alpha/batches/{batch_id}/jobs/bulk')
+@prom_async_time(REQUEST_TIME_GET_JOBS_BULK)
+@rest_authenticated_users_only
+async def get_jobs_bulk(request, userdata):
+    batch_id = int(request.match_info['batch_id'])
+    user = userdata['username']
+
+    try:
+        limit = int(request.query.get('limit', BULK_JOBS_DEFAULT_LIMIT))
+        last_job_id = request.query.get('last_job_id')
+        if last_job_id is not None:
+            last_job_id = int(last_job_id)
+    except ValueError:
+        raise web.HTTPBadRequest(reason='limit and last_job_id must be integers')
+    if not 0 < limit <= BULK_JOBS_MAX_LIMIT:
+        raise web.HTTPBadRequest(reason=f'limit must be between 1 and {BULK_JOBS_MAX_LIMIT}')
+
+    fields = request.query.get('fields')
+    if fields is None:
+        fields = JOB_FIELDS
+    else:
+        fields = fields.split(',')
+        unknown_fields = [field for field in fields if field not in JOB_FIELDS]
+        if unknown_fields:
+            raise web.HTTPBadRequest(reason=f'unknown fields {", ".join(unknown_fields)}, '
+                                     f'expected a subset of {", ".join(JOB_FIELDS)}')
+
+    db = request.app['db']
+    record = await db.select_and_fetchone(
+        '''
+SELECT * FROM batches
+WHERE user = %s AND id = %s AND NOT deleted;
+''', (user, batch_id))
+    if not record:
+        raise web.HTTPNotFound()
+
+    where_conditions = ['(jobs.batch_id = %s)']
+    where_args = [batch_id]
+    if last_job_id is not None:
+        where_conditions.append('(jobs.job_id > %s)')
+        where_args.append(last_job_id)
+    try:
+        conditions, args = _job_query_conditions(request.query.get('q', ''))
+    except ValueError as e:
+        raise web.HTTPBadRequest(reason=str(e))
+    where_conditions.extend(conditions)
+    where_args.extend(args)
+
+    sql = _bulk_jobs_sql(fields, where_conditions, limit)
+
+    resp = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+    await resp.prepare(request)
+    lines = []
+    async for record in db.select_and_fetchall(sql, where_args):
+        lines.append(json.dumps(job_record_to_fields_dict(record, fields)))
+        if len(lines) == 100:
+            lines.append('')
+            await resp.write('\n'.join(lines).encode('utf-8'))
+            lines = []
+    if lines:
+        lines.append('')
+        await resp.write('\n'.join(lines).encode('utf-8'))
+    await resp.write_eof()
+    return resp
+
+
 async def _get_job_log_from_record(app, batch_id, job_id, record):
     state = record['state']
     ip_address = record['ip_address']
@@ -234,7 +362,9 @@ async def _get_job_log_from_record(app, batch_id, job_id, record):
         async def _read_log_from_gcs(task):
             try:
                 data = await log_store.read_log_file(batch_format_version, batch_id, job_id, record['attempt_id'], task)
-            except google.api_core.exceptions.NotFound:
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
                 id = (batch_id, job_id)
                 log.exception(f'missing log file for {id}')
                 data = None
@@ -258,7 +388,40 @@ async def _get_job_log_from_record(app, batch_id, job_id, record):
     return None
 
 
-async def _get_job_log(app, batch_id, job_id, user):
+async def _get_job_log_range_from_record(app, batch_id, job_id, record, container, offset, max_bytes):
+    state = record['state']
+    ip_address = record['ip_address']
+    if state == 'Running':
+        async with aiohttp.ClientSession(
+                raise_for_status=True, timeout=aiohttp.ClientTimeout(total=60)) as session:
+            try:
+                url = (f'http://{ip_address}:5000'
+                       f'/api/v1alpha/batches/{batch_id}/jobs/{job_id}/log')
+                params = {'container': container, 'offset': offset, 'max_bytes': max_bytes}
+                resp = await request_retry_transient_errors(session, 'GET', url, params=params)
+                return await resp.json()
+            except aiohttp.ClientResponseError as e:
+                if e.status == 404:
+                    return None
+                raise
+
+    if state in ('Error', 'Failed', 'Success'):
+        log_store = app['log_store']
+        batch_format_version = BatchFormatVersion(record['format_version'])
+        try:
+            data, size = await log_store.read_log_file_range(
+                batch_format_version, batch_id, job_id, record['attempt_id'], container,
+                offset, max_bytes)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 404:
+                raise
+            return None
+        return log_range(container, offset, data, size, True)
+
+    return None
+
+
+async def _get_job_log_record(app, batch_id, job_id, user):
     db = app['db']
 
     record = await db.select_and_fetchone('''
@@ -275,9 +438,31 @@ WHERE user = %s AND jobs.batch_id = %s AND NOT deleted AND jobs.job_id = %s;
                                           (user, batch_id, job_id))
     if not record:
         raise web.HTTPNotFound()
+    return record
+
+
+async def _get_job_log(app, batch_id, job_id, user):
+    record = await _get_job_log_record(app, batch_id, job_id, user)
     return await _get_job_log_from_record(app, batch_id, job_id, record)
 
 
+def _log_range_params(request):
+    container = request.query.get('container', 'main')
+    if container not in ('input', 'main', 'output'):
+        raise web.HTTPBadRequest(reason=f'invalid container {container}')
+    offset = request.query['offset']
+    max_bytes = request.query.get('max_bytes', LOG_RANGE_MAX_BYTES)
+    try:
+        offset = int(offset)
+        max_bytes = int(max_bytes)
+    except ValueError:
+        raise web.HTTPBadRequest(reason=f'invalid offset {offset} or max_bytes {max_bytes}')
+    if offset < 0 or max_bytes <= 0:
+        raise web.HTTPBadRequest(reason=f'invalid offset {offset} or max_bytes {max_bytes}')
+    # a UTF-8 encoded character is at most 4 bytes
+    return container, offset, max(min(max_bytes, LOG_RANGE_MAX_BYTES), 4)
+
+
 async def _get_attributes(app, record):
     db = app['db']
 
@@ -314,7 +499,9 @@ async def _get_full_job_spec(app, record):
     try:
         spec = await log_store.read_spec_file(batch_id, token, start_job_id, job_id)
         return json.loads(spec)
-    except google.api_core.exceptions.NotFound:
+    except aiohttp.ClientResponseError as e:
+        if e.status != 404:
+            raise
         id = (batch_id, job_id)
         log.exception(f'missing spec file for {id}')
         return None
@@ -339,7 +526,9 @@ async def _get_full_job_status(app, record):
         try:
             status = await log_store.read_status_file(batch_id, job_id, attempt_id)
             return json.loads(status)
-        except google.api_core.exceptions.NotFound:
+        except aiohttp.ClientResponseError as e:
+            if e.status != 404:
+                raise
             id = (batch_id, job_id)
             log.exception(f'missing status file for {id}')
             return None
@@ -368,6 +557,12 @@ async def get_job_log(request, userdata):  # pylint: disable=R1710
     batch_id = int(request.match_info['batch_id'])
     job_id = int(request.match_info['job_id'])
     user = userdata['username']
+    if 'offset' in request.query:
+        container, offset, max_bytes = _log_range_params(request)
+        record = await _get_job_log_record(request.app, batch_id, job_id, user)
+        job_log = await _get_job_log_range_from_record(
+            request.app, batch_id, job_id, record, container, offset, max_bytes)
+        return web.json_response(job_log)
     job_log = await _get_job_log(request.app, batch_id, job_id, user)
     return web.json_response(job_log)
 
@@ -608,6 +803,13 @@ WHERE user = %s AND id = %s AND NOT deleted;
                         f'requested: cpu={resources["cpu"]}, memory={resources["memory"]} '
                         f'maximum: cpu={worker_cores}, memory={total_memory_available}G')
 
+                pvc_size = spec.get('pvc_size')
+                if pvc_size and parse_memory_in_bytes(pvc_size) > WORKER_STORAGE_BYTES:
+                    raise web.HTTPBadRequest(
+                        reason=f'resource requests for job {id} are unsatisfiable: '
+                        f'requested: pvc_size={pvc_size} '
+                        f'maximum: pvc_size={WORKER_STORAGE_BYTES // 1024**3}Gi')
+
                 secrets = spec.get('secrets')
                 if not secrets:
                     secrets = []
@@ -886,6 +1088,55 @@ async def get_batch(request, userdata):
     return web.json_response(await _get_batch(request.app, batch_id, user))
 
 
+def _long_poll_timeout(request):
+    timeout = request.query.get('timeout')
+    if timeout is None:
+        return DEFAULT_LONG_POLL_TIMEOUT_SECS
+    try:
+        timeout = int(timeout)
+    except ValueError:
+        raise web.HTTPBadRequest(reason=f'invalid timeout {timeout}')
+    if timeout < 0:
+        raise web.HTTPBadRequest(reason=f'invalid timeout {timeout}')
+    return min(timeout, MAX_LONG_POLL_TIMEOUT_SECS)
+
+
+@routes.get('/api/v1alpha/batches/{batch_id}/wait')
+@prom_async_time(REQUEST_TIME_GET_BATCH_WAIT)
+@rest_authenticated_users_only
+async def wait_batch(request, userdata):
+    # long poll: return the batch once n_completed differs from the
+    # client's or the batch is complete, or after the timeout
+    batch_id = int(request.match_info['batch_id'])
+    user = userdata['username']
+    db = request.app['db']
+
+    n_completed = request.query.get('n_completed')
+    if n_completed is not None:
+        try:
+            n_completed = int(n_completed)
+        except ValueError:
+            raise web.HTTPBadRequest(reason=f'invalid n_completed {n_completed}')
+    timeout = _long_poll_timeout(request)
+
+    record = await db.select_and_fetchone(
+        '''
+SELECT `state`, n_completed FROM batches
+WHERE user = %s AND id = %s AND NOT deleted;
+''',
+        (user, batch_id))
+    if not record:
+        raise web.HTTPNotFound()
+
+    if (n_completed is not None
+            and record['n_completed'] == n_completed
+            and record['state'] != 'complete'):
+        await request.app['watcher'].wait_batch(
+            batch_id, record['state'], record['n_completed'], timeout)
+
+    return web.json_response(await _get_batch(request.app, batch_id, user))
+
+
 @routes.patch('/api/v1alpha/batches/{batch_id}/cancel')
 @prom_async_time(REQUEST_TIME_PATCH_CANCEL_BATCH)
 @rest_authenticated_users_only
@@ -1115,6 +1366,34 @@ async def get_job(request, userdata):
     return web.json_response(status)
 
 
+@routes.get('/api/v1alpha/batches/{batch_id}/jobs/{job_id}/wait')
+@prom_async_time(REQUEST_TIME_GET_JOB_WAIT)
+@rest_authenticated_users_only
+async def wait_job(request, userdata):
+    # long poll: return the job once its state changes or it is
+    # complete, or after the timeout
+    batch_id = int(request.match_info['batch_id'])
+    job_id = int(request.match_info['job_id'])
+    user = userdata['username']
+    db = request.app['db']
+    timeout = _long_poll_timeout(request)
+
+    record = await db.select_and_fetchone(
+        '''
+SELECT jobs.state FROM jobs
+INNER JOIN batches ON jobs.batch_id = batches.id
+WHERE user = %s AND jobs.batch_id = %s AND NOT deleted AND jobs.job_id = %s;
+''',
+        (user, batch_id, job_id))
+    if not record:
+        raise web.HTTPNotFound()
+
+    if record['state'] not in complete_states:
+        await request.app['watcher'].wait_job(batch_id, job_id, record['state'], timeout)
+
+    return web.json_response(await _get_job(request.app, batch_id, job_id, user))
+
+
 @routes.get('/batches/{batch_id}/jobs/{job_id}')
 @prom_async_time(REQUEST_TIME_GET_JOB_UI)
 @web_authenticated_users_only()
@@ -1443,9 +1722,8 @@ SELECT worker_type, worker_cores, worker_disk_size_gb,
         'Authorization': f'Bearer {row["internal_token"]}'
     }
 
-    credentials = google.oauth2.service_account.Credentials.from_service_account_file(
-        '/gsa-key/key.json')
-    app['log_store'] = LogStore(BATCH_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, instance_id, pool, credentials=credentials)
+    credentials = aiogoogle.Credentials.from_file('/gsa-key/key.json')
+    app['log_store'] = LogStore(BATCH_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, instance_id, credentials=credentials)
 
     cancel_batch_state_changed = asyncio.Event()
     app['cancel_batch_state_changed'] = cancel_batch_state_changed
@@ -1454,6 +1732,10 @@ SELECT worker_type, worker_cores, worker_disk_size_gb,
         'cancel_batch_loop',
         run_if_changed, cancel_batch_state_changed, cancel_batch_loop_body, app))
 
+    watcher = BatchWatcher(db)
+    app['watcher'] = watcher
+    asyncio.ensure_future(retry_long_running('watcher', watcher.run))
+
     delete_batch_state_changed = asyncio.Event()
     app['delete_batch_state_changed'] = delete_batch_state_changed
 
@@ -1465,6 +1747,7 @@ SELECT worker_type, worker_cores, worker_disk_size_gb,
 async def on_cleanup(app):
     blocking_pool = app['blocking_pool']
     blocking_pool.shutdown()
+    await app['log_store'].close()
 
 
 def run():
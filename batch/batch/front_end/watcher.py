@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from hailtop.utils import grouped
+
+log = logging.getLogger('batch.front_end.watcher')
+
+
+class Watch:
+    def __init__(self, value):
+        self.value = value
+        self.n_waiters = 0
+        self.changed = asyncio.Event()
+
+    def update(self, value):
+        if value != self.value:
+            self.value = value
+            self.changed.set()
+            self.changed = asyncio.Event()
+
+
+class BatchWatcher:
+    '''Wait for batch and job state changes on behalf of long-polling clients.
+
+    Clients waiting on the same front end share a single pair of
+    queries per `interval_secs` instead of each polling the batch or
+    job themselves.  A watched batch's value is `(state, n_completed)`
+    and a watched job's value is its state; a value of None means the
+    batch or job no longer exists.
+    '''
+
+    def __init__(self, db, interval_secs=1.0, max_ids_per_query=500):
+        self.db = db
+        self.interval_secs = interval_secs
+        self.max_ids_per_query = max_ids_per_query
+        # batch_id => Watch
+        self.batches = {}
+        # (batch_id, job_id) => Watch
+        self.jobs = {}
+        self.watches_added = asyncio.Event()
+
+    async def _wait(self, watches, key, value, timeout):
+        watch = watches.get(key)
+        if watch is None:
+            watch = Watch(value)
+            watches[key] = watch
+            self.watches_added.set()
+        else:
+            # the caller's value was just read, so it is newer than the
+            # watch's; waiters on the old value are woken
+            watch.update(value)
+        watch.n_waiters += 1
+        try:
+            await asyncio.wait_for(watch.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            watch.n_waiters -= 1
+            if watch.n_waiters == 0 and watches.get(key) is watch:
+                del watches[key]
+
+    async def wait_batch(self, batch_id, state, n_completed, timeout):
+        await self._wait(self.batches, batch_id, (state, n_completed), timeout)
+
+    async def wait_job(self, batch_id, job_id, state, timeout):
+        await self._wait(self.jobs, (batch_id, job_id), state, timeout)
+
+    async def _update_batches(self):
+        batch_ids = list(self.batches)
+        values = {}
+        for group in grouped(self.max_ids_per_query, batch_ids):
+            async for record in self.db.select_and_fetchall(
+                    f'''
+SELECT id, `state`, n_completed FROM batches
+WHERE id IN ({", ".join(["%s"] * len(group))}) AND NOT deleted;
+''',
+                    group,
+                    timer_description='in watcher: get batches'):
+                values[record['id']] = (record['state'], record['n_completed'])
+        for batch_id in batch_ids:
+            watch = self.batches.get(batch_id)
+            if watch:
+                watch.update(values.get(batch_id))
+
+    async def _update_jobs(self):
+        ids = list(self.jobs)
+        values = {}
+        for group in grouped(self.max_ids_per_query, ids):
+            async for record in self.db.select_and_fetchall(
+                    f'''
+SELECT batch_id, job_id, `state` FROM jobs
+WHERE {" OR ".join(["(batch_id = %s AND job_id = %s)"] * len(group))};
+''',
+                    [x for id in group for x in id],
+                    timer_description='in watcher: get jobs'):
+                values[(record['batch_id'], record['job_id'])] = record['state']
+        for id in ids:
+            watch = self.jobs.get(id)
+            if watch:
+                watch.update(values.get(id))
+
+    async def run(self):
+        while True:
+            if not self.batches and not self.jobs:
+                self.watches_added.clear()
+                await self.watches_added.wait()
+            await asyncio.sleep(self.interval_secs)
+            if self.batches:
+                await self._update_batches()
+            if self.jobs:
+                await self._update_jobs()
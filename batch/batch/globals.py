@@ -16,7 +16,19 @@ tasks = ('input', 'main', 'output')
 
 HTTP_CLIENT_MAX_SIZE = 8 * 1024 * 1024
 
+# io volumes live on the worker's local SSD, see WorkerConfig
+WORKER_STORAGE_BYTES = 375 * 1024**3
+
+# largest range of a job log returned by one request
+LOG_RANGE_MAX_BYTES = 4 * 1024 * 1024
+
+# jobs returned by one request to the bulk job listing
+BULK_JOBS_DEFAULT_LIMIT = 1000
+BULK_JOBS_MAX_LIMIT = 10000
+
 BATCH_FORMAT_VERSION = 3
 STATUS_FORMAT_VERSION = 3
-INSTANCE_VERSION = 6
+INSTANCE_VERSION = 7
+# first instance version accepting bulk job creation
+BULK_CREATE_JOBS_INSTANCE_VERSION = 7
 WORKER_CONFIG_VERSION = 2
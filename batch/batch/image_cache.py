@@ -0,0 +1,203 @@
+import logging
+import asyncio
+import collections
+import time
+from aiodocker.exceptions import DockerError
+
+log = logging.getLogger('image_cache')
+
+
+class ImageCache:
+    '''Worker-level cache of docker images.
+
+    Concurrent pulls of the same image are coalesced into one.  For
+    images that require authentication, access is checked by pulling
+    with the user's credentials and the decision is cached for
+    `access_ttl_secs`.  Images not used by a running container are
+    evicted in least-recently-used order once the images used through
+    the cache, whether pulled or already present, exceed `max_bytes`.  Pulls and deletes of an image are
+    serialized, and an image counts as used from the start of `acquire`,
+    so an image is never deleted while it is being pulled.
+    '''
+
+    def __init__(self, docker, docker_call_retry, max_bytes, access_ttl_secs,
+                 pull_timeout_secs, timeout_secs):
+        self.docker = docker
+        self.docker_call_retry = docker_call_retry
+        self.max_bytes = max_bytes
+        self.access_ttl_secs = access_ttl_secs
+        self.pull_timeout_secs = pull_timeout_secs
+        self.timeout_secs = timeout_secs
+
+        # image => size in bytes, least recently used first
+        self.image_size = collections.OrderedDict()
+        self.total_bytes = 0
+        # image => number of containers using the image
+        self.image_users = collections.Counter()
+        # (user, image) => expiration time in seconds
+        self.access_expires = {}
+        # pull key => task
+        self.pulls = {}
+        # image => lock held while the image is pulled or deleted
+        self.image_locks = {}
+
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+        self.n_pulls = 0
+        self.pull_secs_total = 0
+        self.pull_secs_max = 0
+
+    def stats(self):
+        return {
+            'n_images': len(self.image_size),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'n_evictions': self.n_evictions,
+            'n_pulls': self.n_pulls,
+            'mean_pull_secs': self.pull_secs_total / self.n_pulls if self.n_pulls else None,
+            'max_pull_secs': self.pull_secs_max
+        }
+
+    def _image_lock(self, image):
+        lock = self.image_locks.get(image)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.image_locks[image] = lock
+        return lock
+
+    async def _inspect(self, image):
+        try:
+            return await self.docker_call_retry(self.timeout_secs, image)(
+                self.docker.images.inspect, image)
+        except DockerError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def _add_image(self, image, info):
+        if image not in self.image_size:
+            size = info.get('Size', 0)
+            self.image_size[image] = size
+            self.total_bytes += size
+
+    async def _pull(self, image, auth):
+        async with self._image_lock(image):
+            start = time.time()
+            if auth:
+                await self.docker_call_retry(self.pull_timeout_secs, image)(
+                    self.docker.images.pull, image, auth=auth)
+            else:
+                await self.docker_call_retry(self.pull_timeout_secs, image)(
+                    self.docker.images.pull, image)
+            pull_secs = time.time() - start
+
+            self.n_pulls += 1
+            self.pull_secs_total += pull_secs
+            self.pull_secs_max = max(self.pull_secs_max, pull_secs)
+            log.info(f'pulled {image} in {pull_secs:.3f}s')
+
+            if image not in self.image_size:
+                info = await self.docker_call_retry(self.timeout_secs, image)(
+                    self.docker.images.inspect, image)
+                self._add_image(image, info)
+
+    async def _single_flight(self, key, f, *args):
+        task = self.pulls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(f(*args))
+            self.pulls[key] = task
+
+            def remove(_):
+                if self.pulls.get(key) is task:
+                    del self.pulls[key]
+            task.add_done_callback(remove)
+        return await asyncio.shield(task)
+
+    async def _ensure_public_image(self, image):
+        if image in self.image_size:
+            return True
+        # wait for any delete of the image to finish
+        async with self._image_lock(image):
+            info = await self._inspect(image)
+            if info is not None:
+                # count images already on the worker toward max_bytes
+                self._add_image(image, info)
+                return True
+        await self._single_flight(image, self._pull, image, None)
+        return False
+
+    async def _ensure_private_image(self, image, user, auth):
+        key = (user, image)
+        expires = self.access_expires.get(key)
+        if image in self.image_size and expires is not None and time.time() < expires:
+            return True
+        # pull to verify this user has access to this image
+        await self._single_flight(key, self._pull, image, auth)
+        self.access_expires[key] = time.time() + self.access_ttl_secs
+        return False
+
+    async def acquire(self, image, user, auth=None):
+        # count the user first, so the image is not evicted while it is
+        # pulled
+        self.image_users[image] += 1
+        acquired = False
+        try:
+            if auth:
+                hit = await self._ensure_private_image(image, user, auth)
+            else:
+                hit = await self._ensure_public_image(image)
+
+            if hit:
+                self.n_hits += 1
+            else:
+                self.n_misses += 1
+
+            if image in self.image_size:
+                self.image_size.move_to_end(image)
+
+            await self.evict()
+            acquired = True
+        finally:
+            if not acquired:
+                self.release(image)
+
+    def release(self, image):
+        self.image_users[image] -= 1
+        if self.image_users[image] <= 0:
+            del self.image_users[image]
+
+    async def evict(self):
+        for image in list(self.image_size):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if image in self.image_users:
+                continue
+
+            async with self._image_lock(image):
+                # the image might have been evicted or acquired while
+                # waiting for the lock
+                if self.total_bytes <= self.max_bytes or image in self.image_users:
+                    continue
+                size = self.image_size.pop(image, None)
+                if size is None:
+                    continue
+
+                log.info(f'evicting {image} from image cache, {self.total_bytes} bytes > {self.max_bytes} bytes')
+                self.total_bytes -= size
+                self.access_expires = {
+                    (user, i): expires for (user, i), expires in self.access_expires.items()
+                    if i != image
+                }
+                self.n_evictions += 1
+                try:
+                    await self.docker_call_retry(self.timeout_secs, image)(
+                        self.docker.images.delete, image)
+                except DockerError as e:
+                    # 404 no such image, 409 image is being used by a container
+                    if e.status in (404, 409):
+                        log.info(f'could not delete {image}: {e}')
+                    else:
+                        log.exception(f'while deleting {image}, ignoring')
@@ -0,0 +1,127 @@
+import logging
+import asyncio
+import os
+
+from hailtop.utils import retry_all_errors, blocking_to_async
+
+log = logging.getLogger('log_shipper')
+
+
+class LogShipper:
+    '''Ships a container's log to the log store while the container runs.
+
+    The log is appended to a local file as it is produced.  Every
+    `interval_secs`, or whenever `chunk_bytes` have accumulated, the
+    bytes not yet shipped are uploaded as the next chunk of the log.
+    `finish` ships the remainder and composes the chunks into the log
+    file read by the front end for completed jobs.  Until then, ranges
+    of the log are served from the local file.  The local file is read
+    in `thread_pool`.
+    '''
+
+    def __init__(self, log_store, format_version, batch_id, job_id, attempt_id, task, local_path,
+                 *, chunk_bytes, interval_secs, thread_pool=None):
+        self.log_store = log_store
+        self.format_version = format_version
+        self.batch_id = batch_id
+        self.job_id = job_id
+        self.attempt_id = attempt_id
+        self.task = task
+        self.local_path = local_path
+        self.chunk_bytes = chunk_bytes
+        self.interval_secs = interval_secs
+        self.thread_pool = thread_pool
+
+        self._file = open(local_path, 'wb')
+        # bytes appended to the log
+        self.size = 0
+        # bytes uploaded in chunks
+        self.shipped = 0
+        self.n_chunks = 0
+        self.finished = False
+
+        self._lock = asyncio.Lock()
+        self._periodic = asyncio.ensure_future(self._ship_periodically())
+
+    def __str__(self):
+        return f'log {self.batch_id}/{self.job_id}/{self.task}'
+
+    async def append(self, data):
+        assert not self.finished
+        self._file.write(data)
+        self._file.flush()
+        self.size += len(data)
+        if self.size - self.shipped >= self.chunk_bytes:
+            await self.ship()
+
+    def _read_local_blocking(self, offset, n):
+        with open(self.local_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(n)
+
+    async def _read_local(self, offset, n):
+        return await blocking_to_async(self.thread_pool, self._read_local_blocking, offset, n)
+
+    async def ship(self):
+        async with self._lock:
+            while self.shipped < self.size:
+                n = min(self.size - self.shipped, self.chunk_bytes)
+                data = await self._read_local(self.shipped, n)
+                await retry_all_errors(f'error while shipping chunk {self.n_chunks} of {self}')(
+                    self.log_store.write_log_chunk,
+                    self.format_version, self.batch_id, self.job_id, self.attempt_id, self.task,
+                    self.n_chunks, data)
+                self.n_chunks += 1
+                self.shipped += n
+
+    async def _ship_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval_secs)
+            try:
+                await self.ship()
+            except asyncio.CancelledError:  # pylint: disable=try-except-raise
+                raise
+            except Exception:
+                log.exception(f'while shipping {self}, ignoring')
+
+    async def finish(self):
+        self._periodic.cancel()
+        self._file.close()
+        await self.ship()
+        await self.log_store.compose_log_chunks(
+            self.format_version, self.batch_id, self.job_id, self.attempt_id, self.task,
+            self.n_chunks)
+        self.finished = True
+        log.info(f'shipped {self}: {self.size} bytes in {self.n_chunks} chunks')
+
+    def close(self):
+        self._periodic.cancel()
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.local_path)
+        except FileNotFoundError:
+            pass
+
+    async def read(self, offset, max_bytes):
+        '''Read up to `max_bytes` of the log starting at `offset`.
+
+        Returns the bytes read and the size of the log so far.'''
+        if os.path.exists(self.local_path):
+            size = self.size
+            if offset >= size:
+                return b'', size
+            try:
+                return await self._read_local(offset, min(size - offset, max_bytes)), size
+            except FileNotFoundError:
+                # removed by close while reading
+                pass
+        if self.finished:
+            return await self.log_store.read_log_file_range(
+                self.format_version, self.batch_id, self.job_id, self.attempt_id, self.task,
+                offset, max_bytes)
+        return b'', self.size
+
+    async def read_all(self):
+        data, _ = await self.read(0, self.size)
+        return data
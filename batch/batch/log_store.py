@@ -1,20 +1,50 @@
 import logging
 import asyncio
 
-from .google_storage import GCS
+from hailtop import aiogoogle
+
 from .spec_writer import SpecWriter
 
 log = logging.getLogger('logstore')
 
 
 class LogStore:
-    def __init__(self, batch_logs_bucket_name, worker_logs_bucket_name, instance_id, blocking_pool, *, project=None, credentials=None):
+    def __init__(self, batch_logs_bucket_name, worker_logs_bucket_name, instance_id, *, credentials=None, storage_client=None):
         self.batch_logs_bucket_name = batch_logs_bucket_name
         self.worker_logs_bucket_name = worker_logs_bucket_name
         self.instance_id = instance_id
         self.worker_logs_root = f'gs://{worker_logs_bucket_name}/batch/logs/{instance_id}/worker'
         self.batch_logs_root = f'gs://{batch_logs_bucket_name}/batch/logs/{instance_id}/batch'
-        self.gcs = GCS(blocking_pool, project=project, credentials=credentials)
+        if storage_client is None:
+            storage_client = aiogoogle.StorageClient(credentials=credentials)
+        self.storage_client = storage_client
+
+    @staticmethod
+    def _parse_uri(uri):
+        assert uri.startswith('gs://'), uri
+        bucket, _, name = uri[len('gs://'):].partition('/')
+        return bucket, name
+
+    async def _read(self, uri, **kwargs):
+        bucket, name = LogStore._parse_uri(uri)
+        return await self.storage_client.get_object(bucket, name, **kwargs)
+
+    async def _write(self, uri, data, **kwargs):
+        bucket, name = LogStore._parse_uri(uri)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        await self.storage_client.insert_object(bucket, name, data, **kwargs)
+
+    async def _delete(self, uri):
+        bucket, name = LogStore._parse_uri(uri)
+        await self.storage_client.delete_object(bucket, name)
+
+    async def _delete_prefix(self, uri):
+        bucket, name = LogStore._parse_uri(uri)
+        await self.storage_client.delete_prefix(bucket, name)
+
+    async def close(self):
+        await self.storage_client.close()
 
     def worker_log_path(self, machine_name, log_file):
         # this has to match worker startup-script
@@ -31,30 +61,58 @@ class LogStore:
 
     async def read_log_file(self, format_version, batch_id, job_id, attempt_id, task):
         path = self.log_path(format_version, batch_id, job_id, attempt_id, task)
-        return await self.gcs.read_gs_file(path)
+        return (await self._read(path)).decode('utf-8')
 
     async def write_log_file(self, format_version, batch_id, job_id, attempt_id, task, data):
         path = self.log_path(format_version, batch_id, job_id, attempt_id, task)
-        return await self.gcs.write_gs_file_from_string(path, data)
+        return await self._write(path, data, content_type='text/plain')
+
+    def log_chunk_path(self, format_version, batch_id, job_id, attempt_id, task, index):
+        return f'{self.log_path(format_version, batch_id, job_id, attempt_id, task)}.chunks/{index:06}'
+
+    async def read_log_file_range(self, format_version, batch_id, job_id, attempt_id, task, offset, max_bytes):
+        path = self.log_path(format_version, batch_id, job_id, attempt_id, task)
+        bucket, name = LogStore._parse_uri(path)
+        metadata = await self.storage_client.get_object_metadata(bucket, name)
+        size = int(metadata['size'])
+        if offset >= size:
+            return b'', size
+        data = await self.storage_client.get_object(
+            bucket, name, start=offset, end=min(size, offset + max_bytes) - 1)
+        return data, size
+
+    async def write_log_chunk(self, format_version, batch_id, job_id, attempt_id, task, index, data):
+        path = self.log_chunk_path(format_version, batch_id, job_id, attempt_id, task, index)
+        return await self._write(path, data, content_type='text/plain')
+
+    async def compose_log_chunks(self, format_version, batch_id, job_id, attempt_id, task, n_chunks):
+        path = self.log_path(format_version, batch_id, job_id, attempt_id, task)
+        if n_chunks == 0:
+            await self._write(path, b'', content_type='text/plain')
+            return
+        bucket, name = LogStore._parse_uri(path)
+        chunks = [LogStore._parse_uri(self.log_chunk_path(format_version, batch_id, job_id, attempt_id, task, i))[1]
+                  for i in range(n_chunks)]
+        await self.storage_client.compose(bucket, chunks, name, content_type='text/plain')
+        await self.storage_client.delete_objects(bucket, chunks)
 
     async def delete_batch_logs(self, batch_id):
-        await self.gcs.delete_gs_files(
-            self.batch_log_dir(batch_id))
+        await self._delete_prefix(f'{self.batch_log_dir(batch_id)}/')
 
     def status_path(self, batch_id, job_id, attempt_id):
         return f'{self.batch_log_dir(batch_id)}/{job_id}/{attempt_id}/status.json'
 
     async def read_status_file(self, batch_id, job_id, attempt_id):
         path = self.status_path(batch_id, job_id, attempt_id)
-        return await self.gcs.read_gs_file(path)
+        return (await self._read(path)).decode('utf-8')
 
     async def write_status_file(self, batch_id, job_id, attempt_id, status):
         path = self.status_path(batch_id, job_id, attempt_id)
-        return await self.gcs.write_gs_file_from_string(path, status)
+        return await self._write(path, status, content_type='application/json')
 
     async def delete_status_file(self, batch_id, job_id, attempt_id):
         path = self.status_path(batch_id, job_id, attempt_id)
-        return await self.gcs.delete_gs_file(path)
+        return await self._delete(path)
 
     def specs_dir(self, batch_id, token):
         return f'{self.batch_logs_root}/{batch_id}/bunch/{token}'
@@ -68,21 +126,28 @@ class LogStore:
     async def read_spec_file(self, batch_id, token, start_job_id, job_id):
         idx_path = self.specs_index_path(batch_id, token)
         idx_start, idx_end = SpecWriter.get_index_file_offsets(job_id, start_job_id)
-        offsets = await self.gcs.read_binary_gs_file(idx_path, start=idx_start, end=idx_end)
+        offsets = await self._read(idx_path, start=idx_start, end=idx_end)
 
         spec_path = self.specs_path(batch_id, token)
         spec_start, spec_end = SpecWriter.get_spec_file_offsets(offsets)
-        return await self.gcs.read_gs_file(spec_path, start=spec_start, end=spec_end)
+        return (await self._read(spec_path, start=spec_start, end=spec_end)).decode('utf-8')
+
+    async def read_spec_index_file(self, batch_id, token):
+        idx_path = self.specs_index_path(batch_id, token)
+        return await self._read(idx_path)
+
+    async def read_spec_file_range(self, batch_id, token, start, end):
+        spec_path = self.specs_path(batch_id, token)
+        return await self._read(spec_path, start=start, end=end)
 
     async def write_spec_file(self, batch_id, token, data_bytes, offsets_bytes):
         idx_path = self.specs_index_path(batch_id, token)
-        write1 = self.gcs.write_gs_file_from_string(idx_path, offsets_bytes,
-                                                    content_type='application/octet-stream')
+        write1 = self._write(idx_path, offsets_bytes)
 
         specs_path = self.specs_path(batch_id, token)
-        write2 = self.gcs.write_gs_file_from_string(specs_path, data_bytes)
+        write2 = self._write(specs_path, data_bytes, content_type='text/plain')
 
         await asyncio.gather(write1, write2)
 
     async def delete_spec_file(self, batch_id, token):
-        await self.gcs.delete_gs_files(self.specs_dir(batch_id, token))
+        await self._delete_prefix(f'{self.specs_dir(batch_id, token)}/')
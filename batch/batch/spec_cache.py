@@ -0,0 +1,196 @@
+import logging
+import asyncio
+import collections
+import time
+
+from .spec_writer import SpecWriter
+
+log = logging.getLogger('spec_cache')
+
+
+def _offset(idx, i):
+    start = i * SpecWriter.bytes_per_offset
+    return int.from_bytes(idx[start:start + SpecWriter.bytes_per_offset],
+                          byteorder=SpecWriter.byteorder, signed=SpecWriter.signed)
+
+
+class _Bunch:
+    def __init__(self, idx, start_job_id):
+        self.idx = idx
+        self.start_job_id = start_job_id
+        self.n_jobs = len(idx) // SpecWriter.bytes_per_offset - 1
+        # job_id => spec bytes
+        self.specs = {}
+        # (first job_id, last job_id, task) of in-flight spec reads
+        self.reads = []
+        self.n_bytes = len(idx)
+
+    def spec_offsets(self, job_id):
+        i = job_id - self.start_job_id
+        return (_offset(self.idx, i), _offset(self.idx, i + 1))
+
+    def pending_read(self, job_id):
+        for first, last, task in self.reads:
+            if first <= job_id <= last:
+                return task
+        return None
+
+
+class SpecCache:
+    '''Worker-level cache of job specs stored in bunches by the front end.
+
+    A bunch's `specs.idx` is read whole the first time one of its jobs
+    is scheduled on the worker.  Specs are read in windows: the
+    requested job and the jobs following it in the bunch, up to
+    `window_bytes`, are fetched with a single ranged read, since the
+    driver schedules the jobs of a bunch in job id order.  Concurrent
+    requests for jobs in the same bunch or window share one read.
+    Bunches are evicted in least-recently-used order once the cached
+    index and spec bytes exceed `max_bytes`.
+    '''
+
+    def __init__(self, log_store, max_bytes, window_bytes):
+        self.log_store = log_store
+        self.max_bytes = max_bytes
+        self.window_bytes = min(window_bytes, max_bytes)
+
+        # (batch_id, token) => _Bunch, least recently used first
+        self.bunches = collections.OrderedDict()
+        self.total_bytes = 0
+        # (batch_id, token) => task reading the bunch index
+        self.index_reads = {}
+
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+        self.n_index_reads = 0
+        self.n_spec_reads = 0
+        self.bytes_read = 0
+        self.read_secs_total = 0
+        self.read_secs_max = 0
+
+    def stats(self):
+        n_reads = self.n_index_reads + self.n_spec_reads
+        return {
+            'n_bunches': len(self.bunches),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'n_evictions': self.n_evictions,
+            'n_index_reads': self.n_index_reads,
+            'n_spec_reads': self.n_spec_reads,
+            'bytes_read': self.bytes_read,
+            'mean_read_secs': self.read_secs_total / n_reads if n_reads else None,
+            'max_read_secs': self.read_secs_max
+        }
+
+    def _record_read(self, start, n_bytes):
+        read_secs = time.time() - start
+        self.bytes_read += n_bytes
+        self.read_secs_total += read_secs
+        self.read_secs_max = max(self.read_secs_max, read_secs)
+
+    def _add_bytes(self, key, bunch, n_bytes):
+        bunch.n_bytes += n_bytes
+        if self.bunches.get(key) is bunch:
+            self.total_bytes += n_bytes
+            self._evict(key)
+
+    def _evict(self, keep):
+        while self.total_bytes > self.max_bytes and len(self.bunches) > 1:
+            key = next(iter(self.bunches))
+            if key == keep:
+                self.bunches.move_to_end(key)
+                key = next(iter(self.bunches))
+            bunch = self.bunches.pop(key)
+            self.total_bytes -= bunch.n_bytes
+            self.n_evictions += 1
+            log.info(f'evicted bunch {key[0]} {key[1]} ({bunch.n_bytes} bytes)')
+
+    async def _read_index(self, key, start_job_id):
+        batch_id, token = key
+        start = time.time()
+        idx = await self.log_store.read_spec_index_file(batch_id, token)
+        self.n_index_reads += 1
+        self._record_read(start, len(idx))
+
+        bunch = _Bunch(idx, start_job_id)
+        self.bunches[key] = bunch
+        self.total_bytes += bunch.n_bytes
+        self._evict(key)
+        return bunch
+
+    async def _get_bunch(self, key, start_job_id):
+        bunch = self.bunches.get(key)
+        if bunch is not None:
+            self.bunches.move_to_end(key)
+            return bunch
+
+        task = self.index_reads.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._read_index(key, start_job_id))
+            self.index_reads[key] = task
+
+            def remove(_):
+                if self.index_reads.get(key) is task:
+                    del self.index_reads[key]
+            task.add_done_callback(remove)
+        return await asyncio.shield(task)
+
+    async def _read_window(self, key, bunch, job_id, last_job_id):
+        batch_id, token = key
+        spec_start, _ = bunch.spec_offsets(job_id)
+        _, spec_end = bunch.spec_offsets(last_job_id)
+
+        start = time.time()
+        # `end` is inclusive of the last byte to return
+        data = await self.log_store.read_spec_file_range(batch_id, token, spec_start, spec_end - 1)
+        self.n_spec_reads += 1
+        self._record_read(start, len(data))
+
+        n_bytes = 0
+        for i in range(job_id, last_job_id + 1):
+            start, end = bunch.spec_offsets(i)
+            spec = data[start - spec_start:end - spec_start]
+            bunch.specs[i] = spec
+            n_bytes += len(spec)
+        self._add_bytes(key, bunch, n_bytes)
+
+    def _start_window(self, key, bunch, job_id):
+        # prefetch the following jobs in the bunch up to `window_bytes`
+        spec_start, _ = bunch.spec_offsets(job_id)
+        last_job_id = job_id
+        end_job_id = bunch.start_job_id + bunch.n_jobs - 1
+        while (last_job_id < end_job_id
+               and last_job_id + 1 not in bunch.specs
+               and bunch.pending_read(last_job_id + 1) is None):
+            _, next_end = bunch.spec_offsets(last_job_id + 1)
+            if next_end - spec_start > self.window_bytes:
+                break
+            last_job_id += 1
+
+        task = asyncio.ensure_future(self._read_window(key, bunch, job_id, last_job_id))
+        entry = (job_id, last_job_id, task)
+        bunch.reads.append(entry)
+        task.add_done_callback(lambda _: bunch.reads.remove(entry))
+        return task
+
+    async def read_spec(self, batch_id, token, start_job_id, job_id):
+        key = (batch_id, token)
+        bunch = await self._get_bunch(key, start_job_id)
+        if not start_job_id <= job_id < start_job_id + bunch.n_jobs:
+            raise ValueError(f'job {job_id} not in bunch {token} of batch {batch_id} '
+                             f'starting at job {start_job_id} with {bunch.n_jobs} jobs')
+
+        spec = bunch.specs.get(job_id)
+        if spec is not None:
+            self.n_hits += 1
+            return spec.decode('utf-8')
+
+        self.n_misses += 1
+        task = bunch.pending_read(job_id)
+        if task is None:
+            task = self._start_window(key, bunch, job_id)
+        await asyncio.shield(task)
+        return bunch.specs[job_id].decode('utf-8')
@@ -2,8 +2,6 @@ import re
 import logging
 import math
 
-from .front_end.validate import CPU_REGEX, MEMORY_REGEX
-
 log = logging.getLogger('utils')
 
 
@@ -59,36 +57,6 @@ def cost_from_msec_mcpu(msec_mcpu):
     return (msec_mcpu * 0.001 * 0.001) * (total_cost_per_core_hour / 3600)
 
 
-def parse_cpu_in_mcpu(cpu_string):
-    match = CPU_REGEX.fullmatch(cpu_string)
-    if match:
-        number = float(match.group(1))
-        if match.group(2) == 'm':
-            number /= 1000
-        return int(number * 1000)
-    return None
-
-
-conv_factor = {
-    'K': 1000, 'Ki': 1024,
-    'M': 1000**2, 'Mi': 1024**2,
-    'G': 1000**3, 'Gi': 1024**3,
-    'T': 1000**4, 'Ti': 1024**4,
-    'P': 1000**5, 'Pi': 1024**5
-}
-
-
-def parse_memory_in_bytes(memory_string):
-    match = MEMORY_REGEX.fullmatch(memory_string)
-    if match:
-        number = float(match.group(1))
-        suffix = match.group(2)
-        if suffix:
-            return math.ceil(number * conv_factor[suffix])
-        return math.ceil(number)
-    return None
-
-
 def worker_memory_per_core_gb(worker_type):
     if worker_type == 'standard':
         m = 3.75
@@ -132,3 +100,46 @@ def parse_image_tag(image_string):
     if match:
         return match.group(3)
     return None
+
+
+def utf8_prefix_length(b):
+    '''The length of the longest prefix of `b` that does not end in the
+    middle of a UTF-8 encoded character.'''
+    n = len(b)
+    # a character is at most 4 bytes; look back for its lead byte
+    for i in range(n - 1, max(n - 4, 0) - 1, -1):
+        c = b[i]
+        if c & 0xC0 != 0x80:
+            if c & 0x80 == 0:
+                width = 1
+            elif c & 0xE0 == 0xC0:
+                width = 2
+            elif c & 0xF0 == 0xE0:
+                width = 3
+            else:
+                width = 4
+            return n if i + width <= n else i
+    return n
+
+
+def log_range(task, offset, data, size, complete):
+    # skip the rest of a character that starts before `offset`
+    start = 0
+    while start < min(len(data), 3) and data[start] & 0xC0 == 0x80:
+        start += 1
+    offset += start
+    data = data[start:]
+    # a character split at the end is returned by the next range; a range
+    # too short to hold a whole character is returned as is, so that paging
+    # always advances
+    n = utf8_prefix_length(data)
+    if n > 0:
+        data = data[:n]
+    return {
+        'container': task,
+        'offset': offset,
+        'next_offset': offset + len(data),
+        'size': size,
+        'complete': complete,
+        'data': data.decode('utf-8', errors='replace')
+    }
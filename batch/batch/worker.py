@@ -17,21 +17,26 @@ import async_timeout
 import concurrent
 import aiodocker
 from aiodocker.exceptions import DockerError
-import google.oauth2.service_account
 from hailtop.utils import time_msecs, request_retry_transient_errors, RETRY_FUNCTION_SCRIPT, \
-    sleep_and_backoff, retry_all_errors, check_shell, CalledProcessError
+    sleep_and_backoff, retry_all_errors, check_shell, CalledProcessError, parse_cpu_in_mcpu, \
+    parse_memory_in_bytes
 from hailtop.tls import ssl_client_session
+from hailtop import aiogoogle
 
 # import uvloop
 
 from hailtop.config import DeployConfig
 from gear import configure_logging
 
-from .utils import parse_cpu_in_mcpu, parse_image_tag, parse_memory_in_bytes, \
-    adjust_cores_for_memory_request, cores_mcpu_to_memory_bytes, adjust_cores_for_packability
+from .utils import parse_image_tag, adjust_cores_for_memory_request, cores_mcpu_to_memory_bytes, \
+    adjust_cores_for_packability, log_range
 from .semaphore import FIFOWeightedSemaphore
 from .log_store import LogStore
-from .globals import HTTP_CLIENT_MAX_SIZE, STATUS_FORMAT_VERSION
+from .log_shipper import LogShipper
+from .spec_cache import SpecCache
+from .image_cache import ImageCache
+from .completion_batcher import CompletionBatcher
+from .globals import HTTP_CLIENT_MAX_SIZE, STATUS_FORMAT_VERSION, LOG_RANGE_MAX_BYTES
 from .batch_format_version import BatchFormatVersion
 from .worker_config import WorkerConfig
 
@@ -44,6 +49,19 @@ MAX_DOCKER_IMAGE_PULL_SECS = 20 * 60
 MAX_DOCKER_WAIT_SECS = 5 * 60
 MAX_DOCKER_OTHER_OPERATION_SECS = 1 * 60
 
+# docker lives on the 375GB local SSD, shared with job scratch
+IMAGE_CACHE_MAX_BYTES = 150 * 1024**3
+IMAGE_ACCESS_TTL_SECS = 5 * 60
+
+SPEC_CACHE_MAX_BYTES = 256 * 1024**2
+SPEC_CACHE_WINDOW_BYTES = 4 * 1024**2
+
+# completions reported within this window are sent to the driver together
+JOB_COMPLETE_WINDOW_SECS = 0.1
+
+LOG_CHUNK_BYTES = 8 * 1024**2
+LOG_SHIP_INTERVAL_SECS = 60
+
 CORES = int(os.environ['CORES'])
 NAME = os.environ['NAME']
 NAMESPACE = os.environ['NAMESPACE']
@@ -77,6 +95,8 @@ docker = None
 
 port_allocator = None
 
+image_cache = None
+
 worker = None
 
 
@@ -243,11 +263,13 @@ class Container:
         self.timeout = self.spec.get('timeout')
 
         self.container = None
+        self.image_acquired = False
         self.state = 'pending'
         self.error = None
         self.timing = {}
         self.container_status = None
         self.log = None
+        self.log_shipper = None
 
     def container_config(self):
         weight = worker_fraction_in_1024ths(self.spec['cpu'])
@@ -326,6 +348,7 @@ class Container:
         return status
 
     async def run(self, worker):
+        stream_log = None
         try:
             async with self.step('pulling'):
                 if self.image.startswith('gcr.io/'):
@@ -335,21 +358,10 @@ class Container:
                         'username': '_json_key',
                         'password': key
                     }
-                    # Pull to verify this user has access to this
-                    # image.
-                    # FIXME improve the performance of this with a
-                    # per-user image cache.
-                    await docker_call_retry(MAX_DOCKER_IMAGE_PULL_SECS, f'{self}')(
-                        docker.images.pull, self.image, auth=auth)
                 else:
-                    # this caches public images
-                    try:
-                        await docker_call_retry(MAX_DOCKER_OTHER_OPERATION_SECS, f'{self}')(
-                            docker.images.get, self.image)
-                    except DockerError as e:
-                        if e.status == 404:
-                            await docker_call_retry(MAX_DOCKER_IMAGE_PULL_SECS, f'{self}')(
-                                docker.images.pull, self.image)
+                    auth = None
+                await image_cache.acquire(self.image, self.job.user, auth=auth)
+                self.image_acquired = True
 
             if self.port is not None:
                 async with self.step('allocating_port'):
@@ -362,8 +374,16 @@ class Container:
                     create_container, config, name=f'batch-{self.job.batch_id}-job-{self.job.job_id}-{self.name}')
 
             async with self.step('starting'):
+                os.makedirs(self.job.log_host_path(), exist_ok=True)
+                self.log_shipper = LogShipper(
+                    worker.log_store, self.job.format_version, self.job.batch_id,
+                    self.job.job_id, self.job.attempt_id, self.name,
+                    f'{self.job.log_host_path()}/{self.name}',
+                    chunk_bytes=LOG_CHUNK_BYTES, interval_secs=LOG_SHIP_INTERVAL_SECS,
+                    thread_pool=worker.pool)
                 await docker_call_retry(MAX_DOCKER_OTHER_OPERATION_SECS, f'{self}')(
                     start_container, self.container)
+                stream_log = asyncio.ensure_future(self.stream_log())
 
             timed_out = False
             async with self.step('running'):
@@ -377,10 +397,7 @@ class Container:
             log.info(f'{self}: container status {self.container_status}')
 
             async with self.step('uploading_log'):
-                await worker.log_store.write_log_file(
-                    self.job.format_version, self.job.batch_id,
-                    self.job.job_id, self.job.attempt_id, self.name,
-                    await self.get_container_log())
+                await self.upload_log(worker, stream_log, timed_out)
 
             async with self.step('deleting'):
                 await self.delete_container()
@@ -400,7 +417,42 @@ class Container:
             self.state = 'error'
             self.error = traceback.format_exc()
         finally:
+            if stream_log is not None:
+                # stop appending before the log file is closed
+                stream_log.cancel()
+                await asyncio.wait([stream_log])
+                if not stream_log.cancelled() and stream_log.exception() is not None:
+                    log.warning(f'{self}: while streaming log, ignoring: {stream_log.exception()!r}')
             await self.delete_container()
+            if self.log_shipper:
+                self.log_shipper.close()
+            if self.image_acquired:
+                image_cache.release(self.image)
+                self.image_acquired = False
+
+    async def stream_log(self):
+        async for data in self.container.log(stderr=True, stdout=True, follow=True):
+            await self.log_shipper.append(data.encode('utf-8'))
+
+    async def upload_log(self, worker, stream_log, timed_out):
+        try:
+            if timed_out:
+                # the container is still running
+                stream_log.cancel()
+            else:
+                # the stream ends once the container's output is drained
+                await asyncio.wait_for(stream_log, MAX_DOCKER_OTHER_OPERATION_SECS)
+            await self.log_shipper.finish()
+            return
+        except Exception:
+            log.exception(f'while shipping log for {self}, uploading the whole log')
+
+        self.log_shipper.close()
+        self.log_shipper = None
+        await worker.log_store.write_log_file(
+            self.job.format_version, self.job.batch_id,
+            self.job.job_id, self.job.attempt_id, self.name,
+            await self.get_container_log())
 
     async def get_container_log(self):
         logs = await docker_call_retry(MAX_DOCKER_OTHER_OPERATION_SECS, f'{self}')(
@@ -409,10 +461,21 @@ class Container:
         return self.log
 
     async def get_log(self):
+        if self.log_shipper:
+            return (await self.log_shipper.read_all()).decode('utf-8', errors='replace')
         if self.container:
             return await self.get_container_log()
         return self.log
 
+    async def read_log(self, offset, max_bytes):
+        if self.log_shipper:
+            data, size = await self.log_shipper.read(offset, max_bytes)
+            return log_range(self.name, offset, data, size, self.log_shipper.finished)
+        if self.log is not None:
+            data = self.log.encode('utf-8')
+            return log_range(self.name, offset, data[offset:offset + max_bytes], len(data), True)
+        return log_range(self.name, offset, b'', 0, False)
+
     async def delete_container(self):
         if self.container:
             try:
@@ -550,6 +613,9 @@ class Job:
     def gsa_key_file_path(self):
         return f'{self.scratch}/gsa-key'
 
+    def log_host_path(self):
+        return f'{self.scratch}/logs'
+
     def __init__(self, batch_id, user, gsa_key, job_spec, format_version):
         self.batch_id = batch_id
         self.user = user
@@ -742,6 +808,12 @@ class Job:
     async def get_log(self):
         return {name: await c.get_log() for name, c in self.containers.items()}
 
+    async def read_log(self, container, offset, max_bytes):
+        c = self.containers.get(container)
+        if c is None:
+            return None
+        return await c.read_log(offset, max_bytes)
+
     async def delete(self):
         log.info(f'deleting {self}')
         self.deleted = True
@@ -799,9 +871,12 @@ class Worker:
         self.cpu_sem = FIFOWeightedSemaphore(self.cores_mcpu)
         self.pool = concurrent.futures.ThreadPoolExecutor()
         self.jobs = {}
+        self.completion_batcher = CompletionBatcher(
+            self.post_job_completes, window_secs=JOB_COMPLETE_WINDOW_SECS)
 
         # filled in during activation
         self.log_store = None
+        self.spec_cache = None
         self.headers = None
 
     async def run_job(self, job):
@@ -810,9 +885,7 @@ class Worker:
         except Exception:
             log.exception(f'while running {job}, ignoring')
 
-    async def create_job_1(self, request):
-        body = await request.json()
-
+    async def _create_job(self, body):
         batch_id = body['batch_id']
         job_id = body['job_id']
 
@@ -823,7 +896,7 @@ class Worker:
             start_job_id = body['start_job_id']
             addtl_spec = body['job_spec']
 
-            job_spec = await self.log_store.read_spec_file(batch_id, token, start_job_id, job_id)
+            job_spec = await self.spec_cache.read_spec(batch_id, token, start_job_id, job_id)
             job_spec = json.loads(job_spec)
 
             job_spec['attempt_id'] = addtl_spec['attempt_id']
@@ -844,7 +917,7 @@ class Worker:
 
         # already running
         if id in self.jobs:
-            return web.HTTPForbidden()
+            return False
 
         job = Job(batch_id, body['user'], body['gsa_key'], job_spec, format_version)
 
@@ -854,11 +927,35 @@ class Worker:
 
         asyncio.ensure_future(self.run_job(job))
 
+        return True
+
+    async def create_job_1(self, request):
+        body = await request.json()
+        if not await self._create_job(body):
+            return web.HTTPForbidden()
         return web.Response()
 
     async def create_job(self, request):
         return await asyncio.shield(self.create_job_1(request))
 
+    async def create_jobs_1(self, request):
+        body = await request.json()
+
+        async def create(job_body):
+            try:
+                if await self._create_job(job_body):
+                    return {'status': 'created'}
+                return {'status': 'exists'}
+            except Exception:
+                log.exception(f'while creating job {(job_body["batch_id"], job_body["job_id"])}')
+                return {'status': 'error', 'error': traceback.format_exc()}
+
+        results = await asyncio.gather(*[create(job_body) for job_body in body['jobs']])
+        return web.json_response({'results': results})
+
+    async def create_jobs(self, request):
+        return await asyncio.shield(self.create_jobs_1(request))
+
     async def get_job_log(self, request):
         batch_id = int(request.match_info['batch_id'])
         job_id = int(request.match_info['job_id'])
@@ -866,6 +963,11 @@ class Worker:
         job = self.jobs.get(id)
         if not job:
             raise web.HTTPNotFound()
+        if 'offset' in request.query:
+            container = request.query.get('container', 'main')
+            offset = int(request.query['offset'])
+            max_bytes = int(request.query.get('max_bytes', LOG_RANGE_MAX_BYTES))
+            return web.json_response(await job.read_log(container, offset, max_bytes))
         return web.json_response(await job.get_log())
 
     async def get_job_status(self, request):
@@ -899,6 +1001,17 @@ class Worker:
         body = {'name': NAME}
         return web.json_response(body)
 
+    async def get_status(self, request):  # pylint: disable=unused-argument
+        body = {
+            'name': NAME,
+            'n_jobs': len(self.jobs),
+            'free_cores_mcpu': self.cpu_sem.value,
+            'image_cache': image_cache.stats(),
+            'spec_cache': self.spec_cache.stats() if self.spec_cache else None,
+            'completion_batcher': self.completion_batcher.stats()
+        }
+        return web.json_response(body)
+
     async def run(self):
         app_runner = None
         site = None
@@ -906,9 +1019,11 @@ class Worker:
             app = web.Application(client_max_size=HTTP_CLIENT_MAX_SIZE)
             app.add_routes([
                 web.post('/api/v1alpha/batches/jobs/create', self.create_job),
+                web.post('/api/v1alpha/batches/jobs/create/bulk', self.create_jobs),
                 web.delete('/api/v1alpha/batches/{batch_id}/jobs/{job_id}/delete', self.delete_job),
                 web.get('/api/v1alpha/batches/{batch_id}/jobs/{job_id}/log', self.get_job_log),
                 web.get('/api/v1alpha/batches/{batch_id}/jobs/{job_id}/status', self.get_job_status),
+                web.get('/api/v1alpha/status', self.get_status),
                 web.get('/healthcheck', self.healthcheck)
             ])
 
@@ -975,20 +1090,12 @@ class Worker:
             'status': db_status
         }
 
-        body = {
-            'status': status
-        }
-
         start_time = time_msecs()
         delay_secs = 0.1
         while True:
             try:
-                async with ssl_client_session(
-                        raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5)) as session:
-                    await session.post(
-                        deploy_config.url('batch-driver', '/api/v1alpha/instances/job_complete'),
-                        json=body, headers=self.headers)
-                    return
+                await self.completion_batcher.report(status)
+                return
             except asyncio.CancelledError:  # pylint: disable=try-except-raise
                 raise
             except Exception as e:
@@ -1011,6 +1118,16 @@ class Worker:
             # exponentially back off, up to (expected) max of 2m
             delay_secs = min(delay_secs * 2, 2 * 60.0)
 
+    async def post_job_completes(self, statuses):
+        async with ssl_client_session(
+                raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5)) as session:
+            resp = await session.post(
+                deploy_config.url('batch-driver', '/api/v1alpha/instances/jobs_complete'),
+                json={'statuses': statuses}, headers=self.headers)
+            failed = {(batch_id, job_id) for batch_id, job_id in (await resp.json())['failed']}
+        return [i for i, status in enumerate(statuses)
+                if (status['batch_id'], status['job_id']) in failed]
+
     async def post_job_complete(self, job):
         try:
             await self.post_job_complete_1(job)
@@ -1071,18 +1188,20 @@ class Worker:
             with open('key.json', 'w') as f:
                 f.write(json.dumps(resp_json['key']))
 
-            credentials = google.oauth2.service_account.Credentials.from_service_account_file(
-                'key.json')
-            self.log_store = LogStore(BATCH_LOGS_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, INSTANCE_ID, self.pool,
-                                      project=PROJECT, credentials=credentials)
+            credentials = aiogoogle.Credentials.from_file('key.json')
+            self.log_store = LogStore(BATCH_LOGS_BUCKET_NAME, WORKER_LOGS_BUCKET_NAME, INSTANCE_ID,
+                                      credentials=credentials)
+            self.spec_cache = SpecCache(self.log_store, SPEC_CACHE_MAX_BYTES, SPEC_CACHE_WINDOW_BYTES)
 
 
 async def async_main():
-    global port_allocator, worker, docker
+    global port_allocator, image_cache, worker, docker
 
     docker = aiodocker.Docker()
 
     port_allocator = PortAllocator()
+    image_cache = ImageCache(docker, docker_call_retry, IMAGE_CACHE_MAX_BYTES, IMAGE_ACCESS_TTL_SECS,
+                             MAX_DOCKER_IMAGE_PULL_SECS, MAX_DOCKER_OTHER_OPERATION_SECS)
     worker = Worker()
     await worker.run()
 
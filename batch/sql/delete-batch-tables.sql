@@ -8,6 +8,7 @@ DROP PROCEDURE IF EXISTS schedule_job;
 DROP PROCEDURE IF EXISTS unschedule_job;
 DROP PROCEDURE IF EXISTS mark_job_started;
 DROP PROCEDURE IF EXISTS mark_job_complete;
+DROP PROCEDURE IF EXISTS mark_job_complete_in_transaction;
 DROP PROCEDURE IF EXISTS add_attempt;
 
 DROP TRIGGER IF EXISTS instances_before_update;
@@ -0,0 +1,87 @@
+import pytest
+
+from batch.driver.autoscaler import AutoscalerConfig, PoolState, autoscaling_policy
+from batch.driver.autoscaler_sim import burst_trace, simulate
+
+
+class FakeInstance:
+    def __init__(self, name, cores_mcpu=16000):
+        self.name = name
+        self.cores_mcpu = cores_mcpu
+
+
+def pool_state(now_secs, user_ready_cores, *, live_free_cores=0, n_pending=0, n_active=0,
+               idle_instances=(), min_live_instances=0):
+    user_ready_cores_mcpu = {user: cores * 1000 for user, cores in user_ready_cores.items()}
+    return PoolState(
+        now_msecs=now_secs * 1000,
+        worker_cores_mcpu=16000,
+        ready_cores_mcpu=sum(user_ready_cores_mcpu.values()),
+        user_ready_cores_mcpu=user_ready_cores_mcpu,
+        free_cores_mcpu=0,
+        live_free_cores_mcpu=live_free_cores * 1000,
+        n_pending=n_pending,
+        n_active=n_active,
+        n_instances=n_pending + n_active,
+        pool_size=10_000,
+        max_instances=10_000,
+        idle_instances=idle_instances,
+        min_live_instances=min_live_instances)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        autoscaling_policy('foo')
+
+
+def test_reactive_caps_creation():
+    policy = autoscaling_policy('reactive')
+    assert policy.decide(pool_state(0, {'a': 50_000})).n_create == 10
+    assert policy.decide(pool_state(0, {'a': 32})).n_create == 2
+    assert policy.decide(pool_state(0, {})).n_create == 0
+
+
+def test_predictive_counts_pending_and_rate_limits():
+    policy = autoscaling_policy('predictive', AutoscalerConfig(max_create_per_tick=100, max_create_per_minute=150))
+    assert policy.decide(pool_state(0, {'a': 50_000})).n_create == 100
+    # the pending instances cover 1600 cores
+    assert policy.decide(pool_state(15, {'a': 1600}, live_free_cores=1600, n_pending=100)).n_create == 0
+    # 50 left in the minute
+    assert policy.decide(pool_state(30, {'a': 50_000}, live_free_cores=1600, n_pending=100)).n_create == 50
+    assert policy.decide(pool_state(45, {'a': 50_000}, live_free_cores=2400, n_pending=150)).n_create == 0
+    assert policy.decide(pool_state(60, {'a': 50_000}, live_free_cores=2400, n_pending=150)).n_create == 100
+
+
+def test_predictive_follows_trend():
+    config = AutoscalerConfig(boot_latency_secs=105, interval_secs=15)
+    policy = autoscaling_policy('predictive', config)
+    # 'a' grows by 160 cores per tick, 'b' is flat
+    for i in range(4):
+        decision = policy.decide(pool_state(15 * i, {'a': 160 * (i + 1), 'b': 160},
+                                            live_free_cores=160 * (i + 1) + 160))
+    # a: 640 ready + 160 / 15s over 120s = 1920 cores, b: 160 cores
+    assert decision.n_create == (1920 + 160 - 800) // 16
+
+
+def test_predictive_retires_idle_instances():
+    config = AutoscalerConfig(idle_retire_secs=15)
+    policy = autoscaling_policy('predictive', config)
+    instances = [FakeInstance(f'i{i}') for i in range(3)]
+
+    decision = policy.decide(pool_state(0, {'a': 16}, live_free_cores=48, n_active=3,
+                                        idle_instances=instances, min_live_instances=1))
+    assert decision.instances_to_retire == []
+
+    # 16 cores are still needed and one instance is kept
+    decision = policy.decide(pool_state(15, {'a': 16}, live_free_cores=48, n_active=3,
+                                        idle_instances=instances, min_live_instances=1))
+    assert [instance.name for instance in decision.instances_to_retire] == ['i0', 'i1']
+
+
+def test_simulator_burst():
+    jobs = burst_trace(8000, 300)
+    reactive = simulate('reactive', jobs)
+    predictive = simulate('predictive', jobs)
+    assert reactive['used_core_hours'] == predictive['used_core_hours']
+    assert predictive['time_to_capacity_secs'] < reactive['time_to_capacity_secs']
+    assert predictive['instances_created'] == 500
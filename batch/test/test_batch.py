@@ -131,6 +131,11 @@ class Test(unittest.TestCase):
         with self.assertRaisesRegex(aiohttp.client.ClientResponseError, 'bad resource request.*cpu cannot be 0'):
             builder.submit()
 
+        builder = self.client.create_batch()
+        builder.create_job('ubuntu:18.04', ['true'], pvc_size='1Ti')
+        with self.assertRaisesRegex(aiohttp.client.ClientResponseError, 'resource requests.*unsatisfiable'):
+            builder.submit()
+
     def test_out_of_memory(self):
         builder = self.client.create_batch()
         resources = {'cpu': '0.1', 'memory': '10M'}
@@ -226,6 +231,25 @@ class Test(unittest.TestCase):
 
         b.cancel()
 
+    def test_list_jobs_bulk(self):
+        b = self.client.create_batch()
+        for i in range(7):
+            b.create_job('ubuntu:18.04', ['true'], attributes={'name': f'j{i}', 'tag': 'odd' if i % 2 else 'even'})
+        b = b.submit()
+        b.wait()
+
+        jobs = list(b.bulk_jobs(page_size=3))
+        assert [j['job_id'] for j in jobs] == list(range(1, 8))
+        assert jobs == list(b.jobs())
+
+        jobs = list(b.bulk_jobs(q='tag=odd', fields=['state'], page_size=2))
+        assert [j['job_id'] for j in jobs] == [2, 4, 6]
+        assert all(set(j) == {'batch_id', 'job_id', 'state'} for j in jobs), jobs
+        assert all(j['state'] == 'Success' for j in jobs), jobs
+
+        with self.assertRaisesRegex(aiohttp.client.ClientResponseError, 'unknown fields foo'):
+            list(b.bulk_jobs(fields=['foo']))
+
     def test_include_jobs(self):
         b1 = self.client.create_batch()
         for i in range(2):
@@ -498,6 +522,30 @@ echo $HAIL_BATCH_WORKER_IP
             assert batch['state'] == 'success', batch
             assert len(list(b.jobs())) == 9
 
+    def test_append_jobs_to_open_batch(self):
+        builder = self.client.create_batch()
+        builder.open(20)
+
+        def jobs(start, end):
+            for i in range(start, end):
+                yield {'image': 'ubuntu:18.04',
+                       'command': ['echo', str(i)],
+                       'parents': [1] if i > 1 else []}
+
+        assert builder.append_jobs(jobs(1, 11), max_bunch_size=3) == 10
+        assert builder.append_jobs(jobs(11, 21), max_bunch_size=3) == 10
+        b = builder.close()
+        status = b.wait()
+        assert status['state'] == 'success', status
+        assert len(list(b.jobs())) == 20
+
+    def test_close_open_batch_with_missing_jobs(self):
+        builder = self.client.create_batch()
+        builder.open(2)
+        builder.append_jobs([{'image': 'ubuntu:18.04', 'command': ['/bin/true']}])
+        with self.assertRaises(ValueError):
+            builder.close()
+
     def test_create_idempotence(self):
         builder = self.client.create_batch()
         builder.create_job('ubuntu:18.04', ['/bin/true'])
@@ -535,6 +583,28 @@ echo $HAIL_BATCH_WORKER_IP
                 headers=headers)
             assert r.status_code == 400, (config, r)
 
+    def test_wait_long_poll(self):
+        builder = self.client.create_batch()
+        builder.create_job('ubuntu:18.04', ['sleep', '30'])
+        b = builder.submit()
+
+        url = deploy_config.url('batch', f'/api/v1alpha/batches/{b.id}/wait')
+        headers = service_auth_headers(deploy_config, 'batch')
+
+        start = time.time()
+        r = requests.get(url, params={'n_completed': 0, 'timeout': 2}, headers=headers)
+        assert r.status_code == 200, r
+        assert time.time() - start >= 2
+        status = r.json()
+        assert status['n_completed'] == 0 and not status['complete'], status
+
+        r = requests.get(url, params={'timeout': 'foo'}, headers=headers)
+        assert r.status_code == 400, r
+
+        b.cancel()
+        status = b.wait()
+        assert status['complete'], status
+
     def test_duplicate_parents(self):
         batch = self.client.create_batch()
         head = batch.create_job('ubuntu:18.04', command=['echo', 'head'])
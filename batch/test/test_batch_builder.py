@@ -0,0 +1,76 @@
+import json
+import aiohttp
+import pytest
+
+from hailtop.batch_client.aioclient import BatchBuilder
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+
+class FakeBatchClient:
+    def __init__(self, n_failures):
+        self.billing_project = 'test'
+        self.n_failures = n_failures
+        self.n_batches = 0
+        # batch_id => list of job specs
+        self.jobs = {}
+        self.closed = set()
+
+    def maybe_fail(self, path):
+        if self.n_failures > 0:
+            self.n_failures -= 1
+            raise aiohttp.ClientResponseError(
+                status=503,
+                message='Service Unavailable',
+                request_info=aiohttp.RequestInfo(
+                    url=path, method='POST', headers={}, real_url=path),
+                history=())
+
+    async def _post(self, path, data=None, **kwargs):  # pylint: disable=unused-argument
+        if path == '/api/v1alpha/batches/create':
+            self.n_batches += 1
+            self.jobs[self.n_batches] = []
+            return FakeResponse({'id': self.n_batches})
+        self.maybe_fail(path)
+        batch_id = int(path.split('/')[4])
+        self.jobs[batch_id].extend(json.loads(bytes(data._value)))
+        return FakeResponse({})
+
+    async def _patch(self, path):
+        batch_id = int(path.split('/')[4])
+        self.closed.add(batch_id)
+
+
+async def test_submit_retries_after_failed_post():
+    client = FakeBatchClient(n_failures=1)
+    bb = BatchBuilder(client, None, None)
+    for i in range(5):
+        bb.create_job('ubuntu:18.04', ['echo', str(i)])
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await bb.submit(max_bunch_size=2, parallelism=1, disable_progress_bar=True)
+    assert not bb._submitted
+    assert 1 not in client.closed
+
+    batch = await bb.submit(max_bunch_size=2, parallelism=1, disable_progress_bar=True)
+    assert batch.id == 2
+    assert client.closed == {2}
+    assert [spec['job_id'] for spec in client.jobs[2]] == [1, 2, 3, 4, 5]
+    assert [spec['command'] for spec in client.jobs[2]] == [['echo', str(i)] for i in range(5)]
+    assert not bb._job_specs
+
+
+async def test_submit_empty_batch():
+    client = FakeBatchClient(n_failures=0)
+    bb = BatchBuilder(client, None, None)
+    batch = await bb.submit(disable_progress_bar=True)
+    assert client.closed == {batch.id}
+    assert json.dumps(client.jobs[batch.id]) == '[]'
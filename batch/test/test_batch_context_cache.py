@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+
+from batch.driver.batch_context_cache import BatchContextCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDatabase:
+    def __init__(self, bunches):
+        # batch_id => [(start_job_id, token)]
+        self.bunches = bunches
+        self.deleted = set()
+        self.n_queries = 0
+
+    async def select_and_fetchall(self, sql, args=None):
+        self.n_queries += 1
+        await asyncio.sleep(0.01)
+        if 'FROM batch_bunches' in sql:
+            for start_job_id, token in sorted(self.bunches[args[0]]):
+                yield {'start_job_id': start_job_id, 'token': token}
+            return
+        assert 'deleted' in sql, sql
+        for batch_id in args:
+            if batch_id in self.deleted:
+                yield {'id': batch_id}
+
+
+async def test_token_start_id():
+    db = FakeDatabase({1: [(1, 'a'), (101, 'b'), (201, 'c')]})
+    cache = BatchContextCache(db)
+    context = cache.context(1, '{"gsa_key_secret_name": "gsa-key"}')
+    assert context.userdata == {'gsa_key_secret_name': 'gsa-key'}
+
+    results = await asyncio.gather(*[cache.token_start_id(context, job_id) for job_id in (1, 100, 101, 250)])
+    assert results == [('a', 1), ('a', 1), ('b', 101), ('c', 201)]
+    assert db.n_queries == 1
+
+    with pytest.raises(ValueError):
+        await cache.token_start_id(context, 0)
+
+
+async def test_eviction_and_deletion():
+    db = FakeDatabase({})
+    cache = BatchContextCache(db, max_batches=2)
+    for batch_id in (1, 2, 3):
+        cache.context(batch_id, '{}')
+    assert list(cache.batches) == [2, 3]
+
+    db.deleted.add(2)
+    await cache.drop_deleted_batches()
+    assert list(cache.batches) == [3]
+
+
+async def test_resolve_shares_and_expires():
+    cache = BatchContextCache(FakeDatabase({}), secret_ttl_secs=0.05)
+    context = cache.context(1, '{}')
+    n_calls = 0
+
+    async def read_secret(name):
+        nonlocal n_calls
+        n_calls += 1
+        await asyncio.sleep(0.01)
+        return {'name': name}
+
+    results = await asyncio.gather(*[
+        cache.resolve(context, ('secret', 'gsa-key'), read_secret, 'gsa-key') for _ in range(10)])
+    assert results == [{'name': 'gsa-key'}] * 10
+    assert n_calls == 1
+
+    await cache.resolve(context, ('secret', 'gsa-key'), read_secret, 'gsa-key')
+    assert n_calls == 1
+    await asyncio.sleep(0.1)
+    await cache.resolve(context, ('secret', 'gsa-key'), read_secret, 'gsa-key')
+    assert n_calls == 2
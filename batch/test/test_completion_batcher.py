@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+
+from batch.completion_batcher import CompletionBatcher, ReportFailed
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDriver:
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+        self.failed_job_ids = set()
+
+    async def post(self, statuses):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ValueError('driver unavailable')
+        self.requests.append(statuses)
+        return [i for i, status in enumerate(statuses) if status['job_id'] in self.failed_job_ids]
+
+
+async def test_coalesces_reports_in_window():
+    driver = FakeDriver()
+    batcher = CompletionBatcher(driver.post, window_secs=0.05, max_batch_size=100)
+    await asyncio.gather(*[batcher.report({'job_id': i}) for i in range(10)])
+    assert driver.requests == [[{'job_id': i} for i in range(10)]]
+
+    await batcher.report({'job_id': 10})
+    assert len(driver.requests) == 2
+
+
+async def test_max_batch_size():
+    driver = FakeDriver()
+    batcher = CompletionBatcher(driver.post, window_secs=10, max_batch_size=4)
+    await asyncio.wait_for(
+        asyncio.gather(*[batcher.report({'job_id': i}) for i in range(8)]), timeout=1)
+    assert [len(statuses) for statuses in driver.requests] == [4, 4]
+    assert batcher.stats()['n_requests'] == 2
+
+
+async def test_errors_reach_every_report():
+    driver = FakeDriver()
+    driver.fail = True
+    batcher = CompletionBatcher(driver.post, window_secs=0.01)
+    results = await asyncio.gather(*[batcher.report({'job_id': i}) for i in range(3)],
+                                   return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # retried reports go through
+    driver.fail = False
+    await asyncio.gather(*[batcher.report({'job_id': i}) for i in range(3)])
+    assert len(driver.requests) == 1
+
+
+async def test_only_failed_reports_raise():
+    driver = FakeDriver()
+    driver.failed_job_ids = {1}
+    batcher = CompletionBatcher(driver.post, window_secs=0.05, max_batch_size=100)
+    results = await asyncio.gather(*[batcher.report({'job_id': i}) for i in range(3)],
+                                   return_exceptions=True)
+    assert len(driver.requests) == 1
+    assert results[0] is None
+    assert isinstance(results[1], ReportFailed)
+    assert results[2] is None
@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from aiodocker.exceptions import DockerError
+
+from batch.image_cache import ImageCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeImages:
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.present = set()
+        self.n_pulls = 0
+        self.deleted = []
+        self.fail_pulls = False
+        self.pull_secs = 0
+        self.delete_secs = 0.01
+
+    async def pull(self, image, auth=None):  # pylint: disable=unused-argument
+        self.n_pulls += 1
+        await asyncio.sleep(self.pull_secs)
+        if self.fail_pulls:
+            raise DockerError(500, {'message': 'pull failed'})
+        self.present.add(image)
+
+    async def inspect(self, image):
+        if image not in self.present:
+            raise DockerError(404, {'message': f'no such image {image}'})
+        return {'Size': self.sizes[image]}
+
+    async def delete(self, image):
+        await asyncio.sleep(self.delete_secs)
+        if image not in self.present:
+            raise DockerError(404, {'message': f'no such image {image}'})
+        self.present.remove(image)
+        self.deleted.append(image)
+
+
+class FakeDocker:
+    def __init__(self, sizes):
+        self.images = FakeImages(sizes)
+
+
+def no_retry(timeout, name):  # pylint: disable=unused-argument
+    async def wrapper(f, *args, **kwargs):
+        return await f(*args, **kwargs)
+    return wrapper
+
+
+def image_cache(docker, max_bytes):
+    return ImageCache(docker, no_retry, max_bytes, 60, 60, 60)
+
+
+async def test_concurrent_evictions_delete_once():
+    docker = FakeDocker({'a': 100, 'b': 100, 'c': 100})
+    cache = image_cache(docker, 1000)
+    for image in ('a', 'b', 'c'):
+        await cache.acquire(image, 'user')
+        cache.release(image)
+
+    cache.max_bytes = 0
+    await asyncio.gather(cache.evict(), cache.evict())
+    assert sorted(docker.images.deleted) == ['a', 'b', 'c']
+    assert not cache.image_size
+    assert cache.total_bytes == 0
+    assert cache.n_evictions == 3
+
+
+async def test_failed_acquire_releases_user():
+    docker = FakeDocker({'a': 100})
+    cache = image_cache(docker, 1000)
+    docker.images.fail_pulls = True
+    with pytest.raises(DockerError):
+        await cache.acquire('a', 'user')
+    assert not cache.image_users
+
+    docker.images.fail_pulls = False
+    await cache.acquire('a', 'user')
+    assert cache.image_users == {'a': 1}
+
+
+async def test_private_pull_is_not_evicted():
+    docker = FakeDocker({'a': 100})
+    cache = image_cache(docker, 1000)
+    await cache.acquire('a', 'user', auth={'password': 'secret'})
+    cache.release('a')
+
+    # the access check has expired, so acquiring pulls again
+    cache.access_expires.clear()
+    docker.images.pull_secs = 0.05
+    cache.max_bytes = 0
+    acquire = asyncio.ensure_future(cache.acquire('a', 'user', auth={'password': 'secret'}))
+    await asyncio.sleep(0.01)
+    await cache.evict()
+    await acquire
+    assert docker.images.deleted == []
+    assert 'a' in docker.images.present
+    assert docker.images.n_pulls == 2
+
+    cache.release('a')
+    await cache.evict()
+    assert docker.images.deleted == ['a']
+
+
+async def test_acquire_waits_for_delete():
+    docker = FakeDocker({'a': 100})
+    cache = image_cache(docker, 1000)
+    await cache.acquire('a', 'user')
+    cache.release('a')
+
+    cache.max_bytes = 0
+    evict = asyncio.ensure_future(cache.evict())
+    await asyncio.sleep(0)
+    cache.max_bytes = 1000
+    # starts while 'a' is being deleted, so it is pulled again
+    await cache.acquire('a', 'user')
+    await evict
+    assert docker.images.deleted == ['a']
+    assert 'a' in docker.images.present
+    assert cache.image_size == {'a': 100}
+
+
+async def test_present_image_is_counted():
+    docker = FakeDocker({'a': 100})
+    docker.images.present.add('a')
+    cache = image_cache(docker, 1000)
+    await cache.acquire('a', 'user')
+    assert docker.images.n_pulls == 0
+    assert cache.n_hits == 1
+    assert cache.total_bytes == 100
+
+    cache.release('a')
+    cache.max_bytes = 0
+    await cache.evict()
+    assert docker.images.deleted == ['a']
+    assert cache.total_bytes == 0
@@ -0,0 +1,83 @@
+import os
+import json
+import asyncio
+import pytest
+
+# the driver reads its configuration when it is imported
+for name, value in [('HAIL_DEFAULT_NAMESPACE', 'default'),
+                    ('HAIL_BATCH_PODS_NAMESPACE', 'batch-pods'),
+                    ('PROJECT', 'test'),
+                    ('KUBERNETES_SERVER_URL', 'https://kubernetes.default'),
+                    ('HAIL_BATCH_BUCKET_NAME', 'batch'),
+                    ('HAIL_WORKER_LOGS_BUCKET_NAME', 'worker-logs'),
+                    ('HAIL_SHA', 'test'),
+                    ('STANDING_WORKER_MAX_IDLE_TIME_SECS', '300'),
+                    ('HAIL_BATCH_WORKER_IMAGE', 'batch-worker')]:
+    os.environ.setdefault(name, value)
+
+from batch.globals import WORKER_STORAGE_BYTES  # noqa: E402 pylint: disable=wrong-import-position
+from batch.driver.instance import Instance  # noqa: E402 pylint: disable=wrong-import-position
+from batch.driver.instance_pool import InstancePool  # noqa: E402 pylint: disable=wrong-import-position
+
+pytestmark = pytest.mark.asyncio
+
+GiB = 1024**3
+
+
+class FakeDatabase:
+    def __init__(self, running_jobs):
+        self.running_jobs = running_jobs
+
+    async def select_and_fetchall(self, sql, args=None):  # pylint: disable=unused-argument
+        assert "jobs.state = 'Running'" in sql, sql
+        for record in self.running_jobs:
+            yield record
+
+
+def running_job(instance_name, job_id, pvc_size, memory):
+    # format version 3 compact spec, pvc_size and memory at indices 4 and 5
+    return {
+        'batch_id': 1,
+        'job_id': job_id,
+        'spec': json.dumps([['true'], None, None, None, pvc_size, memory]),
+        'cores_mcpu': 1000,
+        'format_version': 3,
+        'instance_name': instance_name
+    }
+
+
+async def test_load_running_job_resources():
+    db = FakeDatabase([
+        running_job('worker-1', 1, 100 * GiB, 2 * GiB),
+        running_job('worker-1', 2, None, None),
+        running_job('worker-2', 3, 10 * GiB, 1 * GiB),
+        running_job('worker-deleted', 4, 10 * GiB, 1 * GiB)
+    ])
+    app = {
+        'instance_id': 'test',
+        'log_store': None,
+        'scheduler_state_changed': asyncio.Event(),
+        'db': db,
+        'compute_client': None,
+        'logging_client': None
+    }
+    pool = InstancePool(app, 'batch-worker-')
+    pool.worker_type = 'standard'
+    app['inst_pool'] = pool
+    for name in ('worker-1', 'worker-2'):
+        pool.add_instance(Instance(app, name, 'active', 16000, 13000, 0, 0, 0, None, 7, 'us-central1-a'))
+
+    await pool.load_running_job_resources()
+
+    worker_1 = pool.name_instance['worker-1']
+    assert worker_1.free_storage_bytes == WORKER_STORAGE_BYTES - 100 * GiB
+    # job 2 uses the memory that comes with its core, 3.75GiB on standard workers
+    assert worker_1.allocated_memory_bytes == 2 * GiB + int(3.75 * GiB)
+    assert set(worker_1.job_resources) == {(1, 1), (1, 2)}
+
+    worker_2 = pool.name_instance['worker-2']
+    assert worker_2.free_storage_bytes == WORKER_STORAGE_BYTES - 10 * GiB
+    assert worker_2.allocated_memory_bytes == 1 * GiB
+
+    worker_1.release_resources_in_memory((1, 1))
+    assert worker_1.free_storage_bytes == WORKER_STORAGE_BYTES
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+from batch.log_shipper import LogShipper
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeLogStore:
+    def __init__(self):
+        self.chunks = {}
+        self.logs = {}
+
+    async def write_log_chunk(self, format_version, batch_id, job_id, attempt_id, task, index, data):
+        self.chunks[(batch_id, job_id, task, index)] = data
+
+    async def compose_log_chunks(self, format_version, batch_id, job_id, attempt_id, task, n_chunks):
+        keys = [(batch_id, job_id, task, i) for i in range(n_chunks)]
+        self.logs[(batch_id, job_id, task)] = b''.join(self.chunks.pop(key) for key in keys)
+
+    async def read_log_file_range(self, format_version, batch_id, job_id, attempt_id, task, offset, max_bytes):
+        data = self.logs[(batch_id, job_id, task)]
+        return data[offset:offset + max_bytes], len(data)
+
+
+async def test_ship_chunks_and_compose(tmpdir):
+    log_store = FakeLogStore()
+    shipper = LogShipper(log_store, None, 1, 2, 'a', 'main', str(tmpdir.join('main')),
+                         chunk_bytes=10, interval_secs=3600)
+
+    lines = [f'line {i}\n'.encode() for i in range(20)]
+    for line in lines[:10]:
+        await shipper.append(line)
+    assert shipper.n_chunks > 0
+    assert shipper.shipped <= shipper.size
+
+    data, size = await shipper.read(5, 10)
+    assert data == b''.join(lines[:10])[5:15]
+    assert size == len(b''.join(lines[:10]))
+
+    for line in lines[10:]:
+        await shipper.append(line)
+    await shipper.finish()
+    assert not log_store.chunks
+    assert log_store.logs[(1, 2, 'main')] == b''.join(lines)
+
+    shipper.close()
+    data, size = await shipper.read(0, 1000)
+    assert data == b''.join(lines)
+    assert await shipper.read_all() == b''.join(lines)
+
+
+async def test_ship_periodically(tmpdir):
+    log_store = FakeLogStore()
+    shipper = LogShipper(log_store, None, 1, 2, 'a', 'main', str(tmpdir.join('main')),
+                         chunk_bytes=1024, interval_secs=0.01)
+    await shipper.append(b'hello\n')
+    await asyncio.sleep(0.1)
+    assert log_store.chunks == {(1, 2, 'main', 0): b'hello\n'}
+    await shipper.finish()
+    shipper.close()
+    assert log_store.logs[(1, 2, 'main')] == b'hello\n'
+
+
+async def test_empty_log(tmpdir):
+    log_store = FakeLogStore()
+    shipper = LogShipper(log_store, None, 1, 2, 'a', 'main', str(tmpdir.join('main')),
+                         chunk_bytes=1024, interval_secs=3600)
+    await shipper.finish()
+    shipper.close()
+    assert log_store.logs[(1, 2, 'main')] == b''
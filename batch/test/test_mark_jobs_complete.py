@@ -0,0 +1,165 @@
+import os
+import asyncio
+import pytest
+import pymysql
+
+# batch.batch reads the driver's configuration when it is imported
+for name, value in [('HAIL_DEFAULT_NAMESPACE', 'default'),
+                    ('HAIL_BATCH_PODS_NAMESPACE', 'batch-pods'),
+                    ('PROJECT', 'test'),
+                    ('KUBERNETES_SERVER_URL', 'https://kubernetes.default'),
+                    ('HAIL_BATCH_BUCKET_NAME', 'batch'),
+                    ('HAIL_WORKER_LOGS_BUCKET_NAME', 'worker-logs'),
+                    ('HAIL_SHA', 'test'),
+                    ('STANDING_WORKER_MAX_IDLE_TIME_SECS', '300')]:
+    os.environ.setdefault(name, value)
+
+from batch.batch import mark_jobs_complete  # noqa: E402 pylint: disable=wrong-import-position
+
+pytestmark = pytest.mark.asyncio
+
+RESOURCES = {'compute/n1-preemptible/1', 'memory/n1-preemptible/1'}
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+        self.completed = []
+        self.attempt_resources = []
+
+    async def execute_and_fetchone(self, sql, args):
+        assert 'CALL mark_job_complete' in sql, sql
+        batch_id, job_id = args[:2]
+        self.completed.append((batch_id, job_id))
+        old_state = 'Success' if (batch_id, job_id) in self.db.completed else 'Running'
+        return {'rc': 0, 'old_state': old_state, 'delta_cores_mcpu': 0}
+
+    async def execute_many(self, sql, args_list):
+        assert 'INSERT INTO `attempt_resources`' in sql, sql
+        for args in args_list:
+            if args[3] not in RESOURCES:
+                raise pymysql.err.IntegrityError(
+                    1452, 'Cannot add or update a child row: a foreign key constraint fails')
+            self.attempt_resources.append(args)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.completed = set()
+        self.attempt_resources = []
+        self.n_transactions = 0
+        self.complete_batch_ids = set()
+
+    def start(self):
+        db = self
+
+        class Start:
+            async def __aenter__(self):
+                db.n_transactions += 1
+                self.tx = FakeTransaction(db)
+                return self.tx
+
+            async def __aexit__(self, exc_type, exc, tb):
+                # changes are rolled back if the transaction fails
+                if exc_type is None:
+                    db.commit(self.tx)
+
+        return Start()
+
+    def commit(self, tx):
+        self.completed.update(tx.completed)
+        self.attempt_resources.extend(tx.attempt_resources)
+
+    async def execute_and_fetchone(self, sql, args):
+        tx = FakeTransaction(self)
+        rv = await tx.execute_and_fetchone(sql, args)
+        self.commit(tx)
+        return rv
+
+    async def execute_many(self, sql, args_list):
+        tx = FakeTransaction(self)
+        await tx.execute_many(sql, args_list)
+        self.commit(tx)
+
+    async def select_and_fetchone(self, sql, args):
+        assert "batches.`state` = 'complete'" in sql, sql
+        [batch_id] = args
+        if batch_id not in self.complete_batch_ids:
+            return None
+        return {'id': batch_id, 'callback': None}
+
+
+class FakeReadyJobQueue:
+    def __init__(self):
+        self.completed = []
+
+    def job_completed(self, batch_id, job_id):
+        self.completed.append((batch_id, job_id))
+
+
+class FakeBatchContextCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, batch_id):
+        self.invalidated.append(batch_id)
+
+
+class FakeInstancePool:
+    def __init__(self):
+        self.name_instance = {}
+
+
+def completion(job_id, resources):
+    return {
+        'batch_id': 1,
+        'job_id': job_id,
+        'attempt_id': 'abc123',
+        'new_state': 'Success',
+        'status': {'state': 'succeeded'},
+        'start_time': 1,
+        'end_time': 2,
+        'reason': None,
+        'resources': [{'name': name, 'quantity': 1} for name in resources]
+    }
+
+
+def make_app(db):
+    return {
+        'db': db,
+        'inst_pool': FakeInstancePool(),
+        'ready_job_queue': FakeReadyJobQueue(),
+        'batch_context_cache': FakeBatchContextCache(),
+        'scheduler_state_changed': asyncio.Event(),
+        'cancel_ready_state_changed': asyncio.Event()
+    }
+
+
+async def test_mark_jobs_complete():
+    db = FakeDatabase()
+    app = make_app(db)
+    failed = await mark_jobs_complete(app, 'instance', [completion(2, RESOURCES), completion(1, RESOURCES)])
+    assert failed == []
+    assert db.n_transactions == 1
+    assert db.completed == {(1, 1), (1, 2)}
+    assert len(db.attempt_resources) == 4
+    assert app['ready_job_queue'].completed == [(1, 1), (1, 2)]
+    assert app['batch_context_cache'].invalidated == []
+
+    # the batch's context is dropped when it completes
+    db.complete_batch_ids.add(1)
+    await mark_jobs_complete(app, 'instance', [completion(3, RESOURCES)])
+    assert app['batch_context_cache'].invalidated == [1]
+
+
+async def test_bad_completion_does_not_fail_the_others():
+    db = FakeDatabase()
+    app = make_app(db)
+    completions = [completion(1, RESOURCES),
+                   completion(2, ['compute/unknown/1']),
+                   completion(3, RESOURCES)]
+    failed = await mark_jobs_complete(app, 'instance', completions)
+    assert failed == [(1, 2)]
+    assert db.completed == {(1, 1), (1, 2), (1, 3)}
+    assert sorted({(args[0], args[1]) for args in db.attempt_resources}) == [(1, 1), (1, 3)]
+    assert sorted(app['ready_job_queue'].completed) == [(1, 1), (1, 2), (1, 3)]
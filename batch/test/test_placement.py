@@ -0,0 +1,31 @@
+import sortedcontainers
+
+from batch.driver.placement import PackingScorePolicy, WORKER_STORAGE_BYTES
+from batch.utils import cores_mcpu_to_memory_bytes
+
+
+class FakeInstance:
+    def __init__(self, name, free_cores_mcpu, allocated_memory_bytes):
+        self.name = name
+        self.cores_mcpu = 16000
+        self.free_cores_mcpu = free_cores_mcpu
+        self.free_storage_bytes = WORKER_STORAGE_BYTES
+        self.allocated_memory_bytes = allocated_memory_bytes
+        self.zone = 'us-central1-a'
+
+
+def test_packing_score_uses_memory():
+    policy = PackingScorePolicy('standard', cores_weight=0, storage_weight=0, fragment_penalty=0)
+    gb = 1024**3
+    # same free cores, different free memory
+    memory_bound = FakeInstance('memory-bound', 8000, cores_mcpu_to_memory_bytes(14000, 'standard'))
+    roomy = FakeInstance('roomy', 8000, cores_mcpu_to_memory_bytes(8000, 'standard'))
+    instances = sortedcontainers.SortedList([memory_bound, roomy], key=lambda instance: instance.free_cores_mcpu)
+
+    assert policy.score(memory_bound, 1000, 0, gb) < policy.score(roomy, 1000, 0, gb)
+    assert policy.get_instance(instances, 'test', 1000, 0, gb) is memory_bound
+
+    # more memory than memory_bound has left
+    memory_bytes = cores_mcpu_to_memory_bytes(4000, 'standard')
+    assert not policy.is_eligible(memory_bound, 'test', 1000, 0, memory_bytes)
+    assert policy.get_instance(instances, 'test', 1000, 0, memory_bytes) is roomy
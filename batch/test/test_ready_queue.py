@@ -0,0 +1,167 @@
+import asyncio
+import pytest
+
+from batch.driver.ready_queue import ReadyJobQueue
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDatabase:
+    def __init__(self):
+        # batch_id => batch record
+        self.batches = {}
+        # batch_id => job_id => job record
+        self.ready_jobs = {}
+        self.n_queries = 0
+
+    def add_batch(self, batch_id, user='user', n_jobs=0, always_run_job_ids=()):
+        self.batches[batch_id] = {
+            'id': batch_id,
+            'user': user,
+            'userdata': '{}',
+            'format_version': 3,
+            'cancelled': False,
+            'state': 'running'
+        }
+        self.ready_jobs[batch_id] = {}
+        for job_id in range(1, n_jobs + 1):
+            self.add_ready_job(batch_id, job_id, always_run=job_id in always_run_job_ids)
+
+    def add_ready_job(self, batch_id, job_id, always_run=False):
+        self.ready_jobs[batch_id][job_id] = {
+            'job_id': job_id,
+            'spec': '[]',
+            'cores_mcpu': 250,
+            'always_run': always_run
+        }
+
+    async def select_and_fetchall(self, sql, args=None, timer_description=None):  # pylint: disable=unused-argument
+        self.n_queries += 1
+        await asyncio.sleep(0)
+
+        if 'FROM jobs' in sql:
+            batch_id, limit = args[0], args[1]
+            batch = self.batches[batch_id]
+            records = [record for record in self.ready_jobs[batch_id].values()
+                       if record['always_run']][:limit]
+            if 'UNION ALL' in sql:
+                assert not batch['cancelled']
+                records.extend([record for record in self.ready_jobs[batch_id].values()
+                                if not record['always_run']][:limit])
+            for record in records:
+                yield dict(record)
+            return
+
+        assert 'FROM batches' in sql, sql
+        for batch in list(self.batches.values()):
+            if batch['state'] != 'running':
+                continue
+            if 'id IN' in sql and batch['id'] not in args:
+                continue
+            yield dict(batch)
+
+
+async def ready_job_ids(queue, user='user'):
+    return [(record['batch_id'], record['job_id']) async for record in queue.user_ready_jobs(user)]
+
+
+async def test_batch_closed_adds_only_closed_batches():
+    db = FakeDatabase()
+    db.add_batch(1, n_jobs=2)
+    queue = ReadyJobQueue(db)
+
+    await queue.update()
+    assert await ready_job_ids(queue) == [(1, 1), (1, 2)]
+
+    db.add_batch(2, n_jobs=1)
+    # not closed yet, so not looked up
+    n_queries = db.n_queries
+    await queue.update()
+    assert db.n_queries == n_queries
+    assert await ready_job_ids(queue) == [(1, 1), (1, 2)]
+
+    queue.batch_closed(2)
+    await queue.update()
+    assert db.n_queries == n_queries + 1
+    assert not queue.closed_batch_ids
+    assert await ready_job_ids(queue) == [(1, 1), (1, 2), (2, 1)]
+
+
+async def test_job_completed_marks_batch_stale():
+    db = FakeDatabase()
+    db.add_batch(1, n_jobs=2)
+    queue = ReadyJobQueue(db)
+    await queue.update()
+
+    records = [record async for record in queue.user_ready_jobs('user')]
+    assert [record['job_id'] for record in records] == [1, 2]
+    for record in records:
+        queue.take(record)
+        del db.ready_jobs[1][record['job_id']]
+    assert queue.in_flight == {(1, 1), (1, 2)}
+    assert queue.n_ready_jobs == 0
+
+    # taken jobs are not reloaded while in flight
+    db.add_ready_job(1, 1)
+    queue.batches[1].stale = True
+    assert await ready_job_ids(queue) == []
+    del db.ready_jobs[1][1]
+
+    # a child becomes Ready when its parent completes
+    db.add_ready_job(1, 3)
+    queue.job_completed(1, 1)
+    queue.job_completed(1, 2)
+    assert not queue.in_flight
+    assert queue.batches[1].stale
+    assert await ready_job_ids(queue) == [(1, 3)]
+
+
+async def test_children_are_loaded_before_the_batch_drains():
+    db = FakeDatabase()
+    db.add_batch(1, n_jobs=3)
+    db.add_batch(2, n_jobs=1)
+    queue = ReadyJobQueue(db, load_limit=10)
+    await queue.update()
+    assert await ready_job_ids(queue) == [(1, 1), (1, 2), (1, 3), (2, 1)]
+
+    queue.take(queue.batches[1].jobs[1])
+    del db.ready_jobs[1][1]
+
+    # job 4 becomes Ready while jobs 2 and 3 are still queued
+    db.add_ready_job(1, 4)
+    queue.job_completed(1, 1)
+    assert await ready_job_ids(queue) == [(1, 2), (1, 3), (1, 4), (2, 1)]
+
+    # nothing new, so no more queries until a job completes
+    n_queries = db.n_queries
+    assert await ready_job_ids(queue) == [(1, 2), (1, 3), (1, 4), (2, 1)]
+    assert db.n_queries == n_queries
+
+
+async def test_batch_state_changed_refreshes_batches():
+    db = FakeDatabase()
+    db.add_batch(1, n_jobs=3, always_run_job_ids=(2,))
+    db.add_batch(2, n_jobs=1)
+    queue = ReadyJobQueue(db)
+    await queue.update()
+    assert await ready_job_ids(queue) == [(1, 1), (1, 2), (1, 3), (2, 1)]
+
+    db.batches[1]['cancelled'] = True
+    db.batches[2]['state'] = 'complete'
+    # no refresh until notified
+    await queue.update()
+    assert not queue.batches[1].cancelled
+    assert 2 in queue.batches
+
+    queue.batch_state_changed()
+    await queue.update()
+    assert not queue.batches_changed
+    assert queue.batches[1].cancelled
+    assert 2 not in queue.batches
+    assert await ready_job_ids(queue) == [(1, 2)]
+
+    # a cancelled batch only reloads always run jobs
+    queue.take({'batch_id': 1, 'job_id': 2})
+    queue.done_scheduling(1, 2, False)
+    assert queue.batches[1].stale
+    assert await ready_job_ids(queue) == [(1, 2)]
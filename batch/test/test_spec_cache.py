@@ -0,0 +1,90 @@
+import asyncio
+import json
+import pytest
+
+from batch.spec_cache import SpecCache
+from batch.spec_writer import SpecWriter
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeLogStore:
+    def __init__(self):
+        self.files = {}
+        self.n_reads = 0
+
+    async def write_spec_file(self, batch_id, token, data_bytes, offsets_bytes):
+        self.files[(batch_id, token, 'specs')] = data_bytes
+        self.files[(batch_id, token, 'specs.idx')] = offsets_bytes
+
+    async def read_spec_index_file(self, batch_id, token):
+        self.n_reads += 1
+        await asyncio.sleep(0.01)
+        return self.files[(batch_id, token, 'specs.idx')]
+
+    async def read_spec_file_range(self, batch_id, token, start, end):
+        self.n_reads += 1
+        await asyncio.sleep(0.01)
+        return self.files[(batch_id, token, 'specs')][start:end + 1]
+
+
+async def write_bunch(log_store, batch_id, start_job_id, n_jobs):
+    spec_writer = SpecWriter(log_store, batch_id)
+    for job_id in range(start_job_id, start_job_id + n_jobs):
+        spec_writer.add(json.dumps({'job_id': job_id, 'command': ['echo', 'x' * job_id]}))
+    return await spec_writer.write()
+
+
+async def test_concurrent_jobs_from_one_bunch():
+    log_store = FakeLogStore()
+    token = await write_bunch(log_store, 1, 1, 64)
+    cache = SpecCache(log_store, 1024**2, 1024**2)
+
+    specs = await asyncio.gather(*[cache.read_spec(1, token, 1, job_id) for job_id in range(1, 65)])
+    assert [json.loads(spec)['job_id'] for spec in specs] == list(range(1, 65))
+    assert log_store.n_reads == 2
+
+    spec = await cache.read_spec(1, token, 1, 17)
+    assert json.loads(spec) == {'job_id': 17, 'command': ['echo', 'x' * 17]}
+    assert log_store.n_reads == 2
+
+
+async def test_prefetch_window():
+    log_store = FakeLogStore()
+    token = await write_bunch(log_store, 1, 1, 100)
+    cache = SpecCache(log_store, 1024**2, 500)
+
+    for job_id in range(1, 101):
+        spec = await cache.read_spec(1, token, 1, job_id)
+        assert json.loads(spec)['job_id'] == job_id
+    n_reads = log_store.n_reads
+    assert 2 < n_reads < 100
+    assert cache.stats()['n_spec_reads'] == n_reads - 1
+
+
+async def test_eviction():
+    log_store = FakeLogStore()
+    tokens = [await write_bunch(log_store, batch_id, 1, 10) for batch_id in range(1, 4)]
+    cache = SpecCache(log_store, 1500, 1500)
+
+    for batch_id, token in enumerate(tokens, 1):
+        for job_id in range(1, 11):
+            spec = await cache.read_spec(batch_id, token, 1, job_id)
+            assert json.loads(spec)['job_id'] == job_id
+    stats = cache.stats()
+    assert stats['n_evictions'] > 0
+    assert stats['total_bytes'] <= 1500
+    assert (3, tokens[2]) in cache.bunches
+
+    n_reads = log_store.n_reads
+    spec = await cache.read_spec(1, tokens[0], 1, 5)
+    assert json.loads(spec)['job_id'] == 5
+    assert log_store.n_reads > n_reads
+
+
+async def test_job_not_in_bunch():
+    log_store = FakeLogStore()
+    token = await write_bunch(log_store, 1, 1, 3)
+    cache = SpecCache(log_store, 1024**2, 1024**2)
+    with pytest.raises(ValueError):
+        await cache.read_spec(1, token, 1, 4)
@@ -1,4 +1,5 @@
-from batch.utils import adjust_cores_for_packability, parse_memory_in_bytes
+from hailtop.utils import parse_memory_in_bytes
+from batch.utils import adjust_cores_for_packability, utf8_prefix_length, log_range
 
 
 def test_packability():
@@ -22,3 +23,36 @@ def test_memory_str_to_bytes():
     assert parse_memory_in_bytes('7') == 7
     assert parse_memory_in_bytes('1K') == 1000
     assert parse_memory_in_bytes('1Ki') == 1024
+
+
+def test_utf8_prefix_length():
+    data = 'aé€😀'.encode('utf-8')
+    assert [utf8_prefix_length(data[:i]) for i in range(len(data) + 1)] == \
+        [0, 1, 1, 3, 3, 3, 6, 6, 6, 6, 10]
+
+
+def test_log_range_splits_characters():
+    data = 'aé'.encode('utf-8')
+    r = log_range('main', 3, data[:2], 10, False)
+    assert r['data'] == 'a'
+    assert r['next_offset'] == 4
+
+
+def test_log_range_starts_mid_character():
+    data = 'é'.encode('utf-8')[1:] + b'abc'
+    r = log_range('main', 1, data, 10, True)
+    assert r['data'] == 'abc'
+    assert r['offset'] == 2
+    assert r['next_offset'] == 5
+
+
+def test_log_range_always_advances():
+    data = '€a'.encode('utf-8')
+    offset = 0
+    ranges = []
+    while offset < len(data):
+        r = log_range('main', offset, data[offset:offset + 2], len(data), True)
+        assert r['next_offset'] > offset
+        ranges.append(r['data'])
+        offset = r['next_offset']
+    assert ranges == ['\ufffd', 'a']
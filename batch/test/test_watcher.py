@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+
+from batch.front_end.watcher import BatchWatcher
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDatabase:
+    def __init__(self):
+        # batch_id => (state, n_completed)
+        self.batches = {}
+        self.n_queries = 0
+
+    async def select_and_fetchall(self, sql, args, timer_description=None):  # pylint: disable=unused-argument
+        self.n_queries += 1
+        assert 'FROM batches' in sql, sql
+        for batch_id in args:
+            if batch_id in self.batches:
+                state, n_completed = self.batches[batch_id]
+                yield {'id': batch_id, 'state': state, 'n_completed': n_completed}
+
+
+async def test_newer_caller_value_waits():
+    db = FakeDatabase()
+    db.batches[1] = ('running', 0)
+    watcher = BatchWatcher(db, interval_secs=0.05)
+    run = asyncio.ensure_future(watcher.run())
+    try:
+        old_waiter = asyncio.ensure_future(watcher.wait_batch(1, 'running', 0, 5))
+        await asyncio.sleep(0)
+
+        # a job completes between ticks; a new client has read the new value
+        db.batches[1] = ('running', 1)
+        new_waiter = asyncio.ensure_future(watcher.wait_batch(1, 'running', 1, 5))
+        await asyncio.sleep(0.01)
+        # the old waiter is woken by the newer value
+        assert old_waiter.done()
+        # the new waiter waits instead of returning right away
+        assert not new_waiter.done()
+
+        db.batches[1] = ('complete', 2)
+        await asyncio.wait_for(new_waiter, 1)
+    finally:
+        run.cancel()
@@ -0,0 +1,235 @@
+'''Benchmark dispatching scheduled jobs from the driver to workers.
+
+Compares the per-job dispatch the scheduler used to do, a new HTTP
+session, create request and `CALL schedule_job` per job, with
+`schedule_jobs`, which sends one request per instance over the
+instance's persistent session and records the jobs in one transaction.
+
+Workers are local stand-ins listening on 127.0.0.2, 127.0.0.3, ... at
+port 5000, the port the driver uses.  The database is an in-memory
+stand-in that charges a fixed latency per round trip.
+
+  python3 benchmark_dispatch.py --n-instances 20 --jobs-per-pass 300
+'''
+import os
+import json
+import time
+import asyncio
+import argparse
+import aiohttp
+from aiohttp import web
+
+for name in ('HAIL_DEFAULT_NAMESPACE', 'HAIL_BATCH_PODS_NAMESPACE', 'PROJECT', 'KUBERNETES_SERVER_URL',
+             'HAIL_BATCH_BUCKET_NAME', 'HAIL_WORKER_LOGS_BUCKET_NAME', 'HAIL_SHA'):
+    os.environ.setdefault(name, 'benchmark')
+os.environ.setdefault('STANDING_WORKER_MAX_IDLE_TIME_SECS', '300')
+
+from hailtop.utils import AsyncWorkerPool, WaitableSharedPool  # noqa: E402 pylint: disable=wrong-import-position
+from batch.batch import job_config, schedule_jobs  # noqa: E402 pylint: disable=wrong-import-position
+from batch.driver.instance import Instance  # noqa: E402 pylint: disable=wrong-import-position
+from batch.driver.batch_context_cache import BatchContextCache  # noqa: E402 pylint: disable=wrong-import-position
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    async def execute_and_fetchall(self, sql, args=None):
+        await self.db.round_trip()
+        if 'FROM jobs' in sql:
+            for i in range(0, len(args), 2):
+                yield {'batch_id': args[i], 'job_id': args[i + 1], 'state': 'Ready',
+                       'cores_mcpu': 250, 'attempt_id': None, 'cancel': False}
+
+    async def execute_and_fetchone(self, sql, args=None):  # pylint: disable=unused-argument
+        await self.db.round_trip()
+        return {'state': 'active'}
+
+    async def execute_many(self, sql, args_array):  # pylint: disable=unused-argument
+        await self.db.round_trip()
+
+    async def just_execute(self, sql, args=None):  # pylint: disable=unused-argument
+        await self.db.round_trip()
+
+    async def execute_update(self, sql, args=None):  # pylint: disable=unused-argument
+        await self.db.round_trip()
+
+
+class FakeTransactionContextManager:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        await self.db.round_trip()
+        return FakeTransaction(self.db)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # commit
+        await self.db.round_trip()
+
+
+class FakeDatabase:
+    def __init__(self, latency_secs):
+        self.latency_secs = latency_secs
+        self.n_round_trips = 0
+
+    async def round_trip(self):
+        self.n_round_trips += 1
+        await asyncio.sleep(self.latency_secs)
+
+    def start(self, read_only=False):  # pylint: disable=unused-argument
+        return FakeTransactionContextManager(self)
+
+    async def execute_and_fetchone(self, sql, args=None):  # pylint: disable=unused-argument
+        # CALL schedule_job, which commits
+        await self.round_trip()
+        await self.round_trip()
+        return {'rc': 0, 'delta_cores_mcpu': 0}
+
+
+class FakeSecret:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeK8sCache:
+    async def read_secret(self, name, namespace, timeout):  # pylint: disable=unused-argument
+        return FakeSecret({'key.json': 'e30='})
+
+
+class FakeInstance(Instance):
+    # pylint: disable=super-init-not-called
+    def __init__(self, name, ip_address):
+        self._state = 'active'
+        self.name = name
+        self.ip_address = ip_address
+        self.version = 7
+        self._client_session = None
+
+    async def mark_healthy(self):
+        pass
+
+    async def incr_failed_request_count(self):
+        pass
+
+    def adjust_free_cores_in_memory(self, delta_mcpu):
+        pass
+
+
+class WorkerStandIn:
+    def __init__(self, host):
+        self.host = host
+        self.n_requests = 0
+        self.n_jobs = 0
+        self.runner = None
+
+    async def create_job(self, request):
+        self.n_requests += 1
+        await request.json()
+        self.n_jobs += 1
+        return web.Response()
+
+    async def create_jobs(self, request):
+        self.n_requests += 1
+        body = await request.json()
+        self.n_jobs += len(body['jobs'])
+        return web.json_response({'results': [{'status': 'created'} for _ in body['jobs']]})
+
+    async def start(self):
+        app = web.Application()
+        app.add_routes([
+            web.post('/api/v1alpha/batches/jobs/create', self.create_job),
+            web.post('/api/v1alpha/batches/jobs/create/bulk', self.create_jobs)
+        ])
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, 5000).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def make_records(start_job_id, n_jobs):
+    spec = {'secrets': [{'namespace': 'benchmark', 'name': 'gsa-key', 'mount_path': '/gsa-key'}]}
+    return [{
+        'batch_id': 1,
+        'job_id': job_id,
+        'attempt_id': f'a{job_id}',
+        'format_version': 1,
+        'spec': json.dumps({**spec, 'job_id': job_id}),
+        'userdata': json.dumps({'gsa_key_secret_name': 'gsa-key'}),
+        'user': 'user',
+        'cores_mcpu': 250
+    } for job_id in range(start_job_id, start_job_id + n_jobs)]
+
+
+async def legacy_schedule_job(app, record, instance):
+    body = await job_config(app, record, record['attempt_id'])
+    async with aiohttp.ClientSession(
+            raise_for_status=True, timeout=aiohttp.ClientTimeout(total=2)) as session:
+        await session.post(f'http://{instance.ip_address}:5000/api/v1alpha/batches/jobs/create', json=body)
+    await app['db'].execute_and_fetchone(
+        'CALL schedule_job(%s, %s, %s, %s);',
+        (record['batch_id'], record['job_id'], record['attempt_id'], instance.name))
+    return True
+
+
+async def legacy_pass(app, pool, instances, records):
+    waitable_pool = WaitableSharedPool(pool)
+    for i, record in enumerate(records):
+        await waitable_pool.call(legacy_schedule_job, app, record, instances[i % len(instances)])
+    await waitable_pool.wait()
+
+
+async def batched_pass(app, pool, instances, records):
+    waitable_pool = WaitableSharedPool(pool)
+    for i, instance in enumerate(instances):
+        await waitable_pool.call(schedule_jobs, app, records[i::len(instances)], instance)
+    await waitable_pool.wait()
+
+
+async def run(name, pass_fn, pool, args):
+    workers = [WorkerStandIn(f'127.0.0.{i + 2}') for i in range(args.n_instances)]
+    for worker in workers:
+        await worker.start()
+    instances = [FakeInstance(f'instance-{i}', worker.host) for i, worker in enumerate(workers)]
+    db = FakeDatabase(args.latency_ms / 1000)
+    app = {'db': db, 'k8s_cache': FakeK8sCache(), 'batch_context_cache': BatchContextCache(db), 'log_store': None}
+    try:
+        start = time.time()
+        for i in range(args.n_passes):
+            await pass_fn(app, pool, instances, make_records(i * args.jobs_per_pass + 1, args.jobs_per_pass))
+        elapsed = time.time() - start
+    finally:
+        for instance in instances:
+            await instance.close_client_session()
+        for worker in workers:
+            await worker.stop()
+
+    n_jobs = sum(worker.n_jobs for worker in workers)
+    n_requests = sum(worker.n_requests for worker in workers)
+    assert n_jobs == args.n_passes * args.jobs_per_pass
+    print(f'{name}: scheduled {n_jobs} jobs in {elapsed:.2f}s, {n_jobs / elapsed:.0f} jobs/s, '
+          f'{n_requests} worker requests, {db.n_round_trips} database round trips')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-instances', type=int, default=20)
+    parser.add_argument('--jobs-per-pass', type=int, default=300)
+    parser.add_argument('--n-passes', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    async def run_all():
+        # the scheduler's pool
+        pool = AsyncWorkerPool(parallelism=100, queue_size=100)
+        await run('legacy', legacy_pass, pool, args)
+        await run('batched', batched_pass, pool, args)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_all())
+
+
+if __name__ == '__main__':
+    main()
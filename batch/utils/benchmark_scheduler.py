@@ -0,0 +1,141 @@
+'''Benchmark the driver's ready job lookup against a local MySQL stand-in.
+
+Compares the per-batch queries the scheduler used to issue on every
+pass with the in-memory ReadyJobQueue.  The stand-in answers the
+scheduler's queries from in-memory tables and charges a fixed latency
+per round trip.
+
+  python3 benchmark_scheduler.py --n-batches 2000 --n-jobs-per-batch 50
+'''
+import time
+import asyncio
+import argparse
+import collections
+
+from batch.driver.ready_queue import ReadyJobQueue
+
+
+class FakeDatabase:
+    def __init__(self, n_users, n_batches, n_jobs_per_batch, latency_secs):
+        self.latency_secs = latency_secs
+        self.n_queries = 0
+
+        self.batches = {}
+        self.ready_jobs = collections.defaultdict(dict)
+        for batch_id in range(1, n_batches + 1):
+            self.batches[batch_id] = {
+                'id': batch_id,
+                'user': f'user{batch_id % n_users}',
+                'userdata': '{}',
+                'format_version': 3,
+                'cancelled': 0,
+                'state': 'running'
+            }
+            for job_id in range(1, n_jobs_per_batch + 1):
+                self.ready_jobs[batch_id][job_id] = {
+                    'job_id': job_id,
+                    'spec': '[]',
+                    'cores_mcpu': 250,
+                    'always_run': 0
+                }
+
+    def mark_running(self, batch_id, job_id):
+        del self.ready_jobs[batch_id][job_id]
+
+    async def select_and_fetchall(self, sql, args=None, timer_description=None):  # pylint: disable=unused-argument
+        self.n_queries += 1
+        await asyncio.sleep(self.latency_secs)
+
+        if 'FROM jobs' in sql:
+            batch_id, limit = args[0], args[1]
+            for record in list(self.ready_jobs[batch_id].values())[:limit]:
+                yield dict(record)
+            return
+
+        assert 'FROM batches' in sql, sql
+        for batch in list(self.batches.values()):
+            if batch['state'] != 'running':
+                continue
+            if 'id IN' in sql and batch['id'] not in args:
+                continue
+            if 'user = %s' in sql and batch['user'] != args[0]:
+                continue
+            yield dict(batch)
+
+
+async def legacy_pass(db, users, share):
+    n_scheduled = 0
+    for user in users:
+        remaining = share
+        async for batch in db.select_and_fetchall(
+                'SELECT ... FROM batches WHERE user = %s', (user,)):
+            async for record in db.select_and_fetchall(
+                    'SELECT ... FROM jobs', (batch['id'], remaining)):
+                db.mark_running(batch['id'], record['job_id'])
+                n_scheduled += 1
+                remaining -= 1
+            if remaining <= 0:
+                break
+    return n_scheduled
+
+
+async def ready_queue_pass(db, queue, users, share):
+    await queue.update()
+    n_scheduled = 0
+    for user in users:
+        remaining = share
+        async for record in queue.user_ready_jobs(user):
+            queue.take(record)
+            db.mark_running(record['batch_id'], record['job_id'])
+            queue.done_scheduling(record['batch_id'], record['job_id'], True)
+            n_scheduled += 1
+            remaining -= 1
+            if remaining <= 0:
+                break
+    return n_scheduled
+
+
+async def run(name, make_pass, args):
+    db = FakeDatabase(args.n_users, args.n_batches, args.n_jobs_per_batch,
+                      args.latency_ms / 1000)
+    users = [f'user{i}' for i in range(args.n_users)]
+    pass_fn = make_pass(db)
+
+    start = time.time()
+    n_scheduled = 0
+    n_passes = 0
+    while n_scheduled < args.n_batches * args.n_jobs_per_batch:
+        n = await pass_fn(users, args.jobs_per_pass // args.n_users)
+        if n == 0:
+            break
+        n_scheduled += n
+        n_passes += 1
+    elapsed = time.time() - start
+
+    print(f'{name}: scheduled {n_scheduled} jobs in {n_passes} passes, {elapsed:.2f}s, '
+          f'{n_scheduled / elapsed:.0f} jobs/s, {db.n_queries} queries')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-users', type=int, default=10)
+    parser.add_argument('--n-batches', type=int, default=2000)
+    parser.add_argument('--n-jobs-per-batch', type=int, default=50)
+    parser.add_argument('--jobs-per-pass', type=int, default=3000)
+    parser.add_argument('--latency-ms', type=float, default=0.5)
+    args = parser.parse_args()
+
+    def make_legacy_pass(db):
+        return lambda users, share: legacy_pass(db, users, share)
+
+    def make_ready_queue_pass(db):
+        queue = ReadyJobQueue(db)
+        return lambda users, share: ready_queue_pass(db, queue, users, share)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run('legacy', make_legacy_pass, args))
+    loop.run_until_complete(run('ready queue', make_ready_queue_pass, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+'''Replay a job trace against the driver's placement policies.
+
+The trace is newline-delimited JSON, one job per line:
+
+  {"time": 0.0, "duration": 120.5, "cores_mcpu": 1000, "storage_bytes": 0,
+   "memory_bytes": 1073741824}
+
+`time` is the submission time in seconds relative to the start of the
+trace.  `storage_bytes` defaults to 0 and `memory_bytes` to the memory
+that comes with the job's cores.  A trace can be exported from the attempts table, for example:
+
+  SELECT attempts.start_time / 1000 AS time,
+    (attempts.end_time - attempts.start_time) / 1000 AS duration,
+    jobs.cores_mcpu
+  FROM attempts
+  INNER JOIN jobs ON attempts.batch_id = jobs.batch_id AND attempts.job_id = jobs.job_id
+  WHERE attempts.end_time IS NOT NULL;
+
+Without --trace, a synthetic trace is generated.  Instances are
+created whenever the job at the head of the queue cannot be placed, up
+to --max-instances.  Jobs that do not fit on an empty worker are
+rejected and counted.
+
+  python3 placement_simulator.py --policy best-fit --policy packing-score
+'''
+import json
+import heapq
+import random
+import argparse
+import collections
+import sortedcontainers
+
+from batch.driver.placement import placement_policies, placement_policy, WORKER_STORAGE_BYTES
+from batch.utils import cores_mcpu_to_memory_bytes
+
+
+class SimInstance:
+    def __init__(self, name, cores_mcpu):
+        self.name = name
+        self.cores_mcpu = cores_mcpu
+        self.free_cores_mcpu = cores_mcpu
+        self.free_storage_bytes = WORKER_STORAGE_BYTES
+        self.allocated_memory_bytes = 0
+        self.zone = 'us-central1-a'
+
+
+def read_trace(path, worker_type):
+    with open(path, 'r') as f:
+        jobs = [json.loads(line) for line in f if line.strip()]
+    t0 = min(job['time'] for job in jobs)
+    for job in jobs:
+        job['time'] -= t0
+        job.setdefault('storage_bytes', 0)
+        job.setdefault('memory_bytes', cores_mcpu_to_memory_bytes(job['cores_mcpu'], worker_type))
+    return sorted(jobs, key=lambda job: job['time'])
+
+
+def synthetic_trace(n_jobs, seed, worker_type):
+    rand = random.Random(seed)
+    jobs = []
+    t = 0
+    for _ in range(n_jobs):
+        t += rand.expovariate(5)
+        cores_mcpu = rand.choice([250, 500, 1000, 1000, 2000, 4000, 8000])
+        jobs.append({
+            'time': t,
+            'duration': rand.uniform(10, 600),
+            'cores_mcpu': cores_mcpu,
+            'storage_bytes': rand.choice([0, 0, 0, 10 * 1024**3, 100 * 1024**3]),
+            # jobs use at most the memory that comes with their cores
+            'memory_bytes': int(rand.choice([0.25, 0.5, 1.0, 1.0])
+                                * cores_mcpu_to_memory_bytes(cores_mcpu, worker_type))
+        })
+    return jobs
+
+
+def simulate(policy, jobs, worker_cores, user, max_instances=None):
+    worker_cores_mcpu = worker_cores * 1000
+    worker_memory_bytes = cores_mcpu_to_memory_bytes(worker_cores_mcpu, policy.worker_type)
+
+    def fits_worker(job):
+        return (job['cores_mcpu'] <= worker_cores_mcpu
+                and job['storage_bytes'] <= WORKER_STORAGE_BYTES
+                and job['memory_bytes'] <= worker_memory_bytes)
+    instances = []
+    instances_by_free_cores = sortedcontainers.SortedSet(
+        key=lambda instance: instance.free_cores_mcpu)
+
+    def adjust(instance, job, sign):
+        instances_by_free_cores.remove(instance)
+        instance.free_cores_mcpu += sign * job['cores_mcpu']
+        instance.free_storage_bytes += sign * job['storage_bytes']
+        instance.allocated_memory_bytes -= sign * job['memory_bytes']
+        instances_by_free_cores.add(instance)
+
+    queue = collections.deque()
+    # (end_time, seq, instance, job)
+    running = []
+    seq = 0
+
+    used_core_secs = 0
+    provisioned_core_secs = 0
+    total_wait = 0
+    n_rejected = 0
+    now = 0
+    next_job = 0
+
+    while next_job < len(jobs) or queue or running:
+        next_arrival = jobs[next_job]['time'] if next_job < len(jobs) else None
+        next_completion = running[0][0] if running else None
+        candidates = [t for t in (next_arrival, next_completion) if t is not None]
+        if candidates:
+            t = min(candidates)
+            provisioned_core_secs += (t - now) * len(instances) * worker_cores
+            now = t
+
+        while running and running[0][0] <= now:
+            _, _, instance, job = heapq.heappop(running)
+            adjust(instance, job, 1)
+
+        while next_job < len(jobs) and jobs[next_job]['time'] <= now:
+            queue.append(jobs[next_job])
+            next_job += 1
+
+        while queue:
+            job = queue[0]
+            if not fits_worker(job):
+                # no number of instances can run it
+                queue.popleft()
+                n_rejected += 1
+                continue
+            instance = policy.get_instance(instances_by_free_cores, user,
+                                           job['cores_mcpu'], job['storage_bytes'], job['memory_bytes'])
+            if instance is None:
+                if max_instances is not None and len(instances) >= max_instances:
+                    break
+                instance = SimInstance(f'instance-{len(instances)}', worker_cores_mcpu)
+                instances.append(instance)
+                instances_by_free_cores.add(instance)
+                continue
+            queue.popleft()
+            adjust(instance, job, -1)
+            total_wait += now - job['time']
+            used_core_secs += job['duration'] * job['cores_mcpu'] / 1000
+            heapq.heappush(running, (now + job['duration'], seq, instance, job))
+            seq += 1
+
+    return {
+        'instances': len(instances),
+        'utilization': used_core_secs / provisioned_core_secs if provisioned_core_secs else None,
+        'makespan': now,
+        'mean_wait': total_wait / (len(jobs) - n_rejected) if len(jobs) > n_rejected else None,
+        'rejected': n_rejected
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trace', help='newline-delimited JSON job trace')
+    parser.add_argument('--n-jobs', type=int, default=10000, help='synthetic trace size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker-type', default='standard')
+    parser.add_argument('--worker-cores', type=int, default=16)
+    parser.add_argument('--max-instances', type=int)
+    parser.add_argument('--policy', action='append', choices=list(placement_policies))
+    args = parser.parse_args()
+
+    if args.trace:
+        jobs = read_trace(args.trace, args.worker_type)
+    else:
+        jobs = synthetic_trace(args.n_jobs, args.seed, args.worker_type)
+
+    for name in args.policy or list(placement_policies):
+        policy = placement_policy(name, args.worker_type)
+        result = simulate(policy, jobs, args.worker_cores, user='test',
+                          max_instances=args.max_instances)
+        print(f'{name}: instances {result["instances"]} '
+              f'utilization {result["utilization"]:.3f} '
+              f'makespan {result["makespan"]:.0f}s '
+              f'mean wait {result["mean_wait"]:.1f}s '
+              f'rejected {result["rejected"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ from . import methods_benchmarks
 from . import linalg_benchmarks
 from . import shuffle_benchmarks
 from . import combiner_benchmarks
+from . import import_benchmarks
+from . import expression_benchmarks
 
 __all__ = [
     'run_all',
@@ -16,4 +18,6 @@ __all__ = [
     'linalg_benchmarks',
     'methods_benchmarks',
     'shuffle_benchmarks',
-    'combiner_benchmarks']
+    'combiner_benchmarks',
+    'import_benchmarks',
+    'expression_benchmarks']
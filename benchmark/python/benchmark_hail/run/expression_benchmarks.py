@@ -0,0 +1,24 @@
+import hail as hl
+
+from .utils import benchmark
+
+
+def construct_expressions(n):
+    x = hl.int32(1)
+    for i in range(n):
+        s = hl.struct(a=x, b=hl.str(x), c=hl.array([x, x + i]))
+        s.annotate(d=s.a * 2)
+
+
+@benchmark()
+def python_expression_construction():
+    construct_expressions(20_000)
+
+
+@benchmark()
+def python_expression_construction_unchecked():
+    hl.typecheck.set_typecheck_enabled(False)
+    try:
+        construct_expressions(20_000)
+    finally:
+        hl.typecheck.set_typecheck_enabled(True)
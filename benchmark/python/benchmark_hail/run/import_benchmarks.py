@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+from .utils import benchmark
+
+# `import hail` must not load these; they are imported when the
+# submodules that need them are first used
+LAZY_MODULES = ['scipy', 'bokeh', 'hailtop', 'hail.linalg', 'hail.stats', 'hail.plot', 'hail.experimental']
+
+# seconds
+IMPORT_HAIL_THRESHOLD = 3.0
+
+_import_hail = f'''
+import sys
+import time
+
+start = time.perf_counter()
+import hail
+elapsed = time.perf_counter() - start
+
+loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+if loaded:
+    sys.exit(f'import hail loaded {{", ".join(loaded)}}')
+if elapsed > {IMPORT_HAIL_THRESHOLD}:
+    sys.exit(f'import hail took {{elapsed:.2f}}s, more than {IMPORT_HAIL_THRESHOLD}s')
+'''
+
+
+@benchmark()
+def import_hail():
+    # in a fresh interpreter, since hail is already imported here
+    subprocess.run([sys.executable, '-c', _import_hail], check=True)
@@ -10,6 +10,38 @@ def block_matrix_nested_multiply():
     ((bm @ bm) @ bm @ bm @ (bm @ bm)).write(path, overwrite=True)
 
 
+def _square_matrix_table(n):
+    mt = hl.utils.range_matrix_table(n, n)
+    return mt.select_entries(x=hl.rand_unif(0, 1))
+
+
+def _dnd_array_matmul(n, block_size):
+    da = hl.experimental.dnd.array(_square_matrix_table(n), 'x', block_size=block_size)
+    (da @ da).write(hl.utils.new_temp_file(), overwrite=True)
+
+
+@benchmark()
+def dnd_array_matmul_local():
+    local_matmul_max_elements = hl.experimental.dnd.DNDArray.local_matmul_max_elements
+    hl.experimental.dnd.DNDArray.local_matmul_max_elements = 64 * 1024 * 1024
+    try:
+        _dnd_array_matmul(4 * 1024, 1024)
+    finally:
+        hl.experimental.dnd.DNDArray.local_matmul_max_elements = local_matmul_max_elements
+
+
+@benchmark()
+def dnd_array_matmul_distributed():
+    _dnd_array_matmul(4 * 1024, 1024)
+
+
+@benchmark()
+def block_matrix_matmul():
+    mt = _square_matrix_table(4 * 1024)
+    bm = hl.linalg.BlockMatrix.from_entry_expr(mt.x, block_size=1024)
+    (bm @ bm).write(hl.utils.new_temp_file(extension='bm'), overwrite=True)
+
+
 @benchmark()
 def make_ndarray_bench():
     ht = hl.utils.range_table(200_000)
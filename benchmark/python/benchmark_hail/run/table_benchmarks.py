@@ -58,6 +58,22 @@ def table_python_construction():
         ht = ht.annotate(**{f'x_{i}': 0})
 
 
+@benchmark()
+def table_python_ir_hash_and_compare():
+    n = 300
+    ht = hl.utils.range_table(100)
+    ht2 = ht
+    tirs = []
+    tirs2 = []
+    for i in range(n):
+        ht = ht.annotate(**{f'x_{i}': ht.idx + i})
+        ht2 = ht2.annotate(**{f'x_{i}': ht2.idx + i})
+        tirs.append(ht._tir)
+        tirs2.append(ht2._tir)
+    seen = set(tirs)
+    assert all(tir in seen for tir in tirs2)
+
+
 @benchmark()
 def table_big_aggregate_compilation():
     n = 1_000
@@ -410,3 +426,23 @@ def test_left_join_region_memory():
     high_mem_table2 = hl.utils.range_table(30).naive_coalesce(1).annotate(big_array=hl.zeros(50_000_000))
     joined = high_mem_table.join(high_mem_table2, how='left')
     joined._force_count()
+
+
+def _collect_wide_table():
+    ht = hl.utils.range_table(1_000_000, n_partitions=16)
+    ht = ht.annotate(x=hl.float64(ht.idx) / 3, s=hl.str(ht.idx), a=hl.range(ht.idx % 10).map(hl.float64))
+    ht.collect()
+
+
+@benchmark()
+def table_collect_binary_results():
+    _collect_wide_table()
+
+
+@benchmark()
+def table_collect_json_results():
+    hl._set_flags(use_json_results='1')
+    try:
+        _collect_wide_table()
+    finally:
+        hl._set_flags(use_json_results=None)
@@ -3,7 +3,8 @@ from .database import create_database_pool, Database, transaction
 from .session import setup_aiohttp_session
 from .auth import userdata_from_web_request, userdata_from_rest_request, \
     web_authenticated_users_only, web_maybe_authenticated_user, rest_authenticated_users_only, \
-    web_authenticated_developers_only, rest_authenticated_developers_only
+    web_authenticated_developers_only, rest_authenticated_developers_only, \
+    invalidate_session, invalidate_user
 from .csrf import new_csrf_token, check_csrf_token
 from .auth_utils import insert_user, create_session
 
@@ -19,6 +20,8 @@ __all__ = [
     'web_authenticated_developers_only',
     'rest_authenticated_users_only',
     'rest_authenticated_developers_only',
+    'invalidate_session',
+    'invalidate_user',
     'new_csrf_token',
     'check_csrf_token',
     'insert_user',
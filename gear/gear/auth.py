@@ -1,9 +1,14 @@
+import os
 import logging
+import asyncio
+import collections
+import time
 from functools import wraps
 import urllib.parse
 import aiohttp
 from aiohttp import web
 import aiohttp_session
+import prometheus_client as pc
 from hailtop.config import get_deploy_config
 from hailtop.utils import request_retry_transient_errors
 from hailtop.tls import ssl_client_session
@@ -12,23 +17,180 @@ log = logging.getLogger('gear.auth')
 
 deploy_config = get_deploy_config()
 
+USERINFO_LATENCY = pc.Summary('gear_userinfo_latency_seconds',
+                              'Latency of userinfo lookups in seconds', ['cache'])
+AUTH_REQUEST_LATENCY = pc.Summary('gear_auth_request_latency_seconds',
+                                  'Latency of userinfo requests to the auth service in seconds')
 
-async def _userdata_from_session_id(session_id):
-    headers = {'Authorization': f'Bearer {session_id}'}
-    try:
-        async with ssl_client_session(
-                raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5)) as session:
+
+class UserinfoCache:
+    '''Cache of the auth service's userinfo responses, keyed by session id.
+
+    Userinfo is requested over one long-lived client session.  Users
+    are cached for `ttl_secs` and unknown session ids (401s) for
+    `negative_ttl_secs`; entries are evicted in least-recently-used
+    order beyond `max_size`.  Lookups for requests that change state
+    re-check with the auth service once an entry is `write_ttl_secs`
+    old.  Concurrent lookups of the same session id share one request.
+    Errors other than 401 are not cached.
+
+    Sessions deleted by the auth service stay valid in other processes'
+    caches for at most `ttl_secs`, or `write_ttl_secs` for writes.
+    '''
+
+    def __init__(self, url, *, session_factory=None, max_size=10_000, ttl_secs=5, write_ttl_secs=1,
+                 negative_ttl_secs=5):
+        self.url = url
+        if session_factory is None:
+            def session_factory():
+                return ssl_client_session(
+                    raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5))
+        self.session_factory = session_factory
+        self.session = None
+        self.max_size = max_size
+        self.ttl_secs = ttl_secs
+        self.write_ttl_secs = write_ttl_secs
+        self.negative_ttl_secs = negative_ttl_secs
+
+        # session_id => (time fetched, userdata or None), least recently used first
+        self.entries = collections.OrderedDict()
+        # session_id => task requesting userinfo
+        self.fetches = {}
+
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_shared = 0
+        self.n_requests = 0
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'n_shared': self.n_shared,
+            'n_requests': self.n_requests
+        }
+
+    def _client_session(self):
+        if self.session is None or self.session.closed:
+            self.session = self.session_factory()
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, session_id):
+        self.n_requests += 1
+        start = time.time()
+        try:
             resp = await request_retry_transient_errors(
-                session, 'GET', deploy_config.url('auth', '/api/v1alpha/userinfo'),
-                headers=headers)
+                self._client_session(), 'GET', self.url,
+                headers={'Authorization': f'Bearer {session_id}'})
             assert resp.status == 200
             return await resp.json()
-    except aiohttp.ClientResponseError as e:
-        if e.status == 401:
-            return None
+        except aiohttp.ClientResponseError as e:
+            if e.status == 401:
+                return None
+            raise
+        finally:
+            AUTH_REQUEST_LATENCY.observe(time.time() - start)
 
-        log.exception('unknown exception getting userinfo')
-        raise web.HTTPInternalServerError()
+    def _put(self, session_id, userdata):
+        self.entries[session_id] = (time.monotonic(), userdata)
+        self.entries.move_to_end(session_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def _start_fetch(self, session_id):
+        task = asyncio.ensure_future(self._request(session_id))
+        self.fetches[session_id] = task
+
+        def done(_):
+            # the fetch was invalidated if it is no longer registered
+            if self.fetches.get(session_id) is task:
+                del self.fetches[session_id]
+                if not task.cancelled() and task.exception() is None:
+                    self._put(session_id, task.result())
+        task.add_done_callback(done)
+        return task
+
+    async def get(self, session_id, *, write=False):
+        '''`write` is true for lookups authenticating requests that
+        change state.'''
+        start = time.time()
+        entry = self.entries.get(session_id)
+        if entry is not None:
+            fetched, userdata = entry
+            if userdata is None:
+                ttl_secs = self.negative_ttl_secs
+            elif write:
+                ttl_secs = min(self.ttl_secs, self.write_ttl_secs)
+            else:
+                ttl_secs = self.ttl_secs
+            if time.monotonic() < fetched + ttl_secs:
+                self.entries.move_to_end(session_id)
+                self.n_hits += 1
+                USERINFO_LATENCY.labels(cache='hit').observe(time.time() - start)
+                return userdata
+            del self.entries[session_id]
+
+        task = self.fetches.get(session_id)
+        if task is None:
+            self.n_misses += 1
+            label = 'miss'
+            task = self._start_fetch(session_id)
+        else:
+            self.n_shared += 1
+            label = 'shared'
+        try:
+            return await asyncio.shield(task)
+        finally:
+            USERINFO_LATENCY.labels(cache=label).observe(time.time() - start)
+
+    def invalidate(self, session_id):
+        self.entries.pop(session_id, None)
+        self.fetches.pop(session_id, None)
+
+    def invalidate_user(self, username):
+        for session_id, (_, userdata) in list(self.entries.items()):
+            if userdata is not None and userdata['username'] == username:
+                del self.entries[session_id]
+        # in-flight lookups may be for this user
+        self.fetches.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.fetches.clear()
+
+
+userinfo_cache = UserinfoCache(
+    deploy_config.url('auth', '/api/v1alpha/userinfo'),
+    ttl_secs=float(os.environ.get('HAIL_USERINFO_CACHE_TTL_SECS', 5)),
+    write_ttl_secs=float(os.environ.get('HAIL_USERINFO_CACHE_WRITE_TTL_SECS', 1)))
+
+
+def invalidate_session(session_id):
+    userinfo_cache.invalidate(session_id)
+
+
+def invalidate_user(username):
+    userinfo_cache.invalidate_user(username)
+
+
+async def close_userinfo_cache(app):  # pylint: disable=unused-argument
+    await userinfo_cache.close()
+
+
+def _is_write(request):
+    return request.method not in ('GET', 'HEAD', 'OPTIONS')
+
+
+async def _userdata_from_session_id(session_id, write):
+    try:
+        return await userinfo_cache.get(session_id, write=write)
     except Exception:  # pylint: disable=broad-except
         log.exception('unknown exception getting userinfo')
         raise web.HTTPInternalServerError()
@@ -38,7 +200,7 @@ async def userdata_from_web_request(request):
     session = await aiohttp_session.get_session(request)
     if 'session_id' not in session:
         return None
-    return await _userdata_from_session_id(session['session_id'])
+    return await _userdata_from_session_id(session['session_id'], _is_write(request))
 
 
 async def userdata_from_rest_request(request):
@@ -47,7 +209,7 @@ async def userdata_from_rest_request(request):
     auth_header = request.headers['Authorization']
     if not auth_header.startswith('Bearer '):
         return None
-    return await _userdata_from_session_id(auth_header[7:])
+    return await _userdata_from_session_id(auth_header[7:], _is_write(request))
 
 
 def rest_authenticated_users_only(fun):
@@ -2,6 +2,7 @@ import os
 import aiohttp_session
 import aiohttp_session.cookie_storage
 from hailtop.config import get_deploy_config
+from .auth import close_userinfo_cache
 
 
 def setup_aiohttp_session(app):
@@ -15,3 +16,4 @@ def setup_aiohttp_session(app):
             domain=os.environ['HAIL_DOMAIN'],
             # 2592000s = 30d
             max_age=2592000))
+    app.on_cleanup.append(close_userinfo_cache)
@@ -0,0 +1,167 @@
+import asyncio
+import time
+import aiohttp
+from aiohttp import web
+import pytest
+
+from gear.auth import UserinfoCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class AuthStandIn:
+    '''Serves /api/v1alpha/userinfo for a fixed set of sessions with a
+    fixed delay standing in for the auth database lookup.'''
+
+    def __init__(self, sessions, delay_secs=0.01):
+        self.sessions = sessions
+        self.delay_secs = delay_secs
+        self.n_requests = 0
+        self.fail = False
+        self.runner = None
+        self.url = None
+
+    async def userinfo(self, request):
+        self.n_requests += 1
+        await asyncio.sleep(self.delay_secs)
+        if self.fail:
+            raise web.HTTPBadRequest()
+        session_id = request.headers['Authorization'][7:]
+        userdata = self.sessions.get(session_id)
+        if userdata is None:
+            raise web.HTTPUnauthorized()
+        return web.json_response(userdata)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.add_routes([web.get('/api/v1alpha/userinfo', self.userinfo)])
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}/api/v1alpha/userinfo'
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.runner.cleanup()
+
+
+def userinfo_cache(auth, **kwargs):
+    return UserinfoCache(
+        auth.url,
+        session_factory=lambda: aiohttp.ClientSession(
+            raise_for_status=True, timeout=aiohttp.ClientTimeout(total=5)),
+        **kwargs)
+
+
+def sessions(n_users):
+    return {f'session-{i}': {'username': f'user-{i}', 'session_id': f'session-{i}', 'is_developer': 0}
+            for i in range(n_users)}
+
+
+async def test_cache_and_negative_cache():
+    async with AuthStandIn(sessions(2)) as auth:
+        cache = userinfo_cache(auth)
+        try:
+            assert (await cache.get('session-0'))['username'] == 'user-0'
+            assert (await cache.get('session-0'))['username'] == 'user-0'
+            assert await cache.get('bad') is None
+            assert await cache.get('bad') is None
+            assert auth.n_requests == 2
+            assert cache.stats()['n_hits'] == 2
+        finally:
+            await cache.close()
+
+
+async def test_ttl_and_max_size():
+    async with AuthStandIn(sessions(3), delay_secs=0) as auth:
+        cache = userinfo_cache(auth, max_size=2, ttl_secs=0.05)
+        try:
+            for i in range(3):
+                await cache.get(f'session-{i}')
+            assert list(cache.entries) == ['session-1', 'session-2']
+            await asyncio.sleep(0.1)
+            await cache.get('session-2')
+            assert auth.n_requests == 4
+        finally:
+            await cache.close()
+
+
+async def test_writes_recheck_sooner():
+    users = sessions(1)
+    async with AuthStandIn(users, delay_secs=0) as auth:
+        cache = userinfo_cache(auth, ttl_secs=60, write_ttl_secs=0.05)
+        try:
+            await cache.get('session-0')
+            await asyncio.sleep(0.1)
+            # logged out in the auth service, this process was not told
+            del users['session-0']
+            assert (await cache.get('session-0'))['username'] == 'user-0'
+            assert await cache.get('session-0', write=True) is None
+            assert auth.n_requests == 2
+            assert await cache.get('session-0') is None
+        finally:
+            await cache.close()
+
+
+async def test_invalidation():
+    users = sessions(2)
+    async with AuthStandIn(users) as auth:
+        cache = userinfo_cache(auth)
+        try:
+            await cache.get('session-0')
+            await cache.get('session-1')
+
+            del users['session-0']
+            cache.invalidate('session-0')
+            assert await cache.get('session-0') is None
+
+            del users['session-1']
+            cache.invalidate_user('user-1')
+            assert await cache.get('session-1') is None
+
+            # a lookup in flight during invalidation is not cached
+            users['session-0'] = {'username': 'user-0', 'session_id': 'session-0', 'is_developer': 0}
+            cache.invalidate('session-0')
+            task = asyncio.ensure_future(cache.get('session-0'))
+            await asyncio.sleep(0)
+            cache.invalidate('session-0')
+            assert (await task)['username'] == 'user-0'
+            assert 'session-0' not in cache.entries
+        finally:
+            await cache.close()
+
+
+async def test_errors_are_not_cached():
+    async with AuthStandIn(sessions(1)) as auth:
+        cache = userinfo_cache(auth)
+        try:
+            auth.fail = True
+            with pytest.raises(aiohttp.ClientResponseError):
+                await cache.get('session-0')
+            assert not cache.entries
+            auth.fail = False
+            assert (await cache.get('session-0'))['username'] == 'user-0'
+        finally:
+            await cache.close()
+
+
+async def test_load():
+    n_users = 20
+    n_lookups = 2000
+    async with AuthStandIn(sessions(n_users)) as auth:
+        cache = userinfo_cache(auth)
+        try:
+            start = time.time()
+            results = await asyncio.gather(*[
+                cache.get(f'session-{i % n_users}') for i in range(n_lookups)])
+            elapsed = time.time() - start
+        finally:
+            await cache.close()
+
+    assert [userdata['username'] for userdata in results] == [f'user-{i % n_users}' for i in range(n_lookups)]
+    # concurrent lookups of one session share a request
+    assert auth.n_requests == n_users
+    assert cache.stats()['n_shared'] == n_lookups - n_users
+    print(f'{n_lookups} lookups in {elapsed:.3f}s, {n_lookups / elapsed:.0f}/s')
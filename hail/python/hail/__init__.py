@@ -1,13 +1,15 @@
-import pkg_resources
+import importlib as _importlib
+import os
 import sys
 
 if sys.version_info < (3, 6):
     raise EnvironmentError('Hail requires Python 3.6, found {}.{}'.format(
         sys.version_info.major, sys.version_info.minor))
 
-__pip_version__ = pkg_resources.resource_string(__name__, 'hail_pip_version').decode().strip()
-del pkg_resources
-del sys
+with open(os.path.join(os.path.dirname(__file__), 'hail_pip_version')) as f:
+    __pip_version__ = f.read().strip()
+del f
+del os
 
 __doc__ = r"""
     __  __     <>__
@@ -35,10 +37,6 @@ from .methods import *  # noqa: F401,F403
 from . import expr
 from . import genetics
 from . import methods
-from . import stats
-from . import linalg
-from . import plot
-from . import experimental
 from . import ir
 from . import backend
 from . import nd as _nd
@@ -111,6 +109,30 @@ ir.register_aggregators()
 
 __version__ = None  # set in hail.init()
 
+# submodules with heavy dependencies (scipy, bokeh) are imported on first
+# access
+_lazy_submodules = {'stats', 'linalg', 'plot', 'experimental'}
+
+
+def __getattr__(name):
+    if name in _lazy_submodules:
+        return _importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    # hail.expr shadows the builtin set and sorted
+    import builtins
+    return builtins.sorted(builtins.set(globals()) | _lazy_submodules)
+
+
+# module __getattr__ requires Python 3.7
+if sys.version_info < (3, 7):
+    for _name in _lazy_submodules:
+        _importlib.import_module(f'.{_name}', __name__)
+    del _name
+del sys
+
 import warnings
 
 warnings.filterwarnings('once', append=True)
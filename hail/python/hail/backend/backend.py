@@ -10,6 +10,14 @@ class Backend(abc.ABC):
     def execute(self, ir, timed=False):
         pass
 
+    def execute_columnar(self, ir, timed=False):
+        """Execute `ir`, an array or set, and return its elements stored by
+        column; see :mod:`hail.utils.columnar`."""
+        from hail.utils.columnar import columnar
+        value, timings = self.execute(ir, timed=True)
+        result = columnar(ir.typ, value)
+        return (result, timings) if timed else result
+
     @abc.abstractmethod
     def value_type(self, ir):
         pass
@@ -0,0 +1,509 @@
+"""Decode values encoded by the JVM backend directly into Python values.
+
+Values are encoded with the default encoded type for their physical type
+(see `EType.defaultFromPType`) and framed by
+:data:`hail.experimental.codec.BUFFER_SPEC`.  A decoder is specialized
+once per (type, physical type) pair; arrays of required or
+missing-bit-masked numerics are read with NumPy instead of element by
+element.
+
+:func:`decode_columnar` decodes a collected array directly into the
+column builders of :mod:`hail.utils.columnar`, without constructing a
+Python value per element.
+"""
+import math
+import re
+import struct
+
+import numpy as np
+
+from hail.expr.types import tint32, tint64, tfloat32, tfloat64, tbool, tstr, tcall, \
+    tarray, tset, tdict, tstruct, ttuple, tinterval, tlocus, tndarray
+from hail.utils.columnar import NumericBuilder, StringBuilder, ArrayBuilder, StructBuilder, \
+    column_builder, finish_columnar
+
+_int32 = struct.Struct('<i')
+_int64 = struct.Struct('<q')
+_float32 = struct.Struct('<f')
+_float64 = struct.Struct('<d')
+
+_structs = {
+    tint32: _int32,
+    tint64: _int64,
+    tfloat32: _float32,
+    tfloat64: _float64,
+}
+
+_numpy_dtypes = {
+    tint32: np.dtype('<i4'),
+    tint64: np.dtype('<i8'),
+    tfloat32: np.dtype('<f4'),
+    tfloat64: np.dtype('<f8'),
+    tbool: np.dtype('?'),
+}
+
+
+class PTypeNode:
+    def __init__(self, name, required, children):
+        self.name = name
+        self.required = required
+        self.children = children
+
+    def __repr__(self):
+        return f'{"+" if self.required else ""}{self.name}{self.children if self.children else ""}'
+
+
+_ptype_token = re.compile(r'\s*(\+|[\[\]{}(),:]|`(?:[^`\\]|\\.)*`|[\w.-]+)')
+
+
+def _tokenize(s):
+    tokens = []
+    pos = 0
+    s = s.rstrip()
+    while pos < len(s):
+        m = _ptype_token.match(s, pos)
+        if m is None:
+            raise ValueError(f'cannot parse physical type at {pos}: {s}')
+        tokens.append(m.group(1))
+        pos = m.end()
+    return tokens
+
+
+def parse_ptype(s):
+    """Parse a canonical physical type string, as printed by `PType.toString`,
+    into a tree of :class:`.PTypeNode`.  Only requiredness and structure are
+    kept; field names and reference genomes come from the virtual type."""
+    tokens = _tokenize(s)
+
+    def expect(i, token):
+        if tokens[i] != token:
+            raise ValueError(f'expected {token!r} at token {i}, found {tokens[i]!r}: {s}')
+        return i + 1
+
+    def parse(i):
+        required = tokens[i] == '+'
+        if required:
+            i += 1
+        name = tokens[i]
+        i += 1
+        children = []
+        if name == 'PCLocus':
+            i = expect(i, '(')
+            i = expect(i + 1, ')')
+        elif name in ('PCArray', 'PCSet', 'PCInterval', 'PCStream'):
+            i = expect(i, '[')
+            child, i = parse(i)
+            children.append(child)
+            i = expect(i, ']')
+        elif name == 'PCNDArray':
+            i = expect(i, '[')
+            child, i = parse(i)
+            children.append(child)
+            i = expect(i, ',')
+            # number of dimensions
+            i = expect(i + 1, ']')
+        elif name == 'PCDict':
+            i = expect(i, '[')
+            key, i = parse(i)
+            i = expect(i, ',')
+            value, i = parse(i)
+            children.extend([key, value])
+            i = expect(i, ']')
+        elif name in ('PCTuple', 'PCStruct', 'PSubsetStruct'):
+            # a PSubsetStruct is encoded like a struct of its fields
+            close = ']' if name == 'PCTuple' else '}'
+            i = expect(i, '[' if name == 'PCTuple' else '{')
+            while tokens[i] != close:
+                if children:
+                    i = expect(i, ',')
+                # field index or name
+                i = expect(i + 1, ':')
+                child, i = parse(i)
+                children.append(child)
+            i += 1
+        return PTypeNode(name, required, children), i
+
+    node, i = parse(0)
+    if i != len(tokens):
+        raise ValueError(f'unexpected trailing tokens in physical type: {s}')
+    return node
+
+
+def unblock(b):
+    """Concatenate the payloads of the length-prefixed blocks written by a
+    `StreamBlockBufferSpec`."""
+    b = memoryview(b)
+    blocks = []
+    off = 0
+    while off < len(b):
+        n = _int32.unpack_from(b, off)[0]
+        off += 4
+        blocks.append(b[off:off + n])
+        off += n
+    if len(blocks) == 1:
+        return blocks[0]
+    return b''.join(blocks)
+
+
+def _required(required):
+    return PTypeNode(None, required, [])
+
+
+def _fundamental(typ, ptype):
+    """The struct layout of a type whose physical representation is a struct."""
+    if isinstance(typ, tlocus):
+        return [tstr, tint32], [_required(True), _required(True)]
+    if isinstance(typ, tinterval):
+        point = ptype.children[0]
+        return ([typ.point_type, typ.point_type, tbool, tbool],
+                [point, point, _required(True), _required(True)])
+    if isinstance(typ, tndarray):
+        shape = ttuple(*([tint64] * typ.ndim))
+        shape_ptype = PTypeNode('PCTuple', True, [_required(True)] * typ.ndim)
+        data_ptype = PTypeNode('PCArray', True, ptype.children)
+        return ([shape, shape, tarray(typ.element_type)],
+                [shape_ptype, shape_ptype, data_ptype])
+    if isinstance(typ, tstruct):
+        return list(typ.types), ptype.children
+    assert isinstance(typ, ttuple), typ
+    return list(typ.types), ptype.children
+
+
+def _call(c):
+    from hail.genetics import Call
+    phased = (c & 0x1) == 1
+    ploidy = (c >> 1) & 0x3
+    ar = c >> 3
+    if ploidy == 0:
+        return Call([], phased=phased)
+    if ploidy == 1:
+        return Call([ar], phased=phased)
+    assert ploidy == 2, c
+    # invert ar = k * (k + 1) / 2 + j for 0 <= j <= k
+    k = int((math.sqrt(8 * ar + 1) - 1) / 2)
+    while (k + 1) * (k + 2) // 2 <= ar:
+        k += 1
+    while k * (k + 1) // 2 > ar:
+        k -= 1
+    j = ar - k * (k + 1) // 2
+    if phased:
+        return Call([j, k - j], phased=True)
+    return Call([j, k], phased=False)
+
+
+def _primitive_decoder(s, convert=None):
+    unpack_from = s.unpack_from
+    size = s.size
+    if convert is None:
+        def decode(buf, off):
+            return unpack_from(buf, off)[0], off + size
+    else:
+        def decode(buf, off):
+            return convert(unpack_from(buf, off)[0]), off + size
+    return decode
+
+
+def _decode_bool(buf, off):
+    return buf[off] != 0, off + 1
+
+
+def _decode_str(buf, off):
+    n = _int32.unpack_from(buf, off)[0]
+    off += 4
+    return str(buf[off:off + n], 'utf-8'), off + n
+
+
+def _struct_decoder(types, ptypes, make):
+    fields = []
+    n_optional = 0
+    for t, pt in zip(types, ptypes):
+        if pt.required:
+            fields.append((_decoder(t, pt), -1))
+        else:
+            fields.append((_decoder(t, pt), n_optional))
+            n_optional += 1
+    n_missing_bytes = (n_optional + 7) // 8
+
+    def decode(buf, off):
+        missing_bytes = buf[off:off + n_missing_bytes]
+        off += n_missing_bytes
+        values = []
+        for dec, i in fields:
+            if i >= 0 and (missing_bytes[i >> 3] >> (i & 0x7)) & 0x1:
+                values.append(None)
+            else:
+                v, off = dec(buf, off)
+                values.append(v)
+        return make(values), off
+
+    return decode
+
+
+def _array_decoder(element_type, element_ptype, make, as_numpy=False):
+    element_required = element_ptype.required
+    dtype = _numpy_dtypes.get(element_type)
+
+    if dtype is not None:
+        itemsize = dtype.itemsize
+
+        def decode(buf, off):
+            n = _int32.unpack_from(buf, off)[0]
+            off += 4
+            if element_required:
+                values = np.frombuffer(buf, dtype=dtype, count=n, offset=off)
+                off += n * itemsize
+                if as_numpy:
+                    return values.copy(), off
+                return make(values.tolist()), off
+            n_missing_bytes = (n + 7) // 8
+            # missing bits are little-endian within each byte
+            missing_bytes = np.frombuffer(buf, dtype=np.uint8, count=n_missing_bytes, offset=off)
+            missing = np.unpackbits(missing_bytes).reshape(-1, 8)[:, ::-1].ravel()[:n].astype(bool)
+            off += n_missing_bytes
+            present = np.flatnonzero(~missing)
+            values = np.frombuffer(buf, dtype=dtype, count=len(present), offset=off)
+            off += len(present) * itemsize
+            result = [None] * n
+            for i, v in zip(present.tolist(), values.tolist()):
+                result[i] = v
+            return make(result), off
+
+        return decode
+
+    dec = _decoder(element_type, element_ptype)
+
+    def decode(buf, off):
+        n = _int32.unpack_from(buf, off)[0]
+        off += 4
+        values = []
+        if element_required:
+            for _ in range(n):
+                v, off = dec(buf, off)
+                values.append(v)
+        else:
+            n_missing_bytes = (n + 7) // 8
+            missing_bytes = buf[off:off + n_missing_bytes]
+            off += n_missing_bytes
+            for i in range(n):
+                if (missing_bytes[i >> 3] >> (i & 0x7)) & 0x1:
+                    values.append(None)
+                else:
+                    v, off = dec(buf, off)
+                    values.append(v)
+        if as_numpy:
+            return np.array(values), off
+        return make(values), off
+
+    return decode
+
+
+def _decoder(typ, ptype):
+    if typ == tint32:
+        return _primitive_decoder(_int32)
+    if typ == tint64:
+        return _primitive_decoder(_int64)
+    if typ == tfloat32:
+        return _primitive_decoder(_float32)
+    if typ == tfloat64:
+        return _primitive_decoder(_float64)
+    if typ == tbool:
+        return _decode_bool
+    if typ == tstr:
+        return _decode_str
+    if typ == tcall:
+        return _primitive_decoder(_int32, _call)
+    if isinstance(typ, tarray):
+        return _array_decoder(typ.element_type, ptype.children[0], list)
+    if isinstance(typ, tset):
+        return _array_decoder(typ.element_type, ptype.children[0], set)
+    if isinstance(typ, tdict):
+        entry_type = ttuple(typ.key_type, typ.value_type)
+        entry_ptype = PTypeNode('PCStruct', True, ptype.children)
+        return _array_decoder(entry_type, entry_ptype, dict)
+    if isinstance(typ, tstruct):
+        names = list(typ)
+
+        def make(values):
+            from hail.utils import Struct
+            return Struct(**dict(zip(names, values)))
+        return _struct_decoder(*_fundamental(typ, ptype), make)
+    if isinstance(typ, ttuple):
+        return _struct_decoder(*_fundamental(typ, ptype), tuple)
+    if isinstance(typ, tlocus):
+        rg = typ.reference_genome
+
+        def make(values):
+            from hail.genetics import Locus
+            return Locus(values[0], values[1], reference_genome=rg)
+        return _struct_decoder(*_fundamental(typ, ptype), make)
+    if isinstance(typ, tinterval):
+        point_type = typ.point_type
+
+        def make(values):
+            from hail.utils import Interval
+            return Interval(values[0], values[1], values[2], values[3], point_type=point_type)
+        return _struct_decoder(*_fundamental(typ, ptype), make)
+    if isinstance(typ, tndarray):
+        (shape_type, strides_type, _), (shape_ptype, strides_ptype, data_ptype) = _fundamental(typ, ptype)
+        decode_shape = _decoder(shape_type, shape_ptype)
+        decode_strides = _decoder(strides_type, strides_ptype)
+        decode_data = _array_decoder(typ.element_type, data_ptype.children[0], None, as_numpy=True)
+        np_type = typ.element_type.to_numpy()
+
+        def decode(buf, off):
+            # the representation struct has no optional fields, so no missing bytes
+            shape, off = decode_shape(buf, off)
+            strides, off = decode_strides(buf, off)
+            data, off = decode_data(buf, off)
+            return np.ndarray(shape=shape, buffer=data.astype(np_type, copy=False),
+                              strides=strides, dtype=np_type), off
+        return decode
+    raise NotImplementedError(f'cannot decode values of type {typ}')
+
+
+_decoders = {}
+
+
+def decoder(typ, ptype_string):
+    """Return a function decoding a buffer of type `typ` encoded with the
+    physical type `ptype_string` into a Python value."""
+    key = (typ, ptype_string)
+    dec = _decoders.get(key)
+    if dec is None:
+        dec = _decoder(typ, parse_ptype(ptype_string))
+        _decoders[key] = dec
+    return dec
+
+
+def decode(typ, ptype_string, b):
+    """Decode `b`, encoded with :data:`hail.experimental.codec.BUFFER_SPEC`,
+    into a Python value."""
+    buf = unblock(b)
+    value, off = decoder(typ, ptype_string)(buf, 0)
+    assert off == len(buf), (off, len(buf))
+    return value
+
+
+def _column_decoder(typ, ptype, builder):
+    """Return a function appending one present value of type `typ`,
+    decoded from a buffer, to `builder`."""
+    if isinstance(builder, NumericBuilder):
+        values = builder.values
+        missing = builder.missing
+        if typ == tbool:
+            def decode(buf, off):
+                values.append(buf[off] != 0)
+                missing.append(0)
+                return off + 1
+            return decode
+        s = _structs[typ]
+        unpack_from = s.unpack_from
+        size = s.size
+
+        def decode(buf, off):
+            values.append(unpack_from(buf, off)[0])
+            missing.append(0)
+            return off + size
+        return decode
+
+    if isinstance(builder, StringBuilder):
+        def decode(buf, off):
+            n = _int32.unpack_from(buf, off)[0]
+            off += 4
+            builder.append_bytes(buf[off:off + n])
+            return off + n
+        return decode
+
+    if isinstance(builder, ArrayBuilder):
+        if isinstance(typ, tdict):
+            element_type = ttuple(typ.key_type, typ.value_type)
+            element_ptype = PTypeNode('PCStruct', True, ptype.children)
+        else:
+            element_type = typ.element_type
+            element_ptype = ptype.children[0]
+        element_builder = builder.values
+        element_required = element_ptype.required
+
+        if element_required and isinstance(element_builder, NumericBuilder):
+            # required numerics are laid out as in the column
+            itemsize = element_builder.values.itemsize
+            element_values = element_builder.values
+            element_missing = element_builder.missing
+
+            def decode(buf, off):
+                n = _int32.unpack_from(buf, off)[0]
+                off += 4
+                element_values.frombytes(buf[off:off + n * itemsize])
+                element_missing.extend(bytes(n))
+                builder.end_value(n)
+                return off + n * itemsize
+            return decode
+
+        dec = _column_decoder(element_type, element_ptype, element_builder)
+
+        def decode(buf, off):
+            n = _int32.unpack_from(buf, off)[0]
+            off += 4
+            if element_required:
+                for _ in range(n):
+                    off = dec(buf, off)
+            else:
+                n_missing_bytes = (n + 7) // 8
+                missing_bytes = buf[off:off + n_missing_bytes]
+                off += n_missing_bytes
+                for i in range(n):
+                    if (missing_bytes[i >> 3] >> (i & 0x7)) & 0x1:
+                        element_builder.append_missing()
+                    else:
+                        off = dec(buf, off)
+            builder.end_value(n)
+            return off
+        return decode
+
+    if isinstance(builder, StructBuilder):
+        fields = []
+        n_optional = 0
+        for t, pt, (_, field_builder) in zip(*_fundamental(typ, ptype), builder.fields):
+            if pt.required:
+                fields.append((_column_decoder(t, pt, field_builder), field_builder, -1))
+            else:
+                fields.append((_column_decoder(t, pt, field_builder), field_builder, n_optional))
+                n_optional += 1
+        n_missing_bytes = (n_optional + 7) // 8
+
+        def decode(buf, off):
+            missing_bytes = buf[off:off + n_missing_bytes]
+            off += n_missing_bytes
+            for dec, field_builder, i in fields:
+                if i >= 0 and (missing_bytes[i >> 3] >> (i & 0x7)) & 0x1:
+                    field_builder.append_missing()
+                else:
+                    off = dec(buf, off)
+            builder.end_value()
+            return off
+        return decode
+
+    dec = _decoder(typ, ptype)
+
+    def decode(buf, off):
+        v, off = dec(buf, off)
+        builder.append(v)
+        return off
+    return decode
+
+
+def decode_columnar(typ, ptype_string, b):
+    """Decode `b`, a tuple of type `typ` whose single field is an array
+    or set, into a :class:`.ColumnarTable` or :class:`.Column` of its
+    elements.  Returns ``None`` if the array is missing."""
+    assert isinstance(typ, ttuple) and len(typ.types) == 1, typ
+    array_type = typ.types[0]
+    ptype = parse_ptype(ptype_string)
+    builder = StructBuilder(typ, [(0, column_builder(array_type))])
+    array_builder = builder.fields[0][1]
+    buf = unblock(b)
+    off = _column_decoder(typ, ptype, builder)(buf, 0)
+    assert off == len(buf), (off, len(buf))
+    if any(array_builder.missing):
+        return None
+    return finish_columnar(array_builder.values)
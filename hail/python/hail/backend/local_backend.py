@@ -14,6 +14,7 @@ from hail.expr.table_type import ttable
 from hail.expr.matrix_type import tmatrix
 from hail.expr.blockmatrix_type import tblockmatrix
 from hail.ir.renderer import CSERenderer
+from hail.utils.columnar import columnar
 from hail.table import Table
 from hail.matrixtable import MatrixTable
 
@@ -247,6 +248,14 @@ class LocalBackend(Py4JBackend):
 
         return (value, timings) if timed else value
 
+    def execute_columnar(self, ir, timed=False):
+        jir = self._to_java_value_ir(ir)
+        result = json.loads(self._jhc.backend().executeJSON(jir))
+        value = columnar(ir.typ, json.loads(result['value']), convert=True)
+        timings = result['timings']
+
+        return (value, timings) if timed else value
+
     def value_type(self, ir):
         jir = self._to_java_value_ir(ir)
         return dtype(jir.typ().toString())
@@ -1,4 +1,3 @@
-import pkg_resources
 import sys
 import os
 import json
@@ -10,14 +9,17 @@ import pyspark
 
 import hail
 from hail.utils.java import FatalError, Env, scala_package_object, scala_object
-from hail.expr.types import dtype
+from hail.expr.types import dtype, ttuple, tvoid
 from hail.expr.table_type import ttable
 from hail.expr.matrix_type import tmatrix
 from hail.expr.blockmatrix_type import tblockmatrix
 from hail.ir.renderer import CSERenderer
+from hail.utils.columnar import columnar
+from hail.experimental.codec import BUFFER_SPEC
 from hail.table import Table
 from hail.matrixtable import MatrixTable
 
+from . import binary_decoder
 from .py4j_backend import Py4JBackend
 from ..hail_logging import Logger
 
@@ -141,6 +143,7 @@ class SparkBackend(Py4JBackend):
     def __init__(self, idempotent, sc, spark_conf, app_name, master,
                  local, log, quiet, append, min_block_size,
                  branching_factor, tmpdir, local_tmpdir, skip_logging_configuration, optimizer_iterations):
+        import pkg_resources
         if pkg_resources.resource_exists(__name__, "hail-all-spark.jar"):
             hail_jar_path = pkg_resources.resource_filename(__name__, "hail-all-spark.jar")
             assert os.path.exists(hail_jar_path), f'{hail_jar_path} does not exist'
@@ -290,12 +293,39 @@ class SparkBackend(Py4JBackend):
     def _to_java_blockmatrix_ir(self, ir):
         return self._to_java_ir(ir, self._parse_blockmatrix_ir)
 
+    def _use_json_results(self, typ):
+        # the binary decoder only understands the default encoding of the
+        # canonical physical types
+        flags = self._jhc.flags()
+        return typ == tvoid or any(
+            flags.get(flag) is not None
+            for flag in ('use_json_results', 'use_packed_int_encoding', 'use_column_encoding',
+                         'use_spicy_ptypes'))
+
     def execute(self, ir, timed=False):
         jir = self._to_java_value_ir(ir)
         # print(self._hail_package.expr.ir.Pretty.apply(jir, True, -1))
-        result = json.loads(self._jhc.backend().executeJSON(jir))
-        value = ir.typ._from_json(result['value'])
-        timings = result['timings']
+        if self._use_json_results(ir.typ):
+            result = json.loads(self._jhc.backend().executeJSON(jir))
+            value = ir.typ._from_json(result['value'])
+            timings = result['timings']
+        else:
+            result = self._jhc.backend().executeEncode(jir, BUFFER_SPEC)
+            value = binary_decoder.decode(ttuple(ir.typ), result._1(), result._2())[0]
+            timings = json.loads(result._3())
+
+        return (value, timings) if timed else value
+
+    def execute_columnar(self, ir, timed=False):
+        jir = self._to_java_value_ir(ir)
+        if self._use_json_results(ir.typ):
+            result = json.loads(self._jhc.backend().executeJSON(jir))
+            value = columnar(ir.typ, json.loads(result['value']), convert=True)
+            timings = result['timings']
+        else:
+            result = self._jhc.backend().executeEncode(jir, BUFFER_SPEC)
+            value = binary_decoder.decode_columnar(ttuple(ir.typ), result._1(), result._2())
+            timings = json.loads(result._3())
 
         return (value, timings) if timed else value
 
@@ -2,7 +2,6 @@ import sys
 import os
 from urllib.parse import urlparse, urlunparse
 
-import pkg_resources
 from pyspark import SparkContext
 
 import hail
@@ -309,6 +308,7 @@ def version():
     str
     """
     if hail.__version__ is None:
+        import pkg_resources
         # https://stackoverflow.com/questions/6028000/how-to-read-a-static-file-from-inside-a-python-package
         hail.__version__ = pkg_resources.resource_string(__name__, 'hail_version').decode().strip()
     return hail.__version__
@@ -317,6 +317,7 @@ def version():
 def _hail_cite_url():
     v = version()
     [tag, sha_prefix] = v.split("-")
+    import pkg_resources
     if pkg_resources.resource_exists(__name__, "hail-all-spark.jar"):
         # pip installed
         return f"https://github.com/hail-is/hail/releases/tag/{tag}"
@@ -448,6 +449,7 @@ def _get_flags(*flags):
 
 
 def debug_info():
+    import pkg_resources
     hail_jar_path = None
     if pkg_resources.resource_exists(__name__, "hail-all-spark.jar"):
         hail_jar_path = pkg_resources.resource_filename(__name__, "hail-all-spark.jar")
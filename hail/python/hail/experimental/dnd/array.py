@@ -1,4 +1,6 @@
+import os
 import json
+import concurrent.futures
 import numpy as np
 from typing import Optional, Tuple
 
@@ -39,6 +41,9 @@ class DNDArray:
     """
 
     default_block_size = 4096
+    # products whose operands and result together have at most this many
+    # elements are computed eagerly on the driver; off by default
+    local_matmul_max_elements = 0
     fast_codec_spec = json.dumps({
         "name": "BlockingBufferSpec",
         "blockSize": 64 * 1024,
@@ -125,6 +130,36 @@ class DNDArray:
             for j in range(n_block_cols)])
         return DNDArray(t)
 
+    @staticmethod
+    def from_numpy(
+            a: np.ndarray,
+            *,
+            block_size: Optional[int] = None
+    ) -> 'DNDArray':
+        if block_size is None:
+            block_size = DNDArray.default_block_size
+        n_rows, n_cols = a.shape
+        n_block_rows = (n_rows + block_size - 1) // block_size
+        n_block_cols = (n_cols + block_size - 1) // block_size
+        dtype = hl.tndarray(hl.dtype(str(a.dtype)), 2)
+        t = Table.parallelize(
+            [hl.Struct(r=r, c=c, block=np.ascontiguousarray(
+                a[(r * block_size):((r + 1) * block_size), (c * block_size):((c + 1) * block_size)]))
+             for r in range(n_block_rows)
+             for c in range(n_block_cols)],
+            schema=hl.tstruct(r=hl.tint32, c=hl.tint32, block=dtype),
+            key=['r', 'c'],
+            n_partitions=max(1, n_block_rows * n_block_cols))
+        t = t.select_globals(
+            r_field='r',
+            c_field='c',
+            n_rows=n_rows,
+            n_cols=n_cols,
+            n_block_rows=n_block_rows,
+            n_block_cols=n_block_cols,
+            block_size=block_size)
+        return DNDArray(t)
+
     def __init__(self, t: Table) -> 'DNDArray':
         assert 'r' in t.row
         assert 'c' in t.row
@@ -172,6 +207,10 @@ class DNDArray:
         assert left.n_cols == right.n_rows
         assert left.n_block_cols == right.n_block_rows
 
+        if left.n_rows * left.n_cols + right.n_rows * right.n_cols + left.n_rows * right.n_cols \
+                <= DNDArray.local_matmul_max_elements:
+            return left._local_matmul(right)
+
         n_rows = left.n_rows
         n_cols = right.n_cols
         block_size = left.block_size
@@ -193,16 +232,6 @@ class DNDArray:
         o = o._key_by_assert_sorted('k', 'c', 'r')
         o = o.annotate(right=right.m[o.k, o.c].block)
         o = o.annotate(product=o.left @ o.right)
-
-        # FIXME: use ndarray sum / fma
-        def ndarray_to_array(ndarray):
-            return hl.rbind(
-                ndarray.shape[0],
-                ndarray.shape[1],
-                lambda n_rows, n_cols: hl.range(hl.int(n_rows * n_cols)).map(
-                    lambda absolute: o.product[absolute % n_rows, absolute // n_rows]))
-        o = o.annotate(shape=o.product.shape,
-                       product=ndarray_to_array(o.product))
         o = o._key_by_assert_sorted('r', 'c', 'k')
         o = o._key_by_assert_sorted('r', 'c')
 
@@ -212,10 +241,7 @@ class DNDArray:
 
         o = Table(ir.TableAggregateByKey(
             o._tir,
-            hl.struct(
-                shape=hl.agg.take(o.shape, 1)[0],
-                block=hl.agg.array_sum(o.product))._ir))
-        o = o.annotate(block=hl.nd.from_column_major(o.block, o.shape))
+            hl.struct(block=hl.agg.ndarray_sum(o.product))._ir))
         o = o.select('block')
         o = o.select_globals(
             r_field='r',
@@ -227,6 +253,28 @@ class DNDArray:
             block_size=block_size)
         return DNDArray(o)
 
+    def _local_matmul(self, right: 'DNDArray') -> 'DNDArray':
+        left = self.collect()
+        right_ = right.collect()
+        block_size = self.block_size
+        result = np.empty((left.shape[0], right_.shape[1]),
+                          dtype=np.result_type(left.dtype, right_.dtype))
+
+        # numpy releases the GIL in matmul, so the output blocks are computed
+        # in parallel, each written into its slice of the result
+        def multiply_block(r, c):
+            rows = slice(r * block_size, (r + 1) * block_size)
+            cols = slice(c * block_size, (c + 1) * block_size)
+            np.matmul(left[rows, :], right_[:, cols], out=result[rows, cols])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = [pool.submit(multiply_block, r, c)
+                       for r in range(self.n_block_rows)
+                       for c in range(right.n_block_cols)]
+            for future in futures:
+                future.result()
+        return DNDArray.from_numpy(result, block_size=block_size)
+
     def write(self, *args, **kwargs) -> 'DNDArray':
         return self.m.write(*args, **kwargs)
 
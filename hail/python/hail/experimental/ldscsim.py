@@ -28,7 +28,6 @@ from hail.table import Table
 from hail.utils.java import Env
 import numpy as np
 import pandas as pd
-import scipy.stats as stats
 
 
 @typecheck(mt=MatrixTable,
@@ -882,6 +881,7 @@ def binarize(mt, y, K, exact=False):
         mt = mt.annotate_cols(y_binarized=tb[mt['y_' + uid]].y_binarized)
         mt = mt.key_cols_by(*map(lambda x: mt[x], key))
     else:  # use inverse CDF
+        import scipy.stats as stats
         y_stats = mt.aggregate_cols(hl.agg.stats(y))
         threshold = stats.norm.ppf(1 - K, loc=y_stats.mean, scale=y_stats.stdev)
         mt = mt.annotate_cols(y_binarized=y > threshold)
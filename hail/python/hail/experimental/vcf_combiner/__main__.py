@@ -26,6 +26,7 @@ def main():
     parser.add_argument('--overwrite', help='overwrite the output path', action='store_true')
     parser.add_argument('--key-by-locus-and-alleles', help='Key by both locus and alleles in the final output.', action='store_true')
     parser.add_argument('--reference-genome', default='GRCh38', help='Reference genome.')
+    parser.add_argument('--max-concurrent-jobs', type=int, default=1, help='Maximum number of jobs of a phase to run at the same time.')
     args = parser.parse_args()
     hl.init(log=args.log)
 
@@ -43,7 +44,8 @@ def main():
                  target_records=args.target_records,
                  overwrite=args.overwrite,
                  reference_genome=args.reference_genome,
-                 key_by_locus_and_alleles=args.key_by_locus_and_alleles)
+                 key_by_locus_and_alleles=args.key_by_locus_and_alleles,
+                 max_concurrent_jobs=args.max_concurrent_jobs)
 
 
 if __name__ == '__main__':
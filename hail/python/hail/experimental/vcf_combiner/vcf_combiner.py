@@ -1,7 +1,10 @@
 """An experimental library for combining (g)VCFS into sparse matrix tables"""
 # these are necessary for the diver script included at the end of this file
+import hashlib
+import json
 import math
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Tuple, Dict
 
 import hail as hl
@@ -471,6 +474,82 @@ class CombinerConfig(object):
         return CombinerPlan(file_size, phases)
 
 
+class CombinerManifest(object):
+    """The plan of a :func:`.run_combiner` run and the outputs of its finished
+    merges, persisted as JSON so that an interrupted run can be resumed."""
+
+    version = 1
+
+    def __init__(self,
+                 path: str,
+                 plan_id: str,
+                 plan: CombinerPlan,
+                 outputs: List[List[List[Optional[str]]]]):
+        self.path = path
+        self.plan_id = plan_id
+        self.plan = plan
+        # phase => job => merge => output path, once written
+        self.outputs = outputs
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load_or_create(cls, path: str, plan_id: str, plan: CombinerPlan) -> 'CombinerManifest':
+        outputs = [[[None for _ in job.merges] for job in phase.jobs] for phase in plan.phases]
+        manifest = cls(path, plan_id, plan, outputs)
+        if hl.hadoop_exists(path):
+            with hl.hadoop_open(path) as f:
+                data = json.load(f)
+            if data.get('version') == cls.version and data.get('plan_id') == plan_id:
+                for phase_i, phase in enumerate(data['phases']):
+                    for job_i, job in enumerate(phase['jobs']):
+                        for merge_i, merge in enumerate(job['merges']):
+                            outputs[phase_i][job_i][merge_i] = merge['output']
+                n_finished = sum(output is not None for phase in outputs for job in phase for output in job)
+                info(f"GVCF combiner: resuming from manifest '{path}' with {n_finished} finished "
+                     f"{hl.utils.misc.plural('merge', n_finished)}.")
+            else:
+                info(f"GVCF combiner: ignoring manifest '{path}' for a different plan.")
+        else:
+            manifest.write()
+        return manifest
+
+    def write(self):
+        data = {
+            'version': self.version,
+            'plan_id': self.plan_id,
+            'phases': [
+                {'jobs': [
+                    {'merges': [
+                        {'inputs': merge.inputs,
+                         'n_samples': merge.input_total_size,
+                         'output': self.outputs[phase_i][job_i][merge_i]}
+                        for merge_i, merge in enumerate(job.merges)]}
+                    for job_i, job in enumerate(phase.jobs)]}
+                for phase_i, phase in enumerate(self.plan.phases)]
+        }
+        with hl.hadoop_open(self.path, 'w') as f:
+            json.dump(data, f)
+
+    def output(self, phase_i: int, job_i: int, merge_i: int) -> Optional[str]:
+        return self.outputs[phase_i][job_i][merge_i]
+
+    def finish(self, phase_i: int, job_i: int, outputs: Dict[int, str]):
+        with self._lock:
+            for merge_i, output in outputs.items():
+                self.outputs[phase_i][job_i][merge_i] = output
+            self.write()
+
+
+def _plan_id(**parameters) -> str:
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _merge_output_valid(path: str) -> bool:
+    # outputs are recorded in the manifest after they are written, and
+    # _SUCCESS is written last, so a recorded output with _SUCCESS is complete
+    return hl.hadoop_exists(f'{path}/_SUCCESS')
+
+
 def run_combiner(sample_paths: List[str],
                  out_file: str,
                  tmp_path: str,
@@ -483,9 +562,19 @@ def run_combiner(sample_paths: List[str],
                  overwrite: bool = False,
                  reference_genome: str = 'default',
                  contig_recoding: Optional[Dict[str, str]] = None,
-                 key_by_locus_and_alleles: bool = False):
+                 key_by_locus_and_alleles: bool = False,
+                 max_concurrent_jobs: int = 1):
     """Run the Hail VCF combiner, performing a hierarchical merge to create a combined sparse matrix table.
 
+    Notes
+    -----
+    The plan and the outputs of finished merges are recorded in a manifest
+    in a subdirectory of `tmp_path` determined by the arguments. If a run is
+    interrupted, running the combiner again with the same arguments skips
+    merges whose outputs were recorded and are still readable with the
+    expected number of samples. If the input GVCFs change, remove that
+    directory or use a different `tmp_path`.
+
     Parameters
     ----------
     sample_paths : :obj:`list` of :obj:`str`
@@ -517,16 +606,32 @@ def run_combiner(sample_paths: List[str],
         differently-formatted data onto known references.
     key_by_locus_and_alleles : :obj:`bool`
         Key by both locus and alleles in the final output.
+    max_concurrent_jobs : :obj:`int`
+        Maximum number of jobs of a phase to run at the same time.
 
     Returns
     -------
     None
 
     """
-    tmp_path += f'/combiner-temporary/{uuid.uuid4()}/'
     if header is not None:
         assert sample_names is not None
         assert len(sample_names) == len(sample_paths)
+    if max_concurrent_jobs < 1:
+        raise ValueError(f'max_concurrent_jobs must be positive, found {max_concurrent_jobs}')
+
+    plan_id = _plan_id(sample_paths=sample_paths,
+                       out_file=out_file,
+                       intervals=[str(i) for i in intervals] if intervals is not None else None,
+                       header=header,
+                       sample_names=sample_names,
+                       branch_factor=branch_factor,
+                       batch_size=batch_size,
+                       target_records=target_records,
+                       reference_genome=str(reference_genome),
+                       contig_recoding=contig_recoding,
+                       key_by_locus_and_alleles=key_by_locus_and_alleles)
+    tmp_path += f'/combiner-temporary/{plan_id}/'
 
     # FIXME: this should be hl.default_reference().even_intervals_contig_boundary
     intervals = intervals or default_exome_intervals(reference_genome)
@@ -535,39 +640,82 @@ def run_combiner(sample_paths: List[str],
                             batch_size=batch_size,
                             target_records=target_records)
     plan = config.plan(len(sample_paths))
+    manifest = CombinerManifest.load_or_create(tmp_path + 'manifest.json', plan_id, plan)
+
+    # (phase_i, job_i, merge_i) => whether its output was found, checked
+    # once per run
+    found_outputs: Dict[Tuple[int, int, int], bool] = {}
+
+    def output_valid(phase_i, job_i, merge_i):
+        key = (phase_i, job_i, merge_i)
+        if key not in found_outputs:
+            output = manifest.output(phase_i, job_i, merge_i)
+            found_outputs[key] = output is not None and _merge_output_valid(output)
+        return found_outputs[key]
 
-    files_to_merge = sample_paths
     n_phases = len(plan.phases)
-    total_ops = len(files_to_merge) * n_phases
-    total_work_done = 0
+    total_ops = len(sample_paths) * n_phases
+
+    # resume after the last phase whose outputs are all present
+    start_phase = 0
+    for phase_i in reversed(range(n_phases)):
+        phase = plan.phases[phase_i]
+        if all(output_valid(phase_i, job_i, merge_i)
+               for job_i, job in enumerate(phase.jobs)
+               for merge_i in range(len(job.merges))):
+            start_phase = phase_i + 1
+            break
+    if start_phase == 0:
+        files_to_merge = sample_paths
+    else:
+        info(f"GVCF combiner: phases 1 through {start_phase} already finished.")
+        files_to_merge = [manifest.output(start_phase - 1, job_i, merge_i)
+                          for job_i, job in enumerate(plan.phases[start_phase - 1].jobs)
+                          for merge_i in range(len(job.merges))]
+    total_work_done = len(sample_paths) * start_phase
+    progress_lock = threading.Lock()
     for phase_i, phase in enumerate(plan.phases):
-        phase_i += 1  # used for info messages, 1-indexed for readability
-
+        if phase_i < start_phase:
+            continue
+        final_phase = phase_i + 1 == n_phases
         n_jobs = len(phase.jobs)
-        merge_str = 'input GVCFs' if phase_i == 1 else 'intermediate sparse matrix tables'
+        merge_str = 'input GVCFs' if phase_i == 0 else 'intermediate sparse matrix tables'
         job_str = hl.utils.misc.plural('job', n_jobs)
-        info(f"Starting phase {phase_i}/{n_phases}, merging {len(files_to_merge)} {merge_str} in {n_jobs} {job_str}.")
+        info(f"Starting phase {phase_i + 1}/{n_phases}, merging {len(files_to_merge)} {merge_str} in {n_jobs} {job_str}.")
+
+        # merges still to run, by job
+        pending: List[List[int]] = []
+        for job_i, job in enumerate(phase.jobs):
+            job_pending = []
+            for merge_i, merge in enumerate(job.merges):
+                if output_valid(phase_i, job_i, merge_i):
+                    total_work_done += merge.input_total_size
+                else:
+                    job_pending.append(merge_i)
+            pending.append(job_pending)
+            if not job_pending:
+                info(f"Skipping phase {phase_i + 1}/{n_phases}, job {job_i + 1}/{n_jobs}: already finished.")
 
-        if phase_i > 1:
+        if any(pending) and phase_i > 0:
             intervals = calculate_new_intervals(hl.read_matrix_table(files_to_merge[0]).rows(),
                                                 config.target_records,
                                                 reference_genome=reference_genome)
 
-        new_files_to_merge = []
-
-        for job_i, job in enumerate(phase.jobs):
-            job_i += 1  # used for info messages, 1-indexed for readability
-
-            n_merges = len(job.merges)
+        def run_job(job_i: int):
+            nonlocal total_work_done
+            job = phase.jobs[job_i]
+            job_pending = pending[job_i]
+            n_merges = len(job_pending)
             merge_str = hl.utils.misc.plural('file', n_merges)
-            pct_total = 100 * job.input_total_size / total_ops
+            pct_total = 100 * sum(job.merges[i].input_total_size for i in job_pending) / total_ops
             info(
-                f"Starting phase {phase_i}/{n_phases}, job {job_i}/{len(phase.jobs)} to create {n_merges} merged {merge_str}, corresponding to ~{pct_total:.1f}% of total I/O.")
+                f"Starting phase {phase_i + 1}/{n_phases}, job {job_i + 1}/{n_jobs} to create {n_merges} merged {merge_str}, corresponding to ~{pct_total:.1f}% of total I/O.")
             merge_mts: List[MatrixTable] = []
-            for merge in job.merges:
+            for merge_i in job_pending:
+                merge = job.merges[merge_i]
                 inputs = [files_to_merge[i] for i in merge.inputs]
 
-                if phase_i == 1:
+                if phase_i == 0:
                     mts = [transform_gvcf(vcf)
                            for vcf in hl.import_gvcfs(inputs, intervals, array_elements_required=False,
                                                       _external_header=header,
@@ -580,7 +728,7 @@ def run_combiner(sample_paths: List[str],
 
                 merge_mts.append(combine_gvcfs(mts))
 
-            if phase_i == n_phases:  # final merge!
+            if final_phase:  # final merge!
                 assert n_jobs == 1
                 assert len(merge_mts) == 1
                 [final_mt] = merge_mts
@@ -588,21 +736,44 @@ def run_combiner(sample_paths: List[str],
                 if key_by_locus_and_alleles:
                     final_mt = MatrixTable(MatrixKeyRowsBy(final_mt._mir, ['locus', 'alleles'], is_sorted=True))
                 final_mt.write(out_file, overwrite=overwrite)
-                new_files_to_merge = [out_file]
-                info(f"Finished phase {phase_i}/{n_phases}, job {job_i}/{len(phase.jobs)}, 100% of total I/O finished.")
-                break
-
-            tmp = f'{tmp_path}_phase{phase_i}_job{job_i}/'
+                manifest.finish(phase_i, job_i, {job_pending[0]: out_file})
+                info(f"Finished phase {phase_i + 1}/{n_phases}, job {job_i + 1}/{n_jobs}, 100% of total I/O finished.")
+                return
+
+            # a job that is rerun writes to a new directory, so that outputs
+            # of its merges that are still valid are left in place
+            attempt = 0
+            while True:
+                tmp = f'{tmp_path}_phase{phase_i + 1}_job{job_i + 1}' + (f'_attempt{attempt}' if attempt else '') + '/'
+                if not any(manifest.output(phase_i, job_i, i) is not None
+                           and manifest.output(phase_i, job_i, i).startswith(tmp)
+                           for i in range(len(job.merges))):
+                    break
+                attempt += 1
             hl.experimental.write_matrix_tables(merge_mts, tmp, overwrite=True)
             pad = len(str(len(merge_mts)))
-            new_files_to_merge.extend(tmp + str(n).zfill(pad) + '.mt' for n in range(len(merge_mts)))
-            total_work_done += job.input_total_size
+            manifest.finish(phase_i, job_i,
+                            {merge_i: tmp + str(n).zfill(pad) + '.mt' for n, merge_i in enumerate(job_pending)})
+            with progress_lock:
+                total_work_done += sum(job.merges[i].input_total_size for i in job_pending)
+                pct_done = 100 * total_work_done / total_ops
             info(
-                f"Finished {phase_i}/{n_phases}, job {job_i}/{len(phase.jobs)}, {100 * total_work_done / total_ops:.1f}% of total I/O finished.")
-
-        info(f"Finished phase {phase_i}/{n_phases}.")
-
-        files_to_merge = new_files_to_merge
+                f"Finished {phase_i + 1}/{n_phases}, job {job_i + 1}/{n_jobs}, {pct_done:.1f}% of total I/O finished.")
+
+        jobs_to_run = [job_i for job_i, job_pending in enumerate(pending) if job_pending]
+        if max_concurrent_jobs == 1 or len(jobs_to_run) <= 1:
+            for job_i in jobs_to_run:
+                run_job(job_i)
+        else:
+            with ThreadPoolExecutor(max_workers=max_concurrent_jobs) as executor:
+                for _ in executor.map(run_job, jobs_to_run):
+                    pass
+
+        info(f"Finished phase {phase_i + 1}/{n_phases}.")
+
+        files_to_merge = [manifest.output(phase_i, job_i, merge_i)
+                          for job_i, job in enumerate(phase.jobs)
+                          for merge_i in range(len(job.merges))]
 
     assert files_to_merge == [out_file]
 
@@ -1,7 +1,7 @@
 from .aggregators import approx_cdf, approx_quantiles, approx_median, collect, collect_as_set, count, count_where, \
-    counter, any, all, take, min, max, sum, array_sum, mean, stats, product, fraction, \
+    counter, any, all, take, min, max, sum, array_sum, ndarray_sum, mean, stats, product, fraction, \
     hardy_weinberg_test, explode, filter, inbreeding, call_stats, info_score, \
-    hist, linreg, corr, group_by, downsample, array_agg, _prev_nonnull
+    hist, hist2d, histdd, linreg, corr, group_by, downsample, array_agg, _prev_nonnull
 
 __all__ = [
     'approx_cdf',
@@ -19,6 +19,7 @@ __all__ = [
     'max',
     'sum',
     'array_sum',
+    'ndarray_sum',
     'mean',
     'stats',
     'product',
@@ -30,6 +31,8 @@ __all__ = [
     'call_stats',
     'info_score',
     'hist',
+    'hist2d',
+    'histdd',
     'linreg',
     'corr',
     'group_by',
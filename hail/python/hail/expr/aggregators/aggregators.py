@@ -5,8 +5,8 @@ import hail as hl
 from hail.expr.expressions import ExpressionException, Expression, \
     ArrayExpression, SetExpression, BooleanExpression, Int64Expression, \
     NumericExpression, DictExpression, StructExpression, Float64Expression, \
-    StringExpression, \
-    expr_any, expr_oneof, expr_array, expr_set, expr_bool, expr_numeric, \
+    StringExpression, NDArrayNumericExpression, \
+    expr_any, expr_oneof, expr_array, expr_ndarray, expr_set, expr_bool, expr_numeric, \
     expr_int32, expr_int64, expr_float64, expr_call, expr_str, \
     unify_all, construct_expr, Indices, Aggregation, to_expr
 from hail.expr.types import hail_type, tint32, tint64, tfloat32, tfloat64, \
@@ -14,7 +14,7 @@ from hail.expr.types import hail_type, tint32, tint64, tfloat32, tfloat64, \
 from hail.expr.functions import rbind, float32, _quantile_from_cdf
 import hail.ir as ir
 from hail.typecheck import TypeChecker, typecheck_method, typecheck, \
-    sequenceof, func_spec, identity, nullable, oneof
+    sequenceof, func_spec, identity, nullable, oneof, numeric, sized_tupleof
 from hail.utils import wrap_to_list
 from hail.utils.java import Env
 
@@ -780,6 +780,35 @@ def array_sum(expr) -> ArrayExpression:
     return array_agg(hl.agg.sum, expr)
 
 
+@typecheck(expr=expr_ndarray(expr_oneof(expr_int64, expr_float64)))
+def ndarray_sum(expr) -> NDArrayNumericExpression:
+    """Compute the element-wise sum of all records of `expr`.
+
+    Examples
+    --------
+    Compute the sum of `C1` and `C2`:
+
+    >>> table1.aggregate(hl.agg.ndarray_sum(hl.nd.array([table1.C1, table1.C2])))
+    array([ 25, 282])
+
+    Notes
+    ------
+    All records must have the same shape. Unlike :func:`array_sum`, each
+    record is added to the running sum in place, so no intermediate
+    ndarrays are allocated. Missing records are ignored; if every record is
+    missing, the result is missing.
+
+    Parameters
+    ----------
+    expr : :class:`.NDArrayNumericExpression`
+
+    Returns
+    -------
+    :class:`.NDArrayNumericExpression` with element type :py:data:`.tint64` or :py:data:`.tfloat64`
+    """
+    return _agg_func('NDArraySum', [expr], expr.dtype)
+
+
 @typecheck(expr=expr_float64)
 def mean(expr) -> Float64Expression:
     """Compute the mean value of records of `expr`.
@@ -1301,6 +1330,173 @@ def hist(expr, start, end, bins) -> StructExpression:
     return _result_from_hist_agg_f(start, end, bins, freq_dict)
 
 
+def _histdd_bins(ranges, bins):
+    if isinstance(bins, int):
+        bins = [bins] * len(ranges)
+    if len(bins) != len(ranges):
+        raise ValueError(f"'histdd': expected {len(ranges)} bin counts, one per dimension, found {len(bins)}")
+    edges = []
+    n_bins = 1
+    for (start, end), nbins in zip(ranges, bins):
+        if nbins <= 0:
+            raise ValueError(f"'histdd' requires positive 'bins', but bins={nbins}")
+        start = float(start)
+        end = float(end)
+        bin_size = (end - start) / nbins
+        if not (bin_size > 0 and bin_size != float('inf')):
+            raise ValueError(f"'histdd': start={start} end={end} bins={nbins} requires positive bin size.")
+        edges.append([start + i * bin_size for i in range(nbins)] + [end])
+        n_bins *= nbins
+    if n_bins >= 2 ** 31:
+        raise ValueError(f"'histdd': too many bins, {n_bins}")
+    return bins, edges, n_bins
+
+
+def _histdd_bin_index(v, edges):
+    start = edges[0]
+    end = edges[-1]
+    nbins = len(edges) - 1
+    bin_size = (end - start) / nbins
+    return (hl.case()
+            .when(~((v >= start) & (v <= end)), -1)
+            .default(hl.min(hl.int32(hl.floor((v - start) / bin_size)), nbins - 1)))
+
+
+@typecheck(exprs=sequenceof(expr_float64),
+           ranges=sequenceof(sized_tupleof(numeric, numeric)),
+           bins=oneof(int, sequenceof(int)))
+def histdd(exprs, ranges, bins=10) -> StructExpression:
+    """Compute binned counts of points in several dimensions.
+
+    Examples
+    --------
+    Count entries in a 3-dimensional grid:
+
+    >>> dataset.aggregate_entries(hl.agg.histdd([hl.float(dataset.GQ), hl.float(dataset.DP), dataset.pheno.age],
+    ...                                          [(0, 100), (0, 50), (20, 70)],
+    ...                                          [10, 10, 5]))  # doctest: +SKIP_OUTPUT_CHECK
+
+    Notes
+    -----
+    Each record is assigned to its bin by arithmetic on the bin size, and
+    counts are accumulated in a dense array of all the bins, in a single
+    pass; the work per record grows with the total number of bins.
+
+    This method returns a struct expression with three fields:
+
+     - `bin_edges` (:class:`.tarray` of :class:`.tarray` of :py:data:`.tfloat64`):
+       The bin edges of each dimension. Bin `i` of dimension `d` contains
+       values in the left-inclusive, right-exclusive range
+       ``[ bin_edges[d][i], bin_edges[d][i+1] )``, except the last bin,
+       which also contains its right edge.
+     - `bin_freq` (:class:`.tarray` of :py:data:`.tint64`): Bin
+       frequencies, in row-major order: the last dimension varies fastest.
+     - `n_outside` (:py:data:`.tint64`): The number of records outside the
+       range in some dimension, or NaN in some dimension.
+
+    Records missing in any dimension are not counted.
+
+    Parameters
+    ----------
+    exprs : :obj:`list` of :class:`.Float64Expression`
+        Coordinates of each record.
+    ranges : :obj:`list` of (:obj:`float`, :obj:`float`)
+        Start and end of the histogram range of each dimension.
+    bins : :obj:`int` or :obj:`list` of :obj:`int`
+        Number of bins in every dimension, or in each dimension.
+
+    Returns
+    -------
+    :class:`.StructExpression`
+        Struct expression with fields `bin_edges`, `bin_freq`, and `n_outside`.
+    """
+    if len(exprs) == 0:
+        raise ValueError("'histdd' requires at least one dimension")
+    if len(exprs) != len(ranges):
+        raise ValueError(f"'histdd': expected {len(exprs)} ranges, one per dimension, found {len(ranges)}")
+    bins, edges, n_bins = _histdd_bins(ranges, bins)
+
+    def bin_index(*vs):
+        indices = [_histdd_bin_index(v, e) for v, e in zip(vs, edges)]
+        outside = hl.any(lambda i: i < 0, hl.array(indices))
+        index = indices[0]
+        for i, nbins in zip(indices[1:], bins[1:]):
+            index = index * nbins + i
+        return hl.cond(outside, -1, index)
+
+    def counts(index):
+        # one-hot in the record's bin, all zeros if it is outside
+        bin_freq = hl.agg.array_sum(hl.range(0, n_bins).map(lambda i: hl.int64(i == index)))
+        return hl.struct(
+            bin_edges=hl.literal(edges, tarray(tarray(tfloat64))),
+            bin_freq=hl.or_else(bin_freq, hl.range(0, n_bins).map(lambda i: hl.int64(0))),
+            n_outside=hl.agg.count_where(index < 0))
+
+    return hl.bind(
+        lambda *vs: hl.agg.filter(hl.all(lambda v: hl.is_defined(v), hl.array(list(vs))),
+                                  counts(bin_index(*vs))),
+        *exprs, _ctx=_agg_func.context)
+
+
+@typecheck(x=expr_float64, y=expr_float64,
+           x_range=sized_tupleof(numeric, numeric), y_range=sized_tupleof(numeric, numeric),
+           bins=oneof(int, sized_tupleof(int, int)))
+def hist2d(x, y, x_range, y_range, bins=10) -> StructExpression:
+    """Compute binned counts of points in two dimensions.
+
+    Examples
+    --------
+    Count entries by `GQ` and `DP`:
+
+    >>> dataset.aggregate_entries(hl.agg.hist2d(hl.float(dataset.GQ), hl.float(dataset.DP),
+    ...                                         (0, 100), (0, 50), bins=(10, 5)))  # doctest: +SKIP_OUTPUT_CHECK
+
+    Notes
+    -----
+    This method returns a struct expression with four fields:
+
+     - `x_edges` (:class:`.tarray` of :py:data:`.tfloat64`): Bin edges in `x`.
+     - `y_edges` (:class:`.tarray` of :py:data:`.tfloat64`): Bin edges in `y`.
+     - `bin_freq` (:class:`.tarray` of :class:`.tarray` of :py:data:`.tint64`):
+       Bin frequencies. ``bin_freq[i][j]`` is the number of records in bin `i`
+       of `x` and bin `j` of `y`.
+     - `n_outside` (:py:data:`.tint64`): The number of records outside either
+       range.
+
+    Bins are left-inclusive and right-exclusive, except the last bin of each
+    dimension, which also contains its right edge. Records missing in either
+    dimension are not counted. See :func:`histdd` for more dimensions.
+
+    Parameters
+    ----------
+    x : :class:`.Float64Expression`
+        X coordinate of each record.
+    y : :class:`.Float64Expression`
+        Y coordinate of each record.
+    x_range : (:obj:`float`, :obj:`float`)
+        Start and end of the histogram range in `x`.
+    y_range : (:obj:`float`, :obj:`float`)
+        Start and end of the histogram range in `y`.
+    bins : :obj:`int` or (:obj:`int`, :obj:`int`)
+        Number of bins in both dimensions, or in `x` and in `y`.
+
+    Returns
+    -------
+    :class:`.StructExpression`
+        Struct expression with fields `x_edges`, `y_edges`, `bin_freq`, and `n_outside`.
+    """
+    if isinstance(bins, int):
+        bins = (bins, bins)
+    y_bins = bins[1]
+    return hl.bind(
+        lambda h: hl.struct(
+            x_edges=h.bin_edges[0],
+            y_edges=h.bin_edges[1],
+            bin_freq=hl.range(0, bins[0]).map(lambda i: h.bin_freq[i * y_bins:(i + 1) * y_bins]),
+            n_outside=h.n_outside),
+        histdd([x, y], [x_range, y_range], list(bins)))
+
+
 @typecheck(x=expr_float64, y=expr_float64, label=nullable(oneof(expr_str, expr_array(expr_str))), n_divisions=int)
 def downsample(x, y, label=None, n_divisions=500) -> ArrayExpression:
     """Downsample (x, y) coordinate datapoints.
@@ -14,7 +14,7 @@ from .expression_typecheck import expr_any, expr_int32, expr_int64, \
     expr_float32, expr_float64, expr_call, expr_bool, expr_str, expr_locus, \
     expr_interval, expr_array, expr_ndarray, expr_set, expr_dict, expr_tuple, \
     expr_struct, expr_oneof, expr_numeric, coercer_from_dtype
-from .expression_utils import analyze, eval_timed, eval, eval_typed, \
+from .expression_utils import analyze, eval_timed, eval, eval_typed, eval_many, \
     extract_refs_by_indices, get_refs, matrix_table_source, table_source, \
     check_entry_indexed, check_row_indexed
 
@@ -61,6 +61,7 @@ __all__ = ['Indices',
            'extract_refs_by_indices',
            'eval',
            'eval_typed',
+           'eval_many',
            'eval_timed',
            'expr_any',
            'expr_int32',
@@ -967,8 +967,8 @@ class Expression(object):
                 file_contents = header_table.union(file_contents)
             file_contents.export(path, delimiter=delimiter, header=False)
 
-    @typecheck_method(n=int, _localize=bool)
-    def take(self, n, _localize=True):
+    @typecheck_method(n=int, _localize=bool, columnar=bool)
+    def take(self, n, _localize=True, *, columnar=False):
         """Collect the first `n` records of an expression.
 
         Examples
@@ -987,20 +987,25 @@ class Expression(object):
         ----------
         n : int
             Number of records to take.
+        columnar : :obj:`bool`
+            If ``True``, return the records stored by column, as
+            :meth:`.Expression.collect` does.
 
         Returns
         -------
-        :obj:`list`
+        :obj:`list`, :class:`.ColumnarTable` or :class:`.Column`
         """
         uid = Env.get_uid()
         name, t = self._to_table(uid)
         e = t.take(n, _localize=False).map(lambda r: r[name])
         if _localize:
+            if columnar:
+                return Env.backend().execute_columnar(e._ir)
             return hl.eval(e)
         return e
 
-    @typecheck_method(_localize=bool)
-    def collect(self, _localize=True):
+    @typecheck_method(_localize=bool, columnar=bool)
+    def collect(self, _localize=True, *, columnar=False):
         """Collect all records of an expression into a local list.
 
         Examples
@@ -1019,14 +1024,23 @@ class Expression(object):
         -------
         The list of records may be very large.
 
+        Parameters
+        ----------
+        columnar : :obj:`bool`
+            If ``True``, return the records stored by column: a
+            :class:`.ColumnarTable` for a struct expression, otherwise a
+            :class:`.Column`, whose numeric values are a NumPy array.
+
         Returns
         -------
-        :obj:`list`
+        :obj:`list`, :class:`.ColumnarTable` or :class:`.Column`
         """
         uid = Env.get_uid()
         name, t = self._to_table(uid)
         e = t.collect(_localize=False).map(lambda r: r[name])
         if _localize:
+            if columnar:
+                return Env.backend().execute_columnar(e._ir)
             return hl.eval(e)
         return e
 
@@ -222,6 +222,83 @@ def eval_typed(expression):
     return eval(expression), expression.dtype
 
 
+@typecheck(exprs=expr_any)
+def eval_many(*exprs):
+    """Evaluate several Hail expressions in a single backend call,
+    returning their results in order.
+
+    Each expression may be an expression as accepted by :func:`.eval`, or an
+    aggregation over the rows of a :class:`.Table`, or over the rows, columns,
+    or entries of a :class:`.MatrixTable`, as accepted by
+    :meth:`.Table.aggregate` and the :class:`.MatrixTable` aggregate methods.
+    Aggregations over the same axes of the same source are computed together,
+    in one pass over the data.
+
+    Examples
+    --------
+    Evaluate several aggregations of a table and a literal at once:
+
+    >>> sum_x, mean_x, n_hets, s = hl.eval_many(hl.agg.sum(table1.X),
+    ...                                         hl.agg.mean(table1.X),
+    ...                                         hl.agg.count_where(dataset.GT.is_het()),
+    ...                                         hl.str(5))  # doctest: +SKIP_OUTPUT_CHECK
+
+    Parameters
+    ----------
+    exprs : varargs of :class:`.Expression`
+        Expressions, or Python values that can be implicitly interpreted as expressions.
+
+    Returns
+    -------
+    :obj:`list`
+    """
+    import hail as hl
+    from hail.utils.java import Env
+
+    # (id(source), aggregation axes) => (source, [(index, expr)]);
+    # expressions without aggregations have axes None
+    groups = {}
+    results = [None] * len(exprs)
+    scalar_parts = []
+    for i, expr in enumerate(exprs):
+        source = expr._indices.source
+        if source is None:
+            if expr._aggregations:
+                raise ExpressionException(f"'eval_many': expression {i} aggregates but has no source")
+            analyze('eval_many', expr, Indices(None))
+            scalar_parts.append((i, expr))
+            continue
+        if expr._aggregations:
+            axes = frozenset(axis for a in expr._aggregations for axis in a.agg_axes())
+        else:
+            axes = None
+        groups.setdefault((id(source), axes), (source, []))[1].append((i, expr))
+
+    parts = [hl.tuple([expr for _, expr in scalar_parts])]
+    for (_, axes), (source, group) in groups.items():
+        fields = hl.struct(**{f'_{i}': expr for i, expr in group})
+        if axes is None:
+            analyze('eval_many', fields, Indices(source))
+            uid = Env.get_uid()
+            parts.append(source.select_globals(**{uid: fields}).index_globals()[uid])
+        elif isinstance(source, hl.Table):
+            parts.append(source.aggregate(fields, _localize=False))
+        elif axes == {source._row_axis}:
+            parts.append(source.aggregate_rows(fields, _localize=False))
+        elif axes == {source._col_axis}:
+            parts.append(source.aggregate_cols(fields, _localize=False))
+        else:
+            parts.append(source.aggregate_entries(fields, _localize=False))
+
+    values = eval(hl.tuple(parts))
+    for (i, _), value in zip(scalar_parts, values[0]):
+        results[i] = value
+    for (_, group), value in zip(groups.values(), values[1:]):
+        for i, _ in group:
+            results[i] = value[f'_{i}']
+    return results
+
+
 def _get_refs(expr: Expression, builder: Dict[str, Indices]) -> None:
     from hail.ir import GetField, TopLevelReference
 
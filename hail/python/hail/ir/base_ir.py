@@ -17,6 +17,10 @@ def _env_bind(env, bindings):
 
 
 class BaseIR(Renderable):
+    # memoized structural hash; nodes are not modified after construction,
+    # except for their lazily computed type, which is kept out of the hash
+    _hash = None
+
     def __init__(self, *children):
         super().__init__()
         self._type = None
@@ -59,7 +63,27 @@ class BaseIR(Renderable):
         return
 
     def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.children == other.children and self._eq(other)
+        # iterative, since pipelines can be deeper than the recursion limit
+        stack = [(self, other)]
+        visited = set()
+        while stack:
+            x, y = stack.pop()
+            if x is y:
+                continue
+            if not isinstance(x, BaseIR):
+                if x != y:
+                    return False
+                continue
+            if (id(x), id(y)) in visited:
+                continue
+            if not (isinstance(y, x.__class__)
+                    and hash(x) == hash(y)
+                    and len(x.children) == len(y.children)
+                    and x._eq(y)):
+                return False
+            visited.add((id(x), id(y)))
+            stack.extend(zip(x.children, y.children))
+        return True
 
     def __ne__(self, other):
         return not self == other
@@ -78,8 +102,33 @@ class BaseIR(Renderable):
         """
         return True
 
+    def _hash_head(self):
+        """Non-child attributes of the BaseIR included in its hash.
+
+        Nodes equal under :meth:`._eq` must have equal heads.  The head
+        must not depend on the lazily computed type, since the hash is
+        memoized.
+
+        Returns
+        -------
+        hashable
+        """
+        return self.head_str()
+
     def __hash__(self):
-        return 31 + hash(str(self))
+        if self._hash is None:
+            # compute bottom-up, memoizing each subtree's hash
+            stack = [self]
+            while stack:
+                x = stack[-1]
+                pending = [c for c in x.children if isinstance(c, BaseIR) and c._hash is None]
+                if pending:
+                    stack.extend(pending)
+                else:
+                    stack.pop()
+                    if x._hash is None:
+                        x._hash = hash((x.__class__, x._hash_head(), *x.children))
+        return self._hash
 
     def new_block(self, i: int) -> bool:
         return self.renderable_new_block(self.renderable_idx_of_child(i))
@@ -545,6 +545,10 @@ class MakeArray(IR):
     def _eq(self, other):
         return other._type == self._type
 
+    def _hash_head(self):
+        # the type is computed lazily when it is not given
+        return None
+
     def _compute_type(self, env, agg_env):
         for a in self.args:
             a._compute_type(env, agg_env)
@@ -1582,16 +1586,12 @@ class BaseApplyAggOp(IR):
         assert all(map(lambda c: len(c.aggregations) == 0, self.children))
         return [self]
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and \
-            other.agg_op == self.agg_op and \
-            other.init_op_args == self.init_op_args and \
-            other.seq_op_args == self.seq_op_args
+    def _eq(self, other):
+        return other.agg_op == self.agg_op and \
+            len(other.init_op_args) == len(self.init_op_args)
 
-    def __hash__(self):
-        return hash(tuple([self.agg_op,
-                           tuple(self.init_op_args),
-                           tuple(self.seq_op_args)]))
+    def _hash_head(self):
+        return (self.agg_op, len(self.init_op_args))
 
     def _compute_type(self, env, agg_env):
         for a in self.init_op_args:
@@ -1667,12 +1667,11 @@ class MakeStruct(IR):
     def render_children(self, r):
         return [InsertFields.IFRenderField(escape_id(f), x) for f, x in self.fields]
 
-    def __eq__(self, other):
-        return isinstance(other, MakeStruct) \
-            and other.fields == self.fields
+    def _eq(self, other):
+        return [f for f, _ in other.fields] == [f for f, _ in self.fields]
 
-    def __hash__(self):
-        return hash(tuple(self.fields))
+    def _hash_head(self):
+        return tuple(f for f, _ in self.fields)
 
     def _compute_type(self, env, agg_env):
         for f, x in self.fields:
@@ -1764,14 +1763,12 @@ class InsertFields(IR):
             *(InsertFields.IFRenderField(escape_id(f), x) for f, x in self.fields)
         ]
 
-    def __eq__(self, other):
-        return isinstance(other, InsertFields) and \
-            other.old == self.old and \
-            other.fields == self.fields and \
+    def _eq(self, other):
+        return [f for f, _ in other.fields] == [f for f, _ in self.fields] and \
             other.field_order == self.field_order
 
-    def __hash__(self):
-        return hash((self.old, tuple(self.fields), tuple(self.field_order) if self.field_order else None))
+    def _hash_head(self):
+        return (tuple(f for f, _ in self.fields), tuple(self.field_order) if self.field_order else None)
 
     def _compute_type(self, env, agg_env):
         self.old._compute_type(env, agg_env)
@@ -24,6 +24,9 @@ def register_aggregators():
     register_aggregator('Sum', (), (dtype('array<int64>'),), dtype('array<int64>'))
     register_aggregator('Sum', (), (dtype('array<float64>'),), dtype('array<float64>'))
 
+    register_aggregator('NDArraySum', (), (dtype('ndarray<int64, ?nat>'),), dtype('ndarray<int64, ?nat>'))
+    register_aggregator('NDArraySum', (), (dtype('ndarray<float64, ?nat>'),), dtype('ndarray<float64, ?nat>'))
+
     register_aggregator('CollectAsSet', (), (dtype("?in"),), dtype('set<?in>'))
 
     register_aggregator('Product', (), (dtype('int64'),), dtype('int64'))
@@ -15,10 +15,8 @@ from hail.expr import Expression, ExpressionException, \
 from hail.expr.types import tbool, tarray, tfloat64, tint32
 from hail import ir
 from hail.genetics.reference_genome import reference_genome_type
-from hail.linalg import BlockMatrix
 from hail.matrixtable import MatrixTable
 from hail.methods.misc import require_biallelic, require_row_key_variant, require_col_key_str
-from hail.stats import LinearMixedModel
 from hail.table import Table
 from hail.typecheck import typecheck, nullable, numeric, oneof, sequenceof, \
     enumeration, anytype
@@ -1072,6 +1070,9 @@ def linear_mixed_model(y,
         The type is block matrix if the model is low rank (i.e., if `z_t` is set
         and :math:`n > m`).
     """
+    from hail.linalg import BlockMatrix
+    from hail.stats import LinearMixedModel
+
     source = matrix_table_source('linear_mixed_model/y', y)
 
     if ((z_t is None and k is None)
@@ -1119,7 +1120,7 @@ def linear_mixed_model(y,
 
 
 @typecheck(entry_expr=expr_float64,
-           model=LinearMixedModel,
+           model=lambda: hail.stats.LinearMixedModel,
            pa_t_path=nullable(str),
            a_t_path=nullable(str),
            mean_impute=bool,
@@ -1246,6 +1247,8 @@ def linear_mixed_regression_rows(entry_expr,
     -------
     :class:`.Table`
     """
+    from hail.linalg import BlockMatrix
+
     mt = matrix_table_source('linear_mixed_regression_rows', entry_expr)
     n = mt.count_cols()
 
@@ -1977,6 +1980,8 @@ def pc_relate(call_expr, min_individual_maf, *, k=None, scores_expr=None,
     :class:`.Table`
         A :class:`.Table` mapping pairs of samples to their pair-wise statistics.
     """
+    from hail.linalg import BlockMatrix
+
     mt = matrix_table_source('pc_relate/call_expr', call_expr)
 
     if k and scores_expr is None:
@@ -2415,7 +2420,7 @@ def split_multi_hts(ds, keep_star=False, left_aligned=False, vep_root='vep', *,
 
 
 @typecheck(call_expr=expr_call)
-def genetic_relatedness_matrix(call_expr) -> BlockMatrix:
+def genetic_relatedness_matrix(call_expr):
     r"""Compute the genetic relatedness matrix (GRM).
 
     Examples
@@ -2472,6 +2477,8 @@ def genetic_relatedness_matrix(call_expr) -> BlockMatrix:
         Genetic relatedness matrix for all samples. Row and column indices
         correspond to matrix table column index.
     """
+    from hail.linalg import BlockMatrix
+
     mt = matrix_table_source('genetic_relatedness_matrix/call_expr', call_expr)
     check_entry_indexed('genetic_relatedness_matrix/call_expr', call_expr)
 
@@ -2490,7 +2497,7 @@ def genetic_relatedness_matrix(call_expr) -> BlockMatrix:
 
 
 @typecheck(call_expr=expr_call)
-def realized_relationship_matrix(call_expr) -> BlockMatrix:
+def realized_relationship_matrix(call_expr):
     r"""Computes the realized relationship matrix (RRM).
 
     Examples
@@ -2545,6 +2552,8 @@ def realized_relationship_matrix(call_expr) -> BlockMatrix:
         Realized relationship matrix for all samples. Row and column indices
         correspond to matrix table column index.
     """
+    from hail.linalg import BlockMatrix
+
     mt = matrix_table_source('realized_relationship_matrix/call_expr', call_expr)
     check_entry_indexed('realized_relationship_matrix/call_expr', call_expr)
 
@@ -2563,7 +2572,7 @@ def realized_relationship_matrix(call_expr) -> BlockMatrix:
 
 
 @typecheck(entry_expr=expr_float64, block_size=nullable(int))
-def row_correlation(entry_expr, block_size=None) -> BlockMatrix:
+def row_correlation(entry_expr, block_size=None):
     """Computes the correlation matrix between row vectors.
 
     Examples
@@ -2658,6 +2667,8 @@ def row_correlation(entry_expr, block_size=None) -> BlockMatrix:
         Correlation matrix between row vectors. Row and column indices
         correspond to matrix table row index.
     """
+    from hail.linalg import BlockMatrix
+
     bm = BlockMatrix.from_entry_expr(entry_expr, mean_impute=True, center=True, normalize=True, block_size=block_size)
     return bm @ bm.T
 
@@ -2667,7 +2678,7 @@ def row_correlation(entry_expr, block_size=None) -> BlockMatrix:
            radius=oneof(int, float),
            coord_expr=nullable(expr_float64),
            block_size=nullable(int))
-def ld_matrix(entry_expr, locus_expr, radius, coord_expr=None, block_size=None) -> BlockMatrix:
+def ld_matrix(entry_expr, locus_expr, radius, coord_expr=None, block_size=None):
     """Computes the windowed correlation (linkage disequilibrium) matrix between
     variants.
 
@@ -3509,6 +3520,8 @@ def ld_prune(call_expr, r2=0.2, bp_window_size=1000000, memory_per_core=256, kee
     :class:`.Table`
         Table of a maximal independent set of variants.
     """
+    from hail.linalg import BlockMatrix
+
     if block_size is None:
         block_size = BlockMatrix.default_block_size()
 
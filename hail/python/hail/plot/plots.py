@@ -605,7 +605,7 @@ def histogram2d(x: NumericExpression,
     -------
     :class:`bokeh.plotting.figure.Figure`
     """
-    data = _generate_hist2d_data(x, y, bins, range).to_pandas()
+    data = _generate_hist2d_data(x, y, bins, range)
 
     # Use python prettier float -> str function
     data['x'] = data['x'].apply(lambda e: str(float(e)))
@@ -668,33 +668,24 @@ def _generate_hist2d_data(x, y, bins, range):
         x_range, y_range = range
     if x_range is None or y_range is None:
         warning('At least one range was not defined in histogram_2d. Doing two passes...')
-        ranges = source.aggregate(hail.struct(x_stats=hail.agg.stats(x),
-                                              y_stats=hail.agg.stats(y)))
+        ranges = source.aggregate(hail.struct(x_min=hail.agg.min(x), x_max=hail.agg.max(x),
+                                              y_min=hail.agg.min(y), y_max=hail.agg.max(y)))
         if x_range is None:
-            x_range = (ranges.x_stats.min, ranges.x_stats.max)
+            x_range = (ranges.x_min, ranges.x_max)
         if y_range is None:
-            y_range = (ranges.y_stats.min, ranges.y_stats.max)
+            y_range = (ranges.y_min, ranges.y_max)
     else:
         warning('If x_range or y_range are specified in histogram_2d, and there are points '
                 'outside of these ranges, they will not be plotted')
     x_range = list(map(float, x_range))
     y_range = list(map(float, y_range))
-    x_spacing = (x_range[1] - x_range[0]) / x_bins
-    y_spacing = (y_range[1] - y_range[0]) / y_bins
 
-    def frange(start, stop, step):
-        from itertools import count, takewhile
-        return takewhile(lambda x: x <= stop, count(start, step))
-
-    x_levels = hail.literal(list(frange(x_range[0], x_range[1], x_spacing))[::-1])
-    y_levels = hail.literal(list(frange(y_range[0], y_range[1], y_spacing))[::-1])
-    grouped_ht = source.group_by(
-        x=hail.str(x_levels.find(lambda w: x >= w)),
-        y=hail.str(y_levels.find(lambda w: y >= w))
-    ).aggregate(c=hail.agg.count())
-    data = grouped_ht.filter(hail.is_defined(grouped_ht.x) & (grouped_ht.x != str(x_range[1]))
-                             & hail.is_defined(grouped_ht.y) & (grouped_ht.y != str(y_range[1])))
-    return data
+    h = source.aggregate(aggregators.hist2d(hail.float64(x), hail.float64(y), x_range, y_range, (x_bins, y_bins)))
+    freq = np.array(h.bin_freq, dtype=np.int64).reshape((x_bins, y_bins))
+    xs, ys = np.nonzero(freq)
+    return pd.DataFrame({'x': np.array(h.x_edges[:-1])[xs],
+                         'y': np.array(h.y_edges[:-1])[ys],
+                         'c': freq[xs, ys]})
 
 
 def _collect_scatter_plot_data(
@@ -1485,12 +1476,14 @@ def visualize_missingness(entry_field, row_field=None, column_field=None,
         mt = mt._select_all(row_exprs={'_new_row_key': row_field},
                             entry_exprs={'is_defined': hail.is_defined(entry_field)})
     ht = mt.localize_entries('entry_fields', 'phenos')
-    ht = ht.select(entry_fields=ht.entry_fields.map(lambda entry: entry.is_defined))
-    data = ht.entry_fields.collect()
+    # collect the row labels with the entries, in a single pass
+    collected = ht.select(_row_label=hail.str(ht._new_row_key),
+                          entry_fields=ht.entry_fields.map(lambda entry: entry.is_defined)).collect()
+    rows = [row._row_label for row in collected]
+    data = [row.entry_fields for row in collected]
     if len(data) > 200:
         warning(f'Missingness dataset has {len(data)} rows. '
                 f'This may take {"a very long time" if len(data) > 1000 else "a few minutes"} to plot.')
-    rows = hail.str(ht._new_row_key).collect()
 
     df = pd.DataFrame(data)
     df = df.rename(columns=dict(enumerate(columns))).rename(index=dict(enumerate(rows)))
@@ -247,7 +247,7 @@ class LinearMixedModel(object):
     likelihood ratio test:
 
     - :meth:`fit_alternatives_numpy` takes one or two ndarrays. It is a pure Python
-      method that evaluates alternatives serially on master.
+      method that evaluates alternatives in blocks on master.
 
     - :meth:`fit_alternatives` takes one or two paths to block matrices. It
       evaluates alternatives in parallel on the workers.
@@ -746,16 +746,24 @@ class LinearMixedModel(object):
         return Table._from_java(backend._jbackend.pyFitLinearMixedModel(
             self._scala_model, jpa_t, maybe_ja_t))
 
-    @typecheck_method(pa=np.ndarray, a=nullable(np.ndarray), return_pandas=bool)
-    def fit_alternatives_numpy(self, pa, a=None, return_pandas=False):
+    @typecheck_method(pa=np.ndarray, a=nullable(np.ndarray), return_pandas=bool,
+                      block_size=int, n_threads=int)
+    def fit_alternatives_numpy(self, pa, a=None, return_pandas=False, block_size=4096, n_threads=1):
         r"""Fit and test alternative model for each augmented design matrix.
 
         Notes
         -----
-        This Python-only implementation runs serially on master. See
+        This Python-only implementation runs on master. See
         the scalable implementation :meth:`fit_alternatives` for documentation
         of the returned table.
 
+        Alternatives are fit together in blocks of `block_size` columns, using
+        matrix products rather than a solve per alternative. Memory beyond the
+        inputs and results is proportional to `block_size` times `n_threads`,
+        so `pa` and `a` may be memory-mapped arrays with many columns. With
+        `n_threads` greater than one, blocks are fit concurrently by a pool
+        of threads.
+
         Parameters
         ----------
         pa: :class:`ndarray`
@@ -767,64 +775,110 @@ class LinearMixedModel(object):
             Required for low-rank inference.
         return_pandas: :obj:`bool`
             If true, return pandas dataframe. If false, return Hail table.
+        block_size: :obj:`int`
+            Number of alternatives to fit together.
+        n_threads: :obj:`int`
+            Number of blocks to fit concurrently.
 
         Returns
         -------
         :class:`.Table` or :class:`.pandas.DataFrame`
             Table of results for each augmented design matrix.
         """
+        from scipy.linalg import cho_factor
+
         self._check_dof(self.f + 1)
 
         if not self._fitted:
             raise Exception("null model is not fit. Run 'fit' first.")
+        if block_size <= 0:
+            raise ValueError(f'block_size must be positive, found {block_size}')
+        if n_threads <= 0:
+            raise ValueError(f'n_threads must be positive, found {n_threads}')
 
         n_cols = pa.shape[1]
         assert pa.shape[0] == self.r
 
         if self.low_rank:
             assert a.shape[0] == self.n and a.shape[1] == n_cols
-            data = [(i,) + self._fit_alternative_numpy(pa[:, i], a[:, i]) for i in range(n_cols)]
+
+        xdx_cho = cho_factor(self._xdx_alt[1:, 1:])
+
+        beta = np.empty(n_cols)
+        sigma_sq = np.empty(n_cols)
+        chi_sq = np.empty(n_cols)
+        p_value = np.empty(n_cols)
+
+        def fit_block(start):
+            end = min(start + block_size, n_cols)
+            (beta[start:end],
+             sigma_sq[start:end],
+             chi_sq[start:end],
+             p_value[start:end]) = self._fit_alternatives_block(
+                xdx_cho, pa[:, start:end], a[:, start:end] if self.low_rank else None)
+
+        starts = range(0, n_cols, block_size)
+        if n_threads == 1 or len(starts) <= 1:
+            for start in starts:
+                fit_block(start)
         else:
-            data = [(i,) + self._fit_alternative_numpy(pa[:, i], None) for i in range(n_cols)]
+            from concurrent.futures import ThreadPoolExecutor
 
-        df = pd.DataFrame.from_records(data, columns=['idx', 'beta', 'sigma_sq', 'chi_sq', 'p_value'])
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                for _ in executor.map(fit_block, starts):
+                    pass
+
+        df = pd.DataFrame({'idx': np.arange(n_cols, dtype=np.int64),
+                           'beta': beta,
+                           'sigma_sq': sigma_sq,
+                           'chi_sq': chi_sq,
+                           'p_value': p_value},
+                          columns=['idx', 'beta', 'sigma_sq', 'chi_sq', 'p_value'])
 
         if return_pandas:
             return df
         else:
             return Table.from_pandas(df, key='idx')
 
-    def _fit_alternative_numpy(self, pa, a):
-        from scipy.linalg import solve, LinAlgError
+    def _fit_alternatives_block(self, xdx_cho, pa, a):
+        from scipy.linalg import cho_solve
         from scipy.stats.distributions import chi2
 
         gamma = self.gamma
-        dpa = self._d_alt * pa
+        dpa = self._d_alt[:, np.newaxis] * pa
 
-        # single thread => no need to copy
-        ydy = self._ydy_alt
-        xdy = self._xdy_alt
-        xdx = self._xdx_alt
+        # first row of the augmented xdx and first entry of xdy, per column
+        xdy0 = self.py @ dpa
+        xdx00 = np.einsum('ij,ij->j', pa, dpa)
+        xdx0 = self.px.T @ dpa
 
         if self.low_rank:
-            xdy[0] = self.py @ dpa + gamma * (self.y @ a)
-            xdx[0, 0] = pa @ dpa + gamma * (a @ a)
-            xdx[0, 1:] = self.px.T @ dpa + gamma * (self.x.T @ a)
-        else:
-            xdy[0] = self.py @ dpa
-            xdx[0, 0] = pa @ dpa
-            xdx[0, 1:] = self.px.T @ dpa
-
-        try:
-            beta = solve(xdx, xdy, assume_a='pos')  # only uses upper triangle
-            residual_sq = ydy - xdy.T @ beta
+            xdy0 += gamma * (self.y @ a)
+            xdx00 += gamma * np.einsum('ij,ij->j', a, a)
+            xdx0 += gamma * (self.x.T @ a)
+
+        # Eliminating the null covariates, whose block of xdx is shared by all
+        # alternatives, leaves beta_star = t / schur, where schur is the Schur
+        # complement of that block. The augmented xdx is positive definite
+        # exactly when schur is positive; relative to xdx00, a schur at the
+        # level of rounding error means x_star is collinear with the covariates.
+        xdx_inv_xdx0 = cho_solve(xdx_cho, xdx0)
+        schur = xdx00 - np.einsum('ij,ij->j', xdx0, xdx_inv_xdx0)
+        t = xdy0 - self._xdy_alt[1:] @ xdx_inv_xdx0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = t / schur
+            reduction = t * beta  # in residual_sq relative to the null model
+            residual_sq = self._residual_sq - reduction
             sigma_sq = residual_sq / self._dof_alt
-            chi_sq = self.n * np.log(self._residual_sq / residual_sq)  # division => precision
+            chi_sq = -self.n * np.log1p(-reduction / self._residual_sq)  # division => precision
             p_value = chi2.sf(chi_sq, 1)
 
-            return beta[0], sigma_sq, chi_sq, p_value
-        except LinAlgError:
-            return tuple(4 * [float('nan')])
+        singular = ~(schur > xdx00 * (self.f + 1) * np.finfo(np.float64).eps)
+        for x in (beta, sigma_sq, chi_sq, p_value):
+            x[singular] = float('nan')
+
+        return beta, sigma_sq, chi_sq, p_value
 
     def _set_scala_model(self):
         from hail.utils.java import Env
@@ -1851,8 +1851,8 @@ class Table(ExprContainer):
         """
         return Env.backend().unpersist_table(self)
 
-    @typecheck_method(_localize=bool)
-    def collect(self, _localize=True):
+    @typecheck_method(_localize=bool, columnar=bool)
+    def collect(self, _localize=True, *, columnar=False):
         """Collect the rows of the table into a local list.
 
         Examples
@@ -1861,19 +1861,37 @@ class Table(ExprContainer):
 
         >>> all_xs = [row['X'] for row in table1.select(table1.X).collect()]
 
+        Collect the rows by column:
+
+        >>> rows = table1.collect(columnar=True)
+        >>> mean_height = rows['HT'].values.mean()
+
         Notes
         -----
         This method returns a list whose elements are of type :class:`.Struct`. Fields
         of these structs can be accessed similarly to fields on a table, using dot
         methods (``struct.foo``) or string indexing (``struct['foo']``).
 
+        With `columnar`, this method instead returns a :class:`.ColumnarTable`,
+        which stores each field in a column: NumPy arrays for numeric fields and
+        offset buffers for strings and collections.  This takes much less memory
+        and time than constructing a :class:`.Struct` per row.  Indexing it with
+        an integer returns a view of that row, and
+        :meth:`.ColumnarTable.to_pandas` shares the numeric columns with the
+        data frame.
+
         Warning
         -------
         Using this method can cause out of memory errors. Only collect small tables.
 
+        Parameters
+        ----------
+        columnar : :obj:`bool`
+            If ``True``, return the rows stored by column.
+
         Returns
         -------
-        :obj:`list` of :class:`.Struct`
+        :obj:`list` of :class:`.Struct` or :class:`.ColumnarTable`
             List of rows.
         """
         if len(self.key) > 0:
@@ -1883,6 +1901,8 @@ class Table(ExprContainer):
         rows_ir = ir.GetField(ir.TableCollect(t._tir), 'rows')
         e = construct_expr(rows_ir, hl.tarray(t.row.dtype))
         if _localize:
+            if columnar:
+                return Env.backend().execute_columnar(e._ir)
             return Env.backend().execute(e._ir)
         else:
             return e
@@ -2050,8 +2070,8 @@ class Table(ExprContainer):
 
         return Table(ir.TableUnion([table._tir for table in all_tables]))
 
-    @typecheck_method(n=int, _localize=bool)
-    def take(self, n, _localize=True):
+    @typecheck_method(n=int, _localize=bool, columnar=bool)
+    def take(self, n, _localize=True, *, columnar=False):
         """Collect the first `n` rows of the table into a local list.
 
         Examples
@@ -2077,14 +2097,17 @@ class Table(ExprContainer):
         ----------
         n : int
             Number of rows to take.
+        columnar : :obj:`bool`
+            If ``True``, return the rows stored by column, as
+            :meth:`.Table.collect` does.
 
         Returns
         -------
-        :obj:`list` of :class:`.Struct`
+        :obj:`list` of :class:`.Struct` or :class:`.ColumnarTable`
             List of row structs.
         """
 
-        return self.head(n).collect(_localize)
+        return self.head(n).collect(_localize, columnar=columnar)
 
     @typecheck_method(n=int)
     def head(self, n) -> 'Table':
@@ -1,7 +1,8 @@
 from .check import TypeChecker, typecheck, typecheck_method, anytype, anyfunc, \
     nullable, sequenceof, tupleof, sized_tupleof, sliceof, dictof, \
     linked_list, setof, oneof, exactly, numeric, char, lazy, enumeration, \
-    identity, transformed, func_spec, table_key_type, TypecheckFailure
+    identity, transformed, func_spec, table_key_type, TypecheckFailure, \
+    set_typecheck_enabled, typecheck_enabled
 
 __all__ = [
     'TypeChecker',
@@ -27,5 +28,7 @@ __all__ = [
     'transformed',
     'func_spec',
     'table_key_type',
-    'TypecheckFailure'
+    'TypecheckFailure',
+    'set_typecheck_enabled',
+    'typecheck_enabled'
 ]
@@ -2,6 +2,8 @@ import re
 import inspect
 import abc
 import collections
+import functools
+import os
 from decorator import decorator
 
 
@@ -605,12 +607,195 @@ def typecheck(**checkers):
     return _make_dec(checkers, is_method=False)
 
 
+class _TypecheckConfig:
+    def __init__(self):
+        self.enabled = os.environ.get('HAIL_DISABLE_TYPECHECK') is None
+
+
+_config = _TypecheckConfig()
+
+
+def set_typecheck_enabled(enabled):
+    """Enable or disable argument validation for functions decorated with
+    :func:`typecheck` and :func:`typecheck_method`.
+
+    Checkers that convert their arguments, such as those that turn Python
+    values into Hail expressions, always run.  Checkers that only test the
+    type of an argument are skipped while validation is disabled, so a
+    wrongly typed argument fails later, if at all.  Validation can also be
+    disabled by setting the ``HAIL_DISABLE_TYPECHECK`` environment variable.
+    """
+    _config.enabled = enabled
+
+
+def typecheck_enabled():
+    return _config.enabled
+
+
+def _accepted_types(checker):
+    """The types `checker` accepts if it is equivalent to an `isinstance`
+    test that returns its argument unchanged, otherwise None."""
+    if isinstance(checker, AnyChecker):
+        return (object,)
+    if isinstance(checker, LiteralChecker):
+        return (checker.t,)
+    if isinstance(checker, ExactlyTypeChecker) and checker.reference_equality and checker.v is None:
+        return (type(None),)
+    if isinstance(checker, MultipleTypeChecker):
+        types = []
+        for c in checker.checkers:
+            ts = _accepted_types(c)
+            if ts is None:
+                return None
+            types.extend(ts)
+        return tuple(types)
+    return None
+
+
+def _compile(f, checkers, is_method):
+    """Generate a wrapper with the signature of `f` that checks each
+    argument in turn and calls `f`.
+
+    Arguments whose checker is an `isinstance` test are tested inline, and
+    not at all if the checker accepts anything or validation is disabled.
+    On any failure the arguments are checked again with :func:`check_all`,
+    which raises the error.  Returns None if `f` cannot be compiled.
+    """
+    spec = get_signature(f)
+    params = list(spec.parameters.values())
+    if is_method:
+        if not params:
+            return None
+        params = params[1:]
+    if set(p.name for p in params) != set(checkers):
+        # check_all raises the error on the first call
+        return None
+    if any(p.kind == p.POSITIONAL_ONLY for p in params):
+        return None
+
+    namespace = {
+        '__tc_f': f,
+        '__tc_config': _config,
+        '__tc_failure': TypecheckFailure,
+        '__tc_slow': _check_and_call,
+        '__tc_checkers': checkers,
+        '__tc_is_method': is_method,
+        '__tc_name': f.__name__,
+        '__tc_isinstance': isinstance,
+        '__tc_tuple': tuple,
+    }
+    sig_params = []
+    call_args = []
+    slow_args = []
+    slow_kwargs = []
+    validate = []
+    convert = []
+    if is_method:
+        self_name = list(spec.parameters)[0]
+        sig_params.append(self_name)
+        call_args.append(self_name)
+        slow_args.append(self_name)
+    for i, p in enumerate(params):
+        name = p.name
+        checker = checkers[name]
+        local = f'__tc_{i}'
+        types = _accepted_types(checker)
+        if types is not None and object in types:
+            types = ()
+        if types is not None:
+            namespace[f'__tc_t{i}'] = types
+        else:
+            namespace[f'__tc_c{i}'] = checker.check
+
+        if p.kind == p.VAR_POSITIONAL:
+            sig_params.append(f'*{name}')
+            slow_args.append(f'*{name}')
+            if types is None:
+                convert.append(f'{local} = __tc_tuple([__tc_c{i}(__tc_x, __tc_name, {name!r}) for __tc_x in {name}])')
+                call_args.append(f'*{local}')
+            else:
+                if types:
+                    validate.append(f'for __tc_x in {name}:\n'
+                                    f'                if not __tc_isinstance(__tc_x, __tc_t{i}): raise __tc_failure')
+                call_args.append(f'*{name}')
+            continue
+        if p.kind == p.VAR_KEYWORD:
+            sig_params.append(f'**{name}')
+            slow_kwargs.append(f'**{name}')
+            if types is None:
+                convert.append(f'{local} = {{__tc_k: __tc_c{i}(__tc_v, __tc_name, {name!r}) for __tc_k, __tc_v in {name}.items()}}')
+                call_args.append(f'**{local}')
+            else:
+                if types:
+                    validate.append(f'for __tc_x in {name}.values():\n'
+                                    f'                if not __tc_isinstance(__tc_x, __tc_t{i}): raise __tc_failure')
+                call_args.append(f'**{name}')
+            continue
+
+        if p.kind == p.KEYWORD_ONLY and not any(q.startswith('*') for q in sig_params):
+            sig_params.append('*')
+        if p.default is p.empty:
+            sig_params.append(name)
+        else:
+            namespace[f'__tc_d{i}'] = p.default
+            sig_params.append(f'{name}=__tc_d{i}')
+        if types is None:
+            convert.append(f'{local} = __tc_c{i}({name}, __tc_name, {name!r})')
+            value = local
+        else:
+            if types:
+                validate.append(f'if not __tc_isinstance({name}, __tc_t{i}): raise __tc_failure')
+            value = name
+        if p.kind == p.KEYWORD_ONLY:
+            call_args.append(f'{name}={value}')
+            slow_kwargs.append(f'{name!r}: {name}')
+        else:
+            call_args.append(value)
+            slow_args.append(name)
+
+    body = []
+    if validate:
+        body.append('        if __tc_config.enabled:')
+        body.extend(f'            {line}' for line in validate)
+    body.extend(f'        {line}' for line in convert)
+    if not body:
+        body.append('        pass')
+    slow_call = (f'__tc_slow(__tc_f, ({"".join(a + ", " for a in slow_args)}), '
+                 f'{{{", ".join(slow_kwargs)}}}, __tc_checkers, __tc_is_method)')
+    src = (f'def {f.__name__}({", ".join(sig_params)}):\n'
+           f'    try:\n'
+           + '\n'.join(body) + '\n'
+           f'    except __tc_failure:\n'
+           f'        return {slow_call}\n'
+           f'    return __tc_f({", ".join(call_args)})\n')
+    try:
+        code = compile(src, f'<typecheck {f.__qualname__}>', 'exec')
+    except SyntaxError:
+        return None
+    exec(code, namespace)
+    wrapper = namespace[f.__name__]
+    functools.update_wrapper(wrapper, f)
+    wrapper.__signature__ = spec
+    wrapper.__kwdefaults__ = f.__kwdefaults__
+    return wrapper
+
+
+def _check_and_call(f, args, kwargs, checkers, is_method):
+    args_, kwargs_ = check_all(f, args, kwargs, checkers, is_method=is_method)
+    return f(*args_, **kwargs_)
+
+
 def _make_dec(checkers, is_method):
     checkers = {k: only(v) for k, v in checkers.items()}
 
     @decorator
     def wrapper(__original_func, *args, **kwargs):
-        args_, kwargs_ = check_all(__original_func, args, kwargs, checkers, is_method=is_method)
-        return __original_func(*args_, **kwargs_)
+        return _check_and_call(__original_func, args, kwargs, checkers, is_method)
 
-    return wrapper
+    def dec(f):
+        compiled = _compile(f, checkers, is_method)
+        if compiled is None:
+            return wrapper(f)
+        return compiled
+
+    return dec
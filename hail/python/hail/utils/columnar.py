@@ -0,0 +1,525 @@
+"""Columnar containers for collected values.
+
+A collected array is stored as one column per field instead of one
+:class:`.Struct` per element.  Numeric fields are NumPy arrays with an
+optional boolean missing mask; strings, arrays, sets and dicts are
+Arrow-style offset buffers over a flat child column; structs and tuples
+hold one column per field.  Loci, intervals, calls and ndarrays are
+kept as a list of Python values.  Elements are converted to Python
+values only when they are accessed.
+"""
+import array
+from collections.abc import Mapping
+
+import numpy as np
+import pandas
+
+import hail as hl
+from hail.utils.struct import Struct
+
+
+def _get(column, i):
+    return None if column.is_missing(i) else column._value(i)
+
+
+def _missing_mask(missing):
+    if missing is None or not any(missing):
+        return None
+    return np.frombuffer(missing, dtype=np.bool_)
+
+
+class Column:
+    """A column of collected values of a single type.
+
+    Columns support :func:`len`, integer indexing and iteration, which
+    return Python values, with ``None`` for missing values.
+    """
+
+    def __init__(self, dtype, missing):
+        self.dtype = dtype
+        # boolean NumPy array, or None if no value is missing
+        self.missing = missing
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def _value(self, i):
+        raise NotImplementedError
+
+    def is_missing(self, i):
+        return self.missing is not None and bool(self.missing[i])
+
+    def _index(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f'index {i} out of range for column of length {n}')
+        return i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return _get(self, self._index(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _get(self, i)
+
+    def to_list(self):
+        """Convert the column to a list of Python values."""
+        return list(self)
+
+    def to_pandas(self):
+        """Convert the column to a :class:`pandas.Series`."""
+        return pandas.Series(self.to_list(), dtype=object)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(dtype={self.dtype}, length={len(self)})'
+
+
+class NumericColumn(Column):
+    """A column of 32- or 64-bit integers or floats, or booleans.
+
+    :attr:`values` is a NumPy array holding an arbitrary value wherever
+    :attr:`missing` is true.
+    """
+
+    def __init__(self, dtype, values, missing=None):
+        super().__init__(dtype, missing)
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def _value(self, i):
+        return self.values[i].item()
+
+    def to_numpy(self):
+        """Return the values as a NumPy array.
+
+        The array is shared with the column if no value is missing.
+        Missing floats are NaN; integer or boolean columns with missing
+        values are converted to an object array with ``None`` for
+        missing values.
+        """
+        if self.missing is None:
+            return self.values
+        if self.values.dtype.kind == 'f':
+            return np.where(self.missing, np.nan, self.values)
+        result = self.values.astype(object)
+        result[self.missing] = None
+        return result
+
+    def to_pandas(self):
+        """Convert the column to a :class:`pandas.Series`.
+
+        The series shares memory with the column if no value is
+        missing.  Integer columns with missing values share memory as a
+        nullable integer array.
+        """
+        if self.missing is not None and self.values.dtype.kind == 'i':
+            return pandas.Series(pandas.arrays.IntegerArray(self.values, self.missing), copy=False)
+        return pandas.Series(self.to_numpy(), copy=False)
+
+
+class StringColumn(Column):
+    """A column of strings stored as UTF-8 bytes.
+
+    The `i`-th string is ``data[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, dtype, offsets, data, missing=None):
+        super().__init__(dtype, missing)
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _value(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+
+class ArrayColumn(Column):
+    """A column of arrays, sets or dicts.
+
+    The elements of the `i`-th value are ``values[offsets[i]:offsets[i + 1]]``;
+    the elements of a dict column are (key, value) tuples.
+    """
+
+    def __init__(self, dtype, offsets, values, missing=None):
+        super().__init__(dtype, missing)
+        self.offsets = offsets
+        self.values = values
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _value(self, i):
+        values = self.values
+        elements = [_get(values, j) for j in range(self.offsets[i], self.offsets[i + 1])]
+        if isinstance(self.dtype, hl.tset):
+            return set(elements)
+        if isinstance(self.dtype, hl.tdict):
+            return dict(elements)
+        return elements
+
+
+class TupleColumn(Column):
+    """A column of tuples with one column per element."""
+
+    def __init__(self, dtype, fields, length, missing=None):
+        super().__init__(dtype, missing)
+        self.fields = fields
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def _value(self, i):
+        return tuple(_get(f, i) for f in self.fields)
+
+
+class StructColumn(Column):
+    """A column of structs with one column per field.
+
+    Indexing with an integer returns a :class:`.ColumnarRow` view;
+    indexing with a field name returns the column of that field.
+    """
+
+    def __init__(self, dtype, fields, length, missing=None):
+        super().__init__(dtype, missing)
+        self.fields = fields
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            if item not in self.fields:
+                raise KeyError(f'no field {item!r} in {self.dtype}')
+            return self.fields[item]
+        if isinstance(item, slice):
+            return super().__getitem__(item)
+        i = self._index(item)
+        return None if self.is_missing(i) else ColumnarRow(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield None if self.is_missing(i) else ColumnarRow(self, i)
+
+    def _value(self, i):
+        return Struct(**{name: _get(f, i) for name, f in self.fields.items()})
+
+    def to_list(self):
+        """Convert the column to a list of :class:`.Struct`."""
+        return [_get(self, i) for i in range(len(self))]
+
+
+class ColumnarRow(Mapping):
+    """A view of one element of a :class:`.StructColumn`.
+
+    Fields are read from the columns when accessed, by attribute or by
+    name, like the fields of a :class:`.Struct`.  Nested structs are
+    views as well.  Use :meth:`to_struct` to materialize the
+    :class:`.Struct`.
+    """
+
+    __slots__ = ('_column', '_i')
+
+    def __init__(self, column, i):
+        self._column = column
+        self._i = i
+
+    def __getitem__(self, item):
+        return self._column[item][self._i]
+
+    def __getattr__(self, item):
+        # the slots are unset while copy or pickle constructs a row, and
+        # copy and pickle look up special methods
+        if item in ColumnarRow.__slots__ or (item.startswith('__') and item.endswith('__')):
+            raise AttributeError(item)
+        if item not in self._column.fields:
+            raise AttributeError(f'ColumnarRow instance has no field {item!r}')
+        return self[item]
+
+    def __iter__(self):
+        return iter(self._column.fields)
+
+    def __len__(self):
+        return len(self._column.fields)
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.to_struct())
+
+    def to_struct(self):
+        return self._column._value(self._i)
+
+    def __repr__(self):
+        return repr(self.to_struct())
+
+    def __str__(self):
+        return str(self.to_struct())
+
+
+class ColumnarTable(StructColumn):
+    """Rows collected with ``columnar=True``, stored by column.
+
+    Examples
+    --------
+    >>> rows = table1.collect(columnar=True)
+    >>> heights = rows['HT'].values
+    >>> rows[0].SEX
+    'M'
+    >>> df = rows.to_pandas()
+
+    Notes
+    -----
+    ``rows[i]`` is a :class:`.ColumnarRow` that reads its fields from the
+    columns when they are accessed; ``rows['x']`` is the column of field
+    `x`.  :meth:`to_list` returns the same list of :class:`.Struct` as
+    :meth:`.Table.collect`.
+    """
+
+    def __init__(self, dtype, fields, length):
+        super().__init__(dtype, fields, length)
+
+    @property
+    def columns(self):
+        return self.fields
+
+    def to_pandas(self):
+        """Convert the rows to a :class:`pandas.DataFrame`.
+
+        Numeric columns without missing values, and integer columns,
+        are shared with the data frame rather than copied.
+
+        Returns
+        -------
+        :class:`.pandas.DataFrame`
+        """
+        return pandas.DataFrame({name: f.to_pandas() for name, f in self.fields.items()},
+                                copy=False)
+
+    def __repr__(self):
+        return f'ColumnarTable(row_type={self.dtype}, n_rows={len(self)})'
+
+
+def _finish_offsets(offsets):
+    return np.frombuffer(offsets, dtype=np.int64)
+
+
+class NumericBuilder:
+    # array typecode and NumPy dtype
+    _formats = {'int32': ('i', np.int32), 'int64': ('q', np.int64), 'float32': ('f', np.float32),
+                'float64': ('d', np.float64), 'bool': ('b', np.bool_)}
+
+    def __init__(self, dtype, convert):
+        self.dtype = dtype
+        typecode, self.numpy_dtype = self._formats[str(dtype)]
+        self.values = array.array(typecode)
+        self.missing = bytearray()
+        self.convert = dtype._convert_from_json if convert else None
+
+    def append_missing(self):
+        self.values.append(0)
+        self.missing.append(1)
+
+    def append(self, v):
+        if v is None:
+            self.append_missing()
+            return
+        if self.convert is not None:
+            v = self.convert(v)
+        self.values.append(v)
+        self.missing.append(0)
+
+    def finish(self):
+        values = np.frombuffer(self.values, dtype=self.values.typecode)
+        if values.dtype != self.numpy_dtype:
+            values = values.view(self.numpy_dtype)
+        return NumericColumn(self.dtype, values, _missing_mask(self.missing))
+
+
+class StringBuilder:
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.offsets = array.array('q', [0])
+        self.data = bytearray()
+        self.missing = bytearray()
+
+    def append_missing(self):
+        self.offsets.append(len(self.data))
+        self.missing.append(1)
+
+    def append_bytes(self, b):
+        self.data += b
+        self.offsets.append(len(self.data))
+        self.missing.append(0)
+
+    def append(self, v):
+        if v is None:
+            self.append_missing()
+        else:
+            self.append_bytes(v.encode('utf-8'))
+
+    def finish(self):
+        return StringColumn(self.dtype, _finish_offsets(self.offsets), bytes(self.data),
+                            _missing_mask(self.missing))
+
+
+class ArrayBuilder:
+    def __init__(self, dtype, values):
+        self.dtype = dtype
+        self.offsets = array.array('q', [0])
+        self.values = values
+        self.n_values = 0
+        self.missing = bytearray()
+
+    def append_missing(self):
+        self.offsets.append(self.n_values)
+        self.missing.append(1)
+
+    def end_value(self, n):
+        self.n_values += n
+        self.offsets.append(self.n_values)
+        self.missing.append(0)
+
+    def append(self, v):
+        if v is None:
+            self.append_missing()
+            return
+        if isinstance(self.dtype, hl.tdict):
+            v = v.items() if isinstance(v, Mapping) else [(e['key'], e['value']) for e in v]
+        n = 0
+        for e in v:
+            self.values.append(e)
+            n += 1
+        self.end_value(n)
+
+    def finish(self):
+        return ArrayColumn(self.dtype, _finish_offsets(self.offsets), self.values.finish(),
+                           _missing_mask(self.missing))
+
+
+class StructBuilder:
+    def __init__(self, dtype, fields):
+        self.dtype = dtype
+        # list of (name or index, builder)
+        self.fields = fields
+        self.length = 0
+        self.missing = bytearray()
+
+    def append_missing(self):
+        for _, f in self.fields:
+            f.append_missing()
+        self.length += 1
+        self.missing.append(1)
+
+    def end_value(self):
+        self.length += 1
+        self.missing.append(0)
+
+    def append(self, v):
+        if v is None:
+            self.append_missing()
+            return
+        for key, f in self.fields:
+            f.append(v[key])
+        self.end_value()
+
+    def finish(self, cls=None):
+        missing = _missing_mask(self.missing)
+        if isinstance(self.dtype, hl.tstruct):
+            fields = {name: f.finish() for name, f in self.fields}
+            if cls is not None:
+                assert missing is None
+                return cls(self.dtype, fields, self.length)
+            return StructColumn(self.dtype, fields, self.length, missing)
+        return TupleColumn(self.dtype, [f.finish() for _, f in self.fields], self.length, missing)
+
+
+class ObjectBuilder:
+    def __init__(self, dtype, convert):
+        self.dtype = dtype
+        self.values = []
+        self.convert = dtype._convert_from_json if convert else None
+
+    def append_missing(self):
+        self.values.append(None)
+
+    def append(self, v):
+        if v is not None and self.convert is not None:
+            v = self.convert(v)
+        self.values.append(v)
+
+    def finish(self):
+        return ObjectColumn(self.dtype, self.values)
+
+
+class ObjectColumn(Column):
+    """A column of loci, intervals, calls or ndarrays stored as Python values."""
+
+    def __init__(self, dtype, values):
+        super().__init__(dtype, None)
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def is_missing(self, i):
+        return self.values[i] is None
+
+    def _value(self, i):
+        return self.values[i]
+
+
+def column_builder(dtype, convert=False):
+    """Return a builder appending values of type `dtype` to a column.
+
+    If `convert` is true, values are in the JSON representation returned
+    by the backend rather than Python values.
+    """
+    if dtype in (hl.tint32, hl.tint64, hl.tfloat32, hl.tfloat64, hl.tbool):
+        return NumericBuilder(dtype, convert)
+    if dtype == hl.tstr:
+        return StringBuilder(dtype)
+    if isinstance(dtype, (hl.tarray, hl.tset)):
+        return ArrayBuilder(dtype, column_builder(dtype.element_type, convert))
+    if isinstance(dtype, hl.tdict):
+        return ArrayBuilder(dtype, column_builder(hl.ttuple(dtype.key_type, dtype.value_type), convert))
+    if isinstance(dtype, hl.tstruct):
+        return StructBuilder(dtype, [(name, column_builder(t, convert)) for name, t in dtype.items()])
+    if isinstance(dtype, hl.ttuple):
+        return StructBuilder(dtype, [(i, column_builder(t, convert)) for i, t in enumerate(dtype.types)])
+    return ObjectBuilder(dtype, convert)
+
+
+def finish_columnar(builder):
+    """Finish the builder for the elements of a collected array.
+
+    Returns a :class:`.ColumnarTable` for an array of structs and the
+    element :class:`.Column` otherwise.
+    """
+    if isinstance(builder, StructBuilder) and isinstance(builder.dtype, hl.tstruct) and not any(builder.missing):
+        return builder.finish(ColumnarTable)
+    return builder.finish()
+
+
+def columnar(dtype, value, convert=False):
+    """Store the elements of the collected array `value` of type `dtype`
+    by column.  Returns ``None`` if `value` is missing."""
+    if value is None:
+        return None
+    assert isinstance(dtype, (hl.tarray, hl.tset)), dtype
+    builder = column_builder(dtype.element_type, convert)
+    for v in value:
+        builder.append(v)
+    return finish_columnar(builder)
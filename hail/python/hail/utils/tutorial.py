@@ -4,7 +4,6 @@ from .misc import new_temp_file, local_path_uri, new_local_temp_dir
 import os
 import zipfile
 from urllib.request import urlretrieve
-from hailtop.utils import sync_retry_transient_errors
 
 __all__ = [
     'get_1kg',
@@ -56,6 +55,8 @@ def get_1kg(output_dir, overwrite: bool = False):
     overwrite
         If ``True``, overwrite any existing files/directories at `output_dir`.
     """
+    from hailtop.utils import sync_retry_transient_errors
+
     fs = Env.fs()
 
     if not _dir_exists(fs, output_dir):
@@ -119,6 +120,8 @@ def get_movie_lens(output_dir, overwrite: bool = False):
     overwrite
         If ``True``, overwrite existing files/directories at those locations.
     """
+    from hailtop.utils import sync_retry_transient_errors
+
     fs = Env.fs()
 
     if not _dir_exists(fs, output_dir):
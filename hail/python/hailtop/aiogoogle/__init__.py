@@ -1,6 +1,7 @@
 from .auth import Credentials, ApplicationDefaultCredentials, \
     ServiceAccountCredentials, AccessToken, Session
-from .client import ContainerClient, ComputeClient, IAmClient, LoggingClient
+from .client import ContainerClient, ComputeClient, IAmClient, LoggingClient, \
+    StorageClient
 
 __all__ = [
     'Credentials',
@@ -11,5 +12,6 @@ __all__ = [
     'ContainerClient',
     'ComputeClient',
     'IAmClient',
-    'LoggingClient'
+    'LoggingClient',
+    'StorageClient'
 ]
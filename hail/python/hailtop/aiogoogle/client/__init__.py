@@ -2,7 +2,8 @@ from .container_client import ContainerClient
 from .compute_client import ComputeClient
 from .iam_client import IAmClient
 from .logging_client import LoggingClient
+from .storage_client import StorageClient
 
 __all__ = [
-    'ContainerClient', 'ComputeClient', 'IAmClient', 'LoggingClient'
+    'ContainerClient', 'ComputeClient', 'IAmClient', 'LoggingClient', 'StorageClient'
 ]
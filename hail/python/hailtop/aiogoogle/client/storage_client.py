@@ -0,0 +1,323 @@
+from typing import Any, AsyncIterator, List, Mapping, Optional, Union
+import uuid
+import urllib.parse
+import aiohttp
+from hailtop.utils import retry_transient_errors
+from .base_client import BaseClient
+
+
+def _quote(name: str) -> str:
+    return urllib.parse.quote(name, safe='')
+
+
+class PagedObjectIterator:
+    def __init__(self, client: 'StorageClient', bucket: str, params: Mapping[str, Any], request_kwargs: Mapping[str, Any]):
+        self._client = client
+        self._bucket = bucket
+        self._params = params
+        self._request_kwargs = request_kwargs
+        self._page = None
+        self._item_index = None
+
+    def __aiter__(self) -> 'PagedObjectIterator':
+        return self
+
+    async def __anext__(self):
+        if self._page is None:
+            assert 'pageToken' not in self._params
+            self._page = await self._client.get(
+                f'/b/{self._bucket}/o', params=self._params, **self._request_kwargs)
+            self._item_index = 0
+
+        # in case a response is empty but there are more pages
+        while True:
+            # an empty page has no items
+            if 'items' in self._page and self._item_index < len(self._page['items']):
+                i = self._item_index
+                self._item_index += 1
+                return self._page['items'][i]
+
+            next_page_token = self._page.get('nextPageToken')
+            if next_page_token is not None:
+                self._params['pageToken'] = next_page_token
+                self._page = await self._client.get(
+                    f'/b/{self._bucket}/o', params=self._params, **self._request_kwargs)
+                self._item_index = 0
+            else:
+                raise StopAsyncIteration
+
+
+class ResumableUpload:
+    '''Upload an object in chunks with the resumable upload protocol.
+
+    Written data is buffered and sent in chunks of `chunk_size` bytes,
+    which must be a multiple of 256KiB.  After each chunk, the server
+    reports how much it has persisted; bytes it has not are resent with
+    the next chunk, so an upload survives interrupted requests.
+    '''
+
+    def __init__(self, client: 'StorageClient', session_url: str, chunk_size: int):
+        assert chunk_size % (256 * 1024) == 0, chunk_size
+        self._client = client
+        self._session_url = session_url
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        # offset of the start of the buffer in the object
+        self._offset = 0
+        self._done = False
+        # the object resource, once the upload is finished
+        self.metadata = None
+
+    async def _put_chunk(self, final: bool) -> None:
+        if final:
+            n = len(self._buffer)
+            total = str(self._offset + n)
+        else:
+            n = self._chunk_size
+            total = '*'
+        if n == 0:
+            content_range = f'bytes */{total}'
+        else:
+            content_range = f'bytes {self._offset}-{self._offset + n - 1}/{total}'
+
+        async with await self._client._session.put(
+                self._session_url,
+                data=bytes(self._buffer[:n]),
+                headers={'Content-Range': content_range},
+                allow_redirects=False) as resp:
+            if resp.status == 308:
+                range_header = resp.headers.get('Range')
+                if range_header is None:
+                    persisted = self._offset
+                else:
+                    # bytes=0-{last persisted byte}
+                    persisted = int(range_header.split('-')[1]) + 1
+            else:
+                assert final, resp.status
+                persisted = self._offset + n
+                self.metadata = await resp.json()
+                self._done = True
+
+        assert self._offset <= persisted <= self._offset + n, (self._offset, persisted, n)
+        del self._buffer[:persisted - self._offset]
+        self._offset = persisted
+
+    async def write(self, b: bytes) -> None:
+        assert not self._done
+        self._buffer.extend(b)
+        while len(self._buffer) >= self._chunk_size:
+            await self._put_chunk(False)
+
+    async def finish(self) -> None:
+        while not self._done:
+            await self._put_chunk(True)
+
+    @property
+    def bytes_written(self) -> int:
+        return self._offset + len(self._buffer)
+
+
+class StorageClient(BaseClient):
+    '''Client for the Google Cloud Storage JSON API.
+
+    Requests share the session's connection pool.  Object ranges use
+    the same convention as the `google.cloud.storage` client: `end` is
+    inclusive of the last byte to return.
+    '''
+
+    max_compose_sources = 32
+    max_batch_requests = 100
+
+    def __init__(self, *, url: str = 'https://storage.googleapis.com', **kwargs):
+        super().__init__(f'{url}/storage/v1', **kwargs)
+        self._url = url
+        self._upload_url = f'{url}/upload/storage/v1'
+
+    # docs:
+    # https://cloud.google.com/storage/docs/json_api/v1
+
+    # https://cloud.google.com/storage/docs/json_api/v1/objects/get
+    def _get_object_kwargs(self, start: Optional[int], end: Optional[int], kwargs):
+        params = kwargs.setdefault('params', {})
+        params['alt'] = 'media'
+        if start is not None or end is not None:
+            headers = kwargs.setdefault('headers', {})
+            start = start or 0
+            end = '' if end is None else end
+            headers['Range'] = f'bytes={start}-{end}'
+        return kwargs
+
+    async def get_object(self, bucket: str, name: str, *,
+                         start: Optional[int] = None, end: Optional[int] = None, **kwargs) -> bytes:
+        kwargs = self._get_object_kwargs(start, end, kwargs)
+
+        async def get():
+            async with await self._session.get(
+                    f'{self._base_url}/b/{bucket}/o/{_quote(name)}', **kwargs) as resp:
+                return await resp.read()
+        # the session retries sending the request, this also retries
+        # reading the body
+        return await retry_transient_errors(get)
+
+    async def get_object_chunks(self, bucket: str, name: str, *,
+                                start: Optional[int] = None, end: Optional[int] = None,
+                                chunk_size: int = 1024 * 1024, **kwargs) -> AsyncIterator[bytes]:
+        kwargs = self._get_object_kwargs(start, end, kwargs)
+        async with await self._session.get(
+                f'{self._base_url}/b/{bucket}/o/{_quote(name)}', **kwargs) as resp:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                yield chunk
+
+    async def get_object_metadata(self, bucket: str, name: str, **kwargs) -> Mapping[str, Any]:
+        return await self.get(f'/b/{bucket}/o/{_quote(name)}', **kwargs)
+
+    # https://cloud.google.com/storage/docs/json_api/v1/objects/insert
+    async def insert_object(self, bucket: str, name: str,
+                            data: Union[bytes, AsyncIterator[bytes]], *,
+                            content_type: str = 'application/octet-stream',
+                            **kwargs) -> Mapping[str, Any]:
+        if not isinstance(data, (bytes, bytearray)):
+            # the session retries failed requests by resending the body,
+            # which a partly consumed iterator cannot do
+            upload = await self._upload_resumable(bucket, name, data, content_type=content_type, **kwargs)
+            return upload.metadata
+        params = kwargs.setdefault('params', {})
+        params['uploadType'] = 'media'
+        params['name'] = name
+        headers = kwargs.setdefault('headers', {})
+        headers['Content-Type'] = content_type
+        async with await self._session.post(
+                f'{self._upload_url}/b/{bucket}/o', data=data, **kwargs) as resp:
+            return await resp.json()
+
+    # https://cloud.google.com/storage/docs/performing-resumable-uploads
+    async def create_resumable_upload(self, bucket: str, name: str, *,
+                                      content_type: str = 'application/octet-stream',
+                                      chunk_size: int = 8 * 1024 * 1024,
+                                      **kwargs) -> ResumableUpload:
+        params = kwargs.setdefault('params', {})
+        params['uploadType'] = 'resumable'
+        headers = kwargs.setdefault('headers', {})
+        headers['X-Upload-Content-Type'] = content_type
+        async with await self._session.post(
+                f'{self._upload_url}/b/{bucket}/o',
+                json={'name': name, 'contentType': content_type},
+                **kwargs) as resp:
+            session_url = resp.headers['Location']
+        return ResumableUpload(self, session_url, chunk_size)
+
+    async def _upload_resumable(self, bucket: str, name: str,
+                                chunks: AsyncIterator[bytes], **kwargs) -> ResumableUpload:
+        upload = await self.create_resumable_upload(bucket, name, **kwargs)
+        async for chunk in chunks:
+            await upload.write(chunk)
+        await upload.finish()
+        return upload
+
+    async def insert_object_resumable(self, bucket: str, name: str,
+                                      chunks: AsyncIterator[bytes], **kwargs) -> int:
+        upload = await self._upload_resumable(bucket, name, chunks, **kwargs)
+        return upload.bytes_written
+
+    # https://cloud.google.com/storage/docs/json_api/v1/objects/delete
+    async def delete_object(self, bucket: str, name: str, *,
+                            ignore_missing: bool = True, **kwargs) -> None:
+        try:
+            await self.delete(f'/b/{bucket}/o/{_quote(name)}', **kwargs)
+        except aiohttp.ClientResponseError as e:
+            if not (ignore_missing and e.status == 404):
+                raise
+
+    # https://cloud.google.com/storage/docs/json_api/v1/objects/list
+    async def list_objects(self, bucket: str, *, prefix: Optional[str] = None,
+                           fields: Optional[str] = None, **kwargs) -> PagedObjectIterator:
+        params = kwargs.pop('params', {})
+        if prefix is not None:
+            params['prefix'] = prefix
+        if fields is not None:
+            params['fields'] = fields
+        return PagedObjectIterator(self, bucket, params, kwargs)
+
+    # https://cloud.google.com/storage/docs/batch
+    async def _delete_objects_batch(self, bucket: str, names: List[str], ignore_missing: bool) -> None:
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        for i, name in enumerate(names):
+            parts.append(
+                f'--{boundary}\r\n'
+                'Content-Type: application/http\r\n'
+                f'Content-ID: <{i}>\r\n'
+                '\r\n'
+                f'DELETE /storage/v1/b/{bucket}/o/{_quote(name)} HTTP/1.1\r\n'
+                '\r\n')
+        parts.append(f'--{boundary}--\r\n')
+
+        async with await self._session.post(
+                f'{self._url}/batch/storage/v1',
+                data=''.join(parts).encode('utf-8'),
+                headers={'Content-Type': f'multipart/mixed; boundary={boundary}'}) as resp:
+            reader = aiohttp.MultipartReader.from_response(resp)
+            errors = []
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                # each part is an HTTP response: HTTP/1.1 {status} {reason}
+                status_line = (await part.text()).split('\r\n', 1)[0]
+                status = int(status_line.split(' ')[1])
+                if status >= 400 and not (ignore_missing and status == 404):
+                    errors.append(status_line)
+        if errors:
+            raise ValueError(f'failed to delete {len(errors)} objects in {bucket}: {errors[:5]}')
+
+    async def delete_objects(self, bucket: str, names: List[str], *,
+                             ignore_missing: bool = True) -> None:
+        for i in range(0, len(names), self.max_batch_requests):
+            await self._delete_objects_batch(
+                bucket, names[i:i + self.max_batch_requests], ignore_missing)
+
+    async def delete_prefix(self, bucket: str, prefix: str) -> None:
+        names = []
+        async for item in await self.list_objects(bucket, prefix=prefix, fields='items(name),nextPageToken'):
+            names.append(item['name'])
+        await self.delete_objects(bucket, names)
+
+    # https://cloud.google.com/storage/docs/json_api/v1/objects/compose
+    async def compose(self, bucket: str, sources: List[str], dest: str, *,
+                      content_type: Optional[str] = None, **kwargs) -> Mapping[str, Any]:
+        '''Compose `sources` into `dest`.  More than 32 sources are
+        composed through temporary objects under `dest`, which are
+        deleted afterwards.'''
+        assert sources
+        temporaries = []
+        level = 0
+        while len(sources) > self.max_compose_sources:
+            next_sources = []
+            for i in range(0, len(sources), self.max_compose_sources):
+                group = sources[i:i + self.max_compose_sources]
+                if len(group) == 1:
+                    next_sources.append(group[0])
+                    continue
+                temporary = f'{dest}.compose/{level}/{i // self.max_compose_sources}'
+                await self._compose(bucket, group, temporary, content_type, kwargs)
+                temporaries.append(temporary)
+                next_sources.append(temporary)
+            sources = next_sources
+            level += 1
+        try:
+            return await self._compose(bucket, sources, dest, content_type, kwargs)
+        finally:
+            if temporaries:
+                await self.delete_objects(bucket, temporaries)
+
+    async def _compose(self, bucket, sources, dest, content_type, kwargs):
+        destination = {}
+        if content_type is not None:
+            destination['contentType'] = content_type
+        return await self.post(
+            f'/b/{bucket}/o/{_quote(dest)}/compose',
+            json={
+                'sourceObjects': [{'name': name} for name in sources],
+                'destination': destination
+            },
+            **dict(kwargs))
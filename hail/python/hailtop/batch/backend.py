@@ -1,5 +1,8 @@
 import abc
+import collections
+import concurrent.futures
 import os
+import sys
 import subprocess as sp
 import uuid
 import time
@@ -8,8 +11,10 @@ from shlex import quote as shq
 import webbrowser
 from hailtop.config import get_deploy_config, get_user_config
 from hailtop.batch_client.client import BatchClient
+from hailtop.utils import parse_cpu_in_mcpu, parse_memory_in_bytes
 
 from .resource import InputResourceFile, JobResourceFile
+from .utils import BatchException
 
 
 class Backend:
@@ -33,6 +38,15 @@ class LocalBackend(Backend):
     """
     Backend that executes batches on a local computer.
 
+    Jobs are run as separate processes as soon as their dependencies have
+    completed.  A job is admitted while the sum of the CPU and memory
+    requirements of the running jobs fits in `n_cpus` and `memory`; jobs
+    without a CPU requirement count as one core and jobs without a memory
+    requirement are not limited by memory.  Each job's output is streamed
+    to standard output prefixed with the job's name.  Once a job fails, no
+    new jobs are started and the error is raised after the running jobs
+    complete.
+
     Examples
     --------
 
@@ -51,9 +65,17 @@ class LocalBackend(Backend):
         Additional flags to pass to `docker run`. Only used if a job specifies
         a docker image. This option will override the value set by the environment
         variable `HAIL_BATCH_EXTRA_DOCKER_RUN_FLAGS`.
+    n_cpus: :obj:`int`, optional
+        Number of cores shared by concurrently running jobs. Defaults to the
+        number of cores on this computer. Use 1 to run jobs one at a time.
+    memory: :obj:`str` or :obj:`int`, optional
+        Memory shared by concurrently running jobs. Units are in bytes if
+        `memory` is an :obj:`int`. Defaults to the physical memory of this
+        computer.
     """
 
-    def __init__(self, tmp_dir='/tmp/', gsa_key_file=None, extra_docker_run_flags=None):
+    def __init__(self, tmp_dir='/tmp/', gsa_key_file=None, extra_docker_run_flags=None,
+                 n_cpus=None, memory=None):
         self._tmp_dir = tmp_dir
 
         flags = ''
@@ -70,6 +92,19 @@ class LocalBackend(Backend):
 
         self._extra_docker_run_flags = flags
 
+        if n_cpus is None:
+            n_cpus = os.cpu_count() or 1
+        if n_cpus < 1:
+            raise BatchException(f'n_cpus must be at least 1, found {n_cpus}')
+        self._cpu_mcpu = n_cpus * 1000
+
+        if memory is None:
+            self._memory_bytes = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        else:
+            self._memory_bytes = parse_memory_in_bytes(str(memory))
+            if self._memory_bytes is None:
+                raise BatchException(f'invalid memory {memory}')
+
     def _run(self, batch, dry_run, verbose, delete_scratch_on_exit):  # pylint: disable=R0915
         """
         Execute a batch.
@@ -91,12 +126,13 @@ class LocalBackend(Backend):
         """
         tmpdir = self._get_scratch_dir()
 
-        script = ['#!/bin/bash',
-                  'set -e' + 'x' if verbose else '',
-                  '\n',
-                  '# change cd to tmp directory',
-                  f"cd {tmpdir}",
-                  '\n']
+        def script(commands):
+            return "\n".join(['#!/bin/bash',
+                              'set -e' + ('x' if verbose else ''),
+                              '\n',
+                              '# change cd to tmp directory',
+                              f"cd {tmpdir}",
+                              '\n'] + commands)
 
         copied_input_resource_files = set()
         os.makedirs(tmpdir + 'inputs/', exist_ok=True)
@@ -137,18 +173,27 @@ class LocalBackend(Backend):
             return [f'{_cp(dest)} {r._get_path(tmpdir)} {shq(dest)}'
                     for dest in r._output_paths]
 
+        # inputs are copied before any job runs since jobs sharing an input
+        # may run concurrently
+        setup = []
+
         write_inputs = [x for r in batch._input_resources for x in copy_external_output(r)]
         if write_inputs:
-            script += ["# Write input resources to output destinations"]
-            script += write_inputs
-            script += ['\n']
+            setup += ["# Write input resources to output destinations"]
+            setup += write_inputs
+            setup += ['\n']
+
+        copy_inputs = [x for job in batch._jobs for r in job._inputs for x in copy_input(job, r)]
+        if copy_inputs:
+            setup += ["# Copy input resources"]
+            setup += copy_inputs
+            setup += ['\n']
 
+        job_commands = {}
         for job in batch._jobs:
             os.makedirs(tmpdir + job._uid + '/', exist_ok=True)
 
-            script.append(f"# {job._uid} {job.name if job.name else ''}")
-
-            script += [x for r in job._inputs for x in copy_input(job, r)]
+            commands = [f"# {job._uid} {job.name if job.name else ''}"]
 
             resource_defs = [r._declare(tmpdir) for r in job._mentioned]
 
@@ -158,28 +203,30 @@ class LocalBackend(Backend):
                 memory = f'-m {job._memory}' if job._memory else ''
                 cpu = f'--cpus={job._cpu}' if job._cpu else ''
 
-                script += [f"docker run "
-                           f"{self._extra_docker_run_flags} "
-                           f"-v {tmpdir}:{tmpdir} "
-                           f"-w {tmpdir} "
-                           f"{memory} "
-                           f"{cpu} "
-                           f"{job._image} /bin/bash "
-                           f"-c {shq(defs + cmd)}",
-                           '\n']
+                commands += [f"docker run "
+                             f"{self._extra_docker_run_flags} "
+                             f"-v {tmpdir}:{tmpdir} "
+                             f"-w {tmpdir} "
+                             f"{memory} "
+                             f"{cpu} "
+                             f"{job._image} /bin/bash "
+                             f"-c {shq(defs + cmd)}",
+                             '\n']
             else:
-                script += resource_defs
-                script += job._command
+                commands += resource_defs
+                commands += job._command
 
-            script += [x for r in job._external_outputs for x in copy_external_output(r)]
-            script += ['\n']
+            commands += [x for r in job._external_outputs for x in copy_external_output(r)]
+            commands += ['\n']
+            job_commands[job] = commands
 
-        script = "\n".join(script)
         if dry_run:
-            print(script)
+            print(script(setup + [x for job in batch._jobs for x in job_commands[job]]))
         else:
             try:
-                sp.check_output(script, shell=True)
+                if setup:
+                    self._run_script('setup', script(setup))
+                self._run_jobs(batch._jobs, {job: script(commands) for job, commands in job_commands.items()})
             except sp.CalledProcessError as e:
                 print(e)
                 print(e.output)
@@ -190,6 +237,91 @@ class LocalBackend(Backend):
 
         print('Batch completed successfully!')
 
+    @staticmethod
+    def _run_script(name, script):
+        output = bytearray()
+        with sp.Popen(script, shell=True, stdout=sp.PIPE, stderr=sp.STDOUT) as proc:
+            for line in proc.stdout:
+                output.extend(line)
+                sys.stdout.write(f'{name}: {line.decode(errors="replace")}')
+                sys.stdout.flush()
+        if proc.returncode != 0:
+            raise sp.CalledProcessError(proc.returncode, script, output=bytes(output))
+
+    def _job_requirements(self, job):
+        cpu_mcpu = 1000
+        if job._cpu is not None:
+            cpu_mcpu = parse_cpu_in_mcpu(job._cpu)
+            if cpu_mcpu is None:
+                raise BatchException(f'invalid cpu {job._cpu} for job {job}')
+
+        memory_bytes = 0
+        if job._memory is not None:
+            memory_bytes = parse_memory_in_bytes(job._memory)
+            if memory_bytes is None:
+                raise BatchException(f'invalid memory {job._memory} for job {job}')
+
+        # a job larger than this computer runs by itself
+        return min(cpu_mcpu, self._cpu_mcpu), min(memory_bytes, self._memory_bytes)
+
+    def _run_jobs(self, jobs, scripts):
+        requirements = {job: self._job_requirements(job) for job in jobs}
+
+        children = collections.defaultdict(list)
+        n_pending_parents = {}
+        for job in jobs:
+            n_pending_parents[job] = len(job._dependencies)
+            for parent in job._dependencies:
+                children[parent].append(job)
+
+        # jobs are in topological order, keep it among the ready jobs
+        index = {job: i for i, job in enumerate(jobs)}
+        ready = [job for job in jobs if n_pending_parents[job] == 0]
+
+        free_cpu_mcpu = self._cpu_mcpu
+        free_memory_bytes = self._memory_bytes
+        running = {}
+        error = None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(jobs) or 1) as pool:
+            while ready or running:
+                if error is None:
+                    admitted = []
+                    for job in ready:
+                        cpu_mcpu, memory_bytes = requirements[job]
+                        if cpu_mcpu <= free_cpu_mcpu and memory_bytes <= free_memory_bytes:
+                            free_cpu_mcpu -= cpu_mcpu
+                            free_memory_bytes -= memory_bytes
+                            name = f'{job._uid} {job.name}' if job.name else job._uid
+                            running[pool.submit(self._run_script, name, scripts[job])] = job
+                            admitted.append(job)
+                    ready = [job for job in ready if job not in admitted]
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    cpu_mcpu, memory_bytes = requirements[job]
+                    free_cpu_mcpu += cpu_mcpu
+                    free_memory_bytes += memory_bytes
+
+                    e = future.exception()
+                    if e is not None:
+                        if error is None:
+                            error = e
+                        continue
+
+                    for child in children[job]:
+                        n_pending_parents[child] -= 1
+                        if n_pending_parents[child] == 0:
+                            ready.append(child)
+                ready.sort(key=lambda job: index[job])
+
+        if error is not None:
+            raise error
+
     def _get_scratch_dir(self):
         def _get_random_name():
             directory = self._tmp_dir + '/batch-{}/'.format(uuid.uuid4().hex[:12])
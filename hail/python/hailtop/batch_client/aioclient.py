@@ -2,7 +2,6 @@ import math
 import random
 import logging
 import json
-import functools
 import asyncio
 import aiohttp
 import secrets
@@ -10,13 +9,18 @@ from asyncinit import asyncinit
 
 from hailtop.config import get_deploy_config
 from hailtop.auth import service_auth_headers
-from hailtop.utils import bounded_gather, request_retry_transient_errors, tqdm, TQDM_DEFAULT_DISABLE
+from hailtop.utils import request_retry_transient_errors, tqdm, TQDM_DEFAULT_DISABLE
 from hailtop.tls import ssl_client_session
 
 from .globals import tasks, complete_states
 
 log = logging.getLogger('batch_client.aioclient')
 
+# below the session's 60s total timeout
+LONG_POLL_TIMEOUT_SECS = 30
+# returned by servers without the long poll endpoints
+LONG_POLL_UNSUPPORTED_STATUSES = (404, 405)
+
 
 class Job:
     @staticmethod
@@ -213,6 +217,9 @@ class Job:
     async def log(self):
         return await self._job.log()
 
+    async def log_range(self, container='main', offset=0, max_bytes=None):
+        return await self._job.log_range(container, offset, max_bytes)
+
     async def attempts(self):
         return await self._job.attempts()
 
@@ -256,6 +263,9 @@ class UnsubmittedJob:
     async def log(self):
         raise ValueError("cannot get the log of an unsubmitted job")
 
+    async def log_range(self, container='main', offset=0, max_bytes=None):
+        raise ValueError("cannot get the log of an unsubmitted job")
+
     async def attempts(self):
         raise ValueError("cannot get the attempts of an unsubmitted job")
 
@@ -287,7 +297,22 @@ class SubmittedJob:
         self._status = await resp.json()
         return self._status
 
+    async def _wait_long_poll(self):
+        while True:
+            resp = await self._batch._client._get(
+                f'/api/v1alpha/batches/{self.batch_id}/jobs/{self.job_id}/wait',
+                params={'timeout': LONG_POLL_TIMEOUT_SECS})
+            self._status = await resp.json()
+            if self._status['state'] in complete_states:
+                return self._status
+
     async def wait(self):
+        try:
+            return await self._wait_long_poll()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in LONG_POLL_UNSUPPORTED_STATUSES:
+                raise
+        log.info(f'long poll not supported, polling job {self.id}')
         i = 0
         while True:
             if await self.is_complete():
@@ -302,6 +327,14 @@ class SubmittedJob:
         resp = await self._batch._client._get(f'/api/v1alpha/batches/{self.batch_id}/jobs/{self.job_id}/log')
         return await resp.json()
 
+    async def log_range(self, container='main', offset=0, max_bytes=None):
+        params = {'container': container, 'offset': offset}
+        if max_bytes is not None:
+            params['max_bytes'] = max_bytes
+        resp = await self._batch._client._get(
+            f'/api/v1alpha/batches/{self.batch_id}/jobs/{self.job_id}/log', params=params)
+        return await resp.json()
+
     async def attempts(self):
         resp = await self._batch._client._get(f'/api/v1alpha/batches/{self.batch_id}/jobs/{self.job_id}/attempts')
         return await resp.json()
@@ -333,15 +366,70 @@ class Batch:
             if last_job_id is None:
                 break
 
+    async def _bulk_jobs_page(self, params):
+        resp = await self._client._get(f'/api/v1alpha/batches/{self.id}/jobs/bulk', params=params)
+        jobs = []
+        async for line in resp.content:
+            if line.strip():
+                jobs.append(json.loads(line))
+        return jobs
+
+    async def bulk_jobs(self, q=None, fields=None, page_size=1000):
+        '''Iterate over the jobs of the batch, `page_size` per request.
+
+        `fields` is a list of the job fields to return; batch_id and
+        job_id are always returned.  Leaving out `cost` avoids the cost
+        computation on the server.  The next page is requested while
+        the current one is consumed.'''
+        params = {'limit': page_size}
+        if q is not None:
+            params['q'] = q
+        if fields is not None:
+            params['fields'] = ','.join(fields)
+
+        next_page = asyncio.ensure_future(self._bulk_jobs_page(params))
+        try:
+            while next_page is not None:
+                jobs = await next_page
+                if len(jobs) == page_size:
+                    next_page = asyncio.ensure_future(self._bulk_jobs_page(
+                        {**params, 'last_job_id': jobs[-1]['job_id']}))
+                else:
+                    next_page = None
+                for job in jobs:
+                    yield job
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
     async def status(self):
         resp = await self._client._get(f'/api/v1alpha/batches/{self.id}')
         return await resp.json()
 
+    async def _wait_long_poll(self, pbar):
+        n_completed = None
+        while True:
+            params = {'timeout': LONG_POLL_TIMEOUT_SECS}
+            if n_completed is not None:
+                params['n_completed'] = n_completed
+            resp = await self._client._get(f'/api/v1alpha/batches/{self.id}/wait', params=params)
+            status = await resp.json()
+            pbar.update(status['n_completed'] - pbar.n)
+            if status['complete']:
+                return status
+            n_completed = status['n_completed']
+
     async def wait(self, *, disable_progress_bar=TQDM_DEFAULT_DISABLE):
         i = 0
         with tqdm(total=self.n_jobs,
                   disable=disable_progress_bar,
                   desc='completed jobs') as pbar:
+            try:
+                return await self._wait_long_poll(pbar)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in LONG_POLL_UNSUPPORTED_STATUSES:
+                    raise
+            log.info(f'long poll not supported, polling batch {self.id}')
             while True:
                 status = await self.status()
                 pbar.update(status['n_completed'] - pbar.n)
@@ -357,6 +445,56 @@ class Batch:
         await self._client._delete(f'/api/v1alpha/batches/{self.id}')
 
 
+async def _aiter(it):
+    if hasattr(it, '__aiter__'):
+        async for x in it:
+            yield x
+    else:
+        for x in it:
+            yield x
+
+
+def job_spec(job_id, parent_ids, image, command, env=None, mount_docker_socket=False,
+             port=None, resources=None, secrets=None,
+             service_account=None, attributes=None,
+             input_files=None, output_files=None, always_run=False, pvc_size=None,
+             timeout=None, gcsfuse=None):
+    spec = {
+        'always_run': always_run,
+        'command': command,
+        'image': image,
+        'job_id': job_id,
+        'mount_docker_socket': mount_docker_socket,
+        'parent_ids': parent_ids
+    }
+
+    if env:
+        spec['env'] = [{'name': k, 'value': v} for (k, v) in env.items()]
+    if port is not None:
+        spec['port'] = port
+    if resources:
+        spec['resources'] = resources
+    if secrets:
+        spec['secrets'] = secrets
+    if service_account:
+        spec['service_account'] = service_account
+    if timeout:
+        spec['timeout'] = timeout
+
+    if attributes:
+        spec['attributes'] = attributes
+    if input_files:
+        spec['input_files'] = [{"from": src, "to": dst} for (src, dst) in input_files]
+    if output_files:
+        spec['output_files'] = [{"from": src, "to": dst} for (src, dst) in output_files]
+    if pvc_size:
+        spec['pvc_size'] = pvc_size
+    if gcsfuse:
+        spec['gcsfuse'] = [{"bucket": bucket, "mount_path": mount_path} for (bucket, mount_path) in gcsfuse]
+
+    return spec
+
+
 class BatchBuilder:
     def __init__(self, client, attributes, callback):
         self._client = client
@@ -364,6 +502,8 @@ class BatchBuilder:
         self._job_specs = []
         self._jobs = []
         self._submitted = False
+        self._open_batch = None
+        self._open_batch_n_jobs = None
         self.attributes = attributes
         self.callback = callback
 
@@ -374,6 +514,8 @@ class BatchBuilder:
                    timeout=None, gcsfuse=None):
         if self._submitted:
             raise ValueError("cannot create a job in an already submitted batch")
+        if self._open_batch is not None:
+            raise ValueError("cannot create a job in an open batch, use append_jobs")
 
         self._job_idx += 1
 
@@ -405,70 +547,80 @@ class BatchBuilder:
         if error_msg:
             raise ValueError("\n".join(error_msg))
 
-        job_spec = {
-            'always_run': always_run,
-            'command': command,
-            'image': image,
-            'job_id': self._job_idx,
-            'mount_docker_socket': mount_docker_socket,
-            'parent_ids': parent_ids
-        }
-
-        if env:
-            job_spec['env'] = [{'name': k, 'value': v} for (k, v) in env.items()]
-        if port is not None:
-            job_spec['port'] = port
-        if resources:
-            job_spec['resources'] = resources
-        if secrets:
-            job_spec['secrets'] = secrets
-        if service_account:
-            job_spec['service_account'] = service_account
-        if timeout:
-            job_spec['timeout'] = timeout
-
-        if attributes:
-            job_spec['attributes'] = attributes
-        if input_files:
-            job_spec['input_files'] = [{"from": src, "to": dst} for (src, dst) in input_files]
-        if output_files:
-            job_spec['output_files'] = [{"from": src, "to": dst} for (src, dst) in output_files]
-        if pvc_size:
-            job_spec['pvc_size'] = pvc_size
-        if gcsfuse:
-            job_spec['gcsfuse'] = [{"bucket": bucket, "mount_path": mount_path} for (bucket, mount_path) in gcsfuse]
-
-        self._job_specs.append(job_spec)
+        self._job_specs.append(job_spec(
+            self._job_idx, parent_ids, image, command, env=env,
+            mount_docker_socket=mount_docker_socket, port=port, resources=resources,
+            secrets=secrets, service_account=service_account, attributes=attributes,
+            input_files=input_files, output_files=output_files, always_run=always_run,
+            pvc_size=pvc_size, timeout=timeout, gcsfuse=gcsfuse))
 
         j = Job.unsubmitted_job(self, self._job_idx)
         self._jobs.append(j)
         return j
 
-    async def _submit_jobs(self, batch_id, byte_job_specs, n_jobs, pbar):
-        assert len(byte_job_specs) > 0, byte_job_specs
-
-        b = bytearray()
-        b.append(ord('['))
-
-        i = 0
-        while i < len(byte_job_specs):
-            spec = byte_job_specs[i]
-            if i > 0:
-                b.append(ord(','))
-            b.extend(spec)
-            i += 1
-
-        b.append(ord(']'))
-
+    async def _submit_jobs(self, batch_id, bunch, n_jobs, pbar):
         await self._client._post(
             f'/api/v1alpha/batches/{batch_id}/jobs/create',
             data=aiohttp.BytesPayload(
-                b, content_type='application/json', encoding='utf-8'))
+                bunch, content_type='application/json', encoding='utf-8'))
         pbar.update(n_jobs)
 
-    async def _create(self, batch_token=None):
+    async def _stream_job_specs(self, batch_id, job_specs, pbar,
+                                max_bunch_bytesize, max_bunch_size, parallelism):
+        # Job specs are encoded as they are consumed and appended directly
+        # to the bunch being filled.  A full bunch is posted right away; once
+        # `parallelism` posts are in flight, encoding waits for one to finish,
+        # so at most `parallelism + 1` bunches are held in memory.
+        in_flight = set()
+
+        async def wait_for_in_flight(limit):
+            while len(in_flight) > limit:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    in_flight.remove(t)
+                    t.result()
+
+        async def post(bunch, n_jobs):
+            bunch.append(ord(']'))
+            await wait_for_in_flight(parallelism - 1)
+            in_flight.add(asyncio.ensure_future(
+                self._submit_jobs(batch_id, bunch, n_jobs, pbar)))
+
+        n_jobs = 0
+        try:
+            bunch = bytearray(b'[')
+            bunch_n_bytes = 0
+            bunch_n_jobs = 0
+            async for spec in _aiter(job_specs):
+                spec = json.dumps(spec).encode('utf-8')
+                n_bytes = len(spec)
+                assert n_bytes < max_bunch_bytesize, (
+                    f'every job spec must be less than max_bunch_bytesize,'
+                    f' { max_bunch_bytesize }B, but {spec} is larger')
+                if bunch_n_jobs > 0 and (bunch_n_bytes + n_bytes >= max_bunch_bytesize
+                                         or bunch_n_jobs >= max_bunch_size):
+                    await post(bunch, bunch_n_jobs)
+                    bunch = bytearray(b'[')
+                    bunch_n_bytes = 0
+                    bunch_n_jobs = 0
+                if bunch_n_jobs > 0:
+                    bunch.append(ord(','))
+                bunch.extend(spec)
+                bunch_n_bytes += n_bytes
+                bunch_n_jobs += 1
+                n_jobs += 1
+            if bunch_n_jobs > 0:
+                await post(bunch, bunch_n_jobs)
+            await wait_for_in_flight(0)
+        finally:
+            for t in in_flight:
+                t.cancel()
+        return n_jobs
+
+    async def _create(self, batch_token=None, n_jobs=None):
         batch_token = batch_token or secrets.token_urlsafe(32)
-        n_jobs = len(self._job_specs)
+        if n_jobs is None:
+            n_jobs = len(self._job_specs)
         batch_spec = {'billing_project': self._client.billing_project,
                       'n_jobs': n_jobs,
                       'token': batch_token}
@@ -482,65 +634,124 @@ class BatchBuilder:
 
     MAX_BUNCH_BYTESIZE = 1024 * 1024
     MAX_BUNCH_SIZE = 1024
+    MAX_BUNCHES_IN_FLIGHT = 6
 
     async def submit(self,
                      max_bunch_bytesize=MAX_BUNCH_BYTESIZE,
                      max_bunch_size=MAX_BUNCH_SIZE,
-                     disable_progress_bar=TQDM_DEFAULT_DISABLE):
+                     disable_progress_bar=TQDM_DEFAULT_DISABLE,
+                     parallelism=MAX_BUNCHES_IN_FLIGHT):
+        '''Create the batch, submit the jobs created by `create_job`, and
+        close it.
+
+        Job specs are encoded and posted a bunch at a time, but every spec
+        built by `create_job` is held in memory until the batch is closed.
+        To submit more jobs than fit in memory, use `open`, `append_jobs`
+        with a generator, and `close` instead.'''
         assert max_bunch_bytesize > 0
         assert max_bunch_size > 0
+        assert parallelism > 0
         if self._submitted:
             raise ValueError("cannot submit an already submitted batch")
+        if self._open_batch is not None:
+            raise ValueError("cannot submit an open batch, use close")
         batch = await self._create()
         id = batch.id
         log.info(f'created batch {id}')
-        byte_job_specs = [json.dumps(job_spec).encode('utf-8')
-                          for job_spec in self._job_specs]
-        byte_job_specs_bunches = []
-        bunch_sizes = []
-        bunch = []
-        bunch_n_bytes = 0
-        bunch_n_jobs = 0
-        for spec in byte_job_specs:
-            n_bytes = len(spec)
-            assert n_bytes < max_bunch_bytesize, (
-                f'every job spec must be less than max_bunch_bytesize,'
-                f' { max_bunch_bytesize }B, but {spec} is larger')
-            if bunch_n_bytes + n_bytes < max_bunch_bytesize and len(bunch) < max_bunch_size:
-                bunch.append(spec)
-                bunch_n_bytes += n_bytes
-                bunch_n_jobs += 1
-            else:
-                byte_job_specs_bunches.append(bunch)
-                bunch_sizes.append(bunch_n_jobs)
-                bunch = [spec]
-                bunch_n_bytes = n_bytes
-                bunch_n_jobs = 1
-        if bunch:
-            byte_job_specs_bunches.append(bunch)
-            bunch_sizes.append(bunch_n_jobs)
-
-        with tqdm(total=len(self._job_specs),
+
+        # the specs are kept until the batch is closed so that a failed
+        # submit can be retried
+        with tqdm(total=batch.n_jobs,
                   disable=disable_progress_bar,
                   desc='jobs submitted to queue') as pbar:
-            await bounded_gather(
-                *[functools.partial(self._submit_jobs, id, bunch, size, pbar)
-                  for bunch, size in zip(byte_job_specs_bunches, bunch_sizes)],
-                parallelism=6)
+            await self._stream_job_specs(id, self._job_specs, pbar,
+                                         max_bunch_bytesize, max_bunch_size, parallelism)
 
         await self._client._patch(f'/api/v1alpha/batches/{id}/close')
         log.info(f'closed batch {id}')
 
+        self._job_specs = []
         for j in self._jobs:
             j._job = j._job._submit(batch)
 
-        self._job_specs = []
         self._jobs = []
         self._job_idx = 0
 
         self._submitted = True
         return batch
 
+    async def open(self, n_jobs, batch_token=None):
+        '''Create the batch without closing it so that jobs can be streamed
+        into it with `append_jobs`.  The server requires the number of jobs
+        up front; `close` fails unless exactly `n_jobs` have been appended.'''
+        if self._submitted:
+            raise ValueError("cannot open an already submitted batch")
+        if self._open_batch is not None:
+            raise ValueError("batch is already open")
+        if self._job_specs:
+            raise ValueError("cannot open a batch with jobs created by create_job, use submit")
+        batch = await self._create(batch_token=batch_token, n_jobs=n_jobs)
+        log.info(f'opened batch {batch.id}')
+        self._open_batch = batch
+        self._open_batch_n_jobs = n_jobs
+        return batch
+
+    async def append_jobs(self, jobs,
+                          max_bunch_bytesize=MAX_BUNCH_BYTESIZE,
+                          max_bunch_size=MAX_BUNCH_SIZE,
+                          disable_progress_bar=TQDM_DEFAULT_DISABLE,
+                          parallelism=MAX_BUNCHES_IN_FLIGHT):
+        '''Stream jobs into the open batch.
+
+        `jobs` is an iterable or async iterable, typically a generator, of
+        dicts of `create_job` keyword arguments.  Parents are given as job
+        ids of jobs already appended to this batch.  Jobs are numbered
+        consecutively from 1 across calls.  Returns the number of jobs
+        appended.'''
+        assert max_bunch_bytesize > 0
+        assert max_bunch_size > 0
+        assert parallelism > 0
+        batch = self._open_batch
+        if batch is None:
+            raise ValueError("cannot append jobs to a batch that is not open")
+
+        async def specs():
+            async for kwargs in _aiter(jobs):
+                kwargs = dict(kwargs)
+                self._job_idx += 1
+                if self._job_idx > self._open_batch_n_jobs:
+                    raise ValueError(f'batch {batch.id} was opened with {self._open_batch_n_jobs} jobs')
+                parent_ids = []
+                for parent in kwargs.pop('parents', None) or []:
+                    parent_id = parent if isinstance(parent, int) else parent.job_id
+                    if not 0 < parent_id < self._job_idx:
+                        raise ValueError(f'job {self._job_idx} has invalid parent job id {parent_id}')
+                    parent_ids.append(parent_id)
+                yield job_spec(self._job_idx, parent_ids, **kwargs)
+
+        with tqdm(total=self._open_batch_n_jobs,
+                  initial=self._job_idx,
+                  disable=disable_progress_bar,
+                  desc='jobs submitted to queue') as pbar:
+            return await self._stream_job_specs(batch.id, specs(), pbar,
+                                                max_bunch_bytesize, max_bunch_size, parallelism)
+
+    async def close(self):
+        batch = self._open_batch
+        if batch is None:
+            raise ValueError("cannot close a batch that is not open")
+        if self._job_idx != self._open_batch_n_jobs:
+            raise ValueError(f'batch {batch.id} was opened with {self._open_batch_n_jobs} jobs '
+                             f'but {self._job_idx} were appended')
+        await self._client._patch(f'/api/v1alpha/batches/{batch.id}/close')
+        log.info(f'closed batch {batch.id}')
+
+        self._open_batch = None
+        self._open_batch_n_jobs = None
+        self._job_idx = 0
+        self._submitted = True
+        return batch
+
 
 @asyncinit
 class BatchClient:
@@ -85,6 +85,9 @@ class Job:
     def log(self):
         return async_to_blocking(self._async_job.log())
 
+    def log_range(self, container='main', offset=0, max_bytes=None):
+        return async_to_blocking(self._async_job.log_range(container, offset, max_bytes))
+
     def attempts(self):
         return async_to_blocking(self._async_job.attempts())
 
@@ -116,6 +119,9 @@ class Batch:
     def jobs(self, q=None):
         return agen_to_blocking(self._async_batch.jobs(q=q))
 
+    def bulk_jobs(self, q=None, fields=None, page_size=1000):
+        return agen_to_blocking(self._async_batch.bulk_jobs(q=q, fields=fields, page_size=page_size))
+
     def wait(self):
         return async_to_blocking(self._async_batch.wait())
 
@@ -167,6 +173,17 @@ class BatchBuilder:
         async_batch = async_to_blocking(self._async_builder.submit(*args, **kwargs))
         return Batch.from_async_batch(async_batch)
 
+    def open(self, n_jobs, batch_token=None):
+        async_batch = async_to_blocking(self._async_builder.open(n_jobs, batch_token=batch_token))
+        return Batch.from_async_batch(async_batch)
+
+    def append_jobs(self, jobs, **kwargs):
+        return async_to_blocking(self._async_builder.append_jobs(jobs, **kwargs))
+
+    def close(self):
+        async_batch = async_to_blocking(self._async_builder.close())
+        return Batch.from_async_batch(async_batch)
+
 
 class BatchClient:
     def __init__(self, billing_project, deploy_config=None, session=None,
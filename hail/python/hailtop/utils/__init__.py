@@ -15,6 +15,7 @@ from .rates import (
     rate_instance_hour_to_fraction_msec
 )
 from .rate_limiter import RateLimit, RateLimiter
+from .quantities import parse_cpu_in_mcpu, parse_memory_in_bytes
 
 __all__ = [
     'time_msecs',
@@ -53,5 +54,7 @@ __all__ = [
     'rate_cpu_hour_to_mcpu_msec',
     'rate_instance_hour_to_fraction_msec',
     'RateLimit',
-    'RateLimiter'
+    'RateLimiter',
+    'parse_cpu_in_mcpu',
+    'parse_memory_in_bytes'
 ]
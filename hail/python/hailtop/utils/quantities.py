@@ -0,0 +1,37 @@
+import math
+import re
+
+MEMORY_REGEXPAT = r'[+]?((?:[0-9]*[.])?[0-9]+)([KMGTP][i]?)?'
+MEMORY_REGEX = re.compile(MEMORY_REGEXPAT)
+
+CPU_REGEXPAT = r'[+]?((?:[0-9]*[.])?[0-9]+)([m])?'
+CPU_REGEX = re.compile(CPU_REGEXPAT)
+
+conv_factor = {
+    'K': 1000, 'Ki': 1024,
+    'M': 1000**2, 'Mi': 1024**2,
+    'G': 1000**3, 'Gi': 1024**3,
+    'T': 1000**4, 'Ti': 1024**4,
+    'P': 1000**5, 'Pi': 1024**5
+}
+
+
+def parse_cpu_in_mcpu(cpu_string):
+    match = CPU_REGEX.fullmatch(cpu_string)
+    if match:
+        number = float(match.group(1))
+        if match.group(2) == 'm':
+            number /= 1000
+        return int(number * 1000)
+    return None
+
+
+def parse_memory_in_bytes(memory_string):
+    match = MEMORY_REGEX.fullmatch(memory_string)
+    if match:
+        number = float(match.group(1))
+        suffix = match.group(2)
+        if suffix:
+            return math.ceil(number * conv_factor[suffix])
+        return math.ceil(number)
+    return None
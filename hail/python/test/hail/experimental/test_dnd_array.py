@@ -40,6 +40,37 @@ def test_range_matmul():
     assert np.array_equal(da_result, a_result)
 
 
+def test_range_matmul_local():
+    n_variants = 10
+    n_samples = 10
+    block_size = 3
+    n_blocks = 16
+    mt = hl.utils.range_matrix_table(n_variants, n_samples)
+    mt = mt.select_entries(x=hl.float(mt.row_idx * mt.col_idx))
+
+    da = hl.experimental.dnd.array(mt, 'x', block_size=block_size)
+    local_matmul_max_elements = hl.experimental.dnd.DNDArray.local_matmul_max_elements
+    hl.experimental.dnd.DNDArray.local_matmul_max_elements = 1024
+    try:
+        da = (da @ da.T).checkpoint(new_temp_file())
+    finally:
+        hl.experimental.dnd.DNDArray.local_matmul_max_elements = local_matmul_max_elements
+    assert da._force_count_blocks() == n_blocks
+    da_result = da.collect().reshape(n_variants, n_variants)
+
+    a = np.array(mt.x.collect()).reshape(n_variants, n_samples)
+    a_result = a @ a.T
+
+    assert np.array_equal(da_result, a_result)
+
+
+def test_from_numpy():
+    a = np.arange(70, dtype=np.float64).reshape((7, 10))
+    da = hl.experimental.dnd.DNDArray.from_numpy(a, block_size=3)
+    assert da.count_blocks() == (4, 3)
+    assert np.array_equal(da.collect(), a)
+
+
 def test_small_collect():
     n_variants = 10
     n_samples = 10
@@ -1,3 +1,4 @@
+import json
 import os
 
 import hail as hl
@@ -52,6 +53,50 @@ def test_1kg_chr22():
         assert n == true_n, sample
         assert n_variant == true_n_variant, sample
 
+
+def test_combiner_resumes_from_manifest():
+    out_file = new_temp_file(extension='mt')
+    tmp_path = new_temp_file()
+
+    paths = [os.path.join(resource('gvcfs'), '1kg_chr22', f'{s}.hg38.g.vcf.gz') for s in all_samples[:5]]
+
+    def run():
+        vc.run_combiner(paths,
+                        out_file=out_file,
+                        tmp_path=tmp_path,
+                        branch_factor=2,
+                        batch_size=2,
+                        reference_genome='GRCh38',
+                        overwrite=True)
+
+    run()
+    expected = hl.read_matrix_table(out_file)
+    expected_samples = expected.s.collect()
+    expected_count = expected.count_rows()
+
+    [run_dir] = hl.hadoop_ls(f'{tmp_path}/combiner-temporary')
+    manifest_path = run_dir['path'] + '/manifest.json'
+    with hl.hadoop_open(manifest_path) as f:
+        manifest = json.load(f)
+    assert manifest['phases'][-1]['jobs'][0]['merges'][0]['output'] == out_file
+    intermediate = manifest['phases'][-2]['jobs'][0]['merges'][0]['output']
+    intermediate_mtime = hl.hadoop_stat(intermediate + '/_SUCCESS')['modification_time']
+
+    # as if the run had died during the final merge
+    manifest['phases'][-1]['jobs'][0]['merges'][0]['output'] = None
+    with hl.hadoop_open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    run()
+    assert hl.hadoop_stat(intermediate + '/_SUCCESS')['modification_time'] == intermediate_mtime
+    with hl.hadoop_open(manifest_path) as f:
+        assert json.load(f)['phases'][-1]['jobs'][0]['merges'][0]['output'] == out_file
+
+    mt = hl.read_matrix_table(out_file)
+    assert mt.s.collect() == expected_samples
+    assert mt.count_rows() == expected_count
+
+
 def test_gvcf_1k_same_as_import_vcf():
     path = os.path.join(resource('gvcfs'), '1kg_chr22', f'HG00308.hg38.g.vcf.gz')
     [mt] = hl.import_gvcfs([path], vc.default_exome_intervals('GRCh38'), reference_genome='GRCh38')
@@ -934,6 +934,44 @@ class Tests(unittest.TestCase):
         self.assertEqual(r.n_smaller, 0)
         self.assertEqual(r.n_larger, 1)
 
+    def test_eval_many(self):
+        ht = hl.utils.range_table(10)
+        ht = ht.annotate_globals(g=5)
+        mt = hl.utils.range_matrix_table(4, 3)
+        self.assertEqual(
+            hl.eval_many(hl.agg.sum(ht.idx), 1, ht.g + 1, hl.agg.count_where(ht.idx < 3),
+                         hl.agg.count_where(mt.row_idx < 2), hl.agg.count_where(mt.col_idx < 2),
+                         hl.agg.sum(mt.row_idx * mt.col_idx), hl.str(2)),
+            [45, 1, 6, 3, 2, 2, 18, '2'])
+        self.assertEqual(hl.eval_many(), [])
+
+        with self.assertRaises(hl.expr.ExpressionException):
+            hl.eval_many(ht.idx)
+
+    def test_aggregators_hist2d(self):
+        table = hl.utils.range_table(11)
+        table = table.annotate(x=hl.float(table.idx), y=hl.float(table.idx % 3),
+                               z=hl.cond(table.idx == 4, hl.null(hl.tfloat64), 1.0))
+        r = table.aggregate(hl.agg.hist2d(table.x, table.y, (0, 8), (0, 3), bins=(4, 3)))
+        self.assertEqual(r.x_edges, [0, 2, 4, 6, 8])
+        self.assertEqual(r.y_edges, [0, 1, 2, 3])
+        self.assertEqual(r.bin_freq, [[1, 1, 0], [1, 0, 1], [0, 1, 1], [1, 1, 1]])
+        self.assertEqual(r.n_outside, 2)
+
+        r = table.aggregate(hl.agg.histdd([table.x, table.y, table.z], [(0, 10), (0, 3), (0, 2)], 1))
+        self.assertEqual(r.bin_edges, [[0, 10], [0, 3], [0, 2]])
+        self.assertEqual(r.bin_freq, [10])
+        self.assertEqual(r.n_outside, 0)
+
+        r = table.aggregate(hl.agg.histdd([table.x / 0], [(0, 1)], 1))
+        self.assertEqual(r.bin_freq, [0])
+        self.assertEqual(r.n_outside, 11)
+
+        with self.assertRaises(ValueError):
+            hl.agg.hist2d(table.x, table.y, (0, 0), (0, 3))
+        with self.assertRaises(ValueError):
+            hl.agg.histdd([table.x, table.y], [(0, 1)])
+
     def test_aggregator_cse(self):
         ht = hl.utils.range_table(10)
         x = hl.agg.count()
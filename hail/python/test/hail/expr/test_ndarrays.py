@@ -414,6 +414,26 @@ def test_ndarray_sum():
         (m.sum(), np_m.sum()))
 
 
+def test_agg_ndarray_sum():
+    np_m = np.arange(6, dtype=np.float64).reshape((2, 3))
+    m = hl.nd.array(np_m)
+
+    ht = hl.utils.range_table(10, n_partitions=3)
+    # records of varying layout, with every third one missing
+    ht = ht.annotate(x=hl.or_missing(ht.idx % 3 != 0,
+                                     hl.if_else(ht.idx % 2 == 0, m * ht.idx, (m.T * ht.idx).T)))
+    expected = sum(np_m * i for i in range(10) if i % 3 != 0)
+    assert np.array_equal(ht.aggregate(hl.agg.ndarray_sum(ht.x)), expected)
+    assert np.array_equal(ht.aggregate(hl.agg.ndarray_sum(hl.nd.array([ht.idx, 1]))),
+                          np.array([45, 10]))
+    assert ht.aggregate(hl.agg.filter(False, hl.agg.ndarray_sum(ht.x))) is None
+
+    ht = ht.annotate(y=hl.if_else(ht.idx == 5, hl.nd.array([1.0]), hl.nd.array([1.0, 2.0])))
+    with pytest.raises(FatalError) as exc:
+        ht.aggregate(hl.agg.ndarray_sum(ht.y))
+    assert "cannot sum ndarrays of shapes" in str(exc.value)
+
+
 def test_ndarray_transpose():
     np_v = np.array([1, 2, 3])
     np_m = np.array([[1, 2, 3], [4, 5, 6]])
@@ -265,6 +265,45 @@ class Tests(unittest.TestCase):
         self.assertAlmostEqual(stats.beta, beta1[0])
         self.assertAlmostEqual(stats.chi_sq, chi_sq)
 
+    def test_fit_alternatives_numpy_blocks(self):
+        np.random.seed(0)
+        n, f, m = 50, 3, 20
+
+        x = np.hstack([np.ones((n, 1)), np.random.randn(n, f - 1)])
+        y = np.random.randn(n)
+        z = np.random.randn(n, n)
+        s, u = np.linalg.eigh(z @ z.T / n)
+        p = u.T
+        a = np.random.randn(n, m)
+        a[:, 1] = 0
+        a[:, 2] = x[:, 1]
+
+        model = LinearMixedModel(p @ y, p @ x, s)
+        model.fit(log_gamma=0.0)
+
+        # direct fit of each alternative, using the projected inverse covariance
+        v_inv = np.diag(model._d_alt)
+        pa = p @ a
+        py, px = p @ y, p @ x
+        xdx_null = px.T @ v_inv @ px
+        residual_null = py @ v_inv @ py - (px.T @ v_inv @ py) @ np.linalg.solve(xdx_null, px.T @ v_inv @ py)
+        expected = {}
+        for i in [0] + list(range(3, m)):
+            x1 = np.hstack([pa[:, i:i + 1], px])
+            beta1 = np.linalg.solve(x1.T @ v_inv @ x1, x1.T @ v_inv @ py)
+            residual1 = py @ v_inv @ py - (x1.T @ v_inv @ py) @ beta1
+            expected[i] = (beta1[0], residual1 / (n - f - 1), n * np.log(residual_null / residual1))
+
+        for block_size, n_threads in [(4096, 1), (1, 1), (3, 1), (3, 4)]:
+            res = model.fit_alternatives_numpy(pa, return_pandas=True, block_size=block_size, n_threads=n_threads)
+            self.assertEqual(list(res['idx']), list(range(m)))
+            self.assertTrue(res.iloc[1:3][['beta', 'sigma_sq', 'chi_sq', 'p_value']].isnull().all().all())
+            for i, e in expected.items():
+                self.assertTrue(np.allclose(res.iloc[i][['beta', 'sigma_sq', 'chi_sq']], e))
+
+        with self.assertRaises(ValueError):
+            model.fit_alternatives_numpy(pa, block_size=0)
+
     @skip_unless_spark_backend()
     def test_linear_mixed_model_function(self):
         n, f, m = 4, 2, 3
@@ -1,5 +1,6 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 import pyspark.sql
 import pytest
@@ -1124,6 +1125,37 @@ class Tests(unittest.TestCase):
         ht = hl.utils.range_table(10)
         assert hl.eval(ht.take(3, _localize=False)) == ht.take(3)
 
+    def test_collect_columnar(self):
+        ht = hl.utils.range_table(10)
+        ht = ht.annotate(x=hl.or_missing(ht.idx % 2 == 0, ht.idx), s=hl.str(ht.idx), n=hl.struct(y=ht.idx * 2.5))
+        rows = ht.collect(columnar=True)
+        assert isinstance(rows, hl.utils.ColumnarTable)
+        assert len(rows) == 10
+        assert rows.to_list() == ht.collect()
+        assert list(rows) == ht.collect()
+        assert rows[3].s == '3'
+        assert rows[3].x is None
+        assert rows[3].n.y == 7.5
+        assert rows[-1].to_struct() == ht.collect()[-1]
+        assert rows['idx'].values.tolist() == list(range(10))
+
+        df = rows.to_pandas()
+        assert np.shares_memory(df['idx'].values, rows['idx'].values)
+        assert df['s'].tolist() == [str(i) for i in range(10)]
+        assert df['x'].isna().tolist() == [i % 2 == 1 for i in range(10)]
+
+    def test_take_columnar(self):
+        ht = hl.utils.range_table(10)
+        assert ht.take(3, columnar=True).to_list() == ht.take(3)
+
+    def test_expr_collect_columnar(self):
+        ht = hl.utils.range_table(10)
+        ht = ht.annotate(s=hl.str(ht.idx))
+        assert ht.idx.collect(columnar=True).values.tolist() == ht.idx.collect()
+        assert ht.s.collect(columnar=True).to_list() == ht.s.collect()
+        assert ht.row.collect(columnar=True).to_list() == ht.row.collect()
+        assert ht.idx.take(3, columnar=True).values.tolist() == [0, 1, 2]
+
     def test_expr_collect_localize_false(self):
         ht = hl.utils.range_table(10)
         assert hl.eval(ht.idx.collect(_localize=False)) == ht.idx.collect()
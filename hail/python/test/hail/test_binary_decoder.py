@@ -0,0 +1,140 @@
+import copy
+import struct
+import unittest
+
+import numpy as np
+
+import hail as hl
+from hail.backend.binary_decoder import decode, decode_columnar, parse_ptype
+from .helpers import *
+
+setUpModule = startTestHailContext
+tearDownModule = stopTestHailContext
+
+
+def block(b):
+    return struct.pack('<i', len(b)) + b
+
+
+class Tests(unittest.TestCase):
+    def test_parse_ptype(self):
+        t = parse_ptype('+PCTuple[0:PCArray[+PCStruct{`a b`:+PInt32,c:PCString,l:PCLocus(GRCh37),d:PCDict[+PCString,PFloat64]}]]')
+        self.assertTrue(t.required)
+        self.assertEqual(t.name, 'PCTuple')
+        [a] = t.children
+        self.assertFalse(a.required)
+        [s] = a.children
+        self.assertEqual([(c.name, c.required) for c in s.children],
+                         [('PInt32', True), ('PCString', False), ('PCLocus', False), ('PCDict', False)])
+        self.assertEqual([(c.name, c.required) for c in s.children[3].children],
+                         [('PCString', True), ('PFloat64', False)])
+
+    def test_decode_subset_struct(self):
+        b = b'\x00' + struct.pack('<i', 2) + b'hi' + struct.pack('<q', 5)
+        t = parse_ptype('+PSubsetStruct{s:PCString,y:+PInt64}')
+        self.assertEqual([(c.name, c.required) for c in t.children],
+                         [('PCString', False), ('PInt64', True)])
+        self.assertEqual(
+            decode(hl.tstruct(s=hl.tstr, y=hl.tint64), '+PSubsetStruct{s:PCString,y:+PInt64}', block(b)),
+            hl.Struct(s='hi', y=5))
+
+    def test_decode_missing_bits(self):
+        # [1, NA, 3] followed by a missing string
+        b = (b'\x02'
+             + struct.pack('<i', 3) + b'\x02' + struct.pack('<ii', 1, 3))
+        self.assertEqual(
+            decode(hl.ttuple(hl.tarray(hl.tint32), hl.tstr), '+PCTuple[0:PCArray[PInt32],1:PCString]', block(b)),
+            ([1, None, 3], None))
+
+    def test_decode_multiple_blocks(self):
+        b = struct.pack('<i', 2) + struct.pack('<dd', 0.5, 1.5)
+        self.assertEqual(
+            decode(hl.tarray(hl.tfloat64), '+PCArray[+PFloat64]', block(b[:5]) + block(b[5:])),
+            [0.5, 1.5])
+
+    def test_decode_call(self):
+        calls = [hl.Call([]), hl.Call([1]), hl.Call([0, 0]), hl.Call([0, 1]), hl.Call([1, 2]),
+                 hl.Call([2, 1], phased=True), hl.Call([13, 47])]
+        encoded = [0x0, 0x2 | (1 << 3), 0x4, 0x4 | (1 << 3), 0x4 | (4 << 3),
+                   0x5 | (8 << 3), 0x4 | ((47 * 48 // 2 + 13) << 3)]
+        b = struct.pack('<i', len(encoded)) + struct.pack(f'<{len(encoded)}i', *encoded)
+        self.assertEqual(decode(hl.tarray(hl.tcall), '+PCArray[+PCCall]', block(b)), calls)
+
+    def test_decode_columnar(self):
+        rows = (b'\x00' + struct.pack('<i', 7) + struct.pack('<i', 2) + b'hi'
+                + struct.pack('<i', 2) + struct.pack('<dd', 0.5, 1.5)
+                + b'\x03' + struct.pack('<i', 8))
+        b = b'\x00' + struct.pack('<i', 2) + rows
+        t = hl.ttuple(hl.tarray(hl.tstruct(x=hl.tint32, s=hl.tstr, a=hl.tarray(hl.tfloat64))))
+        ptype = '+PCTuple[0:PCArray[+PCStruct{x:+PInt32,s:PCString,a:PCArray[+PFloat64]}]]'
+        columns = decode_columnar(t, ptype, block(b))
+        self.assertEqual(columns.to_list(), decode(t, ptype, block(b))[0])
+        np.testing.assert_array_equal(columns['x'].values, np.array([7, 8], dtype=np.int32))
+        np.testing.assert_array_equal(columns['s'].offsets, [0, 2, 2])
+        np.testing.assert_array_equal(columns['s'].missing, [False, True])
+        np.testing.assert_array_equal(columns['a'].offsets, [0, 2, 2])
+        np.testing.assert_array_equal(columns['a'].values.values, [0.5, 1.5])
+        self.assertEqual(columns[0].s, 'hi')
+        self.assertIsNone(columns[1].a)
+        self.assertEqual(copy.copy(columns[0]), columns[0])
+
+    def test_columnar_row_underscore_fields(self):
+        b = b'\x00' + struct.pack('<i', 2) + struct.pack('<ii', 7, 8)
+        t = hl.ttuple(hl.tarray(hl.tstruct(_x=hl.tint32)))
+        columns = decode_columnar(t, '+PCTuple[0:PCArray[+PCStruct{_x:+PInt32}]]', block(b))
+        self.assertEqual(columns[1]._x, 8)
+        self.assertEqual(hl.Struct(_x=8)._x, 8)
+        self.assertEqual(copy.copy(columns[1]), columns[1])
+        with self.assertRaises(AttributeError):
+            columns[1]._y
+
+    def test_execute_matches_json(self):
+        exprs = [
+            hl.literal([1, None, 3], hl.tarray(hl.tint32)),
+            hl.literal([0.5, None], hl.tarray(hl.tfloat64)),
+            hl.literal([True, None, False]),
+            hl.literal({'a', 'b', None}),
+            hl.literal({'a': 1.5, 'b': None}),
+            hl.literal([hl.Struct(x=1, y='foo', z=None)], hl.tarray(hl.tstruct(x=hl.tint32, y=hl.tstr, z=hl.tfloat32))),
+            hl.tuple([hl.int64(5), hl.null(hl.tstr), hl.str('héllo')]),
+            hl.locus('1', 12345),
+            hl.parse_locus_interval('1:100-200'),
+            hl.interval(hl.null(hl.tint32), hl.null(hl.tint32)),
+            hl.call(1, 2, phased=True),
+            hl.range(100).map(lambda i: hl.or_missing(i % 3 != 0, hl.unphased_diploid_gt_index_call(i))),
+            hl.null(hl.tarray(hl.tint32)),
+            hl.range(1000).map(lambda i: hl.or_missing(i % 7 != 0, hl.float32(i) / 7)),
+        ]
+        t = hl.utils.range_table(10)
+        t = t.annotate(s=hl.str(t.idx), a=hl.range(t.idx))
+        exprs.append(t.aggregate(hl.agg.collect(t.row), _localize=False))
+        binary = hl.eval(exprs)
+        hl._set_flags(use_json_results='1')
+        try:
+            json = hl.eval(exprs)
+        finally:
+            hl._set_flags(use_json_results=None)
+        self.assertEqual(binary, json)
+
+    def test_execute_ndarray(self):
+        a = np.arange(12, dtype=np.float64).reshape(3, 4)
+        np.testing.assert_array_equal(hl.eval(hl.nd.array(a)), a)
+        np.testing.assert_array_equal(hl.eval(hl.nd.array(a).T), a.T)
+        i = np.arange(6, dtype=np.int32).reshape(2, 3)
+        np.testing.assert_array_equal(hl.eval(hl.nd.array(i)), i)
+
+    def test_execute_columnar_matches_json(self):
+        t = hl.utils.range_table(50)
+        t = t.annotate(s=hl.or_missing(t.idx % 3 != 0, hl.str(t.idx)),
+                       f=hl.float32(t.idx) / 2,
+                       a=hl.range(t.idx % 4).map(lambda i: hl.or_missing(i != 1, i)),
+                       d=hl.dict([(hl.str(t.idx), t.idx)]),
+                       n=hl.or_missing(t.idx % 2 == 0, hl.struct(b=t.idx % 4 == 0, l=hl.locus('1', t.idx + 1))))
+        binary = t.collect(columnar=True)
+        hl._set_flags(use_json_results='1')
+        try:
+            json = t.collect(columnar=True)
+        finally:
+            hl._set_flags(use_json_results=None)
+        self.assertEqual(binary.to_list(), t.collect())
+        self.assertEqual(json.to_list(), t.collect())
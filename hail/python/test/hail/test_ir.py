@@ -142,6 +142,30 @@ class ValueIRTests(unittest.TestCase):
             assert x == cp
             assert hash(x) == hash(cp)
 
+    def test_eq_and_hash_include_non_child_attributes(self):
+        i = ir.I32(5)
+        assert ir.MakeStruct([('x', i)]) != ir.MakeStruct([('y', i)])
+        assert ir.InsertFields(ir.Ref('s'), [('x', i)], None) != ir.InsertFields(ir.Ref('s'), [('x', i)], ['x'])
+        assert ir.ApplyAggOp('Sum', [], [i]) != ir.ApplyAggOp('Sum', [i], [])
+        assert ir.Let('x', i, ir.Ref('x')) != ir.Let('y', i, ir.Ref('x'))
+        assert hash(ir.MakeStruct([('x', i)])) != hash(ir.MakeStruct([('y', i)]))
+
+    def test_hash_and_str_before_type_computation(self):
+        x = ir.MakeArray([ir.I32(5)], None)
+        y = ir.MakeArray([ir.I32(5)], None)
+        parent = ir.ToStream(x)
+        hash(parent)
+        assert '(MakeArray None' in str(parent)
+        assert x.typ == hl.tarray(hl.tint32)
+        assert '(MakeArray Array[Int32]' in str(parent)
+        assert x != y
+        y._compute_type({}, None)
+        assert x == y
+        assert hash(x) == hash(y)
+        assert ir.ToStream(x) == ir.ToStream(y)
+        assert hash(parent) == hash(ir.ToStream(y))
+        assert str(parent) == str(ir.ToStream(y))
+
 
 class TableIRTests(unittest.TestCase):
     def table_irs(self):
@@ -286,6 +310,13 @@ class MatrixIRTests(unittest.TestCase):
             ht = ht.annotate(**{f'x{i}': i})
         str(ht._tir)
 
+        ht2 = hl.utils.range_table(N)
+        for i in range(M):
+            ht2 = ht2.annotate(**{f'x{i}': i})
+        assert hash(ht._tir) == hash(ht2._tir)
+        assert ht._tir == ht2._tir
+        assert ht._tir != ht2.annotate(y=0)._tir
+
         # TODO: Scala Pretty errors out with a StackOverflowError here
         # ht._force_count()
 
@@ -6,3 +6,17 @@ from .helpers import *
 class Tests(unittest.TestCase):
     def test_get_reference_before_init(self):
         hl.get_reference('GRCh37') # Should be no error
+
+    def test_lazy_submodules(self):
+        import subprocess
+        import sys
+        subprocess.run([sys.executable, '-c', '''
+import sys
+import hail as hl
+for module in ['scipy', 'hail.linalg', 'hail.stats', 'hail.plot']:
+    assert module not in sys.modules, module
+assert 'plot' in dir(hl)
+assert hl.plot.histogram is not None
+assert hl.linalg.BlockMatrix is not None
+assert hl.experimental.ld_score is not None
+'''], check=True)
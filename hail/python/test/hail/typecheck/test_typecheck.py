@@ -1,3 +1,4 @@
+import inspect
 import unittest
 
 from hail.typecheck.check import *
@@ -277,3 +278,44 @@ class Tests(unittest.TestCase):
         f(1)
         with self.assertRaises(TypeError):
             f(1, 2)
+
+    def test_keyword_only_and_signature(self):
+        @typecheck(x=int, y=nullable(str), z=sequenceof(int), kwargs=int)
+        def f(x, y=None, *, z=(1, 2), **kwargs):
+            return x, y, z, kwargs
+
+        self.assertEqual(f(1), (1, None, [1, 2], {}))
+        self.assertEqual(f(1, 'a', z=(3,), w=4), (1, 'a', [3], {'w': 4}))
+        self.assertEqual(f(y='b', x=2), (2, 'b', [1, 2], {}))
+        self.assertEqual(str(inspect.signature(f)), "(x, y=None, *, z=(1, 2), **kwargs)")
+        with self.assertRaisesRegex(TypeError, "parameter 'z'"):
+            f(1, z='a')
+        with self.assertRaisesRegex(TypeError, "keyword argument 'w'"):
+            f(1, w='a')
+        with self.assertRaises(TypeError):
+            f(1, x=2)
+
+    def test_method_argument_names(self):
+        class Foo:
+            @typecheck_method(x=int, args=transformed((int, lambda x: x + 1)))
+            def f(self, x, *args):
+                return x, args
+
+        self.assertEqual(Foo().f(1, 1, 2), (1, (2, 3)))
+        with self.assertRaisesRegex(TypeError, r"parameter '\*args' \(arg 1 of 2\)"):
+            Foo().f(1, 1, 'a')
+
+    def test_disable(self):
+        @typecheck(x=int, y=transformed((int, lambda x: x + 1)))
+        def f(x, y):
+            return x, y
+
+        set_typecheck_enabled(False)
+        try:
+            self.assertEqual(f('a', 1), ('a', 2))
+            with self.assertRaises(TypeError):
+                f(1, 'a')
+        finally:
+            set_typecheck_enabled(True)
+        with self.assertRaises(TypeError):
+            f('a', 1)
@@ -0,0 +1,181 @@
+import re
+import uuid
+import urllib.parse
+import aiohttp
+from aiohttp import web
+from hailtop.utils import request_retry_transient_errors
+from hailtop.aiogoogle.auth.session import BaseSession
+
+
+class UnauthenticatedSession(BaseSession):
+    def __init__(self):
+        self._session = aiohttp.ClientSession(raise_for_status=True)
+
+    async def request(self, method: str, url: str, **kwargs):
+        return await request_retry_transient_errors(self._session, method, url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class FakeStorageServer:
+    '''A subset of the Google Cloud Storage JSON API, in memory.
+
+    `persist_limit`, if set, bounds the bytes persisted by each
+    resumable upload request, to exercise resending unpersisted bytes.
+    The first `n_upload_failures` requests that upload data read the
+    body and then fail with 503 Service Unavailable.
+    '''
+
+    def __init__(self, *, persist_limit=None, page_size=2, n_upload_failures=0):
+        self.objects = {}
+        self.uploads = {}
+        self.persist_limit = persist_limit
+        self.n_upload_failures = n_upload_failures
+        self.page_size = page_size
+        self.n_requests = 0
+        self._runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.add_routes([
+            web.post('/storage/v1/b/{bucket}/o/{name:.+}/compose', self.compose),
+            web.get('/storage/v1/b/{bucket}/o', self.list_objects),
+            web.get('/storage/v1/b/{bucket}/o/{name:.+}', self.get_object),
+            web.delete('/storage/v1/b/{bucket}/o/{name:.+}', self.delete_object),
+            web.post('/upload/storage/v1/b/{bucket}/o', self.insert_object),
+            web.put('/upload/resumable/{upload_id}', self.put_resumable),
+            web.post('/batch/storage/v1', self.batch)
+        ])
+
+        @web.middleware
+        async def count(request, handler):
+            self.n_requests += 1
+            return await handler(request)
+        app.middlewares.append(count)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def _metadata(self, bucket, name):
+        data, content_type = self.objects[(bucket, name)]
+        return {'bucket': bucket, 'name': name, 'size': str(len(data)), 'contentType': content_type}
+
+    async def get_object(self, request):
+        key = (request.match_info['bucket'], request.match_info['name'])
+        if key not in self.objects:
+            raise web.HTTPNotFound()
+        if request.query.get('alt') != 'media':
+            return web.json_response(self._metadata(*key))
+        data, _ = self.objects[key]
+        range_header = request.headers.get('Range')
+        if range_header:
+            m = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header)
+            start = int(m.group(1))
+            end = int(m.group(2)) + 1 if m.group(2) else len(data)
+            return web.Response(body=data[start:end], status=206)
+        return web.Response(body=data)
+
+    async def delete_object(self, request):
+        key = (request.match_info['bucket'], request.match_info['name'])
+        if self.objects.pop(key, None) is None:
+            raise web.HTTPNotFound()
+        return web.Response(status=204)
+
+    async def list_objects(self, request):
+        bucket = request.match_info['bucket']
+        prefix = request.query.get('prefix', '')
+        names = sorted(name for b, name in self.objects if b == bucket and name.startswith(prefix))
+        start = int(request.query.get('pageToken', 0))
+        body = {'items': [self._metadata(bucket, name) for name in names[start:start + self.page_size]]}
+        if start + self.page_size < len(names):
+            body['nextPageToken'] = str(start + self.page_size)
+        return web.json_response(body)
+
+    async def _maybe_fail_upload(self, request):
+        if self.n_upload_failures > 0:
+            self.n_upload_failures -= 1
+            await request.read()
+            raise web.HTTPServiceUnavailable()
+
+    async def insert_object(self, request):
+        bucket = request.match_info['bucket']
+        upload_type = request.query['uploadType']
+        if upload_type == 'media':
+            await self._maybe_fail_upload(request)
+            name = request.query['name']
+            self.objects[(bucket, name)] = (await request.read(), request.headers['Content-Type'])
+            return web.json_response(self._metadata(bucket, name))
+        assert upload_type == 'resumable'
+        body = await request.json()
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = (bucket, body['name'], body['contentType'], bytearray())
+        return web.Response(headers={'Location': f'{self.url}/upload/resumable/{upload_id}'})
+
+    async def put_resumable(self, request):
+        await self._maybe_fail_upload(request)
+        bucket, name, content_type, persisted = self.uploads[request.match_info['upload_id']]
+        data = await request.read()
+        m = re.fullmatch(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', request.headers['Content-Range'])
+        if m.group(1) is not None:
+            start = int(m.group(1))
+            assert start <= len(persisted), (start, len(persisted))
+            data = data[len(persisted) - start:]
+            if self.persist_limit is not None:
+                data = data[:self.persist_limit]
+            persisted.extend(data)
+        total = m.group(3)
+        if total != '*' and len(persisted) == int(total):
+            self.objects[(bucket, name)] = (bytes(persisted), content_type)
+            return web.json_response(self._metadata(bucket, name))
+        headers = {}
+        if persisted:
+            headers['Range'] = f'bytes=0-{len(persisted) - 1}'
+        return web.Response(status=308, headers=headers)
+
+    async def compose(self, request):
+        bucket = request.match_info['bucket']
+        name = request.match_info['name']
+        body = await request.json()
+        sources = body['sourceObjects']
+        if len(sources) > 32:
+            raise web.HTTPBadRequest()
+        data = b''.join(self.objects[(bucket, source['name'])][0] for source in sources)
+        content_type = body['destination'].get('contentType', 'application/octet-stream')
+        self.objects[(bucket, name)] = (data, content_type)
+        return web.json_response(self._metadata(bucket, name))
+
+    async def batch(self, request):
+        reader = await request.multipart()
+        responses = []
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            request_line = (await part.text()).split('\r\n', 1)[0]
+            method, path, _ = request_line.split(' ')
+            m = re.fullmatch(r'/storage/v1/b/([^/]+)/o/(.+)', path)
+            assert method == 'DELETE' and m, request_line
+            key = (m.group(1), urllib.parse.unquote(m.group(2)))
+            if self.objects.pop(key, None) is None:
+                responses.append('HTTP/1.1 404 Not Found\r\n\r\n')
+            else:
+                responses.append('HTTP/1.1 204 No Content\r\n\r\n')
+
+        boundary = f'batch_{uuid.uuid4().hex}'
+        body = ''.join(
+            f'--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{i}>\r\n\r\n{response}\r\n'
+            for i, response in enumerate(responses))
+        body += f'--{boundary}--\r\n'
+        return web.Response(body=body.encode('utf-8'),
+                            headers={'Content-Type': f'multipart/mixed; boundary={boundary}'})
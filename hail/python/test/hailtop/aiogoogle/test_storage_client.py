@@ -0,0 +1,120 @@
+import asyncio
+import os
+import unittest
+import aiohttp
+from hailtop.aiogoogle import StorageClient
+from .fake_storage import FakeStorageServer, UnauthenticatedSession
+
+
+class Test(unittest.TestCase):
+    def run_with_client(self, f, **server_kwargs):
+        async def run():
+            server = FakeStorageServer(**server_kwargs)
+            await server.start()
+            try:
+                async with StorageClient(url=server.url, session=UnauthenticatedSession()) as client:
+                    await f(server, client)
+            finally:
+                await server.stop()
+        asyncio.get_event_loop().run_until_complete(run())
+
+    def test_insert_get_ranged(self):
+        async def f(server, client):
+            await client.insert_object('bucket', 'a/b c', b'0123456789')
+            self.assertEqual(await client.get_object('bucket', 'a/b c'), b'0123456789')
+            self.assertEqual(await client.get_object('bucket', 'a/b c', start=2, end=4), b'234')
+            self.assertEqual(await client.get_object('bucket', 'a/b c', start=7), b'789')
+            metadata = await client.get_object_metadata('bucket', 'a/b c')
+            self.assertEqual(metadata['size'], '10')
+            with self.assertRaises(aiohttp.ClientResponseError) as cm:
+                await client.get_object('bucket', 'missing')
+            self.assertEqual(cm.exception.status, 404)
+        self.run_with_client(f)
+
+    def test_streaming(self):
+        data = os.urandom(3 * 1024 * 1024 + 17)
+
+        async def chunks():
+            for i in range(0, len(data), 100_000):
+                yield data[i:i + 100_000]
+
+        async def f(server, client):
+            metadata = await client.insert_object('bucket', 'streamed', chunks())
+            self.assertEqual(metadata['size'], str(len(data)))
+            received = bytearray()
+            async for chunk in client.get_object_chunks('bucket', 'streamed', chunk_size=65536):
+                self.assertLessEqual(len(chunk), 65536)
+                received.extend(chunk)
+            self.assertEqual(bytes(received), data)
+        self.run_with_client(f)
+
+    def test_streaming_retries_failed_upload(self):
+        data = os.urandom(1024 * 1024 + 17)
+
+        async def chunks():
+            for i in range(0, len(data), 100_000):
+                yield data[i:i + 100_000]
+
+        async def f(server, client):
+            await client.insert_object('bucket', 'bytes', data)
+            self.assertEqual(await client.get_object('bucket', 'bytes'), data)
+            server.n_upload_failures = 1
+            await client.insert_object('bucket', 'streamed', chunks())
+            self.assertEqual(server.n_upload_failures, 0)
+            self.assertEqual(await client.get_object('bucket', 'streamed'), data)
+        self.run_with_client(f, n_upload_failures=1)
+
+    def test_resumable_upload(self):
+        data = os.urandom(3 * 256 * 1024 + 1000)
+
+        async def chunks():
+            for i in range(0, len(data), 200_000):
+                yield data[i:i + 200_000]
+
+        async def f(server, client):
+            n = await client.insert_object_resumable('bucket', 'resumable', chunks(), chunk_size=256 * 1024)
+            self.assertEqual(n, len(data))
+            self.assertEqual(await client.get_object('bucket', 'resumable'), data)
+
+            async def empty():
+                for chunk in []:
+                    yield chunk
+            await client.insert_object_resumable('bucket', 'empty', empty())
+            self.assertEqual(await client.get_object('bucket', 'empty'), b'')
+        # persist less than each request sends, so unpersisted bytes are resent
+        self.run_with_client(f, persist_limit=100_000)
+
+    def test_list_and_delete(self):
+        async def f(server, client):
+            for i in range(5):
+                await client.insert_object('bucket', f'dir/{i}', b'x')
+            await client.insert_object('bucket', 'other', b'x')
+
+            names = [item['name'] async for item in await client.list_objects('bucket', prefix='dir/')]
+            self.assertEqual(names, [f'dir/{i}' for i in range(5)])
+
+            await client.delete_object('bucket', 'dir/0')
+            await client.delete_object('bucket', 'dir/0')
+            with self.assertRaises(aiohttp.ClientResponseError):
+                await client.delete_object('bucket', 'dir/0', ignore_missing=False)
+
+            n_requests = server.n_requests
+            await client.delete_objects('bucket', ['dir/1', 'dir/2', 'missing'])
+            self.assertEqual(server.n_requests, n_requests + 1)
+            with self.assertRaises(ValueError):
+                await client.delete_objects('bucket', ['missing'], ignore_missing=False)
+
+            await client.delete_prefix('bucket', 'dir/')
+            self.assertEqual(set(server.objects), {('bucket', 'other')})
+        self.run_with_client(f)
+
+    def test_compose(self):
+        async def f(server, client):
+            names = [f'part/{i:03}' for i in range(100)]
+            for i, name in enumerate(names):
+                await client.insert_object('bucket', name, f'{i},'.encode())
+            await client.compose('bucket', names, 'composed', content_type='text/plain')
+            self.assertEqual(await client.get_object('bucket', 'composed'),
+                             ''.join(f'{i},' for i in range(100)).encode())
+            self.assertEqual({name for _, name in server.objects}, set(names) | {'composed'})
+        self.run_with_client(f)
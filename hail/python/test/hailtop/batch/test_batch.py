@@ -252,6 +252,57 @@ class LocalTests(unittest.TestCase):
 
             assert self.read(output_file.name) == '2\n1\n0'
 
+    def test_independent_jobs_run_concurrently(self):
+        with tempfile.TemporaryDirectory() as started:
+            b = Batch(backend=LocalBackend(n_cpus=4))
+            for i in range(4):
+                j = b.new_job()
+                # fails unless all four jobs have started before any finishes
+                j.command(f'touch {shq(started)}/{i}; '
+                          f'for k in $(seq 600); do [ $(ls {shq(started)} | wc -l) -eq 4 ] && exit 0; sleep 0.1; done; '
+                          f'exit 1')
+            b.run()
+
+    def test_cpu_limits_concurrency(self):
+        with tempfile.TemporaryDirectory() as running, \
+                tempfile.NamedTemporaryFile('w') as output_file:
+            b = Batch(backend=LocalBackend(n_cpus=4))
+            for i in range(6):
+                j = b.new_job()
+                j.cpu(2)
+                # each job records how many jobs are running, itself included
+                j.command(f'touch {shq(running)}/{i}; ls {shq(running)} | wc -l >> {shq(output_file.name)}; '
+                          f'sleep 0.1; rm {shq(running)}/{i}')
+            b.run()
+            n_running = [int(n) for n in self.read(output_file.name).split()]
+            assert len(n_running) == 6
+            assert max(n_running) <= 2
+
+    def test_dependencies_finish_first(self):
+        with tempfile.TemporaryDirectory() as finished:
+            b = Batch(backend=LocalBackend(n_cpus=4))
+            heads = []
+            for i in range(3):
+                head = b.new_job()
+                head.command(f'touch {shq(finished)}/{i}')
+                heads.append(head)
+            tail = b.new_job()
+            tail.command(f'test $(ls {shq(finished)} | wc -l) -eq 3')
+            tail.depends_on(*heads)
+            b.run()
+
+    def test_failure_stops_scheduling(self):
+        with tempfile.NamedTemporaryFile('w') as output_file:
+            b = self.batch()
+            head = b.new_job()
+            head.command('false')
+            tail = b.new_job()
+            tail.command(f'echo tail > {shq(output_file.name)}')
+            tail.depends_on(head)
+            with self.assertRaises(sp.CalledProcessError):
+                b.run()
+            assert self.read(output_file.name) == ''
+
     def test_add_extension_job_resource_file(self):
         b = self.batch()
         j = b.new_job()
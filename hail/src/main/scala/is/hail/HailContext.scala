@@ -630,6 +630,7 @@ class HailFeatureFlags {
       "jvm_bytecode_dump" -> sys.env.getOrElse("HAIL_DEV_JVM_BYTECODE_DUMP", null),
       "use_packed_int_encoding" -> sys.env.getOrElse("HAIL_DEV_USE_PACKED_INT_ENCODING", null),
       "use_column_encoding" -> sys.env.getOrElse("HAIL_DEV_USE_COLUMN_ENCODING", null),
+      "use_json_results" -> sys.env.getOrElse("HAIL_DEV_USE_JSON_RESULTS", null),
       "use_spicy_ptypes" -> sys.env.getOrElse("HAIL_USE_SPICY_PTYPES", null)
     )
 
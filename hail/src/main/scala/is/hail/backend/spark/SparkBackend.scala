@@ -344,6 +344,24 @@ class SparkBackend(
     }
   }
 
+  // Like executeJSON, but returns the result tuple in the binary encoding of
+  // its physical type instead of as JSON, along with that type and the timings.
+  def executeEncode(ir: IR, bufferSpecString: String): (String, Array[Byte], String) = {
+    val bs = BufferSpec.parseOrDefault(bufferSpecString)
+    withExecuteContext() { ctx =>
+      val (res, timings) = _execute(ctx, ir, true)
+      res match {
+        case Left(_) => throw new RuntimeException("expression returned void")
+        case Right((t, off)) =>
+          val codec = TypedCodecSpec(EType.defaultFromPType(t), t.virtualType, bs)
+          val bytes = codec.encode(ctx, t, off)
+          timings.finish()
+          timings.logInfo()
+          (t.toString, bytes, Serialization.write(timings.asMap())(new DefaultFormats {}))
+      }
+    }
+  }
+
   def decodeToJSON(ptypeString: String, b: Array[Byte], bufferSpecString: String): String = {
     val t = IRParser.parsePType(ptypeString)
     val bs = BufferSpec.parseOrDefault(bufferSpecString)
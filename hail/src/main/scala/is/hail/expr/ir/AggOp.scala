@@ -39,6 +39,7 @@ final case class Downsample() extends AggOp
 final case class LinearRegression() extends AggOp
 final case class Max() extends AggOp
 final case class Min() extends AggOp
+final case class NDArraySum() extends AggOp
 final case class Product() extends AggOp
 final case class Sum() extends AggOp
 final case class Take() extends AggOp
@@ -57,6 +58,7 @@ object AggOp {
     case "collect" | "Collect" => Collect()
     case "collectAsSet" | "CollectAsSet" => CollectAsSet()
     case "sum" | "Sum" => Sum()
+    case "ndarraySum" | "NDArraySum" => NDArraySum()
     case "product" | "Product" => Product()
     case "max" | "Max" => Max()
     case "min" | "Min" => Min()
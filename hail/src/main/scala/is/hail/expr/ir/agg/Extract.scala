@@ -29,6 +29,7 @@ object AggStateSig {
     op match {
       case Sum() | Product() => TypedStateSig(seqPTypes.head.setRequired(true))
       case Min() | Max()  => TypedStateSig(seqPTypes.head.setRequired(false))
+      case NDArraySum() => TypedStateSig(seqPTypes.head.setRequired(false))
       case Count() => TypedStateSig(PInt64(true))
       case Take() => TakeStateSig(seqPTypes.head)
       case TakeBy() =>
@@ -252,6 +253,7 @@ object Extract {
   def getResultType(aggSig: AggSignature): Type = aggSig match {
     case AggSignature(Sum(), _, Seq(t)) => t
     case AggSignature(Product(), _, Seq(t)) => t
+    case AggSignature(NDArraySum(), _, Seq(t)) => t
     case AggSignature(Min(), _, Seq(t)) => t
     case AggSignature(Max(), _, Seq(t)) => t
     case AggSignature(Count(), _, _) => TInt64
@@ -270,6 +272,7 @@ object Extract {
   def getAgg(sig: PhysicalAggSig): StagedAggregator = sig match {
     case PhysicalAggSig(Sum(), TypedStateSig(t)) => new SumAggregator(t)
     case PhysicalAggSig(Product(), TypedStateSig(t)) => new ProductAggregator(t)
+    case PhysicalAggSig(NDArraySum(), TypedStateSig(t: PNDArray)) => new NDArraySumAggregator(t)
     case PhysicalAggSig(Min(), TypedStateSig(t)) => new MinAggregator(t)
     case PhysicalAggSig(Max(), TypedStateSig(t)) => new MaxAggregator(t)
     case PhysicalAggSig(PrevNonnull(), TypedStateSig(t)) => new PrevNonNullAggregator(t)
@@ -0,0 +1,120 @@
+package is.hail.expr.ir.agg
+
+import is.hail.annotations.{Region, StagedRegionValueBuilder}
+import is.hail.asm4s._
+import is.hail.expr.ir.{EmitCode, EmitCodeBuilder}
+import is.hail.types.physical._
+import is.hail.utils._
+
+object NDArraySumAggregator {
+  private def loadLongs(t: PTuple, off: Long): Array[Long] =
+    Array.tabulate(t.size)(i => Region.loadLong(t.fieldOffset(off, i)))
+
+  private def firstElementOffset(t: PArray, aoff: Long): Long =
+    t.firstElementOffset(aoff, t.loadLength(aoff))
+
+  // adds the elements of the ndarray at `right` to those of the ndarray at
+  // `left`, overwriting `left`'s data
+  def addInPlace(pt: PType, left: Long, right: Long): Unit = {
+    val t = pt.asInstanceOf[PCanonicalNDArray]
+    val shapeOff = t.representation.loadField(left, 0)
+    val shape = loadLongs(t.shape.pType, shapeOff)
+    val rightShape = loadLongs(t.shape.pType, t.representation.loadField(right, 0))
+    if (!shape.sameElements(rightShape))
+      fatal(s"ndarray_sum: cannot sum ndarrays of shapes (${ shape.mkString(", ") }) and (${ rightShape.mkString(", ") })")
+
+    val leftStrides = loadLongs(t.strides.pType, t.representation.loadField(left, 1))
+    val rightStrides = loadLongs(t.strides.pType, t.representation.loadField(right, 1))
+    val leftData = firstElementOffset(t.data.pType, t.representation.loadField(left, 2))
+    val rightData = firstElementOffset(t.data.pType, t.representation.loadField(right, 2))
+    val isFloat64 = t.elementType.isInstanceOf[PFloat64]
+
+    val nDims = t.nDims
+    val n = shape.product
+    if (n == 0)
+      return
+
+    // walk both ndarrays in row major order, following each one's strides
+    val idx = new Array[Long](nDims)
+    var leftOff = leftData
+    var rightOff = rightData
+    var i = 0L
+    while (i < n) {
+      if (isFloat64)
+        Region.storeDouble(leftOff, Region.loadDouble(leftOff) + Region.loadDouble(rightOff))
+      else
+        Region.storeLong(leftOff, Region.loadLong(leftOff) + Region.loadLong(rightOff))
+      i += 1
+
+      var d = nDims - 1
+      var carry = true
+      while (carry && d >= 0) {
+        idx(d) += 1
+        leftOff += leftStrides(d)
+        rightOff += rightStrides(d)
+        if (idx(d) == shape(d)) {
+          leftOff -= leftStrides(d) * shape(d)
+          rightOff -= rightStrides(d) * shape(d)
+          idx(d) = 0
+          d -= 1
+        } else
+          carry = false
+      }
+    }
+  }
+}
+
+class NDArraySumAggregator(ndTyp: PNDArray) extends StagedAggregator {
+  type State = TypedRegionBackedAggState
+
+  ndTyp.elementType match {
+    case _: PInt64 | _: PFloat64 =>
+    case t => throw new UnsupportedOperationException(s"can't ndarray_sum over element type $t")
+  }
+
+  val resultType: PType = ndTyp
+  val initOpTypes: Seq[PType] = Array[PType]()
+  val seqOpTypes: Seq[PType] = Array[PType](ndTyp)
+
+  // the state holds its own copy of the first ndarray seen; later ndarrays
+  // are added into that copy without allocating
+  private def add(state: State, nd: Code[Long]): Code[Unit] = {
+    val current = state.get()
+    Code.memoize(nd, "ndarray_sum_nd") { nd =>
+      Code(
+        current.setup,
+        current.m.mux(
+          state.storeNonmissing(nd),
+          Code.invokeScalaObject3[PType, Long, Long, Unit](NDArraySumAggregator.getClass, "addInPlace",
+            state.kb.getPType(ndTyp), current.value[Long], nd)))
+    }
+  }
+
+  protected def _initOp(cb: EmitCodeBuilder, state: State, init: Array[EmitCode]): Unit = {
+    assert(init.length == 0)
+    cb += state.storeMissing()
+  }
+
+  protected def _seqOp(cb: EmitCodeBuilder, state: State, seq: Array[EmitCode]): Unit = {
+    val Array(nextND: EmitCode) = seq
+    cb += Code(
+      nextND.setup,
+      nextND.m.mux(Code._empty, add(state, nextND.value[Long])))
+  }
+
+  protected def _combOp(cb: EmitCodeBuilder, state: State, other: State): Unit = {
+    val otherND = other.get()
+    cb += Code(
+      otherND.setup,
+      otherND.m.mux(Code._empty, add(state, otherND.value[Long])))
+  }
+
+  protected def _result(cb: EmitCodeBuilder, state: State, srvb: StagedRegionValueBuilder): Unit = {
+    val t = state.get()
+    cb += Code(
+      t.setup,
+      t.m.mux(
+        srvb.setMissing(),
+        srvb.addWithDeepCopy(resultType, t.v)))
+  }
+}
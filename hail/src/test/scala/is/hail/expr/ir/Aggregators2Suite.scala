@@ -4,6 +4,7 @@ import breeze.linalg.sum
 import is.hail.TestUtils._
 import is.hail.annotations._
 import is.hail.asm4s._
+import is.hail.expr.Nat
 import is.hail.expr.ir.agg._
 import is.hail.types.MatrixType
 import is.hail.types.physical._
@@ -439,6 +440,36 @@ class Aggregators2Suite extends HailSuite {
     assertAggEquals(aggSig, FastIndexedSeq(), seqOpArgsNA, expected = null, args = FastIndexedSeq(("rows", (arrayType, rows))))
   }
 
+  @Test def testNDArraySum() {
+    val aggSig = PhysicalAggSig(NDArraySum(), TypedStateSig(PCanonicalNDArray(PFloat64(true), 2)))
+
+    def makeNDArray(data: Seq[Double], rowMajor: Boolean): IR =
+      MakeNDArray(MakeArray(data.map(F64), TArray(TFloat64)), MakeTuple.ordered(FastSeq(I64(2), I64(3))), if (rowMajor) True() else False())
+
+    // the elements in row major order, following the strides of the result
+    def elements(nd: Any): IndexedSeq[Double] = {
+      val Row(Row(nRows: Long, nCols: Long), Row(rowStride: Long, colStride: Long), data: IndexedSeq[_]) = nd
+      for (i <- 0L until nRows; j <- 0L until nCols)
+        yield data(((i * rowStride + j * colStride) / 8).toInt).asInstanceOf[Double]
+    }
+
+    val seqOpArgs = FastIndexedSeq(
+      makeNDArray(FastSeq(1.0, 2.0, 3.0, 4.0, 5.0, 6.0), rowMajor = true),
+      NA(TNDArray(TFloat64, Nat(2))),
+      // [[1, 2, 3], [4, 5, 6]] in column major order
+      makeNDArray(FastSeq(1.0, 4.0, 2.0, 5.0, 3.0, 6.0), rowMajor = false),
+      makeNDArray(FastSeq(0.5, 0.5, 0.5, 0.5, 0.5, 0.5), rowMajor = true),
+      makeNDArray(FastSeq(-1.0, 0.0, 1.0, 0.0, -1.0, 0.0), rowMajor = false)
+    ).map(FastIndexedSeq(_))
+
+    assertAggEquals(aggSig, FastIndexedSeq(), seqOpArgs,
+      expected = FastIndexedSeq(1.5, 5.5, 5.5, 8.5, 10.5, 12.5),
+      transformResult = Some(elements _))
+
+    val seqOpArgsNA = Array.fill(4)(FastIndexedSeq[IR](NA(TNDArray(TFloat64, Nat(2)))))
+    assertAggEquals(aggSig, FastIndexedSeq(), seqOpArgsNA, expected = null)
+  }
+
   @Test def testCollectLongs() {
     val seqOpArgs = Array.tabulate(rows.length)(i => FastIndexedSeq[IR](GetField(ArrayRef(Ref("rows", arrayType), i), "b")))
     assertAggEquals(collectAggSig(TInt64), FastIndexedSeq(), seqOpArgs,